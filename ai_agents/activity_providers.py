@@ -0,0 +1,380 @@
+"""
+Activity Providers
+Unified, pre-parsed activity data for AISRI calculation from every source.
+
+Sources:
+- Strava            (strava_activities)
+- Garmin uploads    (workout_results, data_source = 'garmin')
+- Manual logs       (workout_results, data_source = 'manual')
+- In-app GPS runs   (run_sessions)
+
+Features:
+- Each provider fetches a whole batch of athletes in a few paged queries,
+  so adding a source adds no per-athlete query cost
+- All sources are parsed once into one columnar ActivityFrame (numpy arrays)
+- The same run reported by several sources is deduplicated
+  (start within 5 minutes and distance within 5%); the richest source wins
+
+Usage:
+    frame = load_activity_frame(db.supabase, user_ids, since=datetime.now() - timedelta(weeks=8))
+    frame.slice(user_id)          # one athlete's activities, newest first
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+
+# Source codes double as dedupe priority: lower code wins a duplicate
+SOURCE_STRAVA = 0
+SOURCE_GARMIN = 1
+SOURCE_RUN_SESSION = 2
+SOURCE_MANUAL = 3
+
+SOURCE_NAMES = {
+    SOURCE_STRAVA: 'Strava',
+    SOURCE_GARMIN: 'Garmin',
+    SOURCE_RUN_SESSION: 'SafeStride',
+    SOURCE_MANUAL: 'Manual'
+}
+
+DEDUPE_START_TOLERANCE_SECONDS = 300
+DEDUPE_DISTANCE_TOLERANCE = 0.05
+
+QUERY_ATHLETE_CHUNK = 100   # athlete IDs per .in_() filter (URL length)
+QUERY_PAGE_SIZE = 1000      # PostgREST default max rows per request
+
+
+def _to_timestamp(value) -> float:
+    """ISO string / datetime -> epoch seconds (naive values are treated as UTC)"""
+    value = parse_datetime(value)
+    return np.nan if value is None else value.timestamp()
+
+
+def _to_float(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def parse_datetime(value) -> Optional[datetime]:
+    """ISO string / datetime -> aware datetime (naive values are treated as UTC)"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+# =============================================================================
+# ACTIVITY FRAME
+# =============================================================================
+
+@dataclass
+class ActivityFrame:
+    """
+    Columnar activity data for many athletes.
+
+    Rows are grouped by athlete (in `user_ids` order) and sorted newest
+    first within each athlete; rows of athlete i are
+    offsets[i]:offsets[i + 1]. Missing values are NaN.
+    """
+    user_ids: List[str]
+    offsets: np.ndarray         # int64, len(user_ids) + 1
+    start_ts: np.ndarray        # float64 epoch seconds
+    distance_m: np.ndarray      # float64
+    moving_time_s: np.ndarray   # float64
+    average_speed: np.ndarray   # float64 m/s
+    average_heartrate: np.ndarray
+    suffer_score: np.ndarray
+    source: np.ndarray          # int8 SOURCE_* code
+    _position: Dict[str, int] = field(init=False, repr=False)
+
+    COLUMNS = ('start_ts', 'distance_m', 'moving_time_s', 'average_speed',
+               'average_heartrate', 'suffer_score', 'source')
+
+    def __post_init__(self):
+        self._position = {user_id: i for i, user_id in enumerate(self.user_ids)}
+
+    def __len__(self) -> int:
+        return len(self.start_ts)
+
+    def __eq__(self, other) -> bool:
+        """Same athletes and rows; NaN equals NaN (the generated __eq__ cannot compare arrays)"""
+        if not isinstance(other, ActivityFrame):
+            return NotImplemented
+        return self.user_ids == other.user_ids and np.array_equal(self.offsets, other.offsets) and all(
+            np.array_equal(getattr(self, column), getattr(other, column), equal_nan=True)
+            for column in self.COLUMNS
+        )
+
+    @property
+    def athlete_index(self) -> np.ndarray:
+        """Athlete position (into user_ids) of every row"""
+        return np.repeat(np.arange(len(self.user_ids)), np.diff(self.offsets))
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Activities per athlete"""
+        return np.diff(self.offsets)
+
+    def sources_for(self, user_id: str) -> List[str]:
+        """Names of the sources that contributed to an athlete's activities"""
+        athlete = self._position[user_id]
+        codes = np.unique(self.source[self.offsets[athlete]:self.offsets[athlete + 1]])
+        return [SOURCE_NAMES[int(code)] for code in codes]
+
+    def slice(self, user_id: str) -> 'ActivityFrame':
+        """Single-athlete view"""
+        athlete = self._position[user_id]
+        lo, hi = self.offsets[athlete], self.offsets[athlete + 1]
+        return ActivityFrame(
+            user_ids=[user_id],
+            offsets=np.array([0, hi - lo], dtype=np.int64),
+            **{column: getattr(self, column)[lo:hi] for column in self.COLUMNS}
+        )
+
+    @classmethod
+    def build(
+        cls,
+        user_ids: Sequence[str],
+        columns: Dict[str, List],
+        row_user_ids: List[str],
+        dedupe: bool = True
+    ) -> 'ActivityFrame':
+        """
+        Assemble a frame from raw column lists gathered across providers.
+
+        Args:
+            user_ids: Athletes the frame is for (athletes without rows are kept)
+            columns: Column name -> list of values (see COLUMNS)
+            row_user_ids: Athlete of every row
+            dedupe: Drop the same run reported by several sources
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        position = {user_id: i for i, user_id in enumerate(user_ids)}
+
+        athlete = np.array([position.get(u, -1) for u in row_user_ids], dtype=np.int64)
+        data = {
+            column: np.asarray(columns.get(column, []), dtype=np.int8 if column == 'source' else np.float64)
+            for column in cls.COLUMNS
+        }
+
+        keep = (athlete >= 0) & ~np.isnan(data['start_ts'])
+        athlete = athlete[keep]
+        data = {column: values[keep] for column, values in data.items()}
+
+        if dedupe and len(athlete):
+            survivors = cls._dedupe_index(athlete, data)
+            athlete = athlete[survivors]
+            data = {column: values[survivors] for column, values in data.items()}
+
+        # Group by athlete, newest first
+        order = np.lexsort((-data['start_ts'], athlete))
+        athlete = athlete[order]
+        data = {column: values[order] for column, values in data.items()}
+
+        offsets = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(athlete, minlength=len(user_ids)))
+
+        return cls(user_ids=user_ids, offsets=offsets, **data)
+
+    @staticmethod
+    def _dedupe_index(athlete: np.ndarray, data: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Row indices that survive cross-source deduplication.
+
+        Rows of one athlete sorted by start time form a duplicate cluster
+        while each start is within tolerance of the previous one and the
+        distances agree within tolerance. Each cluster keeps its row from
+        the highest-priority source.
+        """
+        order = np.lexsort((data['start_ts'], athlete))
+        start = data['start_ts'][order]
+        distance = np.nan_to_num(data['distance_m'][order])
+        same_athlete = athlete[order][1:] == athlete[order][:-1]
+
+        close_start = np.diff(start) <= DEDUPE_START_TOLERANCE_SECONDS
+        longer = np.maximum(distance[1:], distance[:-1])
+        close_distance = np.abs(distance[1:] - distance[:-1]) <= DEDUPE_DISTANCE_TOLERANCE * np.maximum(longer, 1.0)
+
+        duplicate_of_previous = np.concatenate(([False], same_athlete & close_start & close_distance))
+        cluster = np.cumsum(~duplicate_of_previous)
+
+        # First row per cluster after sorting by (cluster, source priority)
+        by_priority = np.lexsort((data['source'][order], cluster))
+        _, first = np.unique(cluster[by_priority], return_index=True)
+        return order[by_priority[first]]
+
+
+# =============================================================================
+# PROVIDERS
+# =============================================================================
+
+class ActivityProvider:
+    """
+    Base class for activity sources.
+
+    Subclasses describe their table and map a row to frame columns;
+    fetching is batched over many athletes.
+    """
+
+    name = 'base'
+    source = None
+    table = None
+    user_column = 'user_id'
+    start_column = None
+    select_columns = '*'
+
+    def apply_filters(self, query):
+        """Hook for source-specific filters"""
+        return query
+
+    def parse_row(self, row: Dict) -> Dict:
+        """Row -> frame column values (everything except source)"""
+        raise NotImplementedError
+
+    def fetch(self, supabase, user_ids: Sequence[str], since: datetime) -> List[Dict]:
+        """All rows for the athletes since `since`, in paged chunked queries"""
+        rows = []
+        since_iso = since.isoformat()
+
+        for i in range(0, len(user_ids), QUERY_ATHLETE_CHUNK):
+            chunk = list(user_ids[i:i + QUERY_ATHLETE_CHUNK])
+            page = 0
+            while True:
+                query = supabase.table(self.table)\
+                    .select(self.select_columns)\
+                    .in_(self.user_column, chunk)\
+                    .gte(self.start_column, since_iso)
+                response = self.apply_filters(query)\
+                    .order(self.start_column, desc=True)\
+                    .range(page * QUERY_PAGE_SIZE, (page + 1) * QUERY_PAGE_SIZE - 1)\
+                    .execute()
+                data = response.data or []
+                rows.extend(data)
+                if len(data) < QUERY_PAGE_SIZE:
+                    break
+                page += 1
+
+        return rows
+
+
+class StravaActivityProvider(ActivityProvider):
+    name = 'strava'
+    source = SOURCE_STRAVA
+    table = 'strava_activities'
+    start_column = 'start_date'
+    select_columns = ('user_id, start_date, distance_meters, moving_time_seconds, '
+                      'average_speed, average_heartrate, suffer_score')
+
+    def parse_row(self, row: Dict) -> Dict:
+        return {
+            'start_ts': _to_timestamp(row.get('start_date')),
+            'distance_m': _to_float(row.get('distance_meters')),
+            'moving_time_s': _to_float(row.get('moving_time_seconds')),
+            'average_speed': _to_float(row.get('average_speed')),
+            'average_heartrate': _to_float(row.get('average_heartrate')),
+            'suffer_score': _to_float(row.get('suffer_score'))
+        }
+
+
+class WorkoutResultProvider(ActivityProvider):
+    """Activities recorded as workout_results rows (Garmin uploads, manual logs)"""
+    table = 'workout_results'
+    user_column = 'athlete_id'
+    start_column = 'workout_date'
+    select_columns = 'athlete_id, workout_date, distance_km, duration_seconds, avg_hr, data_source'
+    data_source = None
+
+    def apply_filters(self, query):
+        return query.eq('data_source', self.data_source)
+
+    def parse_row(self, row: Dict) -> Dict:
+        distance_m = _to_float(row.get('distance_km')) * 1000
+        moving_time_s = _to_float(row.get('duration_seconds'))
+        return {
+            'start_ts': _to_timestamp(row.get('workout_date')),
+            'distance_m': distance_m,
+            'moving_time_s': moving_time_s,
+            'average_speed': distance_m / moving_time_s if moving_time_s and moving_time_s > 0 else np.nan,
+            'average_heartrate': _to_float(row.get('avg_hr')),
+            'suffer_score': np.nan
+        }
+
+
+class GarminActivityProvider(WorkoutResultProvider):
+    name = 'garmin'
+    source = SOURCE_GARMIN
+    data_source = 'garmin'
+
+
+class ManualActivityProvider(WorkoutResultProvider):
+    name = 'manual'
+    source = SOURCE_MANUAL
+    data_source = 'manual'
+
+
+class RunSessionProvider(ActivityProvider):
+    """GPS runs recorded in the SafeStride app"""
+    name = 'run_sessions'
+    source = SOURCE_RUN_SESSION
+    table = 'run_sessions'
+    start_column = 'start_time'
+    select_columns = 'user_id, start_time, distance_meters, duration_seconds, avg_heart_rate, status'
+
+    def apply_filters(self, query):
+        return query.in_('status', ['completed', 'uploaded'])
+
+    def parse_row(self, row: Dict) -> Dict:
+        distance_m = _to_float(row.get('distance_meters'))
+        moving_time_s = _to_float(row.get('duration_seconds'))
+        return {
+            'start_ts': _to_timestamp(row.get('start_time')),
+            'distance_m': distance_m,
+            'moving_time_s': moving_time_s,
+            'average_speed': distance_m / moving_time_s if moving_time_s and moving_time_s > 0 else np.nan,
+            'average_heartrate': _to_float(row.get('avg_heart_rate')),
+            'suffer_score': np.nan
+        }
+
+
+DEFAULT_PROVIDERS = (
+    StravaActivityProvider(),
+    GarminActivityProvider(),
+    RunSessionProvider(),
+    ManualActivityProvider()
+)
+
+
+def load_activity_frame(
+    supabase,
+    user_ids: Sequence[str],
+    since: datetime,
+    providers: Optional[Iterable[ActivityProvider]] = None
+) -> ActivityFrame:
+    """
+    Fetch every source for a batch of athletes and build one deduplicated frame.
+
+    A failing source is logged and skipped so the others still contribute.
+    """
+    columns = {column: [] for column in ActivityFrame.COLUMNS}
+    row_user_ids = []
+
+    for provider in (providers or DEFAULT_PROVIDERS):
+        try:
+            rows = provider.fetch(supabase, user_ids, since)
+        except Exception as e:
+            print(f"Error fetching {provider.name} activities: {e}")
+            continue
+
+        for row in rows:
+            parsed = provider.parse_row(row)
+            for column, value in parsed.items():
+                columns[column].append(value)
+            columns['source'].append(provider.source)
+            row_user_ids.append(str(row[provider.user_column]))
+
+    return ActivityFrame.build(user_ids, columns, row_user_ids)
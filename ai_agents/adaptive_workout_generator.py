@@ -12,11 +12,13 @@ Key Features:
 """
 
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple, Union
 from enum import Enum
 import statistics
 
+from workload_engine import WorkloadEngine, WorkloadState, ACWR_SAFE_MIN, ACWR_SAFE_MAX
+
 
 class TrainingPhase(Enum):
     """Training phases"""
@@ -36,7 +38,7 @@ class LoadTrend(Enum):
     RECOVERY_WEEK = "recovery_week"
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AthleteAbility:
     """Current athlete ability/fitness level"""
     current_pace_easy: int  # sec/km for easy runs
@@ -50,7 +52,7 @@ class AthleteAbility:
     fitness_score: float  # 0-100 overall fitness
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PerformanceHistory:
     """Recent performance history"""
     last_7_days: List[str]  # Performance labels: BEST/GREAT/GOOD/FAIR/POOR
@@ -59,22 +61,26 @@ class PerformanceHistory:
     consecutive_good_performances: int  # Streak of GREAT/BEST
     fatigue_indicators: List[str]  # Recent fatigue signals
     injury_risk_score: float  # 0-100 (higher = more risk)
+    # Stored EWMA of the daily ledger load (athlete_workload_state 'load':
+    # minutes, doubled for hard sessions); derived from weekly km if absent
+    workload: Optional[WorkloadState] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class InjuryPreventionMetrics:
     """Injury prevention calculations"""
-    acute_load: float  # Last 7 days load
-    chronic_load: float  # Last 28 days load (avg)
+    acute_load: float  # 7-day EWMA, as a weekly total
+    chronic_load: float  # 28-day EWMA, as a weekly total
     acwr: float  # Acute:Chronic Workload Ratio
     load_status: str  # "safe", "caution", "high_risk"
     recommended_max_increase_pct: float  # Max safe increase %
     recovery_week_needed: bool
+    workload: Optional[WorkloadState] = None  # Underlying EWMA state (daily units)
 
 
-@dataclass
+@dataclass(slots=True)
 class GeneratedWorkout:
-    """Generated workout prescription"""
+    """Generated workout prescription (slotted; filled in by the generator, so not frozen)"""
     workout_date: datetime
     workout_type: str  # easy/long/interval/tempo/threshold/recovery/strength/mobility
     distance_km: float
@@ -117,8 +123,8 @@ class AdaptiveWorkoutGenerator:
     def __init__(self):
         """Initialize workout generator"""
         # Safe ACWR ranges
-        self.acwr_safe_min = 0.8
-        self.acwr_safe_max = 1.3
+        self.acwr_safe_min = ACWR_SAFE_MIN
+        self.acwr_safe_max = ACWR_SAFE_MAX
         self.acwr_optimal = 1.0
         
         # Progressive overload limits
@@ -156,6 +162,101 @@ class AdaptiveWorkoutGenerator:
             performance_history, athlete_ability.weekly_volume_km
         )
         
+        workout = self._generate_for_day(
+            athlete_ability, performance_history, training_phase,
+            week_number, day_of_week, weekly_plan_structure, injury_metrics
+        )
+        
+        # Set workout date and load calculations
+        workout.workout_date = datetime.now() + timedelta(days=1)
+        workout.expected_load = self._calculate_workout_load(workout)
+        workout.acwr_after_workout = self._project_acwr_after_workout(
+            injury_metrics,
+            self._workload_increment(workout, athlete_ability, performance_history)
+        )
+        
+        return workout
+    
+    def generate_block(
+        self,
+        athlete_ability: AthleteAbility,
+        performance_history: PerformanceHistory,
+        training_phase: TrainingPhase,
+        start_date: Union[date, datetime],
+        days: int,
+        week_number: int = 1,
+        first_day_of_week: Optional[int] = None,
+        weekly_plan_structure: Optional[Dict] = None
+    ) -> List[GeneratedWorkout]:
+        """
+        Generate a multi-day block of workouts in one pass.
+        
+        The load context (EWMA workload, injury metrics) is computed once
+        from the performance history. Each day's workout is then generated
+        against the projected state, and its expected load is rolled into
+        the acute/chronic EWMA before the next day. Later days therefore
+        see the load of the block so far.
+        
+        Args:
+            athlete_ability: Current fitness/ability levels
+            performance_history: Recent performance data
+            training_phase: Training phase for the whole block
+            start_date: Date of the first workout
+            days: Number of consecutive days
+            week_number: Plan week of the first day (advances every 7 days)
+            first_day_of_week: Weekly-structure slot of the first day
+                (1=Mon..7=Sun); defaults to start_date's weekday
+            weekly_plan_structure: Optional weekly structure override
+            
+        Returns:
+            One GeneratedWorkout per day, in date order
+        """
+        if not isinstance(start_date, datetime):
+            start_date = datetime.combine(start_date, time())
+        first_slot = first_day_of_week or start_date.isoweekday()
+        
+        # Load context once (a state without as_of is taken as current on day 1)
+        workload = self._calculate_injury_prevention_metrics(
+            performance_history, athlete_ability.weekly_volume_km
+        ).workload
+        
+        workouts = []
+        for offset in range(days):
+            # Metrics on the state at the end of the previous day, as
+            # generate_next_workout does for tomorrow
+            workout_date = start_date + timedelta(days=offset)
+            injury_metrics = self._metrics_from_workload(workload, performance_history)
+            
+            workout = self._generate_for_day(
+                athlete_ability, performance_history, training_phase,
+                week_number + offset // 7, (first_slot - 1 + offset) % 7 + 1,
+                weekly_plan_structure, injury_metrics
+            )
+            workout.workout_date = workout_date
+            workout.expected_load = self._calculate_workout_load(workout)
+            increment = self._workload_increment(workout, athlete_ability, performance_history)
+            workout.acwr_after_workout = round(
+                WorkloadEngine.project(workload, increment, workout_date.date()), 2
+            ) if workload.chronic > 0 else 1.0
+            
+            # Roll the block's own load forward
+            workload = WorkloadEngine.update(workload, increment, workout_date.date())
+            workouts.append(workout)
+        
+        return workouts
+    
+    def _generate_for_day(
+        self,
+        athlete_ability: AthleteAbility,
+        performance_history: PerformanceHistory,
+        training_phase: TrainingPhase,
+        week_number: int,
+        day_of_week: int,
+        weekly_plan_structure: Optional[Dict],
+        injury_metrics: InjuryPreventionMetrics
+    ) -> GeneratedWorkout:
+        """Workout for one plan day against precomputed injury metrics (no date or load yet)"""
+        
         # Determine if recovery week needed
         is_recovery_week = self._check_recovery_week_needed(
             week_number, injury_metrics, performance_history
@@ -210,13 +311,7 @@ class AdaptiveWorkoutGenerator:
                 athlete_ability, increase_pct, injury_metrics
             )
         
-        # Set workout date and load calculations
-        workout.workout_date = datetime.now() + timedelta(days=1)
-        workout.expected_load = self._calculate_workout_load(workout)
         workout.progressive_increase_pct = increase_pct
-        workout.acwr_after_workout = self._project_acwr_after_workout(
-            injury_metrics, workout.expected_load
-        )
         
         # Generate rationale
         workout.generation_rationale = self._generate_rationale(
@@ -232,25 +327,22 @@ class AdaptiveWorkoutGenerator:
     ) -> InjuryPreventionMetrics:
         """Calculate ACWR and injury prevention metrics"""
         
-        # Acute load (last 7 days)
-        if len(history.last_4_weeks_volume) >= 1:
-            acute_load = history.last_4_weeks_volume[-1]  # Last week
-        else:
-            acute_load = current_volume
-        
-        # Chronic load (average of last 4 weeks)
-        if len(history.last_4_weeks_volume) >= 4:
-            chronic_load = sum(history.last_4_weeks_volume) / len(history.last_4_weeks_volume)
-        elif len(history.last_4_weeks_volume) > 0:
-            chronic_load = sum(history.last_4_weeks_volume) / len(history.last_4_weeks_volume)
-        else:
-            chronic_load = current_volume
+        # EWMA workload: stored state when available, else from weekly volumes
+        workload = history.workload or WorkloadEngine.state_from_weekly_volumes(
+            history.last_4_weeks_volume or [current_volume]
+        )
+        return self._metrics_from_workload(workload, history)
+    
+    def _metrics_from_workload(
+        self,
+        workload: WorkloadState,
+        history: PerformanceHistory
+    ) -> InjuryPreventionMetrics:
+        """Injury prevention metrics for a given EWMA workload state"""
         
-        # ACWR calculation
-        if chronic_load > 0:
-            acwr = acute_load / chronic_load
-        else:
-            acwr = 1.0
+        acute_load = workload.acute_weekly
+        chronic_load = workload.chronic_weekly
+        acwr = workload.acwr
         
         # Determine load status
         if acwr < self.acwr_safe_min:
@@ -276,7 +368,8 @@ class AdaptiveWorkoutGenerator:
             acwr=acwr,
             load_status=load_status,
             recommended_max_increase_pct=recommended_increase,
-            recovery_week_needed=recovery_needed
+            recovery_week_needed=recovery_needed,
+            workload=workload
         )
     
     def _check_recovery_week_needed(
@@ -799,23 +892,43 @@ class AdaptiveWorkoutGenerator:
         load = workout.distance_km * intensity
         return round(load, 1)
     
+    def _calculate_ledger_load(self, workout: GeneratedWorkout, ability: AthleteAbility) -> float:
+        """
+        Planned load in athlete_daily_load units: running minutes, doubled
+        for hard (tempo/threshold/interval) sessions
+        """
+        pace = workout.target_pace_seconds or ability.current_pace_easy
+        minutes = workout.distance_km * pace / 60
+        if workout.workout_type in ["tempo", "threshold", "interval"]:
+            minutes *= 2
+        return round(minutes, 1)
+    
+    def _workload_increment(
+        self,
+        workout: GeneratedWorkout,
+        ability: AthleteAbility,
+        history: PerformanceHistory
+    ) -> float:
+        """Workout load in the units of the EWMA state it is projected onto"""
+        if history.workload is not None:
+            return self._calculate_ledger_load(workout, ability)
+        return workout.expected_load
+    
     def _project_acwr_after_workout(
         self,
         injury_metrics: InjuryPreventionMetrics,
         new_workout_load: float
     ) -> float:
-        """Project ACWR after this workout"""
-        
-        # New acute load (add this workout to last 7 days)
-        new_acute = injury_metrics.acute_load + new_workout_load
+        """Project ACWR after this workout (tomorrow, on top of the EWMA state)"""
         
-        # Chronic stays same (4-week average)
-        chronic = injury_metrics.chronic_load
+        workload = injury_metrics.workload
+        if workload is None or workload.chronic <= 0:
+            return 1.0
         
-        if chronic > 0:
-            projected_acwr = new_acute / chronic
-        else:
-            projected_acwr = 1.0
+        as_of = workload.as_of or datetime.now().date()
+        projected_acwr = WorkloadEngine.project(
+            workload, new_workout_load, as_of + timedelta(days=1)
+        )
         
         return round(projected_acwr, 2)
     
@@ -11,37 +11,60 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
 supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
+# Athletes per get_training_plan_inputs page
+INPUT_PAGE_SIZE = 1000
+
+DEFAULT_INJURY_RISK = {"risk_score": 0, "risk_level": "LOW"}
+
 
 class AISRiAdaptiveTrainingPlanAgent:
+    """
+    Weekly training plans from the latest AISRI score and injury risk.
+
+    Plans are built in memory with client-generated ids and stored through
+    the persist_training_plans RPC, so a plan (or a whole squad's plans)
+    is written in one transaction. Inputs for many athletes are read with
+    one get_training_plan_inputs call per page.
+    """
+
+    def __init__(self, client=None):
+
+        self.supabase = client or supabase
 
-    def get_latest_aisri(self, athlete_id):
 
-        response = supabase.table("AISRI_assessments") \
-            .select("aisri_score") \
-            .eq("athlete_id", athlete_id) \
-            .order("created_at", desc=True) \
-            .limit(1) \
-            .execute()
+    def get_plan_inputs(self, athlete_ids=None, coach_id=None):
+        """
+        Latest AISRI score and injury risk for an id list and/or a coach's
+        active squad: {athlete_id: {"aisri_score", "injury_risk"}}
+        """
 
-        if not response.data:
-            return None
+        inputs = {}
+        after = None
 
-        return response.data[0]["aisri_score"]
+        while True:
+            response = self.supabase.rpc("get_training_plan_inputs", {
+                "p_athlete_ids": list(athlete_ids) if athlete_ids is not None else None,
+                "p_coach_id": coach_id,
+                "p_after": after,
+                "p_limit": INPUT_PAGE_SIZE
+            }).execute()
 
+            rows = response.data or []
 
-    def get_injury_risk(self, athlete_id):
+            for row in rows:
+                injury = DEFAULT_INJURY_RISK
+                if row.get("risk_level") is not None:
+                    injury = {"risk_score": row.get("risk_score"), "risk_level": row["risk_level"]}
 
-        response = supabase.table("injury_risk_predictions") \
-            .select("risk_score, risk_level") \
-            .eq("athlete_id", athlete_id) \
-            .order("created_at", desc=True) \
-            .limit(1) \
-            .execute()
+                inputs[row["athlete_id"]] = {
+                    "aisri_score": row.get("aisri_score"),
+                    "injury_risk": injury
+                }
 
-        if not response.data:
-            return {"risk_score": 0, "risk_level": "LOW"}
+            if len(rows) < INPUT_PAGE_SIZE:
+                return inputs
 
-        return response.data[0]
+            after = rows[-1]["athlete_id"]
 
 
     def determine_week_structure(self, aisri_score, risk_level):
@@ -86,95 +109,163 @@ class AISRiAdaptiveTrainingPlanAgent:
         }
 
 
-    def create_plan_record(self, athlete_id):
+    def build_plan(self, athlete_id, aisri_score, injury, start_date, created_at):
+        """
+        One week's plan as rows ready for persist_training_plans.
+
+        Returns (result, plan_row, workout_rows, assignment_rows); rest
+        days appear in the weekly plan but get no workout or assignment.
+        """
+
+        structure = self.determine_week_structure(
+            aisri_score,
+            injury["risk_level"]
+        )
 
         plan_id = str(uuid.uuid4())
 
-        supabase.table("ai_workout_plans").insert({
+        plan_row = {
             "id": plan_id,
             "athlete_id": athlete_id,
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": created_at,
             "status": "active"
-        }).execute()
+        }
 
-        return plan_id
+        workout_rows = []
+        assignment_rows = []
+        plan = []
 
+        for i, zone in enumerate(structure):
 
-    def create_workout(self, athlete_id, plan_id, workout, date):
+            workout = self.get_workout_details(zone)
 
-        if workout["zone"] == "REST":
-            return
+            date = start_date + timedelta(days=i)
 
-        workout_id = str(uuid.uuid4())
+            if zone != "REST":
+                workout_id = str(uuid.uuid4())
+
+                workout_rows.append({
+                    "id": workout_id,
+                    "athlete_id": athlete_id,
+                    "name": workout["name"],
+                    "duration_minutes": workout["duration"],
+                    "zone": zone,
+                    "created_at": created_at
+                })
+
+                assignment_rows.append({
+                    "id": str(uuid.uuid4()),
+                    "athlete_id": athlete_id,
+                    "workout_id": workout_id,
+                    "plan_id": plan_id,
+                    "scheduled_date": date.isoformat(),
+                    "status": "scheduled"
+                })
 
-        supabase.table("ai_workouts").insert({
-            "id": workout_id,
-            "athlete_id": athlete_id,
-            "name": workout["name"],
-            "duration_minutes": workout["duration"],
-            "zone": workout["zone"],
-            "created_at": datetime.utcnow().isoformat()
-        }).execute()
+            plan.append({
+                "date": date.isoformat(),
+                "zone": zone,
+                "name": workout["name"],
+                "duration": workout["duration"]
+            })
 
-        supabase.table("workout_assignments").insert({
-            "athlete_id": athlete_id,
-            "workout_id": workout_id,
+        result = {
+            "status": "success",
             "plan_id": plan_id,
-            "scheduled_date": date.isoformat(),
-            "status": "scheduled"
-        }).execute()
+            "athlete_id": athlete_id,
+            "aisri_score": aisri_score,
+            "injury_risk": injury,
+            "weekly_plan": plan
+        }
 
+        return result, plan_row, workout_rows, assignment_rows
 
-    def generate_plan(self, athlete_id):
 
-        aisri_score = self.get_latest_aisri(athlete_id)
+    def persist_plans(self, plan_rows, workout_rows, assignment_rows, supersede=False):
+        """Store prebuilt plans atomically (one RPC round-trip)"""
 
-        if aisri_score is None:
-            return {"status": "error", "message": "No AISRi score"}
+        self.supabase.rpc("persist_training_plans", {
+            "p_plans": plan_rows,
+            "p_workouts": workout_rows,
+            "p_assignments": assignment_rows,
+            "p_supersede": supersede
+        }).execute()
 
-        injury = self.get_injury_risk(athlete_id)
 
-        structure = self.determine_week_structure(
-            aisri_score,
-            injury["risk_level"]
-        )
+    def generate_plans(self, athlete_ids=None, coach_id=None, supersede=True):
+        """
+        Generate and store weekly plans for many athletes at once (e.g. a
+        coach regenerating their squad).
+
+        One read for the inputs, one transaction for every plan. With
+        supersede, each athlete's previously active plan is cancelled and
+        its remaining scheduled workouts removed in the same transaction.
+        """
 
-        plan_id = self.create_plan_record(athlete_id)
+        if athlete_ids is None and coach_id is None:
+            return {"status": "error", "message": "athlete_ids or coach_id required"}
+
+        inputs = self.get_plan_inputs(athlete_ids, coach_id)
 
         start_date = datetime.utcnow().date()
+        created_at = datetime.utcnow().isoformat()
 
-        plan = []
+        plans = []
+        skipped = []
+        plan_rows, workout_rows, assignment_rows = [], [], []
 
-        for i, zone in enumerate(structure):
+        for athlete_id in sorted(inputs):
 
-            workout = self.get_workout_details(zone)
+            athlete = inputs[athlete_id]
 
-            date = start_date + timedelta(days=i)
+            if athlete["aisri_score"] is None:
+                skipped.append({"athlete_id": athlete_id, "message": "No AISRi score"})
+                continue
 
-            self.create_workout(
+            result, plan_row, workouts, assignments = self.build_plan(
                 athlete_id,
-                plan_id,
-                workout,
-                date
+                athlete["aisri_score"],
+                athlete["injury_risk"],
+                start_date,
+                created_at
             )
 
-            plan.append({
-                "date": date.isoformat(),
-                "zone": zone,
-                "name": workout["name"],
-                "duration": workout["duration"]
-            })
+            plans.append(result)
+            plan_rows.append(plan_row)
+            workout_rows.extend(workouts)
+            assignment_rows.extend(assignments)
+
+        if plan_rows:
+            self.persist_plans(plan_rows, workout_rows, assignment_rows, supersede)
 
         return {
             "status": "success",
-            "plan_id": plan_id,
-            "athlete_id": athlete_id,
-            "aisri_score": aisri_score,
-            "injury_risk": injury,
-            "weekly_plan": plan
+            "generated": len(plans),
+            "skipped": skipped,
+            "plans": plans
         }
 
 
+    def generate_plan(self, athlete_id):
+
+        athlete = self.get_plan_inputs([athlete_id]).get(athlete_id)
+
+        if athlete is None or athlete["aisri_score"] is None:
+            return {"status": "error", "message": "No AISRi score"}
+
+        result, plan_row, workout_rows, assignment_rows = self.build_plan(
+            athlete_id,
+            athlete["aisri_score"],
+            athlete["injury_risk"],
+            datetime.utcnow().date(),
+            datetime.utcnow().isoformat()
+        )
+
+        self.persist_plans([plan_row], workout_rows, assignment_rows)
+
+        return result
+
+
 if __name__ == "__main__":
 
     agent = AISRiAdaptiveTrainingPlanAgent()
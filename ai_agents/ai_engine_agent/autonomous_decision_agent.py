@@ -4,12 +4,20 @@ from dotenv import load_dotenv
 from datetime import datetime
 import uuid
 
+from training_load_ledger import TrainingLoadLedger
+
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
 supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+ledger = TrainingLoadLedger(supabase)
+
+# Average ledger load per training day (moving minutes, doubled for hard
+# sessions) above which recovery is prescribed: about an hour of hard
+# running, or two hours easy, on every training day of the week
+HIGH_TRAINING_LOAD = 120
 
 
 class AISRiAutonomousDecisionAgent:
@@ -46,17 +54,10 @@ class AISRiAutonomousDecisionAgent:
 
     def get_training_load(self, athlete_id):
 
-        response = supabase.table("training_load_metrics") \
-            .select("load_score") \
-            .eq("athlete_id", athlete_id) \
-            .order("created_at", desc=True) \
-            .limit(7) \
-            .execute()
-
-        if not response.data:
-            return 0
+        # Average load of training days in the last week (daily ledger)
+        days = ledger.get_days(athlete_id, days=7)
 
-        loads = [l["load_score"] for l in response.data if l["load_score"]]
+        loads = [day.load for day in days if day.load]
 
         return sum(loads) / len(loads) if loads else 0
 
@@ -76,7 +77,7 @@ class AISRiAutonomousDecisionAgent:
                 "reason": "AISRi score critically low"
             }
 
-        if training_load > 80:
+        if training_load > HIGH_TRAINING_LOAD:
             return {
                 "decision": "RECOVERY",
                 "reason": "Training load too high"
@@ -2,7 +2,8 @@ from supabase import create_client
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-import statistics
+
+from workload_engine import WorkloadEngine
 
 load_dotenv()
 
@@ -10,6 +11,7 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
 supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+workload = WorkloadEngine(supabase)
 
 
 class AISRiInjuryPredictionAgent:
@@ -26,33 +28,14 @@ class AISRiInjuryPredictionAgent:
         return response.data
 
 
-    def get_training_load(self, athlete_id):
-
-        response = supabase.table("training_load_metrics") \
-            .select("load_score, created_at") \
-            .eq("athlete_id", athlete_id) \
-            .order("created_at", desc=True) \
-            .limit(14) \
-            .execute()
-
-        return response.data
-
-
-    def calculate_load_ratio(self, loads):
-
-        if len(loads) < 7:
-            return 1.0
+    def calculate_load_ratio(self, athlete_id):
 
-        acute = statistics.mean([l["load_score"] for l in loads[:7]])
-        chronic = statistics.mean([l["load_score"] for l in loads])
+        # EWMA acute:chronic ratio of daily load, maintained per athlete
+        return workload.get_state(athlete_id).acwr
 
-        if chronic == 0:
-            return 1.0
 
-        return acute / chronic
-
-
-    def calculate_aisri_trend(self, aisri_history):
+    @staticmethod
+    def calculate_aisri_trend(aisri_history):
 
         if len(aisri_history) < 2:
             return 0
@@ -66,7 +49,6 @@ class AISRiInjuryPredictionAgent:
     def predict_injury_risk(self, athlete_id):
 
         aisri_history = self.get_aisri_history(athlete_id)
-        loads = self.get_training_load(athlete_id)
 
         if not aisri_history:
             return {
@@ -76,10 +58,31 @@ class AISRiInjuryPredictionAgent:
 
         latest_score = aisri_history[0]["aisri_score"]
 
-        load_ratio = self.calculate_load_ratio(loads) if loads else 1.0
+        load_ratio = self.calculate_load_ratio(athlete_id)
 
         aisri_trend = self.calculate_aisri_trend(aisri_history)
 
+        risk_score = self.score_risk(latest_score, load_ratio, aisri_trend)
+
+        risk_level = self.get_risk_level(risk_score)
+
+        self.save_prediction(athlete_id, risk_score, risk_level)
+
+        return {
+            "status": "success",
+            "athlete_id": athlete_id,
+            "risk_score": risk_score,
+            "risk_level": risk_level,
+            "load_ratio": load_ratio,
+            "aisri_trend": aisri_trend,
+            "latest_aisri_score": latest_score
+        }
+
+
+    @staticmethod
+    def score_risk(latest_score, load_ratio, aisri_trend):
+
+        # Rule-based risk score (0-100); no I/O
         risk_score = 0
 
         # AISRi score contribution
@@ -104,24 +107,11 @@ class AISRiInjuryPredictionAgent:
         elif aisri_trend < -5:
             risk_score += 15
 
-        risk_score = min(risk_score, 100)
-
-        risk_level = self.get_risk_level(risk_score)
-
-        self.save_prediction(athlete_id, risk_score, risk_level)
-
-        return {
-            "status": "success",
-            "athlete_id": athlete_id,
-            "risk_score": risk_score,
-            "risk_level": risk_level,
-            "load_ratio": load_ratio,
-            "aisri_trend": aisri_trend,
-            "latest_aisri_score": latest_score
-        }
+        return min(risk_score, 100)
 
 
-    def get_risk_level(self, risk_score):
+    @staticmethod
+    def get_risk_level(risk_score):
 
         if risk_score >= 70:
             return "HIGH"
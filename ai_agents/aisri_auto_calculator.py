@@ -4,6 +4,7 @@ Automatically calculates AISRI scores from Strava/Garmin activity data.
 
 Features:
 - Analyzes activity history (past 4-8 weeks)
+- Multi-source batch scoring (Strava, Garmin, manual logs, in-app runs)
 - Calculates 6 AISRI pillars from objective data
 - Provides confidence score for reliability
 - Scheduled weekly updates
@@ -17,12 +18,16 @@ Endpoints:
 
 import os
 import math
-from datetime import datetime, timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+import numpy as np
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from database_integration import DatabaseIntegration
+from activity_providers import ActivityFrame, ActivityProvider, load_activity_frame, parse_datetime
+from structural_index import invalidate_structural_index
 
 
 @dataclass
@@ -44,6 +49,16 @@ class AISRIAutoResult:
     calculated_at: datetime
 
 
+# Training age of auth.users row `u`: the earlier of account creation and
+# the first recorded activity from any source
+TENURE_START_SQL = """LEAST(
+    u.created_at,
+    (SELECT MIN(s.start_date) FROM strava_activities s WHERE s.user_id = u.id),
+    (SELECT MIN(rs.start_time) FROM run_sessions rs WHERE rs.user_id = u.id),
+    (SELECT MIN(wr.workout_date)::TIMESTAMPTZ FROM workout_results wr
+     WHERE wr.athlete_id::UUID = u.id AND wr.data_source IN ('garmin', 'manual'))
+)"""
+
 router = APIRouter()
 db = DatabaseIntegration()
 
@@ -90,6 +105,28 @@ class AISRIAutoCalculator:
             start_date=datetime.now() - timedelta(weeks=8)
         )
         
+        return AISRIAutoCalculator.score_activities(athlete, activities)
+    
+    @staticmethod
+    def score_activities(
+        athlete: Dict,
+        activities: List[Dict],
+        calculated_at: Optional[datetime] = None
+    ) -> AISRIAutoResult:
+        """
+        AISRI pillars and score from an athlete's Strava activities
+        (newest first); no I/O.
+        
+        Args:
+            athlete: Athlete row (created_at gives the training age)
+            activities: Activities of the past 8 weeks, newest first
+            calculated_at: Timestamp for the result (now if None)
+            
+        Returns:
+            AISRIAutoResult with scores and confidence
+        """
+        calculated_at = calculated_at or datetime.now()
+        
         if len(activities) < 3:
             # Insufficient data for reliable auto-calculation
             return AISRIAutoResult(
@@ -106,7 +143,7 @@ class AISRIAutoCalculator:
                 activities_analyzed=len(activities),
                 data_source='Strava',
                 notes='Insufficient activity data. Complete full assessment for accurate scores.',
-                calculated_at=datetime.now()
+                calculated_at=calculated_at
             )
         
         # Calculate each pillar
@@ -158,7 +195,7 @@ class AISRIAutoCalculator:
             activities_analyzed=len(activities),
             data_source='Strava',
             notes='Auto-calculated from Strava activities. Complete full assessment for comprehensive analysis.' if confidence >= 70 else 'Limited data. Complete full assessment for more accurate scores.',
-            calculated_at=datetime.now()
+            calculated_at=calculated_at
         )
     
     @staticmethod
@@ -395,6 +432,241 @@ class AISRIAutoCalculator:
             confidence += 10
         
         return min(max(confidence, 0), 100)
+    
+    # ═══════════════════════════════════════════════════════════════════
+    # Multi-source batch calculation
+    # ═══════════════════════════════════════════════════════════════════
+    
+    @staticmethod
+    def calculate_from_providers(
+        user_ids: List[str],
+        tenure_start: Optional[Dict[str, datetime]] = None,
+        providers: Optional[List[ActivityProvider]] = None
+    ) -> Dict[str, AISRIAutoResult]:
+        """
+        Calculate AISRI for a batch of athletes from every activity source.
+        
+        Strava, Garmin uploads, manual logs and in-app runs are fetched
+        once for the whole batch, deduplicated, and scored in one
+        vectorized pass.
+        
+        Args:
+            user_ids: SafeStride user IDs
+            tenure_start: Optional user_id -> platform join date (adaptability/confidence bonus)
+            providers: Activity sources (defaults to all)
+            
+        Returns:
+            Dict of user_id -> AISRIAutoResult
+        """
+        frame = load_activity_frame(
+            db.supabase,
+            user_ids,
+            since=datetime.now(timezone.utc) - timedelta(weeks=8),
+            providers=providers
+        )
+        return AISRIAutoCalculator.calculate_batch(frame, tenure_start)
+    
+    @staticmethod
+    def get_tenure_start(user_id: str) -> Optional[datetime]:
+        """Start of an athlete's training history (see TENURE_START_SQL)"""
+        # Interpolated into raw SQL, so only a well-formed UUID gets through
+        user_id = str(uuid.UUID(user_id))
+        response = db.supabase.rpc('execute_raw_sql', {
+            'query': f"SELECT {TENURE_START_SQL} AS tenure_start FROM auth.users u WHERE u.id = '{user_id}'"
+        }).execute()
+        rows = response.data or []
+        return parse_datetime(rows[0].get('tenure_start')) if rows else None
+    
+    @staticmethod
+    def calculate_batch(
+        frame: ActivityFrame,
+        tenure_start: Optional[Dict[str, datetime]] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, AISRIAutoResult]:
+        """
+        Score every athlete in an ActivityFrame at once.
+        
+        Same pillar rules as the per-activity methods above, expressed as
+        array operations over all athletes' activities (newest first).
+        """
+        now = now or datetime.now(timezone.utc)
+        now_ts = now.timestamp()
+        n_athletes = len(frame.user_ids)
+        
+        counts = frame.counts
+        athlete = frame.athlete_index
+        position = np.arange(len(frame)) - frame.offsets[:-1][athlete]
+        days_ago = np.floor((now_ts - frame.start_ts) / 86400).astype(np.int64)
+        distance = np.nan_to_num(frame.distance_m)
+        
+        # Years on platform per athlete (0 when unknown)
+        years_active = np.zeros(n_athletes)
+        for i, user_id in enumerate(frame.user_ids):
+            started = (tenure_start or {}).get(user_id)
+            if started:
+                if started.tzinfo is None:
+                    started = started.replace(tzinfo=timezone.utc)
+                years_active[i] = (now - started).days / 365
+        
+        def per_athlete_sum(mask, weights=None):
+            return np.bincount(
+                athlete[mask],
+                weights=None if weights is None else weights[mask],
+                minlength=n_athletes
+            )
+        
+        def tiered(value, tiers, default=0):
+            """First matching (threshold, points) pair where value >= threshold"""
+            points = np.full(n_athletes, default)
+            for threshold, bonus in reversed(tiers):
+                points = np.where(value >= threshold, bonus, points)
+            return points
+        
+        # Adaptability
+        adaptability = 50 + np.minimum((years_active * 3).astype(np.int64), 20)
+        adaptability += tiered(counts, [(30, 20), (15, 15), (5, 10)], default=5)
+        half = counts // 2
+        recent = position < half[athlete]
+        recent_avg = per_athlete_sum(recent, distance) / np.maximum(half, 1)
+        older_avg = per_athlete_sum(~recent, distance) / np.maximum(counts - half, 1)
+        adaptability += np.where((counts >= 8) & (recent_avg > older_avg * 1.1), 10, 0)
+        
+        # Consistency: activities per week over the past 4 weeks
+        in_window = days_ago <= 28
+        week = np.minimum(np.maximum(np.ceil(days_ago / 7) - 1, 0), 3).astype(np.int64)
+        week_counts = np.bincount(
+            athlete[in_window] * 4 + week[in_window],
+            minlength=n_athletes * 4
+        ).reshape(n_athletes, 4)
+        avg_weekly = week_counts.mean(axis=1)
+        std_dev = week_counts.std(axis=1)
+        consistency = 50 + tiered(avg_weekly, [(6, 30), (4, 25), (3, 20), (2, 10)])
+        consistency += np.select([std_dev < 1, std_dev < 2], [10, 5], default=0)
+        
+        # Intensity: pace variety and recent quality sessions
+        speed = frame.average_speed
+        has_pace = (speed > 0) & (distance > 1000)
+        pace = np.where(has_pace, (1000 / 60) / np.where(has_pace, speed, 1), np.nan)
+        pace_count = per_athlete_sum(has_pace)
+        fastest = np.full(n_athletes, np.inf)
+        slowest = np.full(n_athletes, -np.inf)
+        np.minimum.at(fastest, athlete[has_pace], pace[has_pace])
+        np.maximum.at(slowest, athlete[has_pace], pace[has_pace])
+        avg_pace = per_athlete_sum(has_pace, pace) / np.maximum(pace_count, 1)
+        pace_range = slowest - fastest
+        enough_paces = pace_count >= 3
+        intensity = 60 + np.select(
+            [enough_paces & (pace_range > 2.0),
+             enough_paces & (pace_range > 1.0),
+             enough_paces & (pace_range > 0.5)],
+            [20, 15, 10],
+            default=0
+        )
+        intensity += np.where(enough_paces & (slowest > avg_pace * 1.3), 10, 0)
+        recent_hard = per_athlete_sum((position < 7) & (frame.suffer_score > 100)) > 0
+        intensity += np.where(recent_hard, 10, 0)
+        
+        # Recovery: rest days and training streaks over the past 14 days
+        in_fortnight = (days_ago >= 0) & (days_ago < 14)
+        trained = np.zeros((n_athletes, 14), dtype=bool)
+        trained[athlete[in_fortnight], days_ago[in_fortnight]] = True
+        rest_days = 14 - trained.sum(axis=1)
+        recovery = 60 + tiered(rest_days, [(4, 20), (2, 15), (1, 10)], default=-10)
+        streak = np.zeros(n_athletes, dtype=np.int64)
+        max_streak = np.zeros(n_athletes, dtype=np.int64)
+        for day in range(14):
+            streak = (streak + 1) * trained[:, day]
+            max_streak = np.maximum(max_streak, streak)
+        recovery += np.select(
+            [max_streak > 10, max_streak > 7, max_streak <= 3],
+            [-20, -10, 10],
+            default=0
+        )
+        
+        # Fatigue: last week vs. 4-week average distance
+        recent_week_distance = per_athlete_sum(days_ago <= 7, distance)
+        avg_weekly_distance = per_athlete_sum(position < 28, distance) / 4
+        fatigue = 70 + np.select(
+            [recent_week_distance > avg_weekly_distance * 1.5,
+             recent_week_distance > avg_weekly_distance * 1.2,
+             recent_week_distance < avg_weekly_distance * 0.7],
+            [-20, -10, 10],
+            default=0
+        )
+        fatigue = np.where(counts > 0, fatigue, 70)
+        
+        # Confidence
+        has_hr = per_athlete_sum(np.nan_to_num(frame.average_heartrate) != 0) > 0
+        confidence = 50 + tiered(counts, [(30, 30), (15, 20), (5, 10)])
+        confidence += tiered(years_active, [(2, 10), (1, 5)])
+        confidence += np.where(has_hr, 10, 0)
+        
+        pillars = {
+            'adaptability': np.clip(adaptability, 0, 100),
+            'consistency': np.clip(consistency, 0, 100),
+            'intensity': np.clip(intensity, 0, 100),
+            'recovery': np.clip(recovery, 0, 100),
+            'fatigue': np.clip(fatigue, 0, 100)
+        }
+        confidence = np.clip(confidence, 0, 100)
+        
+        # Injury risk: neutral estimate (requires manual assessment)
+        injury_risk = 70
+        aisri_scores = np.round((
+            pillars['adaptability'] + injury_risk + pillars['fatigue'] +
+            pillars['recovery'] + pillars['intensity'] + pillars['consistency']
+        ) / 6).astype(np.int64)
+        
+        calculated_at = datetime.now()
+        results = {}
+        for i, user_id in enumerate(frame.user_ids):
+            data_source = ' + '.join(frame.sources_for(user_id)) or 'None'
+            
+            if counts[i] < 3:
+                results[user_id] = AISRIAutoResult(
+                    aisri_score=60,
+                    risk_level='Moderate',
+                    confidence=30,
+                    pillar_adaptability=60,
+                    pillar_injury_risk=70,
+                    pillar_fatigue=60,
+                    pillar_recovery=60,
+                    pillar_intensity=60,
+                    pillar_consistency=50,
+                    calculation_method='multi_source_auto_insufficient',
+                    activities_analyzed=int(counts[i]),
+                    data_source=data_source,
+                    notes='Insufficient activity data. Complete full assessment for accurate scores.',
+                    calculated_at=calculated_at
+                )
+                continue
+            
+            aisri_score = int(aisri_scores[i])
+            if aisri_score >= 80:
+                risk_level = 'Low'
+            elif aisri_score >= 60:
+                risk_level = 'Moderate'
+            else:
+                risk_level = 'High'
+            
+            results[user_id] = AISRIAutoResult(
+                aisri_score=aisri_score,
+                risk_level=risk_level,
+                confidence=int(confidence[i]),
+                pillar_adaptability=int(pillars['adaptability'][i]),
+                pillar_injury_risk=injury_risk,
+                pillar_fatigue=int(pillars['fatigue'][i]),
+                pillar_recovery=int(pillars['recovery'][i]),
+                pillar_intensity=int(pillars['intensity'][i]),
+                pillar_consistency=int(pillars['consistency'][i]),
+                calculation_method='multi_source_auto',
+                activities_analyzed=int(counts[i]),
+                data_source=data_source,
+                notes=f'Auto-calculated from {data_source} activities. Complete full assessment for comprehensive analysis.' if confidence[i] >= 70 else 'Limited data. Complete full assessment for more accurate scores.',
+                calculated_at=calculated_at
+            )
+        
+        return results
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -410,23 +682,26 @@ async def calculate_aisri_auto(
     Calculate AISRI scores automatically from activity data.
     
     This endpoint:
-    1. Fetches athlete's Strava/Garmin activities
+    1. Fetches the athlete's activities from every source (Strava, Garmin,
+       manual logs, in-app runs), deduplicated
     2. Analyzes training patterns
-    3. Calculates AISRI scores
+    3. Calculates AISRI scores (same path as the weekly update)
     4. Saves to database
     5. Returns result
     """
     try:
-        # Get athlete's Strava ID
-        athlete = await db.get_user_athlete_connection(user_id)
-        if not athlete or not athlete.get('strava_athlete_id'):
-            raise HTTPException(404, "No Strava connection found")
+        try:
+            tenure_start = AISRIAutoCalculator.get_tenure_start(user_id)
+        except ValueError:
+            raise HTTPException(400, "Invalid user ID")
         
         # Calculate scores
-        result = await AISRIAutoCalculator.calculate_from_strava(
-            user_id=user_id,
-            strava_athlete_id=athlete['strava_athlete_id']
-        )
+        result = AISRIAutoCalculator.calculate_from_providers(
+            [user_id],
+            tenure_start={user_id: tenure_start} if tenure_start else None
+        )[user_id]
+        if result.activities_analyzed == 0:
+            raise HTTPException(404, "No activities found from any connected source")
         
         # Save to database
         await db.upsert_aisri_score(
@@ -444,6 +719,7 @@ async def calculate_aisri_auto(
             data_source=result.data_source,
             notes=result.notes
         )
+        invalidate_structural_index(user_id)
         
         return {
             "success": True,
@@ -467,6 +743,8 @@ async def calculate_aisri_auto(
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"Error calculating AISRI: {str(e)}")
 
@@ -487,7 +765,7 @@ async def get_aisri_scores(user_id: str):
             return {
                 "current_score": None,
                 "history": [],
-                "message": "No AISRI scores calculated yet. Connect Strava to auto-calculate."
+                "message": "No AISRI scores calculated yet. Connect Strava or Garmin, or log a run, to auto-calculate."
             }
         
         return {
@@ -16,55 +16,94 @@ Usage:
     if not result['safe']:
         # Block workout and provide reasoning
         return result['recommendation']
+
+    # Many athletes, one database round-trip (get_safety_gate_inputs RPC)
+    results = await safety_gate.check_workouts_safety([
+        {'athlete_id': a, 'workout_type': 'run', 'intensity': 'hard', 'duration_minutes': 45}
+        for a in athlete_ids
+    ])
 """
 
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+import math
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Dict, Iterator, List, Optional
+from datetime import date, datetime, timedelta, timezone
 from database_integration import DatabaseIntegration
-from workout_templates import get_template_for_state, STRUCTURAL_WORKOUT_TEMPLATES
+from workout_templates import TEMPLATE_REGISTRY, WorkoutTemplate
+from training_load_ledger import TrainingLoadLedger, DailyLoad
+from workload_engine import WorkloadEngine, WorkloadState
+from safety_rules import SafetyRuleEngine
+from structural_index import StructuralIndex, StructuralState, entries_from_latest_rows
+from safety_audit_log import SafetyAuditLog
 
+import numpy as np
 
 
-from enum import Enum
 
-class StructuralState(Enum):
-    """
-    Structural readiness state based on structural score.
-    
-    States:
-    - RED: < 55 - Only mobility + activation + zone 1-2 allowed
-    - YELLOW: 55-70 - No threshold or VO2 allowed
-    - GREEN: > 70 - Full training access
-    """
-    RED = 'red'
-    YELLOW = 'yellow'
-    GREEN = 'green'
+@dataclass
+class GateInputs:
+    """Everything the safety gates read for one athlete (one RPC row)"""
+    athlete_id: str
+    has_profile: bool = False
+    latest_aisri: Optional[Dict] = None
+    latest_injury_prediction: Optional[Dict] = None
+    recent_days: List[DailyLoad] = field(default_factory=list)  # Oldest first
+    workload: WorkloadState = field(default_factory=WorkloadState)  # EWMA minutes
     
-    @staticmethod
-    def from_score(structural_score: int) -> 'StructuralState':
-        """Determine state from structural score"""
-        if structural_score < 55:
-            return StructuralState.RED
-        elif structural_score <= 70:
-            return StructuralState.YELLOW
-        else:
-            return StructuralState.GREEN
+    @classmethod
+    def from_row(cls, row: Dict, today: date) -> 'GateInputs':
+        """Build from a get_safety_gate_inputs row"""
+        sessions = row.get('recent_sessions') or []
+        hard_sessions = row.get('recent_hard_sessions') or []
+        recent_days = [
+            DailyLoad(
+                day=today - timedelta(days=len(sessions) - 1 - i),
+                sessions=sessions[i],
+                hard_sessions=hard_sessions[i]
+            )
+            for i in range(len(sessions))
+        ]
+        
+        workload = WorkloadState(as_of=today)
+        if row.get('workload_as_of'):
+            workload = WorkloadEngine.advance(WorkloadState(
+                acute=float(row.get('minutes_acute') or 0),
+                chronic=float(row.get('minutes_chronic') or 0),
+                as_of=date.fromisoformat(row['workload_as_of'])
+            ), today)
+        
+        return cls(
+            athlete_id=row['athlete_id'],
+            has_profile=bool(row.get('has_profile')),
+            latest_aisri=row.get('latest_aisri'),
+            latest_injury_prediction=row.get('latest_injury_prediction'),
+            recent_days=recent_days,
+            workload=workload
+        )
 
 
 class AISRISafetyGate:
     """Enforces safety checks before workout generation"""
     
-    # Safety thresholds
-    MIN_AISRI_FOR_HARD_WORKOUT = 65
-    MIN_AISRI_FOR_INTERVAL = 70
-    MAX_INJURY_RISK = 75  # Out of 100
-    MIN_RECOVERY_SCORE = 60
-    MAX_CONSECUTIVE_HARD_DAYS = 3
-    MAX_WEEKLY_VOLUME_INCREASE = 10  # Percent
+    # Thresholds and intensity lists live in the rule table (safety_rules.py)
+    HARD_DAY_WINDOW = 7  # Days of hard-session history fetched per athlete
     
-    def __init__(self, database: DatabaseIntegration):
+    def __init__(
+        self,
+        database: DatabaseIntegration,
+        rules: Optional[SafetyRuleEngine] = None,
+        audit_log: Optional[SafetyAuditLog] = None,
+        structural_index: Optional[StructuralIndex] = None
+    ):
         """Initialize safety gate system"""
         self.db = database
+        self.workload = WorkloadEngine(database.supabase)
+        self.rules = rules or SafetyRuleEngine.from_env()
+        # One index per client, shared with every other gate in the process
+        self.structural_index = structural_index or StructuralIndex.shared(database.supabase)
+        # Every decision is buffered and bulk-written off the request path
+        self.audit_log = audit_log or SafetyAuditLog(database.supabase)
     
     async def check_workout_safety(
         self,
@@ -90,270 +129,273 @@ class AISRISafetyGate:
                 'gates_passed': [str],
                 'gates_failed': [str],
                 'aisri_score': int,
-                'injury_risk': int
+                'injury_risk': int,
+                'rules_version': str
             }
         """
         
-        gates_passed = []
-        gates_failed = []
+        results = await self.check_workouts_safety([{
+            'athlete_id': athlete_id,
+            'workout_type': workout_type,
+            'intensity': intensity,
+            'duration_minutes': duration_minutes
+        }])
+        return results[0]
+    
+    async def check_workouts_safety(self, workouts: List[Dict]) -> List[Dict]:
+        """
+        Safety check for many planned workouts with one database round-trip.
         
-        # Get athlete data
-        athlete = self.db.get_athlete_profile(athlete_id)
-        if not athlete:
-            return self._create_result(False, "Athlete profile not found", "", [], ["missing_profile"])
+        Args:
+            workouts: [{'athlete_id', 'workout_type', 'intensity', 'duration_minutes'?}]
         
-        # Gate 1: AISRi Score Check
-        aisri_check = await self._check_aisri_score(athlete_id, intensity)
-        if aisri_check['passed']:
-            gates_passed.append('aisri_score')
-        else:
-            gates_failed.append('aisri_score')
+        Returns:
+            One check_workout_safety-style result per workout, in order
+        """
         
-        # Gate 2: Injury Risk Check
-        injury_check = await self._check_injury_risk(athlete_id, intensity)
-        if injury_check['passed']:
-            gates_passed.append('injury_risk')
+        try:
+            inputs = self.fetch_gate_inputs([w['athlete_id'] for w in workouts])
+        except Exception as e:
+            error = self._create_result(False, f"Error loading safety gate inputs: {str(e)}", "", [], ["gate_inputs"])
+            results = [dict(error) for _ in workouts]
         else:
-            gates_failed.append('injury_risk')
+            results = self.evaluate_gates_batch([inputs[str(w['athlete_id'])] for w in workouts], workouts)
         
-        # Gate 3: Recovery Status Check
-        recovery_check = await self._check_recovery_status(athlete_id, intensity)
-        if recovery_check['passed']:
-            gates_passed.append('recovery')
-        else:
-            gates_failed.append('recovery')
+        for workout, result in zip(workouts, results):
+            self.audit_log.record_workout_check(
+                workout['athlete_id'], result,
+                workout.get('workout_type'), workout.get('intensity'), workout.get('duration_minutes')
+            )
+        return results
+    
+    # =========================================================================
+    # GATE INPUTS (one RPC for any number of athletes)
+    # =========================================================================
+    
+    def fetch_gate_inputs(self, athlete_ids: List[str]) -> Dict[str, 'GateInputs']:
+        """Every gate input for the given athletes via get_safety_gate_inputs"""
+        
+        ids = list(dict.fromkeys(str(a) for a in athlete_ids))
+        response = self.db.supabase.rpc('get_safety_gate_inputs', {
+            'p_athlete_ids': ids,
+            'p_days': self.HARD_DAY_WINDOW
+        }).execute()
+        
+        today = datetime.now(timezone.utc).date()
+        inputs = {athlete_id: GateInputs(athlete_id=athlete_id) for athlete_id in ids}
+        for row in (response.data or []):
+            inputs[row['athlete_id']] = GateInputs.from_row(row, today)
+        return inputs
+    
+    # =========================================================================
+    # SAFETY ENVELOPE (every admissible workout in one pass)
+    # =========================================================================
+    
+    async def get_safety_envelope(
+        self,
+        athlete_id: str,
+        workout_types: Optional[List[str]] = None,
+        intensities: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Every intensity x workout type pair with pass/fail, reasons and the
+        maximum safe duration, from one gate-input fetch.
         
-        # Gate 4: Consecutive Hard Days Check
-        consecutive_check = await self._check_consecutive_hard_days(athlete_id, intensity)
-        if consecutive_check['passed']:
-            gates_passed.append('consecutive_days')
-        else:
-            gates_failed.append('consecutive_days')
-        
-        # Gate 5: Volume Progression Check (if duration provided)
-        if duration_minutes:
-            volume_check = await self._check_volume_progression(athlete_id, duration_minutes)
-            if volume_check['passed']:
-                gates_passed.append('volume_progression')
-            else:
+        The duration bound is solved from the volume-progression inequality
+        (projected EWMA ACWR <= limit) rather than probed.
+        
+        Returns:
+            {
+                'athlete_id': str,
+                'rules_version': str,
+                'structural_state': str,
+                'structural_score': int,
+                'speed_permission': bool,
+                'max_safe_duration_minutes': int or None (no volume limit),
+                'options': [{'intensity', 'workout_type', 'safe', 'reasons',
+                             'gates_failed', 'max_safe_duration_minutes'}]
+            }
+        """
+        
+        rules = self.rules.current()
+        intensities = intensities or rules.intensity_names[1:]
+        workout_types = workout_types or rules.workout_type_names[1:]
+        
+        inputs = self.fetch_gate_inputs([athlete_id])[str(athlete_id)]
+        structural = self.structural_index.get(athlete_id)
+        structural_score, state = structural.score, structural.state
+        
+        pairs = list(product(intensities, workout_types))
+        gate_results = self.evaluate_gates_batch(
+            [inputs] * len(pairs),
+            [{'intensity': i, 'workout_type': t} for i, t in pairs]
+        )
+        structural = rules.evaluate_structural(
+            [state.value] * len(pairs),
+            [t for _, t in pairs],
+            [i for i, _ in pairs]
+        )
+        
+        max_minutes = self.workload.max_load(
+            inputs.workload.with_chronic_floor(rules.min_chronic_minutes), rules.max_volume_acwr
+        )
+        max_minutes = None if max_minutes is None else int(math.floor(max_minutes))
+        
+        options = []
+        for k, ((intensity, workout_type), gate_result) in enumerate(zip(pairs, gate_results)):
+            gates_failed = list(gate_result['gates_failed'])
+            reasons = [gate_result['reason']] if gates_failed else []
+            for kind in ('type', 'intensity'):
+                if not structural[f'{kind}_allowed'][k]:
+                    gates_failed.append('structural_state')
+                    reasons.append(f'Structural state {state.name} (score: {structural_score}). {rules.structural_reason(state.value, kind)}')
+                    break
+            
+            safe = not gates_failed and max_minutes != 0
+            if not gates_failed and max_minutes == 0:
                 gates_failed.append('volume_progression')
+                reasons.append('No training volume available without exceeding the acute:chronic limit')
+            
+            options.append({
+                'intensity': intensity,
+                'workout_type': workout_type,
+                'safe': safe,
+                'reasons': reasons,
+                'gates_failed': gates_failed,
+                'max_safe_duration_minutes': max_minutes if safe else 0
+            })
         
-        # Determine overall safety
-        safe = len(gates_failed) == 0
+        return {
+            'athlete_id': str(athlete_id),
+            'rules_version': rules.version,
+            'structural_state': state.value,
+            'structural_score': structural_score,
+            'speed_permission': bool(structural['speed_permission'][0]) if pairs else False,
+            'max_safe_duration_minutes': max_minutes,
+            'options': options,
+            'computed_at': datetime.now().isoformat()
+        }
+    
+    # =========================================================================
+    # GATE EVALUATION (compiled rule table, no I/O)
+    # =========================================================================
+    
+    def evaluate_gates(
+        self,
+        inputs: 'GateInputs',
+        workout_type: str,
+        intensity: str,
+        duration_minutes: Optional[int] = None
+    ) -> Dict:
+        """Run every gate against a prefetched GateInputs record"""
+        return self.evaluate_gates_batch([inputs], [{
+            'workout_type': workout_type,
+            'intensity': intensity,
+            'duration_minutes': duration_minutes
+        }])[0]
+    
+    def evaluate_gates_batch(self, inputs: List['GateInputs'], workouts: List[Dict]) -> List[Dict]:
+        """
+        Run every gate for a batch of candidate workouts.
         
-        # Build response
-        if safe:
-            return self._create_result(
-                safe=True,
-                reason="All safety gates passed",
-                recommendation=f"Safe to proceed with {intensity} {workout_type}",
-                gates_passed=gates_passed,
-                gates_failed=gates_failed,
-                aisri_score=aisri_check.get('score', 0),
-                injury_risk=injury_check.get('risk', 0)
-            )
-        else:
+        Inputs are gathered into arrays once and checked against the
+        compiled rule table with array operations; Python only formats
+        the results.
+        """
+        
+        rules = self.rules.current()
+        n = len(workouts)
+        
+        intensities = [w['intensity'] for w in workouts]
+        aisri = np.full(n, np.nan)
+        recovery = np.full(n, np.nan)
+        injury_risk = np.full(n, 50.0)  # Neutral when no prediction
+        consecutive_hard = np.zeros(n)
+        projected_acwr = np.full(n, np.nan)
+        
+        for i, (record, workout) in enumerate(zip(inputs, workouts)):
+            if record.latest_aisri:
+                aisri[i] = record.latest_aisri.get('aisri_score', 0) or 0
+                pillar_recovery = record.latest_aisri.get('pillar_recovery')
+                recovery[i] = 70 if pillar_recovery is None else pillar_recovery  # Not scored yet
+            if record.latest_injury_prediction:
+                injury_risk[i] = record.latest_injury_prediction.get('risk_score', 50)
+            consecutive_hard[i] = TrainingLoadLedger.consecutive_hard_days(record.recent_days)
+            workload = record.workload.with_chronic_floor(rules.min_chronic_minutes)
+            if workout.get('duration_minutes') and workload.chronic > 0:
+                projected_acwr[i] = self.workload.project(workload, workout['duration_minutes'])
+        
+        checks = rules.evaluate_gates(intensities, aisri, injury_risk, recovery, consecutive_hard, projected_acwr)
+        
+        results = []
+        for i, (record, workout) in enumerate(zip(inputs, workouts)):
+            intensity = intensities[i]
+            workout_type = workout.get('workout_type', 'run')
+            
+            if not record.has_profile:
+                results.append(self._create_result(
+                    False, "Athlete profile not found", "", [], ["missing_profile"],
+                    rules_version=rules.version
+                ))
+                continue
+            
+            gates = [
+                ('aisri_score', checks.aisri[i]),
+                ('injury_risk', checks.injury_risk[i]),
+                ('recovery', checks.recovery[i]),
+                ('consecutive_days', checks.consecutive_days[i])
+            ]
+            if workout.get('duration_minutes'):
+                gates.append(('volume_progression', checks.volume[i]))
+            
+            gates_passed = [name for name, passed in gates if passed]
+            gates_failed = [name for name, passed in gates if not passed]
+            # Scores are reported as stored, not as the float arrays
+            aisri_score = (record.latest_aisri or {}).get('aisri_score', 0)
+            risk = (record.latest_injury_prediction or {}).get('risk_score', 50)
+            
+            if not gates_failed:
+                results.append(self._create_result(
+                    safe=True,
+                    reason="All safety gates passed",
+                    recommendation=f"Safe to proceed with {intensity} {workout_type}",
+                    gates_passed=gates_passed,
+                    gates_failed=gates_failed,
+                    aisri_score=aisri_score,
+                    injury_risk=risk,
+                    rules_version=rules.version
+                ))
+                continue
+            
             # Compile failure reasons
             reasons = []
             if 'aisri_score' in gates_failed:
-                reasons.append(aisri_check['reason'])
+                if np.isnan(aisri[i]):
+                    reasons.append('No AISRi assessment found')
+                else:
+                    reasons.append(f'AISRi score ({aisri_score}) below threshold for {intensity} workouts ({checks.min_aisri[i]:g})')
             if 'injury_risk' in gates_failed:
-                reasons.append(injury_check['reason'])
+                reasons.append(f'Injury risk ({risk}) too high for {intensity} workout')
             if 'recovery' in gates_failed:
-                reasons.append(recovery_check['reason'])
+                reasons.append(f'Recovery score ({recovery[i]:g}) too low for {intensity} workout')
             if 'consecutive_days' in gates_failed:
-                reasons.append(consecutive_check['reason'])
+                reasons.append(f'Too many consecutive hard days ({int(consecutive_hard[i])}). Recovery day recommended.')
             if 'volume_progression' in gates_failed:
-                reasons.append(volume_check['reason'])
+                increase_percent = (projected_acwr[i] - 1) * 100
+                reasons.append(f'Acute volume would be {increase_percent:.1f}% above chronic load (ACWR {projected_acwr[i]:.2f} > {rules.max_volume_acwr:g})')
             
-            # Build recommendation
-            recommendation = self._build_recommendation(gates_failed, intensity)
-            
-            return self._create_result(
+            results.append(self._create_result(
                 safe=False,
                 reason="; ".join(reasons),
-                recommendation=recommendation,
+                recommendation=self._build_recommendation(gates_failed, intensity),
                 gates_passed=gates_passed,
                 gates_failed=gates_failed,
-                aisri_score=aisri_check.get('score', 0),
-                injury_risk=injury_check.get('risk', 0)
-            )
-    
-    async def _check_aisri_score(self, athlete_id: str, intensity: str) -> Dict:
-        """Check if AISRi score meets threshold for workout intensity"""
-        
-        try:
-            # Get latest AISRi score
-            result = self.db.supabase.table("aisri_scores").select("*").eq(
-                "athlete_id", athlete_id
-            ).order("created_at", desc=True).limit(1).execute()
-            
-            if not result.data or len(result.data) == 0:
-                return {'passed': False, 'reason': 'No AISRi assessment found', 'score': 0}
-            
-            latest_score = result.data[0]
-            aisri_value = latest_score.get('aisri_score', 0)
-            
-            # Check against intensity-specific thresholds
-            if intensity in ['hard', 'tempo', 'threshold']:
-                if aisri_value < self.MIN_AISRI_FOR_HARD_WORKOUT:
-                    return {
-                        'passed': False,
-                        'reason': f'AISRi score ({aisri_value}) below threshold for hard workouts ({self.MIN_AISRI_FOR_HARD_WORKOUT})',
-                        'score': aisri_value
-                    }
-            
-            elif intensity in ['interval', 'speed', 'vo2max']:
-                if aisri_value < self.MIN_AISRI_FOR_INTERVAL:
-                    return {
-                        'passed': False,
-                        'reason': f'AISRi score ({aisri_value}) below threshold for interval workouts ({self.MIN_AISRI_FOR_INTERVAL})',
-                        'score': aisri_value
-                    }
-            
-            return {'passed': True, 'score': aisri_value}
-        
-        except Exception as e:
-            return {'passed': False, 'reason': f'Error checking AISRi: {str(e)}', 'score': 0}
-    
-    async def _check_injury_risk(self, athlete_id: str, intensity: str) -> Dict:
-        """Check injury risk level"""
-        
-        try:
-            # Get latest injury prediction
-            result = self.db.supabase.table("injury_risk_predictions").select("*").eq(
-                "athlete_id", athlete_id
-            ).order("created_at", desc=True).limit(1).execute()
-            
-            if not result.data or len(result.data) == 0:
-                # No prediction = use neutral risk
-                return {'passed': True, 'risk': 50}
-            
-            prediction = result.data[0]
-            risk_score = prediction.get('risk_score', 50)
-            
-            # Block high-intensity workouts if injury risk is high
-            if risk_score > self.MAX_INJURY_RISK and intensity in ['hard', 'interval', 'speed', 'tempo']:
-                return {
-                    'passed': False,
-                    'reason': f'Injury risk ({risk_score}) too high for {intensity} workout',
-                    'risk': risk_score
-                }
-            
-            return {'passed': True, 'risk': risk_score}
-        
-        except Exception as e:
-            return {'passed': True, 'risk': 50}  # Neutral on error
-    
-    async def _check_recovery_status(self, athlete_id: str, intensity: str) -> Dict:
-        """Check recovery adequacy"""
+                aisri_score=aisri_score,
+                injury_risk=risk,
+                rules_version=rules.version
+            ))
         
-        try:
-            # Get latest AISRi score for recovery pillar
-            result = self.db.supabase.table("aisri_scores").select("*").eq(
-                "athlete_id", athlete_id
-            ).order("created_at", desc=True).limit(1).execute()
-            
-            if not result.data or len(result.data) == 0:
-                return {'passed': True}  # No data = allow
-            
-            latest_score = result.data[0]
-            recovery_score = latest_score.get('pillar_recovery', 70)
-            
-            # Check recovery for hard workouts
-            if intensity in ['hard', 'interval', 'speed', 'tempo', 'long']:
-                if recovery_score < self.MIN_RECOVERY_SCORE:
-                    return {
-                        'passed': False,
-                        'reason': f'Recovery score ({recovery_score}) too low for {intensity} workout'
-                    }
-            
-            return {'passed': True}
-        
-        except Exception as e:
-            return {'passed': True}  # Allow on error
-    
-    async def _check_consecutive_hard_days(self, athlete_id: str, intensity: str) -> Dict:
-        """Check for too many consecutive hard workout days"""
-        
-        if intensity not in ['hard', 'interval', 'speed', 'tempo']:
-            return {'passed': True}  # Only check hard workouts
-        
-        try:
-            # Get recent workouts (last 7 days)
-            seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
-            
-            result = self.db.supabase.table("strava_activities").select("*").eq(
-                "athlete_id", athlete_id
-            ).gte("start_date", seven_days_ago).order("start_date", desc=True).execute()
-            
-            if not result.data:
-                return {'passed': True}
-            
-            # Count consecutive hard days
-            consecutive_hard = 0
-            for activity in result.data:
-                # Check if hard workout (high heart rate or interval type)
-                avg_hr = activity.get('average_heartrate', 0)
-                workout_type = activity.get('workout_type', '')
-                
-                is_hard = (
-                    avg_hr > 160 or
-                    workout_type in ['3', '4', '9']  # Strava workout types: interval, tempo, race
-                )
-                
-                if is_hard:
-                    consecutive_hard += 1
-                else:
-                    break  # Streak broken
-            
-            if consecutive_hard >= self.MAX_CONSECUTIVE_HARD_DAYS:
-                return {
-                    'passed': False,
-                    'reason': f'Too many consecutive hard days ({consecutive_hard}). Recovery day recommended.'
-                }
-            
-            return {'passed': True}
-        
-        except Exception as e:
-            return {'passed': True}  # Allow on error
-    
-    async def _check_volume_progression(self, athlete_id: str, planned_duration: int) -> Dict:
-        """Check for safe volume progression"""
-        
-        try:
-            # Get last 2 weeks of activity volume
-            two_weeks_ago = (datetime.now() - timedelta(days=14)).isoformat()
-            one_week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-            
-            # Week 1 volume (2 weeks ago to 1 week ago)
-            result_week1 = self.db.supabase.table("strava_activities").select("moving_time").eq(
-                "athlete_id", athlete_id
-            ).gte("start_date", two_weeks_ago).lt("start_date", one_week_ago).execute()
-            
-            # Week 2 volume (last 7 days)
-            result_week2 = self.db.supabase.table("strava_activities").select("moving_time").eq(
-                "athlete_id", athlete_id
-            ).gte("start_date", one_week_ago).execute()
-            
-            week1_minutes = sum([a.get('moving_time', 0) / 60 for a in result_week1.data]) if result_week1.data else 0
-            week2_minutes = sum([a.get('moving_time', 0) / 60 for a in result_week2.data]) if result_week2.data else 0
-            
-            # Calculate proposed volume increase
-            if week1_minutes > 0:
-                proposed_week2 = week2_minutes + planned_duration
-                increase_percent = ((proposed_week2 - week1_minutes) / week1_minutes) * 100
-                
-                if increase_percent > self.MAX_WEEKLY_VOLUME_INCREASE:
-                    return {
-                        'passed': False,
-                        'reason': f'Weekly volume increase ({increase_percent:.1f}%) exceeds safe limit ({self.MAX_WEEKLY_VOLUME_INCREASE}%)'
-                    }
-            
-            return {'passed': True}
-        
-        except Exception as e:
-            return {'passed': True}  # Allow on error
+        return results
     
     def _create_result(
         self,
@@ -363,7 +405,8 @@ class AISRISafetyGate:
         gates_passed: List[str],
         gates_failed: List[str],
         aisri_score: int = 0,
-        injury_risk: int = 0
+        injury_risk: int = 0,
+        rules_version: Optional[str] = None
     ) -> Dict:
         """Create standardized result dictionary"""
         return {
@@ -374,6 +417,7 @@ class AISRISafetyGate:
             'gates_failed': gates_failed,
             'aisri_score': aisri_score,
             'injury_risk': injury_risk,
+            'rules_version': rules_version or self.rules.current().version,
             'checked_at': datetime.now().isoformat()
         }
     
@@ -410,32 +454,10 @@ class AISRISafetyGate:
                 "athlete_id", athlete_id
             ).order("created_at", desc=True).limit(1).execute()
             
-            aisri_score = aisri_result.data[0].get('aisri_score', 0) if aisri_result.data else 0
-            injury_risk = injury_result.data[0].get('risk_score', 50) if injury_result.data else 50
-            recovery = aisri_result.data[0].get('pillar_recovery', 70) if aisri_result.data else 70
-            
-            # Determine overall status
-            if aisri_score >= 75 and injury_risk < 50:
-                status = "EXCELLENT"
-                message = "All systems go! Ready for high-intensity training."
-            elif aisri_score >= 65 and injury_risk < 65:
-                status = "GOOD"
-                message = "Safe for moderate to hard training."
-            elif aisri_score >= 50 and injury_risk < 75:
-                status = "CAUTION"
-                message = "Proceed with easy to moderate training only."
-            else:
-                status = "WARNING"
-                message = "Focus on recovery. Avoid hard training."
-            
-            return {
-                'status': status,
-                'message': message,
-                'aisri_score': aisri_score,
-                'injury_risk': injury_risk,
-                'recovery_score': recovery,
-                'updated_at': datetime.now().isoformat()
-            }
+            return self.summarize_safety(
+                aisri_result.data[0] if aisri_result.data else None,
+                injury_result.data[0] if injury_result.data else None
+            )
 
         except Exception as e:
             return {
@@ -447,6 +469,37 @@ class AISRISafetyGate:
                 'updated_at': datetime.now().isoformat()
             }
 
+    @staticmethod
+    def summarize_safety(latest_aisri: Optional[Dict], latest_injury_prediction: Optional[Dict]) -> Dict:
+        """Overall safety status from the latest AISRi and injury rows (no I/O)"""
+        
+        aisri_score = latest_aisri.get('aisri_score', 0) if latest_aisri else 0
+        injury_risk = latest_injury_prediction.get('risk_score', 50) if latest_injury_prediction else 50
+        recovery = latest_aisri.get('pillar_recovery', 70) if latest_aisri else 70
+        
+        # Determine overall status
+        if aisri_score >= 75 and injury_risk < 50:
+            status = "EXCELLENT"
+            message = "All systems go! Ready for high-intensity training."
+        elif aisri_score >= 65 and injury_risk < 65:
+            status = "GOOD"
+            message = "Safe for moderate to hard training."
+        elif aisri_score >= 50 and injury_risk < 75:
+            status = "CAUTION"
+            message = "Proceed with easy to moderate training only."
+        else:
+            status = "WARNING"
+            message = "Focus on recovery. Avoid hard training."
+        
+        return {
+            'status': status,
+            'message': message,
+            'aisri_score': aisri_score,
+            'injury_risk': injury_risk,
+            'recovery_score': recovery,
+            'updated_at': datetime.now().isoformat()
+        }
+    
     async def get_structural_score(self, athlete_id: str) -> int:
         """
         Get structural score for athlete.
@@ -458,30 +511,8 @@ class AISRISafetyGate:
             Structural score (0-100)
         """
         try:
-            # Fetch latest AISRI assessment with pillar breakdowns
-            result = self.db.supabase.table("aisri_scores").select("*").eq(
-                "athlete_id", athlete_id
-            ).order("assessment_date", desc=True).limit(1).execute()
-            
-            if not result.data:
-                return 50  # Default neutral score
-            
-            latest = result.data[0]
-            
-            # Calculate structural score as average of strength + mobility
-            # (these are the core structural components)
-            strength = latest.get('strength_score', 50)
-            mobility = latest.get('mobility_score', 50)
-            
-            # Could also factor in ROM if available
-            rom = latest.get('rom_score', None)
-            
-            if rom is not None:
-                structural_score = int((strength + mobility + rom) / 3)
-            else:
-                structural_score = int((strength + mobility) / 2)
-            
-            return structural_score
+            # Cached per assessment; refreshed when new assessments land
+            return self.structural_index.get(athlete_id).score
             
         except Exception as e:
             print(f"Warning: Could not fetch structural score: {e}")
@@ -523,60 +554,82 @@ class AISRISafetyGate:
         structural_score = await self.get_structural_score(athlete_id)
         state = StructuralState.from_score(structural_score)
         
-        # RED: Only mobility + activation + zone 1-2
-        if state == StructuralState.RED:
-            allowed_types = ['mobility', 'activation', 'easy', 'recovery']
-            speed_permission = False
-            
-            if workout_type.lower() not in allowed_types:
-                return {
-                    'passed': False,
-                    'state': 'red',
-                    'structural_score': structural_score,
-                    'speed_permission': False,
-                    'reason': f'Structural state RED (score: {structural_score}). Only mobility, activation, and easy runs (zone 1-2) allowed.'
-                }
-            
-            # If allowed type, still check intensity
-            if intensity in ['high', 'very_high']:
-                return {
-                    'passed': False,
-                    'state': 'red',
-                    'structural_score': structural_score,
-                    'speed_permission': False,
-                    'reason': f'Structural state RED (score: {structural_score}). High intensity not allowed.'
-                }
-        
-        # YELLOW: No threshold or VO2
-        elif state == StructuralState.YELLOW:
-            blocked_types = ['threshold', 'vo2max', 'interval', 'race']
-            speed_permission = False
-            
-            if workout_type.lower() in blocked_types:
-                return {
-                    'passed': False,
-                    'state': 'yellow',
-                    'structural_score': structural_score,
-                    'speed_permission': False,
-                    'reason': f'Structural state YELLOW (score: {structural_score}). Threshold and VO2max workouts not allowed.'
-                }
+        # Allowed types / intensities per state come from the rule table
+        rules = self.rules.current()
+        clearance = rules.evaluate_structural([state.value], [workout_type], [intensity])
+        speed_permission = bool(clearance['speed_permission'][0])
         
-        # GREEN: Full access
-        else:
-            speed_permission = True
-        
-        return {
+        result = {
             'passed': True,
             'state': state.value,
             'structural_score': structural_score,
-            'speed_permission': speed_permission
+            'speed_permission': speed_permission,
+            'rules_version': rules.version
         }
+        for kind in ('type', 'intensity'):
+            if not clearance[f'{kind}_allowed'][0]:
+                result['passed'] = False
+                result['reason'] = f'Structural state {state.name} (score: {structural_score}). {rules.structural_reason(state.value, kind)}'
+                break
+        
+        self.audit_log.record_structural_clearance(athlete_id, result, workout_type, intensity)
+        return result
 
+    def iter_structural_states(
+        self,
+        athlete_ids: Optional[List[str]] = None,
+        group_id: Optional[str] = None,
+        page_size: int = 1000
+    ) -> Iterator[List[Dict]]:
+        """
+        Structural score, state and speed permission for many athletes.
+        
+        One DISTINCT ON query per page of athletes; scores, states and
+        speed permission are computed per page with array operations.
+        Pages also warm the structural index.
+        
+        Args:
+            athlete_ids: Explicit athletes
+            group_id: Coach id (adds the coach's active athletes)
+            page_size: Athletes per page
+        
+        Yields:
+            Pages of {'athlete_id', 'structural_score', 'state',
+            'speed_permission', 'assessment_id', 'assessment_date'}
+        """
+        for page in self.structural_index.iter_latest_assessments(athlete_ids, group_id, page_size):
+            rules = self.rules.current()
+            entries = entries_from_latest_rows(page)
+            self.structural_index.store(entries)
+            
+            codes = StructuralState.codes_from_scores(np.array([e.score for e in entries]))
+            speed_permission = rules.speed_permission[codes]
+            
+            yield [
+                {
+                    'athlete_id': entry.athlete_id,
+                    'structural_score': entry.score,
+                    'state': entry.state.value,
+                    'speed_permission': bool(speed),
+                    'assessment_id': entry.assessment_id,
+                    'assessment_date': entry.assessment_date
+                }
+                for entry, speed in zip(entries, speed_permission)
+            ]
+    
+    def classify_structural_states(
+        self,
+        athlete_ids: Optional[List[str]] = None,
+        group_id: Optional[str] = None
+    ) -> List[Dict]:
+        """All of iter_structural_states as one list (small groups)"""
+        return [row for page in self.iter_structural_states(athlete_ids, group_id) for row in page]
+    
     def load_template_for_state(
         self,
         structural_state: str,
         workout_type: str
-    ) -> Dict:
+    ) -> WorkoutTemplate:
         """
         Load appropriate workout template based on structural state.
         
@@ -585,22 +638,11 @@ class AISRISafetyGate:
             workout_type: Desired workout type
         
         Returns:
-            Template dictionary with structure and AI constraints
+            Shared, read-only template with structure and AI constraints
+            (fallbacks are resolved in the registry; unknown states get
+            the green fallback)
         """
-        from workout_templates import get_template_for_state
-        
-        template = get_template_for_state(structural_state, workout_type)
-        
-        if not template:
-            # Fallback to safest option
-            if structural_state == 'red':
-                template = STRUCTURAL_WORKOUT_TEMPLATES['red']['easy']
-            elif structural_state == 'yellow':
-                template = STRUCTURAL_WORKOUT_TEMPLATES['yellow']['easy']
-            else:
-                template = STRUCTURAL_WORKOUT_TEMPLATES['green']['threshold']
-        
-        return template
+        return TEMPLATE_REGISTRY.get(structural_state, workout_type) or TEMPLATE_REGISTRY.fallback('green')
 
 
 
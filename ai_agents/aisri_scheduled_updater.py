@@ -11,28 +11,50 @@ Features:
 - Incremental updates (only athletes with new activities)
 - Error resilience (continues even if one athlete fails)
 - Detailed logging
-- Notification on completion
+- Notification on completion (queued, rate-limited Telegram delivery)
 
 Usage:
     # Run manually for testing
     python aisri_scheduled_updater.py
     
+    # Run as 4 local worker processes sharing the run through shard leases
+    python aisri_scheduled_updater.py --workers 4 --shards 32
+    
+    # Run one sharded worker per node (all nodes share AISRI_SHARD_DSN)
+    python aisri_scheduled_updater.py --worker-id node-a --shards 32
+    
     # Or set up as cron job (Linux/Mac):
     0 2 * * 0 cd /path/to/ai_agents && python aisri_scheduled_updater.py
     
     # Or use Windows Task Scheduler (Windows)
 """
 
+import argparse
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict
+import multiprocessing
+import socket
+from collections import defaultdict
+from datetime import datetime
+from typing import List, Dict, Optional
 import os
 import sys
 
 from database_integration import DatabaseIntegration
-from aisri_auto_calculator import AISRIAutoCalculator
-from communication_agent_v2 import CommunicationAgent
+from aisri_auto_calculator import TENURE_START_SQL, AISRIAutoCalculator, AISRIAutoResult
+from activity_providers import parse_datetime
+from notification_dispatcher import NotificationDispatcher
+from aisri_shard_coordinator import (
+    ShardLeaseCoordinator,
+    ShardLease,
+    LeaseHeartbeat,
+    LeaseLostError,
+    shard_for,
+    current_run_id
+)
+
+DEFAULT_NUM_SHARDS = 32
+CALCULATION_BATCH_SIZE = 500  # Athletes scored per multi-source fetch
 
 
 # Configure logging
@@ -52,9 +74,13 @@ class AISRIScheduledUpdater:
     Scheduled service to automatically update AISRI scores.
     """
     
-    def __init__(self):
-        self.db = DatabaseIntegration()
-        self.comm = CommunicationAgent()
+    def __init__(
+        self,
+        db: Optional[DatabaseIntegration] = None,
+        notifier: Optional[NotificationDispatcher] = None
+    ):
+        self.db = db or DatabaseIntegration()
+        self.notifier = notifier or NotificationDispatcher()
     
     async def run_weekly_update(self):
         """
@@ -62,7 +88,7 @@ class AISRIScheduledUpdater:
         
         Process:
         1. Fetch all athletes with Strava/Garmin connections
-        2. Check for new activities since last calculation
+        2. Detect athletes with new activities since last calculation (one query)
         3. Recalculate AISRI scores for athletes with updates
         4. Send notification summaries
         5. Log results
@@ -75,29 +101,13 @@ class AISRIScheduledUpdater:
         athletes = await self._get_connected_athletes()
         logger.info(f"📊 Found {len(athletes)} athletes with activity connections")
         
-        results = {
-            'success': 0,
-            'skipped': 0,
-            'failed': 0,
-            'errors': []
-        }
+        results = self._new_results()
+        
+        # One aggregate query decides who needs recomputation
+        changes = self._detect_changes()
         
         # Process each athlete
-        for athlete in athletes:
-            try:
-                updated = await self._update_athlete_aisri(athlete)
-                if updated:
-                    results['success'] += 1
-                else:
-                    results['skipped'] += 1
-                    
-            except Exception as e:
-                results['failed'] += 1
-                results['errors'].append({
-                    'user_id': athlete['user_id'],
-                    'error': str(e)
-                })
-                logger.error(f"❌ Failed to update athlete {athlete['user_id']}: {e}")
+        await self._process_athletes(athletes, results, changes)
         
         # Calculate duration
         duration = (datetime.now() - start_time).total_seconds()
@@ -115,77 +125,295 @@ class AISRIScheduledUpdater:
         
         # Send admin notification if enabled
         if os.getenv('AISRI_SCHEDULER_NOTIFY', 'true').lower() == 'true':
-            await self._send_admin_notification(results, duration)
+            self._send_admin_notification(results, duration)
+        
+        # Deliver queued notifications before the process exits
+        await self.notifier.close()
+        
+        return results
+    
+    async def run_sharded_worker(
+        self,
+        coordinator: ShardLeaseCoordinator,
+        worker_id: str,
+        run_id: Optional[str] = None,
+        num_shards: int = DEFAULT_NUM_SHARDS
+    ) -> Dict:
+        """
+        Process the weekly update as one of several cooperating workers.
+        
+        Process:
+        1. Register the run's shards (no-op if another worker already did)
+        2. Claim a shard lease, process its athletes while a heartbeat
+           thread keeps the lease alive
+        3. Mark the shard done and claim the next one; when every pending
+           shard is leased, wait for the earliest lease to expire
+        4. Stop once every shard of the run is done; the worker that
+           finishes the run sends the admin report
+        
+        Workers can be added or killed at any time: a killed worker's
+        lease expires and its shard is stolen by a worker still waiting.
+        """
+        run_id = run_id or current_run_id()
+        coordinator.init_run(run_id, num_shards)
+        
+        logger.info(f"🚀 Worker {worker_id} joining {run_id} ({num_shards} shards)")
+        start_time = datetime.now()
+        
+        athletes = await self._get_connected_athletes()
+        athletes_by_shard = defaultdict(list)
+        for athlete in athletes:
+            athletes_by_shard[shard_for(athlete['user_id'], num_shards)].append(athlete)
+        
+        results = self._new_results()
+        results['shards_processed'] = 0
+        
+        while True:
+            lease = coordinator.claim_next_shard(run_id, worker_id)
+            if lease is None:
+                # Shards still leased by other (possibly dead) workers
+                wait = coordinator.seconds_until_claimable(run_id)
+                if wait is None:
+                    break
+                await asyncio.sleep(wait)
+                continue
+            
+            shard_results = self._new_results()
+            heartbeat = LeaseHeartbeat(coordinator, lease)
+            heartbeat.start()
+            
+            try:
+                shard_athletes = athletes_by_shard.get(lease.shard_id, [])
+                changes = self._detect_changes(
+                    [athlete['user_id'] for athlete in shard_athletes]
+                ) if shard_athletes else {}
+                await self._process_athletes(
+                    shard_athletes,
+                    shard_results,
+                    changes,
+                    lease=lease
+                )
+                coordinator.complete(
+                    lease,
+                    success=shard_results['success'],
+                    skipped=shard_results['skipped'],
+                    failed=shard_results['failed']
+                )
+                results['shards_processed'] += 1
+                logger.info(f"✅ Worker {worker_id} finished shard {lease.shard_id}")
+            except LeaseLostError as e:
+                logger.warning(f"⚠️  {e}; shard will be finished by another worker")
+            finally:
+                heartbeat.stop()
+            
+            for key in ('success', 'skipped', 'failed'):
+                results[key] += shard_results[key]
+            results['errors'].extend(shard_results['errors'])
+        
+        duration = (datetime.now() - start_time).total_seconds()
+        logger.info(
+            f"🏁 Worker {worker_id} done: {results['shards_processed']} shards, "
+            f"{results['success']} updated, {results['skipped']} skipped, "
+            f"{results['failed']} failed in {duration:.1f}s"
+        )
+        
+        # Exactly one worker reports the whole run
+        if coordinator.claim_run_report(run_id, worker_id):
+            summary = coordinator.run_summary(run_id)
+            logger.info(f"📊 {run_id} complete: {summary}")
+            if os.getenv('AISRI_SCHEDULER_NOTIFY', 'true').lower() == 'true':
+                self._send_admin_notification(
+                    {**summary, 'errors': results['errors']},
+                    duration
+                )
+        
+        # Deliver queued notifications before the worker exits
+        await self.notifier.close()
         
         return results
     
+    @staticmethod
+    def _new_results() -> Dict:
+        """Empty results accumulator"""
+        return {
+            'success': 0,
+            'skipped': 0,
+            'failed': 0,
+            'errors': []
+        }
+    
+    def _detect_changes(self, user_ids: Optional[List[str]] = None) -> Optional[Dict[str, Dict]]:
+        """
+        Find athletes whose activities changed since their last AISRI calculation.
+        
+        Args:
+            user_ids: Restrict the check to these athletes (None = everyone)
+            
+        Returns:
+            Dict of user_id -> change record, or None if detection failed
+        """
+        changes = self.db.get_aisri_recompute_candidates(user_ids)
+        if changes is None:
+            logger.warning("⚠️  Change detection failed; recalculating every athlete")
+        else:
+            logger.info(f"🔍 {len(changes)} athletes have new activity data")
+        return changes
+    
+    async def _process_athletes(
+        self,
+        athletes: List[Dict],
+        results: Dict,
+        changes: Optional[Dict[str, Dict]],
+        lease: Optional[ShardLease] = None
+    ):
+        """
+        Update each changed athlete, recording outcomes in results.
+        
+        Unchanged athletes are counted as skipped without touching their
+        activity rows. Changed athletes are scored in batches from all
+        activity sources at once. When working under a shard lease, stops
+        as soon as the lease can no longer be guaranteed so a stolen shard
+        is never processed twice.
+        """
+        # One chat-id lookup for the shard; only athletes with a previous
+        # score can get a score-change notification
+        chat_ids = self._telegram_chat_ids([
+            user_id for user_id, change in (changes or {}).items()
+            if change.get('last_aisri_score') is not None
+        ])
+        
+        for batch_start in range(0, len(athletes), CALCULATION_BATCH_SIZE):
+            batch = athletes[batch_start:batch_start + CALCULATION_BATCH_SIZE]
+            pending = [
+                athlete for athlete in batch
+                if changes is None or athlete['user_id'] in changes
+            ]
+            results['skipped'] += len(batch) - len(pending)
+            if not pending:
+                continue
+            
+            self._check_lease(lease)
+            try:
+                # Off the event loop so queued notifications keep flowing
+                scores = await asyncio.to_thread(
+                    AISRIAutoCalculator.calculate_from_providers,
+                    [athlete['user_id'] for athlete in pending],
+                    self._tenure_starts(pending)
+                )
+            except Exception as e:
+                for athlete in pending:
+                    results['failed'] += 1
+                    results['errors'].append({
+                        'user_id': athlete['user_id'],
+                        'error': str(e)
+                    })
+                logger.error(f"❌ Failed to calculate batch of {len(pending)} athletes: {e}")
+                continue
+            
+            for athlete in pending:
+                self._check_lease(lease)
+                
+                try:
+                    change = changes.get(athlete['user_id']) if changes is not None else None
+                    updated = await self._update_athlete_aisri(
+                        athlete,
+                        scores.get(athlete['user_id']),
+                        change,
+                        chat_id=chat_ids.get(athlete['user_id'])
+                    )
+                    if updated:
+                        results['success'] += 1
+                    else:
+                        results['skipped'] += 1
+                        
+                except Exception as e:
+                    results['failed'] += 1
+                    results['errors'].append({
+                        'user_id': athlete['user_id'],
+                        'error': str(e)
+                    })
+                    logger.error(f"❌ Failed to update athlete {athlete['user_id']}: {e}")
+    
+    @staticmethod
+    def _tenure_starts(athletes: List[Dict]) -> Dict[str, datetime]:
+        """user_id -> start of training history (adaptability/confidence bonus)"""
+        starts = {}
+        for athlete in athletes:
+            try:
+                started = parse_datetime(athlete.get('tenure_start'))
+            except ValueError:
+                started = None
+            if started:
+                starts[athlete['user_id']] = started
+        return starts
+    
+    @staticmethod
+    def _check_lease(lease: Optional[ShardLease]):
+        """Raise if a shard lease can no longer be guaranteed"""
+        if lease and not lease.is_valid():
+            raise LeaseLostError(
+                f"Lease on shard {lease.shard_id} expired mid-shard for {lease.worker_id}"
+            )
+    
     async def _get_connected_athletes(self) -> List[Dict]:
         """
-        Fetch all athletes with Strava or Garmin connections.
+        Fetch all athletes with Strava/Garmin connections or in-app runs.
         
         Returns:
-            List of athlete records with connection info
+            List of athlete records with connection info. tenure_start is
+            the earlier of the account creation and the first recorded
+            activity (any source) - the training age the per-source
+            calculators used to read from the Strava profile.
         """
-        query = """
+        query = f"""
         SELECT 
             u.id as user_id,
             u.email,
             sa.strava_athlete_id,
             sa.last_sync_at as strava_last_sync,
             ga.garmin_user_id,
-            ga.last_sync_at as garmin_last_sync
+            ga.last_sync_at as garmin_last_sync,
+            {TENURE_START_SQL} as tenure_start
         FROM auth.users u
         LEFT JOIN strava_athletes sa ON u.id = sa.user_id
         LEFT JOIN garmin_connections ga ON u.id = ga.user_id
         WHERE sa.strava_athlete_id IS NOT NULL 
            OR ga.garmin_user_id IS NOT NULL
+           OR EXISTS (SELECT 1 FROM run_sessions rs WHERE rs.user_id = u.id)
         """
         
         result = await self.db.supabase.rpc('execute_raw_sql', {'query': query})
         return result.data if result.data else []
     
-    async def _update_athlete_aisri(self, athlete: Dict) -> bool:
+    async def _update_athlete_aisri(
+        self,
+        athlete: Dict,
+        result: Optional[AISRIAutoResult],
+        change: Optional[Dict] = None,
+        chat_id: Optional[str] = None
+    ) -> bool:
         """
-        Update AISRI score for a single athlete if new activities exist.
+        Save a freshly calculated AISRI score for a single athlete.
         
         Args:
             athlete: Athlete record with connection info
+            result: Score from the multi-source batch calculation
+            change: Change-detection record (last score and activity marks),
+                    None if the athlete has no previous calculation or
+                    detection was unavailable
+            chat_id: Athlete's Telegram chat for score-change notifications
             
         Returns:
             True if updated, False if skipped
         """
         user_id = athlete['user_id']
+        last_score = change.get('last_aisri_score') if change else None
         
-        # Check last AISRI calculation date
-        last_calculation = await self.db.get_last_aisri_calculation(user_id)
-        
-        if last_calculation:
-            last_calc_date = datetime.fromisoformat(last_calculation['calculated_at'])
-        else:
-            last_calc_date = datetime.now() - timedelta(days=365)  # Far in past
-        
-        # Check for new activities since last calculation
-        has_new_activities = await self._has_new_activities_since(
-            athlete=athlete,
-            since_date=last_calc_date
-        )
-        
-        if not has_new_activities:
-            logger.info(f"⏭️  Skipping {user_id}: No new activities since {last_calc_date.date()}")
+        if result is None:
+            logger.warning(f"⚠️  No AISRI result calculated for {user_id}")
             return False
         
-        # Calculate new AISRI scores
-        logger.info(f"🔄 Updating AISRI for {user_id}...")
-        
-        if athlete.get('strava_athlete_id'):
-            result = await AISRIAutoCalculator.calculate_from_strava(
-                user_id=user_id,
-                strava_athlete_id=athlete['strava_athlete_id']
-            )
-        else:
-            # Future: Add Garmin calculation
-            logger.warning(f"⚠️  Garmin-only athletes not yet supported for {user_id}")
-            return False
+        logger.info(f"🔄 Updating AISRI for {user_id} from {result.data_source}...")
         
         # Save to database
         await self.db.upsert_aisri_score(
@@ -207,55 +435,43 @@ class AISRIScheduledUpdater:
         logger.info(f"✅ Updated {user_id}: AISRI={result.aisri_score}, Confidence={result.confidence}%")
         
         # Send notification to athlete if score changed significantly
-        if last_calculation:
-            score_change = abs(result.aisri_score - last_calculation['aisri_score'])
+        if last_score is not None:
+            last_score = round(float(last_score))
+            score_change = abs(result.aisri_score - last_score)
             if score_change >= 10:
-                await self._notify_athlete_score_change(
+                self._notify_athlete_score_change(
                     user_id=user_id,
-                    old_score=last_calculation['aisri_score'],
+                    chat_id=chat_id,
+                    old_score=last_score,
                     new_score=result.aisri_score,
                     risk_level=result.risk_level
                 )
         
         return True
     
-    async def _has_new_activities_since(
-        self,
-        athlete: Dict,
-        since_date: datetime
-    ) -> bool:
-        """
-        Check if athlete has new activities since given date.
-        
-        Args:
-            athlete: Athlete record
-            since_date: Check for activities after this date
-            
-        Returns:
-            True if new activities exist
-        """
-        if athlete.get('strava_athlete_id'):
-            activities = await self.db.get_athlete_activities(
-                athlete['strava_athlete_id'],
-                start_date=since_date
-            )
-            return len(activities) > 0
-        
-        # Future: Check Garmin activities
-        return False
+    def _telegram_chat_ids(self, user_ids: List[str]) -> Dict[str, str]:
+        """Chat IDs for a batch of athletes ({} when notifications are off)"""
+        if os.getenv('ENABLE_TELEGRAM_NOTIFICATIONS', 'false').lower() != 'true':
+            return {}
+        return self.db.get_telegram_chat_ids(user_ids)
     
-    async def _notify_athlete_score_change(
+    def _notify_athlete_score_change(
         self,
         user_id: str,
+        chat_id: Optional[str],
         old_score: int,
         new_score: int,
         risk_level: str
     ):
         """
-        Notify athlete of significant AISRI score change.
+        Queue a notification of significant AISRI score change.
+        
+        Delivery happens in the background dispatcher; pending updates to
+        the same athlete are merged into one message.
         
         Args:
             user_id: User ID
+            chat_id: Telegram chat ID (None if the athlete has none linked)
             old_score: Previous AISRI score
             new_score: New AISRI score
             risk_level: Current risk level
@@ -281,24 +497,23 @@ class AISRIScheduledUpdater:
         View your full analysis in the SafeStride app.
         """
         
-        try:
-            # Send via Telegram if configured
-            if os.getenv('ENABLE_TELEGRAM_NOTIFICATIONS', 'false').lower() == 'true':
-                await self.comm.send_telegram_alert(
-                    user_id=user_id,
-                    message=message,
-                    priority='medium'
-                )
-        except Exception as e:
-            logger.warning(f"Failed to send notification to {user_id}: {e}")
+        # Send via Telegram if configured
+        if os.getenv('ENABLE_TELEGRAM_NOTIFICATIONS', 'false').lower() != 'true':
+            return
+        
+        if not chat_id:
+            logger.info(f"No Telegram chat linked for {user_id}; skipping notification")
+            return
+        
+        self.notifier.enqueue(chat_id, message)
     
-    async def _send_admin_notification(
+    def _send_admin_notification(
         self,
         results: Dict,
         duration: float
     ):
         """
-        Send summary notification to admin.
+        Queue summary notification to admin.
         
         Args:
             results: Update results dictionary
@@ -325,13 +540,7 @@ class AISRIScheduledUpdater:
             for error in results['errors'][:5]:  # Show first 5 errors
                 message += f"- {error['user_id']}: {error['error']}\n"
         
-        try:
-            await self.comm.send_telegram_message(
-                chat_id=admin_telegram_id,
-                text=message
-            )
-        except Exception as e:
-            logger.error(f"Failed to send admin notification: {e}")
+        self.notifier.enqueue(admin_telegram_id, message)
 
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -350,5 +559,65 @@ async def main():
     sys.exit(0)
 
 
+async def run_worker(worker_id: str, num_shards: int, run_id: Optional[str] = None):
+    """Run one sharded worker"""
+    updater = AISRIScheduledUpdater()
+    coordinator = ShardLeaseCoordinator.from_env()
+    results = await updater.run_sharded_worker(
+        coordinator=coordinator,
+        worker_id=worker_id,
+        run_id=run_id,
+        num_shards=num_shards
+    )
+    
+    sys.exit(1 if results['failed'] > 0 else 0)
+
+
+def _worker_process(worker_id: str, num_shards: int, run_id: str):
+    """Entry point for spawned worker processes"""
+    asyncio.run(run_worker(worker_id, num_shards, run_id))
+
+
+def run_local_workers(num_workers: int, num_shards: int) -> int:
+    """
+    Spawn N local worker processes sharing one run.
+    
+    Returns:
+        Process exit code (1 if any worker failed)
+    """
+    run_id = current_run_id()
+    host = socket.gethostname()
+    context = multiprocessing.get_context('spawn')
+    
+    processes = [
+        context.Process(
+            target=_worker_process,
+            args=(f"{host}-{os.getpid()}-w{i}", num_shards, run_id),
+            name=f"aisri-worker-{i}"
+        )
+        for i in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    
+    return 1 if any(p.exitcode != 0 for p in processes) else 0
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Weekly AISRI score updater")
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Spawn N local worker processes sharing shard leases')
+    parser.add_argument('--shards', type=int, default=DEFAULT_NUM_SHARDS,
+                        help='Number of athlete shards for sharded runs')
+    parser.add_argument('--worker-id', default=None,
+                        help='Run a single sharded worker with this id (multi-node)')
+    args = parser.parse_args()
+    
+    if args.workers > 0:
+        sys.exit(run_local_workers(args.workers, args.shards))
+    elif args.worker_id:
+        asyncio.run(run_worker(args.worker_id, args.shards))
+    else:
+        asyncio.run(main())
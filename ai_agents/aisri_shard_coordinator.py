@@ -0,0 +1,492 @@
+"""
+AISRI Shard Lease Coordinator
+Lets several AISRIScheduledUpdater workers share one weekly run safely.
+
+How it works:
+- Athletes are split into a fixed number of shards by a stable hash of user_id
+- Each shard is a row in a local coordination table (aisri_shard_leases)
+- A worker claims a shard by taking a time-limited lease on it
+- While processing, a heartbeat thread extends the lease (shard work is
+  blocking, so the heartbeat cannot share the worker's event loop)
+- Leases that expire (crashed or killed worker) are stolen by other workers:
+  a worker with nothing to claim waits for the earliest lease to expire
+  and only stops once every shard of the run is done
+- Finished shards are marked done for the run and never claimed again
+
+Backends:
+- SQLite file (default) - good for several processes on one machine
+- Postgres via psycopg2 - set AISRI_SHARD_DSN=postgresql://... for multi-node
+
+Usage:
+    coordinator = ShardLeaseCoordinator.from_env()
+    coordinator.init_run(run_id, num_shards=16)
+
+    while True:
+        lease = coordinator.claim_next_shard(run_id, worker_id)
+        if lease is None:
+            wait = coordinator.seconds_until_claimable(run_id)
+            if wait is None:
+                break  # Run complete
+            time.sleep(wait)
+            continue
+        with LeaseHeartbeat(coordinator, lease):
+            ...process athletes where shard_for(user_id, 16) == lease.shard_id...
+        coordinator.complete(lease, success=10, skipped=2, failed=0)
+"""
+
+import logging
+import os
+import time
+import zlib
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 120
+DEFAULT_SHARD_DB_PATH = 'logs/aisri_shard_leases.db'
+
+
+class LeaseLostError(Exception):
+    """Raised when a worker no longer holds the lease it is working under"""
+    pass
+
+
+def shard_for(user_id: str, num_shards: int) -> int:
+    """
+    Stable shard assignment for an athlete.
+
+    Uses CRC32 rather than hash() so every process and node agrees
+    on the same assignment regardless of PYTHONHASHSEED.
+    """
+    return zlib.crc32(str(user_id).encode('utf-8')) % num_shards
+
+
+def current_run_id(now: Optional[datetime] = None) -> str:
+    """Run identifier shared by all workers started for the same ISO week"""
+    now = now or datetime.now()
+    year, week, _ = now.isocalendar()
+    return f"aisri-weekly-{year}-W{week:02d}"
+
+
+@dataclass
+class ShardLease:
+    """A lease held by one worker on one shard"""
+    run_id: str
+    shard_id: int
+    num_shards: int
+    worker_id: str
+    expires_at: float
+
+    def is_valid(self, margin_seconds: float = 5.0) -> bool:
+        """True while the lease is safely within its expiry window"""
+        return time.time() + margin_seconds < self.expires_at
+
+
+class ShardLeaseCoordinator:
+    """
+    Lease-based work claiming over a small coordination table.
+
+    All state changes are single conditional UPDATE statements, so the
+    database decides which worker wins a race for a shard.
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        placeholder: str = '?',
+        lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ):
+        """
+        Args:
+            connect: Zero-argument factory returning a DB-API connection
+            placeholder: Parameter marker of the driver ('?' sqlite, '%s' psycopg2)
+            lease_seconds: How long a claim or heartbeat keeps a shard
+        """
+        self._connect = connect
+        self._placeholder = placeholder
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._ensure_schema()
+
+    @classmethod
+    def from_env(cls) -> 'ShardLeaseCoordinator':
+        """Build coordinator from AISRI_SHARD_DSN / AISRI_SHARD_DB settings"""
+        lease_seconds = int(os.getenv('AISRI_SHARD_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+        dsn = os.getenv('AISRI_SHARD_DSN', '')
+
+        if dsn.startswith('postgres'):
+            import psycopg2
+
+            return cls(
+                connect=lambda: psycopg2.connect(dsn),
+                placeholder='%s',
+                lease_seconds=lease_seconds
+            )
+
+        return cls.for_sqlite(
+            os.getenv('AISRI_SHARD_DB', DEFAULT_SHARD_DB_PATH),
+            lease_seconds=lease_seconds
+        )
+
+    @classmethod
+    def for_sqlite(
+        cls,
+        path: str,
+        lease_seconds: int = DEFAULT_LEASE_SECONDS
+    ) -> 'ShardLeaseCoordinator':
+        """Coordinator backed by a SQLite file shared by local processes"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        def connect():
+            conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            return conn
+
+        return cls(connect=connect, placeholder='?', lease_seconds=lease_seconds)
+
+    # =========================================================================
+    # SCHEMA / RUN SETUP
+    # =========================================================================
+
+    def _conn(self):
+        """One connection per thread (sqlite connections are not shareable)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    def close_connection(self):
+        """Close the calling thread's connection (e.g. when a heartbeat thread exits)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+    def _execute(self, sql: str, params: tuple = ()) -> int:
+        """Execute a statement, commit, and return affected row count"""
+        conn = self._conn()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql.replace('?', self._placeholder), params)
+            rowcount = cursor.rowcount
+            conn.commit()
+            return rowcount
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        """Run a SELECT and return all rows"""
+        conn = self._conn()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql.replace('?', self._placeholder), params)
+            rows = cursor.fetchall()
+            conn.commit()
+            return rows
+        finally:
+            cursor.close()
+
+    def _ensure_schema(self):
+        """Create the coordination table if it does not exist"""
+        self._execute("""
+            CREATE TABLE IF NOT EXISTS aisri_shard_leases (
+                run_id TEXT NOT NULL,
+                shard_id INTEGER NOT NULL,
+                num_shards INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_expires_at DOUBLE PRECISION,
+                heartbeat_at DOUBLE PRECISION,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                success_count INTEGER NOT NULL DEFAULT 0,
+                skipped_count INTEGER NOT NULL DEFAULT 0,
+                failed_count INTEGER NOT NULL DEFAULT 0,
+                completed_at DOUBLE PRECISION,
+                PRIMARY KEY (run_id, shard_id)
+            )
+        """)
+
+    def init_run(self, run_id: str, num_shards: int):
+        """
+        Register all shards for a run.
+
+        Safe to call from every worker: existing shard rows are left alone,
+        so late-starting workers join the run instead of resetting it.
+        """
+        for shard_id in range(num_shards):
+            self._execute(
+                """
+                INSERT INTO aisri_shard_leases (run_id, shard_id, num_shards)
+                VALUES (?, ?, ?)
+                ON CONFLICT (run_id, shard_id) DO NOTHING
+                """,
+                (run_id, shard_id, num_shards)
+            )
+
+    # =========================================================================
+    # LEASE OPERATIONS
+    # =========================================================================
+
+    def claim_next_shard(self, run_id: str, worker_id: str) -> Optional[ShardLease]:
+        """
+        Claim any pending shard that is unowned or whose lease has expired.
+
+        Returns:
+            ShardLease if a shard was claimed, None when nothing is left
+        """
+        rows = self._query(
+            """
+            SELECT shard_id, num_shards FROM aisri_shard_leases
+            WHERE run_id = ? AND status = 'pending'
+            ORDER BY shard_id
+            """,
+            (run_id,)
+        )
+        if not rows:
+            return None
+
+        # Start at a worker-specific offset so workers don't all race for shard 0
+        offset = zlib.crc32(worker_id.encode('utf-8')) % len(rows)
+        candidates = rows[offset:] + rows[:offset]
+
+        for shard_id, num_shards in candidates:
+            now = time.time()
+            expires_at = now + self.lease_seconds
+            claimed = self._execute(
+                """
+                UPDATE aisri_shard_leases
+                SET owner = ?, lease_expires_at = ?, heartbeat_at = ?, attempts = attempts + 1
+                WHERE run_id = ? AND shard_id = ? AND status = 'pending'
+                  AND (owner IS NULL OR lease_expires_at < ?)
+                """,
+                (worker_id, expires_at, now, run_id, shard_id, now)
+            )
+            if claimed == 1:
+                return ShardLease(
+                    run_id=run_id,
+                    shard_id=shard_id,
+                    num_shards=num_shards,
+                    worker_id=worker_id,
+                    expires_at=expires_at
+                )
+
+        return None
+
+    def seconds_until_claimable(self, run_id: str) -> Optional[float]:
+        """
+        How long a worker with nothing to claim should wait before retrying.
+
+        Returns:
+            Seconds until the earliest held lease expires (capped at a
+            quarter lease, so a shard finished meanwhile is noticed), 0 if
+            a pending shard is unowned, None once no shard is pending
+        """
+        rows = self._query(
+            """
+            SELECT owner, lease_expires_at FROM aisri_shard_leases
+            WHERE run_id = ? AND status = 'pending'
+            """,
+            (run_id,)
+        )
+        if not rows:
+            return None
+        if any(owner is None or expires_at is None for owner, expires_at in rows):
+            return 0.0
+
+        earliest = min(expires_at for _, expires_at in rows)
+        # Claims need lease_expires_at < now, so wake just after it
+        return min(max(earliest - time.time(), 0.0) + 0.01, self.lease_seconds / 4)
+
+    def heartbeat(self, lease: ShardLease) -> ShardLease:
+        """
+        Extend a held lease.
+
+        Raises:
+            LeaseLostError: if the lease expired and another worker stole it
+        """
+        now = time.time()
+        expires_at = now + self.lease_seconds
+        renewed = self._execute(
+            """
+            UPDATE aisri_shard_leases
+            SET lease_expires_at = ?, heartbeat_at = ?
+            WHERE run_id = ? AND shard_id = ? AND owner = ? AND status = 'pending'
+            """,
+            (expires_at, now, lease.run_id, lease.shard_id, lease.worker_id)
+        )
+        if renewed != 1:
+            raise LeaseLostError(
+                f"Worker {lease.worker_id} lost lease on shard {lease.shard_id} of {lease.run_id}"
+            )
+
+        lease.expires_at = expires_at
+        return lease
+
+    def complete(
+        self,
+        lease: ShardLease,
+        success: int = 0,
+        skipped: int = 0,
+        failed: int = 0
+    ):
+        """
+        Mark a shard done and record its counts.
+
+        Raises:
+            LeaseLostError: if the lease is no longer held by this worker
+        """
+        done = self._execute(
+            """
+            UPDATE aisri_shard_leases
+            SET status = 'done', completed_at = ?, lease_expires_at = NULL,
+                success_count = ?, skipped_count = ?, failed_count = ?
+            WHERE run_id = ? AND shard_id = ? AND owner = ? AND status = 'pending'
+            """,
+            (time.time(), success, skipped, failed, lease.run_id, lease.shard_id, lease.worker_id)
+        )
+        if done != 1:
+            raise LeaseLostError(
+                f"Worker {lease.worker_id} could not complete shard {lease.shard_id}: lease lost"
+            )
+
+    def release(self, lease: ShardLease):
+        """Give a shard back without completing it (e.g. on shutdown)"""
+        self._execute(
+            """
+            UPDATE aisri_shard_leases
+            SET owner = NULL, lease_expires_at = NULL
+            WHERE run_id = ? AND shard_id = ? AND owner = ? AND status = 'pending'
+            """,
+            (lease.run_id, lease.shard_id, lease.worker_id)
+        )
+
+    # =========================================================================
+    # RUN STATUS
+    # =========================================================================
+
+    def run_summary(self, run_id: str) -> Dict:
+        """Aggregate status and counts across all shards of a run"""
+        rows = self._query(
+            """
+            SELECT status, COUNT(*), SUM(success_count), SUM(skipped_count), SUM(failed_count)
+            FROM aisri_shard_leases
+            WHERE run_id = ? AND shard_id >= 0
+            GROUP BY status
+            """,
+            (run_id,)
+        )
+
+        summary = {
+            'shards_total': 0,
+            'shards_done': 0,
+            'success': 0,
+            'skipped': 0,
+            'failed': 0
+        }
+        for status, count, success, skipped, failed in rows:
+            summary['shards_total'] += count
+            if status == 'done':
+                summary['shards_done'] += count
+            summary['success'] += success or 0
+            summary['skipped'] += skipped or 0
+            summary['failed'] += failed or 0
+
+        return summary
+
+    def run_complete(self, run_id: str) -> bool:
+        """True once every shard of the run is done"""
+        summary = self.run_summary(run_id)
+        return summary['shards_total'] > 0 and summary['shards_done'] == summary['shards_total']
+
+    def claim_run_report(self, run_id: str, worker_id: str) -> bool:
+        """
+        Elect exactly one worker to send the end-of-run report.
+
+        Inserts a sentinel row (shard_id -1); only the first insert wins.
+        """
+        if not self.run_complete(run_id):
+            return False
+
+        inserted = self._execute(
+            """
+            INSERT INTO aisri_shard_leases (run_id, shard_id, num_shards, status, owner, completed_at)
+            VALUES (?, -1, 0, 'reported', ?, ?)
+            ON CONFLICT (run_id, shard_id) DO NOTHING
+            """,
+            (run_id, worker_id, time.time())
+        )
+        return inserted == 1
+
+
+class LeaseHeartbeat:
+    """
+    Keeps a shard lease alive from a background thread.
+
+    Shard processing is blocking (sync Supabase calls, batch scoring), so a
+    heartbeat scheduled on the worker's event loop would not run until the
+    shard is finished. The thread renews the lease every lease_seconds / 4
+    and zeroes lease.expires_at if it is lost, which stops the worker at
+    its next lease check.
+
+    Usage:
+        with LeaseHeartbeat(coordinator, lease):
+            ...process the shard...
+    """
+
+    def __init__(
+        self,
+        coordinator: ShardLeaseCoordinator,
+        lease: ShardLease,
+        interval: Optional[float] = None
+    ):
+        self.coordinator = coordinator
+        self.lease = lease
+        self.interval = interval or max(coordinator.lease_seconds / 4, 1)
+        self.beats = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"lease-heartbeat-{lease.run_id}-{lease.shard_id}",
+            daemon=True
+        )
+
+    def __enter__(self) -> 'LeaseHeartbeat':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop heartbeating and wait for the thread to exit"""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    self.coordinator.heartbeat(self.lease)
+                    self.beats += 1
+                except LeaseLostError as e:
+                    logger.warning(f"⚠️  {e}")
+                    self.lease.expires_at = 0
+                    return
+                except Exception as e:
+                    logger.error(f"Heartbeat failed for shard {self.lease.shard_id}: {e}")
+        finally:
+            self.coordinator.close_connection()
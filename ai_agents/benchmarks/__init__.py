@@ -0,0 +1,10 @@
+"""
+AISRI Benchmarks
+Offline performance benchmarks for the AISRI calculators, safety gate,
+workout generator and race analyzer, driven by synthetic athletes.
+
+Usage (from ai_agents/):
+    python -m benchmarks                         # 1, 100, 10k, 100k athletes
+    python -m benchmarks --sizes 1,100 --repeat 3
+    python -m benchmarks --update-baseline       # accept current timings
+"""
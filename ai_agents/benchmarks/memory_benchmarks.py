@@ -0,0 +1,127 @@
+"""
+Memory Benchmarks
+Bytes per record of the workout and performance records, measured with
+tracemalloc on synthetic athletes.
+
+Each slotted record type is compared with an equivalent __dict__-based
+dataclass (the layout before slots). Targets and results are also
+measured as struct-of-arrays containers. Only the records themselves
+are measured: the field values already exist and are shared by every
+layout. The exception is PerformanceAssessment, where the dict layout
+also builds its own ExpectedPerformance per record, as assessments did
+before DEFAULT_EXPECTED was shared.
+
+Usage (from ai_agents/):
+    python -m benchmarks.memory_benchmarks --athletes 2000
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from typing import Callable, Dict, List
+
+from adaptive_workout_generator import AdaptiveWorkoutGenerator, TrainingPhase
+from performance_tracker import (
+    DEFAULT_EXPECTED, PerformanceTracker, WorkoutResultArrays, WorkoutTargetArrays
+)
+
+from benchmarks.synthetic import SyntheticConfig, iter_athletes, to_workout_pairs
+
+
+def measure(build: Callable) -> int:
+    """Bytes still allocated by what build() returns (after one warm-up build)"""
+    build()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del objects
+    return used
+
+
+def dict_layout(cls):
+    """Same fields as cls, as a plain (__dict__-based) dataclass"""
+    return make_dataclass(f'{cls.__name__}Dict', [f.name for f in fields(cls)])
+
+
+def copier(cls, records: List) -> Callable:
+    """build() that copies records into instances of cls (same field names)"""
+    names = [f.name for f in fields(cls)]
+    return lambda: [cls(**{name: getattr(r, name) for name in names}) for r in records]
+
+
+def run(athlete_count: int, config: SyntheticConfig) -> Dict[str, Dict[str, float]]:
+    athletes = next(iter_athletes(athlete_count, config, chunk_size=athlete_count))
+    targets, results = to_workout_pairs(athletes)
+    tracker = PerformanceTracker()
+    assessments = [tracker.assess_workout_performance(t, r) for t, r in zip(targets, results)]
+    generator = AdaptiveWorkoutGenerator()
+    workouts = [
+        generator.generate_next_workout(a.ability, a.history, TrainingPhase.BASE_BUILD, 1, i % 7 + 1)
+        for i, a in enumerate(athletes)
+    ]
+
+    expected_twin = dict_layout(type(DEFAULT_EXPECTED))
+    expected_values = {f.name: getattr(DEFAULT_EXPECTED, f.name) for f in fields(expected_twin)}
+    assessment_twin = dict_layout(type(assessments[0]))
+    assessment_names = [f.name for f in fields(assessment_twin)]
+
+    def assessments_dict_layout():
+        return [
+            assessment_twin(**{
+                **{name: getattr(a, name) for name in assessment_names},
+                'expected': expected_twin(**expected_values)
+            })
+            for a in assessments
+        ]
+
+    rows = {
+        'AthleteAbility': ([a.ability for a in athletes], None),
+        'PerformanceHistory': ([a.history for a in athletes], None),
+        'GeneratedWorkout': (workouts, None),
+        'WorkoutTarget': (targets, lambda: WorkoutTargetArrays.from_records(targets)),
+        'WorkoutResult': (results, lambda: WorkoutResultArrays.from_records(results)),
+        'PerformanceComparison': ([a.comparison for a in assessments], None),
+        'PerformanceAssessment': (assessments, None)
+    }
+
+    report = {}
+    print(f"{'record':<24} {'count':>8} {'dict B/rec':>11} {'slots B/rec':>12} {'arrays B/rec':>13} {'saved':>7}")
+    for name, (records, arrays) in rows.items():
+        count = len(records)
+        cls = type(records[0])
+        dict_build = assessments_dict_layout if name == 'PerformanceAssessment' else copier(dict_layout(cls), records)
+        dict_bytes = measure(dict_build) / count
+        slot_bytes = measure(copier(cls, records)) / count
+        array_bytes = measure(arrays) / count if arrays else None
+        best = min(slot_bytes, array_bytes or slot_bytes)
+        report[name] = {
+            'count': count,
+            'dict_bytes_per_record': round(dict_bytes, 1),
+            'slots_bytes_per_record': round(slot_bytes, 1),
+            'arrays_bytes_per_record': None if array_bytes is None else round(array_bytes, 1),
+            'reduction': round(1 - best / dict_bytes, 3)
+        }
+        arrays_column = f"{array_bytes:>13.1f}" if array_bytes is not None else f"{'-':>13}"
+        print(f"{name:<24} {count:>8} {dict_bytes:>11.1f} {slot_bytes:>12.1f} {arrays_column} "
+              f"{report[name]['reduction']:>7.0%}")
+    return report
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record memory benchmarks (offline)")
+    parser.add_argument('--athletes', type=int, default=5000, help='Synthetic athletes to build records from')
+    parser.add_argument('--seed', type=int, default=SyntheticConfig.seed)
+    args = parser.parse_args(argv)
+
+    print(f"🧠 Record memory: {args.athletes} synthetic athletes")
+    run(args.athletes, SyntheticConfig(seed=args.seed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Offline Database
+In-memory stand-in for DatabaseIntegration used by the benchmarks.
+
+Implements the subset of the supabase-py query builder the benchmarked
+code calls (select/eq/in_/gt/gte/lte/lt/order/limit/range/execute, plus rpc
+for the functions registered by OfflineDatabase). Equality
+filters use per-column hash indexes so lookups stay O(1) per athlete
+even with 100k synthetic athletes loaded.
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+from workload_engine import WorkloadEngine
+
+
+class _Table:
+    """Rows of one table plus lazily built equality indexes"""
+
+    def __init__(self):
+        self.rows: List[Dict] = []
+        self._indexes: Dict[str, Dict] = {}
+
+    def insert(self, rows: List[Dict]):
+        self.rows.extend(rows)
+        for column, index in self._indexes.items():
+            for row in rows:
+                index[row.get(column)].append(row)
+
+    def lookup(self, column: str, value) -> List[Dict]:
+        index = self._indexes.get(column)
+        if index is None:
+            index = defaultdict(list)
+            for row in self.rows:
+                index[row.get(column)].append(row)
+            self._indexes[column] = index
+        return index.get(value, [])
+
+
+class _Query:
+    """Chainable query mirroring supabase-py's builder"""
+
+    def __init__(self, table: _Table):
+        self._table = table
+        self._eq = None
+        self._filters = []
+        self._order = None
+        self._limit = None
+        self._range = None
+
+    def select(self, *columns, **kwargs):
+        return self
+
+    def insert(self, rows):
+        rows = rows if isinstance(rows, list) else [rows]
+        self._table.insert(rows)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=rows))
+
+    def eq(self, column, value):
+        if self._eq is None:
+            self._eq = (column, value)
+        else:
+            self._filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def lt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end)
+        return self
+
+    def execute(self):
+        rows = self._table.lookup(*self._eq) if self._eq else self._table.rows
+        rows = [row for row in rows if all(f(row) for f in self._filters)]
+        if self._order:
+            column, desc = self._order
+            rows = sorted(rows, key=lambda row: row.get(column) or '', reverse=desc)
+        if self._range:
+            rows = rows[self._range[0]:self._range[1] + 1]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        return SimpleNamespace(data=rows)
+
+
+class OfflineSupabase:
+    """Minimal in-memory supabase client"""
+
+    def __init__(self):
+        self._tables: Dict[str, _Table] = defaultdict(_Table)
+
+        self._functions: Dict[str, Callable[[Dict], List[Dict]]] = {}
+
+    def insert(self, table: str, rows: List[Dict]):
+        self._tables[table].insert(rows)
+
+    def table(self, name: str) -> _Query:
+        return _Query(self._tables[name])
+
+    def register_rpc(self, name: str, function: Callable[[Dict], List[Dict]]):
+        self._functions[name] = function
+
+    def rpc(self, name: str, params: Dict):
+        rows = self._functions[name](params)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=rows))
+
+
+class OfflineDatabase:
+    """DatabaseIntegration look-alike backed by OfflineSupabase"""
+
+    def __init__(self):
+        self.supabase = OfflineSupabase()
+        self.supabase.register_rpc('get_safety_gate_inputs', self._safety_gate_inputs)
+        self.supabase.register_rpc('get_nightly_workout_inputs', self._nightly_workout_inputs)
+        self.supabase.register_rpc('get_workout_completion_inputs', self._workout_completion_inputs)
+        self.supabase.register_rpc('complete_workout', self._complete_workout)
+
+    def load_athletes(self, athletes):
+        """Load synthetic athletes into the tables the safety gate and the nightly pipeline read"""
+        self.supabase.insert('athlete_profiles', [a.profile for a in athletes])
+        self.supabase.insert('athlete_detailed_profile', [self._detailed_profile_row(a) for a in athletes])
+        self.supabase.insert('aisri_scores', [a.aisri_row for a in athletes])
+        self.supabase.insert('injury_risk_predictions', [a.injury_row for a in athletes])
+        daily_rows = {a.user_id: self._daily_load_rows(a) for a in athletes}
+        self.supabase.insert('athlete_daily_load', [
+            row for rows in daily_rows.values() for row in rows
+        ])
+        self.supabase.insert('athlete_workload_state', [
+            self._workload_state_row(athlete_id, rows)
+            for athlete_id, rows in daily_rows.items() if rows
+        ])
+
+    @staticmethod
+    def _detailed_profile_row(athlete) -> Dict:
+        """athlete_detailed_profile row carrying the athlete's ability fields"""
+        ability = athlete.ability
+        return {
+            'athlete_id': athlete.user_id,
+            'signup_date': athlete.profile['created_at'],
+            'current_avg_pace_easy': ability.current_pace_easy,
+            'current_avg_pace_tempo': ability.current_pace_tempo,
+            'current_avg_pace_interval': ability.current_pace_interval,
+            'current_max_hr': ability.max_hr,
+            'current_weekly_volume_km': ability.weekly_volume_km,
+            'before_signup_longest_run_km': ability.longest_run_km
+        }
+
+    @staticmethod
+    def _daily_load_rows(athlete) -> List[Dict]:
+        """Ledger rows as the athlete_daily_load triggers would maintain them"""
+        days: Dict[str, Dict] = {}
+        for activity in athlete.activities:
+            day = datetime.fromtimestamp(activity['start_ts'], timezone.utc).date().isoformat()
+            row = days.setdefault(day, {
+                'athlete_id': athlete.user_id, 'day': day, 'minutes': 0, 'distance_m': 0,
+                'load': 0, 'sessions': 0, 'hard_sessions': 0, 'max_hr': None
+            })
+            minutes = activity['moving_time'] / 60
+            hard = activity.get('average_heartrate', 0) > 160
+            row['minutes'] += round(minutes)
+            row['distance_m'] += round(activity['distance'])
+            row['load'] += round(minutes * (2 if hard else 1))
+            row['sessions'] += 1
+            row['hard_sessions'] += int(hard)
+            if activity.get('average_heartrate'):
+                row['max_hr'] = max(row['max_hr'] or 0, activity['average_heartrate'])
+        return list(days.values())
+
+    @staticmethod
+    def _workload_state_row(athlete_id: str, daily_rows: List[Dict]) -> Dict:
+        """EWMA state as the athlete_daily_load trigger would maintain it"""
+        days = sorted(daily_rows, key=lambda row: row['day'])
+        first = date.fromisoformat(days[0]['day'])
+        last = date.fromisoformat(days[-1]['day'])
+        row = {'athlete_id': athlete_id, 'as_of': last.isoformat()}
+        for metric in ('load', 'minutes'):
+            series = [0.0] * ((last - first).days + 1)
+            for day in days:
+                series[(date.fromisoformat(day['day']) - first).days] = day[metric]
+            state = WorkloadEngine.state_from_series(series, as_of=last)
+            row[f'{metric}_acute'] = state.acute
+            row[f'{metric}_chronic'] = state.chronic
+        return row
+
+    def _latest(self, table: str, athlete_id: str) -> Optional[Dict]:
+        rows = self.supabase.table(table).select('*').eq('athlete_id', athlete_id)\
+            .order('created_at', desc=True).limit(1).execute().data
+        return rows[0] if rows else None
+
+    def _safety_gate_inputs(self, params: Dict) -> List[Dict]:
+        """Python mirror of the get_safety_gate_inputs RPC"""
+        today = datetime.now(timezone.utc).date()
+        window = [today - timedelta(days=n) for n in range(params['p_days'] - 1, -1, -1)]
+        rows = []
+        for athlete_id in params['p_athlete_ids']:
+            by_day = {
+                row['day']: row
+                for row in self.supabase.table('athlete_daily_load').select('*')
+                .eq('athlete_id', athlete_id).execute().data
+            }
+            recent = [by_day.get(day.isoformat(), {}) for day in window]
+            state = self.supabase.table('athlete_workload_state').select('*')\
+                .eq('athlete_id', athlete_id).execute().data
+            state = state[0] if state else {}
+            rows.append({
+                'athlete_id': athlete_id,
+                'has_profile': self.get_athlete_profile(athlete_id) is not None,
+                'latest_aisri': self._latest('aisri_scores', athlete_id),
+                'latest_injury_prediction': self._latest('injury_risk_predictions', athlete_id),
+                'recent_sessions': [row.get('sessions', 0) for row in recent],
+                'recent_hard_sessions': [row.get('hard_sessions', 0) for row in recent],
+                'workload_as_of': state.get('as_of'),
+                'minutes_acute': state.get('minutes_acute'),
+                'minutes_chronic': state.get('minutes_chronic')
+            })
+        return rows
+
+    def _nightly_workout_inputs(self, params: Dict) -> List[Dict]:
+        """Python mirror of the get_nightly_workout_inputs RPC (every profiled athlete is active)"""
+        profiles = self.supabase._tables['athlete_detailed_profile'].rows
+        ids = set(params['p_athlete_ids']) if params.get('p_athlete_ids') is not None else None
+        members = sorted(
+            (p for p in profiles
+             if (ids is None or p['athlete_id'] in ids)
+             and (params.get('p_after') is None or p['athlete_id'] > params['p_after'])),
+            key=lambda p: p['athlete_id']
+        )[:params.get('p_limit', 1000)]
+
+        cutoff = (datetime.now() - timedelta(days=7)).isoformat()
+        rows = []
+        for profile in members:
+            athlete_id = profile['athlete_id']
+            state = self.supabase.table('athlete_workload_state').select('*')\
+                .eq('athlete_id', athlete_id).execute().data
+            state = state[0] if state else {}
+            results = self.supabase.table('workout_results').select('*').eq('athlete_id', athlete_id)\
+                .gte('workout_date', cutoff).order('workout_date', desc=True).execute().data
+            assignments = self.supabase.table('workout_assignments').select('*')\
+                .eq('athlete_id', athlete_id).execute().data
+            rows.append({
+                'athlete_id': athlete_id,
+                'profile': profile,
+                'recent_results': results,
+                'workload_as_of': state.get('as_of'),
+                'load_acute': state.get('load_acute'),
+                'load_chronic': state.get('load_chronic'),
+                'has_assignment': any(a['scheduled_date'][:10] == params['p_day'] for a in assignments)
+            })
+        return rows
+
+    def _workout_completion_inputs(self, params: Dict) -> List[Dict]:
+        """Python mirror of the get_workout_completion_inputs RPC"""
+        tables = self.supabase._tables
+        athlete_id = params['p_athlete_id']
+        assignment = tables['workout_assignments'].lookup('id', params['p_assignment_id'])
+        profile = tables['athlete_detailed_profile'].lookup('athlete_id', athlete_id)
+        state = tables['athlete_workload_state'].lookup('athlete_id', athlete_id)
+        state = state[0] if state else {}
+        cutoff = (datetime.now() - timedelta(days=params.get('p_recent_days', 7))).isoformat()
+        results = tables['workout_results'].lookup('athlete_id', athlete_id)
+        completed = sorted(
+            tables['workout_results'].lookup('assignment_id', params['p_assignment_id']),
+            key=lambda row: row['workout_date']
+        )
+        return [{
+            'assignment': assignment[0] if assignment else None,
+            'profile': profile[0] if profile else None,
+            'recent_results': sorted(
+                (row for row in results if row['workout_date'] >= cutoff),
+                key=lambda row: row['workout_date'], reverse=True
+            ),
+            'workload_as_of': state.get('as_of'),
+            'load_acute': state.get('load_acute'),
+            'load_chronic': state.get('load_chronic'),
+            'completed_result': completed[0] if completed else None
+        }]
+
+    def _complete_workout(self, params: Dict) -> List[Dict]:
+        """Python mirror of the complete_workout RPC (all rows or none)"""
+        tables = self.supabase._tables
+        assignment = tables['workout_assignments'].lookup('id', params['p_assignment_id'])
+        if not assignment:
+            raise ValueError(f"Workout assignment {params['p_assignment_id']} not found")
+        existing = sorted(
+            tables['workout_results'].lookup('assignment_id', params['p_assignment_id']),
+            key=lambda row: row['workout_date']
+        )
+        if existing:
+            return [{'result_id': existing[0]['id'], 'next_assignment_id': None, 'duplicate': True,
+                     'stored_result': dict(existing[0])}]
+
+        now = datetime.now().isoformat()
+        assignment[0].update({'workout_status': 'completed', 'completed_date': now, 'updated_at': now})
+        tables['workout_results'].insert([params['p_result']])
+        tables['ability_progression'].insert([params['p_progression']])
+        next_assignment = params.get('p_next_assignment')
+        if next_assignment:
+            tables['workout_assignments'].insert([next_assignment])
+        return [{
+            'result_id': params['p_result']['id'],
+            'next_assignment_id': next_assignment['id'] if next_assignment else None,
+            'duplicate': False,
+            'stored_result': None
+        }]
+
+    def get_athlete_profile(self, athlete_id: str) -> Optional[Dict]:
+        rows = self.supabase.table('athlete_profiles').select('*').eq('id', athlete_id).execute().data
+        return rows[0] if rows else None
@@ -0,0 +1,532 @@
+"""
+Benchmark Runner
+Times the AISRI hot paths on synthetic athletes and compares against a
+JSON baseline.
+
+Benchmarks:
+- aisri_pillars_scalar   AISRIAutoCalculator pillar methods, one athlete at a time
+- aisri_pillars_batch    AISRIAutoCalculator.calculate_batch over an ActivityFrame
+- safety_gate            AISRISafetyGate.check_workout_safety (in-memory database)
+- safety_gate_batch      AISRISafetyGate.check_workouts_safety, one call per chunk
+- safety_replay          SafetyReplay: build arrays and replay 365 days x every intensity
+- workout_generator      AdaptiveWorkoutGenerator.generate_next_workout
+- workout_block          AdaptiveWorkoutGenerator.generate_block, 14 days per athlete
+- block_optimizer        BlockOptimizer.optimize_batch, 28 days per athlete
+- load_risk              LoadRiskSimulator.simulate, 28-day plan x 2000 trajectories per athlete
+- nightly_workouts       NightlyWorkoutPipeline.run in-process: load, filter, generate, store
+- workout_completion     DatabaseIntegration.process_workout_completion, one completed run per athlete
+- derived_data_sync      AthleteDerivedData.sync after one new activity per athlete
+- race_analyzer          RaceAnalyzer.analyze_race
+- performance_scalar     PerformanceTracker.assess_workout_performance, one workout at a time
+- performance_batch      PerformanceTracker.assess_batch over WorkoutTarget/ResultArrays
+
+Only the measured call is timed; generating athletes and loading the
+in-memory database are excluded. Each chunk is timed repeatedly; the
+median is kept along with the interquartile spread of the runs, and a
+slowdown only counts as a regression when it beats both the relative
+tolerance and that run-to-run noise. Everything runs offline.
+
+Usage (from ai_agents/):
+    python -m benchmarks.run_benchmarks --sizes 1,100,10000,100000
+    python -m benchmarks.run_benchmarks --only safety_gate --sizes 100
+    python -m benchmarks.run_benchmarks --update-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, replace
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+# Modules below build a module-level DatabaseIntegration on import; nothing
+# connects until a query runs, so placeholder credentials keep this offline.
+os.environ.setdefault('SUPABASE_URL', 'http://localhost:54321')
+os.environ.setdefault('SUPABASE_KEY', 'offline-benchmark-key')
+os.environ.setdefault('SUPABASE_SERVICE_KEY', 'offline-benchmark-key')
+
+import numpy as np
+
+from adaptive_workout_generator import AdaptiveWorkoutGenerator, TrainingPhase
+from aisri_auto_calculator import AISRIAutoCalculator
+from aisri_safety_gate import AISRISafetyGate
+from block_optimizer import BlockOptimizer, OptimizerInputs, session_options
+from database_integration import DatabaseIntegration
+from load_risk_simulator import LoadRiskSimulator
+from nightly_workout_pipeline import NightlyWorkoutPipeline
+from performance_tracker import PerformanceTracker, WorkoutResultArrays, WorkoutTargetArrays
+from race_analyzer import RaceAnalyzer
+from recompute_graph import LEDGER_DAYS, AthleteDerivedData
+from safety_replay import SafetyReplay
+from structural_index import StructuralIndex, StructuralIndexEntry
+from training_load_ledger import TrainingLoadLedger
+from workload_engine import WorkloadEngine
+
+from benchmarks.synthetic import (
+    SyntheticConfig, SyntheticAthlete, iter_athletes, to_activity_frame, to_workout_pairs
+)
+from benchmarks.offline_db import OfflineDatabase
+
+
+DEFAULT_SIZES = [1, 100, 10_000, 100_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25        # Fail when the median is >25% slower than baseline
+MIN_SAMPLE_SECONDS = 0.2        # Short chunks are re-timed until this much was measured...
+MAX_REPEAT = 50                 # ...up to this many runs
+NOISE_FACTOR = 2.0              # A regression must also exceed this many run-to-run spreads
+CHUNK_SIZE = 1000
+
+PHASES = list(TrainingPhase)
+INTENSITIES = ['easy', 'moderate', 'tempo', 'hard', 'interval']
+
+
+# =============================================================================
+# BENCHMARKS
+# =============================================================================
+# Each benchmark prepares untimed state for a chunk of athletes and returns
+# the zero-argument callable that gets timed.
+
+def bench_aisri_pillars_scalar(athletes: List[SyntheticAthlete]) -> Callable:
+    calculator = AISRIAutoCalculator
+
+    def run():
+        for athlete in athletes:
+            activities = athlete.activities
+            calculator._calculate_adaptability(athlete.profile, activities)
+            calculator._calculate_consistency(activities)
+            calculator._calculate_intensity(activities)
+            calculator._calculate_recovery(activities)
+            calculator._estimate_fatigue(activities)
+            calculator._calculate_confidence(athlete.profile, activities)
+    return run
+
+
+def bench_aisri_pillars_batch(athletes: List[SyntheticAthlete]) -> Callable:
+    frame = to_activity_frame(athletes)
+    tenure_start = {
+        a.user_id: datetime.fromisoformat(a.profile['created_at']).replace(tzinfo=timezone.utc)
+        for a in athletes
+    }
+    return lambda: AISRIAutoCalculator.calculate_batch(frame, tenure_start)
+
+
+def bench_safety_gate(athletes: List[SyntheticAthlete]) -> Callable:
+    database = OfflineDatabase()
+    database.load_athletes(athletes)
+    gate = AISRISafetyGate(database)
+
+    async def check_all():
+        for i, athlete in enumerate(athletes):
+            await gate.check_workout_safety(
+                athlete.user_id,
+                workout_type='run',
+                intensity=INTENSITIES[i % len(INTENSITIES)],
+                duration_minutes=45
+            )
+    return lambda: asyncio.run(check_all())
+
+
+def bench_safety_gate_batch(athletes: List[SyntheticAthlete]) -> Callable:
+    database = OfflineDatabase()
+    database.load_athletes(athletes)
+    gate = AISRISafetyGate(database)
+    workouts = [
+        {
+            'athlete_id': athlete.user_id,
+            'workout_type': 'run',
+            'intensity': INTENSITIES[i % len(INTENSITIES)],
+            'duration_minutes': 45
+        }
+        for i, athlete in enumerate(athletes)
+    ]
+    return lambda: asyncio.run(gate.check_workouts_safety(workouts))
+
+
+def bench_safety_replay(athletes: List[SyntheticAthlete]) -> Callable:
+    database = OfflineDatabase()
+    database.load_athletes(athletes)
+    tables = database.supabase._tables
+    replay = SafetyReplay()
+    end = datetime.now(timezone.utc).date()
+    start = end - timedelta(days=364)
+    ids = [athlete.user_id for athlete in athletes]
+
+    def run():
+        inputs = replay.build_inputs(
+            ids, start, end,
+            tables['aisri_scores'].rows,
+            tables['injury_risk_predictions'].rows,
+            tables['athlete_daily_load'].rows,
+            [row['id'] for row in tables['athlete_profiles'].rows]
+        )
+        replay.evaluate_many(inputs, INTENSITIES, duration_minutes=45)
+    return run
+
+
+def bench_workout_generator(athletes: List[SyntheticAthlete]) -> Callable:
+    generator = AdaptiveWorkoutGenerator()
+
+    def run():
+        for i, athlete in enumerate(athletes):
+            generator.generate_next_workout(
+                athlete_ability=athlete.ability,
+                performance_history=athlete.history,
+                training_phase=PHASES[i % len(PHASES)],
+                week_number=i % 40 + 1,
+                day_of_week=i % 7 + 1
+            )
+    return run
+
+
+def bench_workout_block(athletes: List[SyntheticAthlete]) -> Callable:
+    generator = AdaptiveWorkoutGenerator()
+    start = datetime.now() + timedelta(days=1)
+
+    def run():
+        for i, athlete in enumerate(athletes):
+            generator.generate_block(
+                athlete_ability=athlete.ability,
+                performance_history=athlete.history,
+                training_phase=PHASES[i % len(PHASES)],
+                start_date=start,
+                days=14,
+                week_number=i % 40 + 1
+            )
+    return run
+
+
+def bench_block_optimizer(athletes: List[SyntheticAthlete]) -> Callable:
+    database = OfflineDatabase()
+    database.load_athletes(athletes)
+    gate = AISRISafetyGate(database)
+    optimizer = BlockOptimizer()
+    gate_inputs = gate.fetch_gate_inputs([athlete.user_id for athlete in athletes])
+    inputs = [
+        OptimizerInputs.from_gate_inputs(gate_inputs[athlete.user_id], sessions=session_options(athlete.ability))
+        for athlete in athletes
+    ]
+    return lambda: optimizer.optimize_batch(inputs, days=28)
+
+
+def bench_load_risk(athletes: List[SyntheticAthlete]) -> Callable:
+    simulator = LoadRiskSimulator(n_simulations=2000, seed=0)
+    plans = []
+    for athlete in athletes:
+        state = WorkloadEngine.state_from_weekly_volumes(
+            [v * athlete.ability.current_pace_easy / 60 for v in athlete.history.last_4_weeks_volume]
+        )
+        easy = athlete.ability.weekly_volume_km / 5 * athlete.ability.current_pace_easy / 60
+        plans.append((state, [easy, 0, easy, easy * 1.2, 0, easy, easy * 1.8] * 4))
+
+    def run():
+        for state, minutes in plans:
+            simulator.simulate(state, minutes)
+    return run
+
+
+def bench_nightly_workouts(athletes: List[SyntheticAthlete]) -> Callable:
+    database = OfflineDatabase()
+    database.load_athletes(athletes)
+    index = StructuralIndex(database.supabase)
+    index.store(StructuralIndexEntry.from_assessment(a.user_id, a.aisri_row) for a in athletes)
+    pipeline = NightlyWorkoutPipeline(database, AISRISafetyGate(database, structural_index=index), workers=0)
+
+    def run():
+        database.supabase._tables.pop('workout_assignments', None)  # Every run generates everyone
+        report = pipeline.run()
+        assert report.assigned + report.rest_days == len(athletes), report.to_dict()
+    return run
+
+
+def bench_workout_completion(athletes: List[SyntheticAthlete]) -> Callable:
+    database = OfflineDatabase()
+    database.load_athletes(athletes)
+    db = DatabaseIntegration.__new__(DatabaseIntegration)
+    db.supabase = database.supabase
+    db.performance_tracker = PerformanceTracker()
+    db.workout_generator = AdaptiveWorkoutGenerator()
+
+    assignments, completions = [], []
+    for athlete in athletes:
+        workout = db.workout_generator.generate_next_workout(
+            athlete.ability, athlete.history, TrainingPhase.BASE_BUILD, 1, 2
+        )
+        assignment_id = f"{athlete.user_id}-assignment"
+        assignments.append({'id': assignment_id, **db._workout_assignment_row(athlete.user_id, workout)})
+        activity = athlete.activities[0] if athlete.activities else {'distance': 5000, 'moving_time': 1800}
+        completions.append((assignment_id, athlete.user_id, {
+            'external_id': f"{athlete.user_id}-activity",
+            'completed_date': datetime.now().isoformat(),
+            'distance_km': activity['distance'] / 1000,
+            'duration_seconds': int(activity['moving_time']),
+            'avg_pace_seconds': int(activity['moving_time'] / activity['distance'] * 1000),
+            'avg_hr': activity.get('average_heartrate')
+        }))
+
+    def run():
+        # Every run completes fresh assignments
+        for table in ('workout_assignments', 'workout_results', 'ability_progression'):
+            database.supabase._tables.pop(table, None)
+        database.supabase.insert('workout_assignments', [dict(row) for row in assignments])
+        for assignment_id, athlete_id, workout_data in completions:
+            assert not db.process_workout_completion(assignment_id, athlete_id, workout_data)['duplicate']
+    return run
+
+
+def bench_derived_data_sync(athletes: List[SyntheticAthlete]) -> Callable:
+    derived = AthleteDerivedData()
+    today = datetime.now(timezone.utc).date()
+
+    # Activity frame and ledger of every athlete with and without the newest activity
+    inputs = []
+    for variant in (athletes, [replace(a, activities=a.activities[1:]) for a in athletes]):
+        database = OfflineDatabase()
+        database.load_athletes(variant)
+        ledger = TrainingLoadLedger(database.supabase)
+        frame = to_activity_frame(variant)
+        inputs.append({
+            a.user_id: {'activities': frame.slice(a.user_id),
+                        'ledger': ledger.get_days(a.user_id, days=LEDGER_DAYS, end=today)}
+            for a in variant
+        })
+    full, trimmed = inputs
+
+    for athlete in athletes:
+        profile = {**OfflineDatabase._detailed_profile_row(athlete), 'created_at': athlete.profile['created_at']}
+        derived.sync(athlete.user_id, **trimmed[athlete.user_id], profile=profile, assessment=athlete.aisri_row,
+                     assessment_score=None, aisri_history=[], recent_results=[], today=today)
+    newest = [True]
+
+    def run():
+        # Alternate adding and removing the newest activity so every run is incremental
+        newest[0] = not newest[0]
+        for athlete in athletes:
+            derived.sync(athlete.user_id, **(full if newest[0] else trimmed)[athlete.user_id])
+    return run
+
+
+def bench_race_analyzer(athletes: List[SyntheticAthlete]) -> Callable:
+    analyzer = RaceAnalyzer()
+
+    def run():
+        for athlete in athletes:
+            analyzer.analyze_race(
+                athlete.race,
+                training_history=athlete.training_history,
+                athlete_age=athlete.age
+            )
+    return run
+
+
+def bench_performance_scalar(athletes: List[SyntheticAthlete]) -> Callable:
+    targets, results = to_workout_pairs(athletes)
+    tracker = PerformanceTracker()
+
+    def run():
+        for target, result in zip(targets, results):
+            tracker.assess_workout_performance(target, result)
+    return run
+
+
+def bench_performance_batch(athletes: List[SyntheticAthlete]) -> Callable:
+    targets, results = to_workout_pairs(athletes)
+    target_arrays = WorkoutTargetArrays.from_records(targets)
+    result_arrays = WorkoutResultArrays.from_records(results)
+    tracker = PerformanceTracker()
+    return lambda: tracker.assess_batch(target_arrays, result_arrays)
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    'aisri_pillars_scalar': bench_aisri_pillars_scalar,
+    'aisri_pillars_batch': bench_aisri_pillars_batch,
+    'safety_gate': bench_safety_gate,
+    'safety_gate_batch': bench_safety_gate_batch,
+    'safety_replay': bench_safety_replay,
+    'workout_generator': bench_workout_generator,
+    'workout_block': bench_workout_block,
+    'block_optimizer': bench_block_optimizer,
+    'load_risk': bench_load_risk,
+    'nightly_workouts': bench_nightly_workouts,
+    'workout_completion': bench_workout_completion,
+    'derived_data_sync': bench_derived_data_sync,
+    'race_analyzer': bench_race_analyzer,
+    'performance_scalar': bench_performance_scalar,
+    'performance_batch': bench_performance_batch
+}
+
+
+# =============================================================================
+# RUNNER
+# =============================================================================
+
+def run_suite(
+    sizes: List[int],
+    names: List[str],
+    config: SyntheticConfig,
+    repeat: int = 3
+) -> Dict[str, Dict[str, Dict]]:
+    """
+    Time every benchmark at every size.
+
+    Each chunk is timed at least `repeat` times, and short chunks until
+    MIN_SAMPLE_SECONDS of runs were measured; the median run is kept and
+    chunk medians are summed per size, as are the interquartile ranges of
+    the runs ('spread_seconds').
+    """
+    results = {name: {} for name in names}
+    now = datetime.now(timezone.utc)
+
+    for size in sizes:
+        totals = {name: 0.0 for name in names}
+        spreads = {name: 0.0 for name in names}
+        for chunk in iter_athletes(size, config, chunk_size=CHUNK_SIZE, now=now):
+            for name in names:
+                run = BENCHMARKS[name](chunk)
+                samples = []
+                while len(samples) < repeat or (
+                        sum(samples) < MIN_SAMPLE_SECONDS and len(samples) < MAX_REPEAT):
+                    started = time.perf_counter()
+                    run()
+                    samples.append(time.perf_counter() - started)
+                totals[name] += statistics.median(samples)
+                if len(samples) > 1:
+                    quartiles = statistics.quantiles(samples, n=4)
+                    spreads[name] += quartiles[2] - quartiles[0]
+
+        for name in names:
+            results[name][str(size)] = {
+                'seconds': round(totals[name], 6),
+                'spread_seconds': round(spreads[name], 6),
+                'per_athlete_us': round(totals[name] / size * 1e6, 3)
+            }
+            print(f"  {name:<22} {size:>7} athletes  {totals[name]:>10.4f}s  "
+                  f"{totals[name] / size * 1e6:>10.1f} µs/athlete")
+
+    return results
+
+
+def environment_info() -> Dict:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'recorded_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+
+def compare_to_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Regressions against the baseline.
+
+    A case regresses when its median is more than `tolerance` slower than
+    the baseline and the slowdown is larger than NOISE_FACTOR times the
+    wider of the two run-to-run spreads. Baselines recorded without a
+    spread are compared on the tolerance alone.
+
+    Returns:
+        Human-readable regression lines (empty when nothing regressed)
+    """
+    regressions = []
+    print(f"\n{'benchmark':<22} {'size':>7} {'baseline':>10} {'current':>10} {'noise':>8} {'change':>8}")
+
+    for name, by_size in results.items():
+        for size, current in by_size.items():
+            previous = baseline.get('results', {}).get(name, {}).get(size)
+            if not previous:
+                continue
+
+            delta = current['seconds'] - previous['seconds']
+            change = delta / max(previous['seconds'], 1e-9)
+            noise = NOISE_FACTOR * max(previous.get('spread_seconds', 0.0), current.get('spread_seconds', 0.0))
+            flag = ''
+            if change > tolerance and delta > noise:
+                flag = '  REGRESSION'
+                regressions.append(f"{name} @ {size}: {previous['seconds']:.4f}s -> "
+                                   f"{current['seconds']:.4f}s ({change:+.0%})")
+
+            print(f"{name:<22} {size:>7} {previous['seconds']:>10.4f} "
+                  f"{current['seconds']:>10.4f} {noise:>8.4f} {change:>+8.0%}{flag}")
+
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="AISRI performance benchmarks (offline)")
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Comma-separated athlete counts')
+    parser.add_argument('--only', default=None,
+                        help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Minimum timed runs per chunk (median is kept)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help='Baseline JSON file to compare against')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write this run as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown before a regression is reported (0.25 = 25%%)')
+    parser.add_argument('--no-fail', action='store_true',
+                        help='Report regressions without a failing exit code')
+    parser.add_argument('--history-weeks', type=int, default=SyntheticConfig.history_weeks)
+    parser.add_argument('--runs-per-week', type=float, default=SyntheticConfig.runs_per_week)
+    parser.add_argument('--hr-availability', type=float, default=SyntheticConfig.hr_availability)
+    parser.add_argument('--easy-pace-mean', type=float, default=SyntheticConfig.easy_pace_mean)
+    parser.add_argument('--easy-pace-sd', type=float, default=SyntheticConfig.easy_pace_sd)
+    parser.add_argument('--seed', type=int, default=SyntheticConfig.seed)
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    config = SyntheticConfig(
+        history_weeks=args.history_weeks,
+        runs_per_week=args.runs_per_week,
+        hr_availability=args.hr_availability,
+        easy_pace_mean=args.easy_pace_mean,
+        easy_pace_sd=args.easy_pace_sd,
+        seed=args.seed
+    )
+
+    print(f"🏃 AISRI benchmarks: sizes={sizes} repeat={args.repeat}")
+    results = run_suite(sizes, names, config, repeat=args.repeat)
+    report = {
+        'environment': environment_info(),
+        'config': asdict(config),
+        'results': results
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if baseline is None:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📌 Baseline written to {args.baseline}")
+        return 0
+
+    if baseline.get('config') != report['config']:
+        print("\n⚠️  Synthetic config differs from the baseline; timings are not comparable")
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 0 if args.no_fail else 1
+
+    print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
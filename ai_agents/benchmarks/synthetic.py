@@ -0,0 +1,297 @@
+"""
+Synthetic Athlete Generator
+Deterministic, realistic athletes for benchmarking (no database or network).
+
+Each athlete i is generated from its own seed, so athlete i is identical
+no matter how many athletes are generated or in what chunk size - a
+10k run covers exactly the first 10k athletes of a 100k run.
+
+Usage:
+    config = SyntheticConfig(history_weeks=8, runs_per_week=4.5, hr_availability=0.6)
+    for chunk in iter_athletes(100_000, config, chunk_size=1000):
+        ...
+"""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+from adaptive_workout_generator import AthleteAbility, PerformanceHistory
+from performance_tracker import WorkoutResult, WorkoutTarget, WorkoutType
+from race_analyzer import RaceRecord, RaceSplit, RaceType, TrainingHistory
+from activity_providers import ActivityFrame, SOURCE_STRAVA
+
+
+# Workout mix: (kind, probability, pace multiplier vs easy pace, distance range km)
+WORKOUT_MIX = [
+    ('easy', 0.68, 1.00, (5.0, 10.0)),
+    ('tempo', 0.14, 0.86, (6.0, 10.0)),
+    ('interval', 0.10, 0.80, (6.0, 9.0)),
+    ('long', 0.08, 1.05, (14.0, 26.0))
+]
+
+# Prescribed workout types for to_workout_pairs
+TARGET_TYPES = [WorkoutType.EASY_RUN, WorkoutType.RECOVERY, WorkoutType.TEMPO,
+                WorkoutType.THRESHOLD, WorkoutType.INTERVAL, WorkoutType.LONG_RUN]
+
+PERFORMANCE_LABELS = ['BEST', 'GREAT', 'GOOD', 'FAIR', 'POOR', 'INCOMPLETE']
+PERFORMANCE_WEIGHTS = [0.08, 0.25, 0.37, 0.18, 0.09, 0.03]
+
+
+@dataclass
+class SyntheticConfig:
+    """Knobs for the synthetic population"""
+    history_weeks: int = 8          # Weeks of activity history per athlete
+    runs_per_week: float = 4.0      # Mean training frequency
+    hr_availability: float = 0.7    # Fraction of activities with heart rate
+    easy_pace_mean: float = 360.0   # sec/km, population mean easy pace
+    easy_pace_sd: float = 45.0      # sec/km, spread between athletes
+    pace_jitter: float = 0.04       # Run-to-run pace variation (fraction)
+    seed: int = 42
+
+
+@dataclass
+class SyntheticAthlete:
+    """One athlete in every shape the benchmarked components consume"""
+    user_id: str
+    profile: Dict                   # Athlete profile row (created_at, ...)
+    activities: List[Dict]          # Strava-style activities, newest first
+    ability: AthleteAbility
+    history: PerformanceHistory
+    race: RaceRecord
+    training_history: TrainingHistory
+    age: int
+    aisri_row: Dict                 # Latest aisri_scores row
+    injury_row: Dict                # Latest injury_risk_predictions row
+
+
+def _format_pace(seconds: float) -> str:
+    seconds = int(round(seconds))
+    return f"{seconds // 60}:{seconds % 60:02d}/km"
+
+
+def _format_time(seconds: float) -> str:
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def generate_athlete(index: int, config: SyntheticConfig, now: datetime) -> SyntheticAthlete:
+    """Generate athlete number `index` of the population"""
+    rng = random.Random(config.seed * 1_000_003 + index)
+    user_id = f"synthetic-{index:07d}"
+
+    easy_pace = max(240.0, rng.gauss(config.easy_pace_mean, config.easy_pace_sd))
+    max_hr = rng.randint(172, 198)
+    has_hr_device = rng.random() < config.hr_availability
+    frequency = max(0.5, rng.gauss(config.runs_per_week, 1.0))
+
+    # Activity history, newest first
+    activities = []
+    kinds, weights = [w[0] for w in WORKOUT_MIX], [w[1] for w in WORKOUT_MIX]
+    mix = {w[0]: w for w in WORKOUT_MIX}
+    for days_ago in range(config.history_weeks * 7):
+        if rng.random() >= frequency / 7:
+            continue
+        _, _, pace_factor, (low, high) = mix[rng.choices(kinds, weights)[0]]
+        pace = easy_pace * pace_factor * (1 + rng.gauss(0, config.pace_jitter))
+        distance_m = rng.uniform(low, high) * 1000
+        moving_time = distance_m / 1000 * pace
+        start = now - timedelta(days=days_ago, hours=rng.uniform(0, 12))
+
+        activity = {
+            'start_date_local': start.replace(tzinfo=None).isoformat(),
+            'start_ts': start.timestamp(),
+            'distance': distance_m,
+            'moving_time': moving_time,
+            'average_speed': distance_m / moving_time
+        }
+        if has_hr_device:
+            hr = int(max_hr * (0.70 + 0.18 * (1 / pace_factor - 1) * 5 + rng.uniform(0, 0.05)))
+            activity['average_heartrate'] = min(hr, max_hr)
+            activity['suffer_score'] = int(moving_time / 60 * (hr / max_hr) ** 3 * 2)
+        activities.append(activity)
+
+    weekly_volumes = [0.0] * 4
+    for activity in activities:
+        week = int((now.timestamp() - activity['start_ts']) // (7 * 86400))
+        if week < 4:
+            weekly_volumes[week] += activity['distance'] / 1000
+
+    weekly_volume = sum(weekly_volumes) / 4
+    ability = AthleteAbility(
+        current_pace_easy=int(easy_pace),
+        current_pace_tempo=int(easy_pace * 0.86),
+        current_pace_interval=int(easy_pace * 0.80),
+        max_hr=max_hr,
+        threshold_hr=int(max_hr * 0.87),
+        aerobic_hr=int(max_hr * 0.78),
+        weekly_volume_km=round(weekly_volume, 1),
+        longest_run_km=round(max((a['distance'] for a in activities), default=5000) / 1000, 1),
+        fitness_score=max(20.0, min(95.0, 100 - (easy_pace - 240) / 3))
+    )
+
+    last_7_days = rng.choices(PERFORMANCE_LABELS, PERFORMANCE_WEIGHTS, k=7)
+    streak = 0
+    for label in reversed(last_7_days):
+        if label not in ('BEST', 'GREAT'):
+            break
+        streak += 1
+    history = PerformanceHistory(
+        last_7_days=last_7_days,
+        last_4_weeks_volume=list(reversed([round(v, 1) for v in weekly_volumes])),
+        last_3_workouts=[
+            {'distance_km': round(a['distance'] / 1000, 2), 'avg_pace_seconds': int(a['moving_time'] / a['distance'] * 1000)}
+            for a in activities[:3]
+        ],
+        consecutive_good_performances=streak,
+        fatigue_indicators=rng.sample(
+            ['Elevated resting HR', 'Poor sleep', 'Muscle soreness', 'Low motivation'],
+            k=rng.choice([0, 0, 0, 1, 2, 3])
+        ),
+        injury_risk_score=round(rng.uniform(10, 90), 1)
+    )
+
+    # Most recent race
+    race_type = rng.choice([RaceType.FIVE_K, RaceType.TEN_K, RaceType.HALF_MARATHON, RaceType.MARATHON])
+    race_km = {RaceType.FIVE_K: 5, RaceType.TEN_K: 10, RaceType.HALF_MARATHON: 21, RaceType.MARATHON: 42}[race_type]
+    race_pace = easy_pace * (0.82 + 0.03 * race_km / 10)
+    fade = rng.uniform(-0.02, 0.08)
+    splits = []
+    for km in range(1, race_km + 1):
+        split_pace = race_pace * (1 + fade * (km / race_km - 0.5) + rng.gauss(0, 0.015))
+        splits.append(RaceSplit(
+            km=km,
+            pace=_format_pace(split_pace),
+            pace_seconds=int(split_pace),
+            hr=int(max_hr * rng.uniform(0.84, 0.93)) if has_hr_device else None
+        ))
+    race_seconds = sum(s.pace_seconds for s in splits)
+    avg_race_pace = race_seconds / race_km
+    race = RaceRecord(
+        race_type=race_type,
+        date=now - timedelta(days=rng.randint(7, 120)),
+        finish_time=_format_time(race_seconds),
+        finish_time_seconds=race_seconds,
+        avg_pace=_format_pace(avg_race_pace),
+        avg_pace_seconds=int(avg_race_pace),
+        avg_hr=int(max_hr * 0.88) if has_hr_device else None,
+        max_hr=max_hr if has_hr_device else None,
+        splits=splits,
+        elevation_gain=rng.randint(0, 300),
+        weather_temp=rng.randint(5, 32)
+    )
+
+    total_distance = sum(a['distance'] for a in activities) / 1000
+    training_history = TrainingHistory(
+        total_runs=len(activities),
+        total_distance=round(total_distance, 1),
+        avg_weekly_volume=round(total_distance / max(config.history_weeks, 1), 1),
+        longest_run=ability.longest_run_km,
+        avg_pace=_format_pace(easy_pace),
+        avg_pace_seconds=int(easy_pace),
+        consistency=round(len(activities) / max(config.history_weeks, 1), 1),
+        easy_run_percentage=round(rng.uniform(50, 90), 1)
+    )
+
+    created_at = now - timedelta(days=rng.randint(30, 3000))
+    aisri_score = rng.randint(35, 95)
+    return SyntheticAthlete(
+        user_id=user_id,
+        profile={'id': user_id, 'created_at': created_at.replace(tzinfo=None).isoformat()},
+        activities=activities,
+        ability=ability,
+        history=history,
+        race=race,
+        training_history=training_history,
+        age=rng.randint(18, 65),
+        aisri_row={
+            'athlete_id': user_id,
+            'aisri_score': aisri_score,
+            'total_score': aisri_score,
+            'pillar_recovery': rng.randint(35, 95),
+            'created_at': (now - timedelta(days=rng.randint(0, 14))).isoformat()
+        },
+        injury_row={
+            'athlete_id': user_id,
+            'risk_score': round(history.injury_risk_score),
+            'created_at': (now - timedelta(days=rng.randint(0, 14))).isoformat()
+        }
+    )
+
+
+def iter_athletes(
+    count: int,
+    config: SyntheticConfig = None,
+    chunk_size: int = 1000,
+    now: datetime = None
+) -> Iterator[List[SyntheticAthlete]]:
+    """Yield the first `count` athletes of the population in chunks"""
+    config = config or SyntheticConfig()
+    now = now or datetime.now(timezone.utc)
+    for start in range(0, count, chunk_size):
+        yield [generate_athlete(i, config, now) for i in range(start, min(start + chunk_size, count))]
+
+
+def to_activity_frame(athletes: List[SyntheticAthlete]) -> ActivityFrame:
+    """Columnar frame of the athletes' activities (as the batch calculator consumes)"""
+    columns = {column: [] for column in ActivityFrame.COLUMNS}
+    row_user_ids = []
+    for athlete in athletes:
+        for activity in athlete.activities:
+            row_user_ids.append(athlete.user_id)
+            columns['start_ts'].append(activity['start_ts'])
+            columns['distance_m'].append(activity['distance'])
+            columns['moving_time_s'].append(activity['moving_time'])
+            columns['average_speed'].append(activity['average_speed'])
+            columns['average_heartrate'].append(activity.get('average_heartrate', float('nan')))
+            columns['suffer_score'].append(activity.get('suffer_score', float('nan')))
+            columns['source'].append(SOURCE_STRAVA)
+    return ActivityFrame.build([a.user_id for a in athletes], columns, row_user_ids, dedupe=False)
+
+
+def to_workout_pairs(athletes: List[SyntheticAthlete]) -> Tuple[List[WorkoutTarget], List[WorkoutResult]]:
+    """
+    Aligned (prescribed, completed) workouts, one pair per activity. The
+    prescription is the activity perturbed, with a mix of pace/HR ranges,
+    missing targets, intervals and unfinished sessions.
+    """
+    targets, results = [], []
+    for athlete in athletes:
+        rng = random.Random(athlete.user_id)
+        for n, activity in enumerate(athlete.activities):
+            distance_km = activity['distance'] / 1000
+            pace = int(activity['moving_time'] / distance_km)
+            hr = activity.get('average_heartrate')
+            workout_type = rng.choice(TARGET_TYPES)
+
+            target_pace = int(pace * rng.uniform(0.95, 1.05)) if rng.random() < 0.9 else None
+            target_hr = int(hr * rng.uniform(0.95, 1.05)) if hr and rng.random() < 0.8 else None
+            targets.append(WorkoutTarget(
+                workout_type=workout_type,
+                distance_km=round(distance_km * rng.uniform(0.9, 1.1), 1),
+                target_pace_seconds=target_pace,
+                pace_range_seconds=(target_pace - 10, target_pace + 10)
+                if target_pace and rng.random() < 0.5 else (0, 0),
+                target_hr=target_hr,
+                hr_range=(target_hr - 5, target_hr + 5) if target_hr and rng.random() < 0.5 else (0, 0),
+                intervals=rng.randint(4, 8) if workout_type == WorkoutType.INTERVAL else None
+            ))
+
+            completed_full = rng.random() > 0.05
+            splits = None
+            if rng.random() < 0.6:
+                splits = [int(pace * (1 + rng.gauss(0, 0.03))) for _ in range(max(1, int(distance_km)))]
+            results.append(WorkoutResult(
+                workout_id=f"{athlete.user_id}-{n}",
+                completed_date=datetime.fromtimestamp(activity['start_ts'], timezone.utc),
+                distance_km=round(distance_km, 2),
+                total_time_seconds=int(activity['moving_time']),
+                avg_pace_seconds=pace,
+                avg_hr=hr,
+                max_hr=int(hr * 1.08) if hr else None,
+                splits=splits,
+                completed_full=completed_full,
+                stopped_at_km=None if completed_full else round(distance_km, 2)
+            ))
+    return targets, results
@@ -0,0 +1,375 @@
+"""
+Block Optimizer
+Constraint-aware training-block planning: the session sequence over a
+1-4 week horizon that maximizes training stimulus while every day passes
+the safety gates.
+
+The search is a forward dynamic program over a discretized state
+(acute EWMA, chronic EWMA, key-session streak). Each day every surviving
+state tries every session in the menu; transitions that fail a gate are
+dropped, and of the states landing in the same bin only the best-valued
+one is kept (with its exact loads, so every returned plan is checked
+against the exact EWMA, not the bin). Bins are relative to the athlete's
+starting chronic load, so the frontier stays a few hundred states wide
+whatever the athlete's volume.
+
+Constraints (from the compiled safety rule table, as the gate applies them):
+- AISRi / injury risk / recovery thresholds per intensity
+- Structural clearance (workout type and intensity class per state)
+- Max consecutive hard days per intensity, counted over key sessions
+  (long runs as well as hard ones), which is stricter than the gate;
+  rest days neither extend nor break the streak, as in the ledger
+- Projected ACWR (minutes EWMA, as the volume gate) <= the volume limit,
+  with chronic load below the rule table's cold-start floor counted as
+  the floor (as the gate does), so athletes without history ramp up
+  instead of being planned as if they had no limit
+
+Objective: session minutes x intensity factor, with key sessions
+discounted by repeat_discount for every key day in a row before them,
+minus a penalty for acute load below the ACWR 0.8 floor (undertraining).
+
+Features:
+- One athlete (per request) or many at once (nightly replanning): the
+  batch runs every athlete's frontier through the same array operations
+- 28-day plans in roughly 10-20 ms per athlete
+- Weekly structures that plug into AdaptiveWorkoutGenerator
+
+Usage:
+    optimizer = BlockOptimizer()
+    plan = optimizer.optimize(OptimizerInputs.from_gate_inputs(inputs, 'green'), days=28)
+    plan.sessions[0].workout_type, plan.weekly_structures()
+
+    plans = optimizer.optimize_batch(all_inputs, days=28)
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from safety_rules import SafetyRuleEngine
+from training_load_ledger import TrainingLoadLedger
+from workload_engine import ACWR_SAFE_MIN, WorkloadEngine, WorkloadState
+
+
+MAX_HORIZON_DAYS = 28
+
+# Bin width as a fraction of the starting chronic load
+ACUTE_RESOLUTION = 0.1
+CHRONIC_RESOLUTION = 0.1
+
+# Chronic loads below this (minutes/day) bin as if they were this
+MIN_REFERENCE_LOAD = 5.0
+
+HARD_INTENSITY_CLASSES = ('high', 'very_high')
+LOW_INTENSITY_CLASS = 'low'
+
+_BIN_BITS = 16
+
+
+@dataclass(frozen=True)
+class SessionOption:
+    """One entry of the session menu"""
+    workout_type: str
+    intensity: str          # Safety-gate intensity key
+    minutes: float
+    stimulus_factor: float  # Per-minute stimulus (as _calculate_workout_load)
+
+
+REST = SessionOption('rest', 'rest', 0.0, 0.0)
+
+DEFAULT_SESSIONS = (
+    REST,
+    SessionOption('recovery', 'easy', 30.0, 1.0),
+    SessionOption('easy', 'easy', 40.0, 1.0),
+    SessionOption('easy', 'easy', 60.0, 1.0),
+    SessionOption('long', 'long', 90.0, 1.2),
+    SessionOption('tempo', 'tempo', 40.0, 1.8),
+    SessionOption('threshold', 'threshold', 35.0, 1.8),
+    SessionOption('interval', 'interval', 45.0, 2.0)
+)
+
+
+def session_options(ability=None) -> List[SessionOption]:
+    """
+    Session menu, with easy and long durations sized from an
+    AthleteAbility (weekly volume / longest run at easy pace) when given
+    """
+    if ability is None:
+        return list(DEFAULT_SESSIONS)
+
+    easy_minutes = ability.weekly_volume_km / 5 * ability.current_pace_easy / 60
+    long_minutes = ability.longest_run_km * ability.current_pace_easy / 60
+    sessions = []
+    for option in DEFAULT_SESSIONS:
+        if option.workout_type == 'easy':
+            scale = option.minutes / 50
+            option = SessionOption('easy', 'easy', round(max(20.0, easy_minutes * scale)), 1.0)
+        elif option.workout_type == 'long':
+            option = SessionOption('long', 'long', round(max(option.minutes, long_minutes)), 1.2)
+        sessions.append(option)
+    return sessions
+
+
+@dataclass
+class OptimizerInputs:
+    """Per-athlete state the optimizer plans from"""
+    athlete_id: str
+    workload: WorkloadState             # 'minutes' EWMA, as of the day before the block
+    consecutive_hard: int = 0
+    aisri: float = np.nan               # NaN: no assessment (intensities with min_aisri blocked)
+    injury_risk: float = 50.0
+    recovery: float = np.nan            # NaN: recovery gate not applied
+    structural_state: str = 'green'
+    sessions: Optional[List[SessionOption]] = None  # Default menu when None
+
+    @classmethod
+    def from_gate_inputs(cls, inputs, structural_state: str = 'green', sessions=None) -> 'OptimizerInputs':
+        """From a GateInputs record (get_safety_gate_inputs), reading values as the gate does"""
+        aisri, recovery, injury_risk = np.nan, np.nan, 50.0
+        if inputs.latest_aisri:
+            aisri = inputs.latest_aisri.get('aisri_score', 0) or 0
+            pillar_recovery = inputs.latest_aisri.get('pillar_recovery')
+            recovery = 70 if pillar_recovery is None else pillar_recovery
+        if inputs.latest_injury_prediction:
+            injury_risk = inputs.latest_injury_prediction.get('risk_score', 50)
+        return cls(
+            athlete_id=str(inputs.athlete_id),
+            workload=inputs.workload,
+            consecutive_hard=TrainingLoadLedger.consecutive_hard_days(inputs.recent_days),
+            aisri=float(aisri),
+            injury_risk=float(injury_risk),
+            recovery=float(recovery),
+            structural_state=structural_state,
+            sessions=sessions
+        )
+
+
+@dataclass
+class PlannedSession:
+    """One day of an optimized block"""
+    day: date
+    workout_type: str
+    intensity: str
+    duration_minutes: float
+    hard: bool
+    acwr_after: float
+
+
+@dataclass
+class BlockPlan:
+    """Optimized block for one athlete"""
+    athlete_id: str
+    start_date: date
+    sessions: List[PlannedSession] = field(default_factory=list)
+    stimulus: float = 0.0
+    rules_version: str = ''
+
+    def weekly_structures(self) -> List[Dict[int, str]]:
+        """
+        One {day_of_week (1=Mon..7=Sun): workout_type} dict per plan week,
+        the weekly_plan_structure format of AdaptiveWorkoutGenerator
+        """
+        weeks = []
+        for offset in range(0, len(self.sessions), 7):
+            weeks.append({s.day.isoweekday(): s.workout_type for s in self.sessions[offset:offset + 7]})
+        return weeks
+
+
+class BlockOptimizer:
+    """Dynamic program over (acute, chronic, key-session streak) per athlete"""
+
+    def __init__(
+        self,
+        rules: Optional[SafetyRuleEngine] = None,
+        acute_resolution: float = ACUTE_RESOLUTION,
+        chronic_resolution: float = CHRONIC_RESOLUTION,
+        repeat_discount: float = 0.5,
+        undertraining_weight: float = 1.0
+    ):
+        self.rules = rules or SafetyRuleEngine.from_env()
+        self.acute_resolution = acute_resolution
+        self.chronic_resolution = chronic_resolution
+        self.repeat_discount = repeat_discount
+        self.undertraining_weight = undertraining_weight
+
+    def optimize(self, inputs: OptimizerInputs, days: int = 28, start: Optional[date] = None) -> BlockPlan:
+        """Best block for one athlete"""
+        return self.optimize_batch([inputs], days, start)[0]
+
+    def optimize_batch(
+        self,
+        inputs: Sequence[OptimizerInputs],
+        days: int = 28,
+        start: Optional[date] = None
+    ) -> List[BlockPlan]:
+        """
+        Best block for every athlete in one pass.
+
+        Args:
+            inputs: One OptimizerInputs per athlete
+            days: Horizon (1..MAX_HORIZON_DAYS)
+            start: First planned day (default: tomorrow, UTC)
+
+        Returns:
+            One BlockPlan per input, in input order
+        """
+        if not 1 <= days <= MAX_HORIZON_DAYS:
+            raise ValueError(f"Block horizon must be 1-{MAX_HORIZON_DAYS} days, got {days}")
+        start = start or datetime.now(timezone.utc).date() + timedelta(days=1)
+        if not inputs:
+            return []
+
+        rules = self.rules.current()
+        menus = [list(i.sessions or DEFAULT_SESSIONS) for i in inputs]
+        n_actions = max(len(menu) for menu in menus)
+        # Pad shorter menus with rest (duplicates never win a bin over the original)
+        menus = [menu + [REST] * (n_actions - len(menu)) for menu in menus]
+
+        minutes = np.array([[s.minutes for s in menu] for menu in menus])
+        factor = np.array([[s.stimulus_factor for s in menu] for menu in menus])
+        key, hard, max_consecutive, allowed = self._action_tables(rules, inputs, menus)
+        streak_cap = int(min(np.max(max_consecutive, initial=1, where=np.isfinite(max_consecutive)), 255))
+
+        # Starting states: the workload decayed to the day before the block
+        n = len(inputs)
+        ath = np.arange(n)
+        acute = np.empty(n)
+        chronic = np.empty(n)
+        for i, record in enumerate(inputs):
+            state = WorkloadEngine.advance(record.workload, start - timedelta(days=1))
+            acute[i], chronic[i] = state.acute, state.chronic
+        streak = np.minimum([i.consecutive_hard for i in inputs], streak_cap).astype(np.int64)
+        value = np.zeros(n)
+        acute_width = np.maximum(chronic, MIN_REFERENCE_LOAD) * self.acute_resolution
+        chronic_width = np.maximum(chronic, MIN_REFERENCE_LOAD) * self.chronic_resolution
+
+        alpha_a, alpha_c = WorkloadEngine.ALPHA_ACUTE, WorkloadEngine.ALPHA_CHRONIC
+        discount = self.repeat_discount ** np.arange(streak_cap + 1)
+        parents, actions, acwrs = [], [], []
+
+        for _ in range(days):
+            # Decay to today, then every action: (frontier, n_actions)
+            acute, chronic = acute * (1 - alpha_a), chronic * (1 - alpha_c)
+            m = minutes[ath]
+            new_acute = acute[:, None] + alpha_a * m
+            new_chronic = chronic[:, None] + alpha_c * m
+            # Ratios are judged on the floored chronic load; the exact one is carried
+            judged = np.maximum(chronic, rules.min_chronic_minutes)[:, None] + alpha_c * m
+            acwr = np.divide(new_acute, judged, out=np.ones_like(new_acute), where=judged > 0)
+
+            feasible = allowed[ath] & (streak[:, None] < max_consecutive[ath])
+            # Volume gate: every session with a duration
+            feasible &= (m == 0) | (acwr <= rules.max_volume_acwr)
+
+            is_key = key[ath]
+            gain = m * factor[ath] * np.where(is_key, discount[streak][:, None], 1.0)
+            shortfall = np.maximum(ACWR_SAFE_MIN * judged - new_acute, 0.0)
+            candidate = value[:, None] + gain - self.undertraining_weight * shortfall
+
+            # Rest days neither extend nor break the streak (as the ledger counts it)
+            next_streak = np.where(
+                m == 0, streak[:, None], np.where(is_key, np.minimum(streak[:, None] + 1, streak_cap), 0)
+            )
+            keys = self._bin_keys(ath[:, None], next_streak, new_acute, new_chronic,
+                                  acute_width[ath][:, None], chronic_width[ath][:, None])
+
+            # Best feasible candidate per bin (rest is always feasible, so no athlete drops out)
+            survivors = np.flatnonzero(feasible)
+            flat_keys, flat_values = keys.ravel()[survivors], candidate.ravel()[survivors]
+            order = np.lexsort((-flat_values, flat_keys))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = flat_keys[order[1:]] != flat_keys[order[:-1]]
+            chosen = survivors[order[first]]
+
+            parent, action = np.divmod(chosen, n_actions)
+            parents.append(parent)
+            actions.append(action)
+            acwrs.append(acwr.ravel()[chosen])
+
+            ath = ath[parent]
+            acute = new_acute.ravel()[chosen]
+            chronic = new_chronic.ravel()[chosen]
+            streak = next_streak.ravel()[chosen]
+            value = candidate.ravel()[chosen]
+
+        # Best final state per athlete, in athlete order
+        order = np.lexsort((-value, ath))
+        best = order[np.r_[True, ath[order[1:]] != ath[order[:-1]]]]
+
+        plans = []
+        for final in best:
+            i = int(ath[final])
+            sequence = []
+            node = int(final)
+            for day in range(days - 1, -1, -1):
+                sequence.append((int(actions[day][node]), float(acwrs[day][node])))
+                node = int(parents[day][node])
+            sequence.reverse()
+
+            plans.append(BlockPlan(
+                athlete_id=inputs[i].athlete_id,
+                start_date=start,
+                sessions=[
+                    PlannedSession(
+                        day=start + timedelta(days=d),
+                        workout_type=menus[i][k].workout_type,
+                        intensity=menus[i][k].intensity,
+                        duration_minutes=menus[i][k].minutes,
+                        hard=bool(hard[i, k]),
+                        acwr_after=round(acwr_after, 2)
+                    )
+                    for d, (k, acwr_after) in enumerate(sequence)
+                ],
+                stimulus=round(float(value[final]), 1),
+                rules_version=rules.version
+            ))
+        return plans
+
+    @staticmethod
+    def _action_tables(rules, inputs: Sequence[OptimizerInputs], menus: List[List[SessionOption]]):
+        """
+        (key, hard, max_consecutive, allowed) arrays of shape (n_athletes, n_actions).
+
+        allowed folds in every gate that does not depend on the plan so
+        far (AISRi, injury risk, recovery, structural clearance); rest is
+        always allowed. Key sessions are everything above the 'low'
+        intensity class (long runs included); hard ones are 'high' and up.
+        """
+        n, k = len(menus), len(menus[0])
+        intensities = [s.intensity for menu in menus for s in menu]
+        workout_types = [s.workout_type for menu in menus for s in menu]
+        codes = rules.intensity_codes(intensities).reshape(n, k)
+
+        checks = rules.evaluate_gate_codes(
+            codes,
+            np.array([i.aisri for i in inputs], dtype=np.float64)[:, None],
+            np.array([i.injury_risk for i in inputs], dtype=np.float64)[:, None],
+            np.array([i.recovery for i in inputs], dtype=np.float64)[:, None],
+            np.zeros((n, 1)),
+            np.full((n, 1), np.nan)
+        )
+        structural = rules.evaluate_structural(
+            [i.structural_state for i in inputs for _ in range(k)], workout_types, intensities
+        )
+
+        is_rest = np.array([[s.minutes == 0 for s in menu] for menu in menus])
+        allowed = (
+            checks.aisri & checks.injury_risk & checks.recovery
+            & structural['type_allowed'].reshape(n, k)
+            & structural['intensity_allowed'].reshape(n, k)
+        ) | is_rest
+
+        classes = [[rules.intensity_classes.get(s.intensity, s.intensity) for s in menu] for menu in menus]
+        hard = np.array([[c in HARD_INTENSITY_CLASSES for c in row] for row in classes])
+        key = np.array([[c != LOW_INTENSITY_CLASS for c in row] for row in classes]) & ~is_rest
+        return key, hard, checks.max_consecutive_hard_days, allowed
+
+    @staticmethod
+    def _bin_keys(ath, streak, acute, chronic, acute_width, chronic_width) -> np.ndarray:
+        """One int64 per (athlete, streak, acute bin, chronic bin)"""
+        limit = (1 << _BIN_BITS) - 1
+        acute_bin = np.minimum(acute / acute_width, limit).astype(np.int64)
+        chronic_bin = np.minimum(chronic / chronic_width, limit).astype(np.int64)
+        return (((ath * 256 + streak) << _BIN_BITS | acute_bin) << _BIN_BITS) | chronic_bin
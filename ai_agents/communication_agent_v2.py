@@ -471,16 +471,16 @@ async def metrics():
 # DAILY AUTOMATION
 # ===============================
 
-async def daily_workout_automation():
+def daily_workout_automation():
     """
-    Daily automation job - sends workout recommendations
-    Runs at 6 AM UTC
+    Daily automation job - generates tomorrow's workouts for every active athlete
+    Runs at 6 AM UTC (in the scheduler's thread pool)
     """
+    from database_integration import DatabaseIntegration
+    from nightly_workout_pipeline import NightlyWorkoutPipeline
     logger.info("Daily workout automation triggered")
-    # TODO: Implement athlete notification logic
-    # - Query active athletes
-    # - Generate personalized workouts
-    # - Send via Telegram
+    report = NightlyWorkoutPipeline(DatabaseIntegration()).run()
+    logger.info(f"[WORKOUTS] Nightly generation complete: {report.to_dict()}")
 
 async def daily_recovery_check():
     """
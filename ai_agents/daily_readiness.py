@@ -0,0 +1,309 @@
+"""
+Daily Readiness
+Precomputed "should I train today?" record per athlete.
+
+A nightly stage evaluates, for every active athlete in bulk:
+- the safety summary (AISRISafetyGate.summarize_safety)
+- the structural state and speed permission (structural index + rule table)
+- the autonomous training decision (AISRiAutonomousDecisionAgent.decide_action)
+and stores one compact row in athlete_readiness. Daytime requests read
+that row directly. Rows are recomputed on read only when they are from an
+earlier day or were marked stale by a database trigger (new AISRi score,
+injury prediction, assessment or training load). Records are stored through
+store_athlete_readiness, which skips rows invalidated after their inputs
+were read, so a late trigger is never overwritten.
+
+Usage:
+    # Nightly (cron, after the ledger and AISRi updates)
+    python daily_readiness.py
+    0 4 * * * cd /path/to/ai_agents && python daily_readiness.py
+
+    # Request path
+    readiness = DailyReadiness(db, safety_gate)
+    record = readiness.get(athlete_id)     # ReadinessRecord
+"""
+
+import logging
+import sys
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+from database_integration import DatabaseIntegration
+from aisri_safety_gate import AISRISafetyGate
+from structural_index import StructuralIndexEntry
+
+logger = logging.getLogger(__name__)
+
+
+READINESS_TABLE = 'athlete_readiness'
+PAGE_SIZE = 1000
+ACTIVE_DAYS = 28  # Athletes with training load in this window are precomputed
+
+# Decision agent defaults when an athlete has no assessment / prediction yet
+DEFAULT_ASSESSMENT_SCORE = 50
+DEFAULT_INJURY_RISK = {"risk_score": 0, "risk_level": "LOW"}
+
+
+@dataclass
+class ReadinessRecord:
+    """One athlete's readiness for one day (one athlete_readiness row)"""
+    athlete_id: str
+    readiness_date: str
+    status: str
+    message: str
+    aisri_score: Optional[float]
+    injury_risk: Optional[float]
+    injury_risk_level: Optional[str]
+    recovery_score: Optional[float]
+    structural_state: str
+    structural_score: int
+    speed_permission: bool
+    decision: str
+    decision_reason: str
+    training_load: float
+    computed_at: str
+    version: int = 0  # athlete_readiness version the inputs were read at
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'ReadinessRecord':
+        return cls(**{name: row.get(name) for name in cls.__dataclass_fields__})
+
+    def to_row(self) -> Dict:
+        return asdict(self)
+
+    def to_decision_response(self) -> Dict:
+        """Shape of AISRiAutonomousDecisionAgent.run_decision_cycle"""
+        return {
+            "status": "success",
+            "athlete_id": self.athlete_id,
+            "aisri_score": self.aisri_score,
+            "injury_risk": {"risk_score": self.injury_risk, "risk_level": self.injury_risk_level},
+            "training_load": self.training_load,
+            "decision": {"decision": self.decision, "reason": self.decision_reason},
+            "readiness": asdict(self)
+        }
+
+
+def build_readiness_record(
+    athlete_id: str,
+    today: date,
+    latest_aisri: Optional[Dict],
+    latest_injury_prediction: Optional[Dict],
+    assessment_aisri_score: Optional[float],
+    training_load: float,
+    structural: StructuralIndexEntry,
+    speed_permission: bool,
+    decision_agent,
+    computed_at: str,
+    version: int = 0
+) -> ReadinessRecord:
+    """
+    One readiness record from get_readiness_inputs-shaped values (no I/O).
+
+    The decision agent is fed the latest AISRI_assessments score (50 when
+    the athlete has none), as AISRiAutonomousDecisionAgent does itself.
+    """
+    summary = AISRISafetyGate.summarize_safety(latest_aisri, latest_injury_prediction)
+
+    injury = latest_injury_prediction or DEFAULT_INJURY_RISK
+    training_load = float(training_load or 0)
+    decision = decision_agent.decide_action(
+        assessment_aisri_score if assessment_aisri_score is not None else DEFAULT_ASSESSMENT_SCORE,
+        {"risk_score": injury.get('risk_score'), "risk_level": injury.get('risk_level')},
+        training_load
+    )
+
+    return ReadinessRecord(
+        athlete_id=athlete_id,
+        readiness_date=today.isoformat(),
+        status=summary['status'],
+        message=summary['message'],
+        aisri_score=summary['aisri_score'],
+        injury_risk=summary['injury_risk'],
+        injury_risk_level=injury.get('risk_level'),
+        recovery_score=summary['recovery_score'],
+        structural_state=structural.state.value,
+        structural_score=structural.score,
+        speed_permission=bool(speed_permission),
+        decision=decision['decision'],
+        decision_reason=decision['reason'],
+        training_load=training_load,
+        computed_at=computed_at,
+        version=version
+    )
+
+
+class DailyReadiness:
+    """Bulk precompute and cached reads of athlete_readiness"""
+
+    def __init__(
+        self,
+        database: DatabaseIntegration,
+        safety_gate: Optional[AISRISafetyGate] = None,
+        decision_agent=None
+    ):
+        self.db = database
+        self.supabase = database.supabase
+        self.safety_gate = safety_gate or AISRISafetyGate(database)
+        if decision_agent is None:
+            # Imported lazily: the agent module opens its own client on import
+            from ai_engine_agent.autonomous_decision_agent import AISRiAutonomousDecisionAgent
+            decision_agent = AISRiAutonomousDecisionAgent()
+        self.decision_agent = decision_agent
+
+    # =========================================================================
+    # READS (request path)
+    # =========================================================================
+
+    def get(self, athlete_id: str, today: Optional[date] = None) -> ReadinessRecord:
+        """Today's record; recomputed only if missing, from an earlier day or stale"""
+        return self.get_many([athlete_id], today)[str(athlete_id)]
+
+    def get_many(self, athlete_ids: List[str], today: Optional[date] = None) -> Dict[str, ReadinessRecord]:
+        """Today's records for many athletes; invalid ones are recomputed in one batch"""
+        today = today or _today()
+        ids = [str(a) for a in athlete_ids]
+
+        response = self.supabase.table(READINESS_TABLE).select('*').in_('athlete_id', ids).execute()
+        records = {
+            row['athlete_id']: ReadinessRecord.from_row(row)
+            for row in (response.data or [])
+            if not row.get('stale') and row.get('readiness_date') == today.isoformat()
+        }
+
+        missing = [a for a in ids if a not in records]
+        if missing:
+            records.update({r.athlete_id: r for r in self.recompute(missing, today)})
+        return records
+
+    # =========================================================================
+    # PRECOMPUTE
+    # =========================================================================
+
+    def recompute(self, athlete_ids: List[str], today: Optional[date] = None) -> List[ReadinessRecord]:
+        """Compute and store records for specific athletes"""
+        records = []
+        for page in self._iter_inputs(athlete_ids=[str(a) for a in athlete_ids]):
+            records.extend(self._store(self.compute(page, today)))
+        return records
+
+    def precompute_all(self, today: Optional[date] = None, page_size: int = PAGE_SIZE) -> Dict:
+        """
+        Nightly stage: compute and store records for every active athlete.
+
+        Returns:
+            {'athletes': int, 'pages': int, 'failed_pages': int, 'by_decision': {...}}
+        """
+        results = {'athletes': 0, 'pages': 0, 'failed_pages': 0, 'by_decision': {}}
+
+        for page in self._iter_inputs(page_size=page_size):
+            results['pages'] += 1
+            try:
+                records = self._store(self.compute(page, today))
+                self._save_decisions(records)
+            except Exception as e:
+                results['failed_pages'] += 1
+                logger.error(f"Readiness page after {page[0]['athlete_id']} failed: {e}")
+                continue
+
+            results['athletes'] += len(records)
+            for record in records:
+                results['by_decision'][record.decision] = results['by_decision'].get(record.decision, 0) + 1
+
+        logger.info(f"Readiness precomputed: {results}")
+        return results
+
+    def compute(self, rows: List[Dict], today: Optional[date] = None) -> List[ReadinessRecord]:
+        """Readiness for a page of get_readiness_inputs rows (no writes)"""
+        today = today or _today()
+        computed_at = datetime.now(timezone.utc).isoformat()
+
+        ids = [str(row['athlete_id']) for row in rows]
+        structural = self.safety_gate.structural_index.get_many(ids)
+        rules = self.safety_gate.rules.current()
+        speed = rules.evaluate_structural(
+            [structural[a].state.value for a in ids], ['easy'] * len(ids), ['low'] * len(ids)
+        )['speed_permission']
+
+        return [
+            build_readiness_record(
+                athlete_id=athlete_id,
+                today=today,
+                latest_aisri=row.get('latest_aisri'),
+                latest_injury_prediction=row.get('latest_injury_prediction'),
+                assessment_aisri_score=row.get('assessment_aisri_score'),
+                training_load=row.get('training_load'),
+                structural=structural[athlete_id],
+                speed_permission=speed[i],
+                decision_agent=self.decision_agent,
+                computed_at=computed_at,
+                version=int(row.get('readiness_version') or 0)
+            )
+            for i, (athlete_id, row) in enumerate(zip(ids, rows))
+        ]
+
+    def _iter_inputs(
+        self,
+        athlete_ids: Optional[List[str]] = None,
+        page_size: int = PAGE_SIZE
+    ) -> Iterator[List[Dict]]:
+        """Pages of get_readiness_inputs rows (every active athlete if no ids)"""
+        after = None
+        while True:
+            page = self.supabase.rpc('get_readiness_inputs', {
+                'p_athlete_ids': athlete_ids,
+                'p_active_days': ACTIVE_DAYS,
+                'p_after': after,
+                'p_limit': page_size
+            }).execute().data or []
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = page[-1]['athlete_id']
+
+    def _store(self, records: List[ReadinessRecord]) -> List[ReadinessRecord]:
+        """Store records unless invalidated since their inputs were read"""
+        if records:
+            stored = self.supabase.rpc('store_athlete_readiness', {
+                'p_rows': [record.to_row() for record in records]
+            }).execute().data or []
+            skipped = len(records) - len(stored)
+            if skipped:
+                # Still returned to the caller; the rows stay stale and are
+                # recomputed on the next read
+                logger.info(f"Readiness: {skipped} record(s) invalidated during compute, left stale")
+        return records
+
+    def _save_decisions(self, records: List[ReadinessRecord]):
+        """Keep the ai_decisions history: one bulk insert per page instead of one row per request"""
+        if records:
+            self.supabase.table("ai_decisions").insert([
+                {
+                    "athlete_id": record.athlete_id,
+                    "decision": record.decision,
+                    "reason": record.decision_reason,
+                    "created_at": record.computed_at
+                }
+                for record in records
+            ]).execute()
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Script Entry Point
+# ═══════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    results = DailyReadiness(DatabaseIntegration()).precompute_all()
+    sys.exit(1 if results['failed_pages'] > 0 else 0)
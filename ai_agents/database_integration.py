@@ -12,7 +12,8 @@ Provides CRUD operations for:
 """
 
 import os
-from datetime import datetime, timedelta
+import uuid
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from supabase import create_client, Client
 import json
@@ -23,6 +24,7 @@ from race_analyzer import RaceAnalyzer, RaceRecord, RaceAnalysisResult, RaceType
 from fitness_analyzer import FitnessAnalyzer, ComprehensiveFitnessAssessment, DimensionLevel
 from performance_tracker import PerformanceTracker, WorkoutTarget, WorkoutResult, PerformanceAssessment, WorkoutType, PerformanceLabel
 from adaptive_workout_generator import AdaptiveWorkoutGenerator, AthleteAbility, PerformanceHistory, TrainingPhase, GeneratedWorkout
+from workload_engine import WorkloadEngine, WorkloadState
 
 # Load environment variables
 load_dotenv()
@@ -274,7 +276,40 @@ class DatabaseIntegration:
     ) -> Dict:
         """Create new workout assignment"""
         
-        workout_data = {
+        workout_data = self._workout_assignment_row(athlete_id, workout)
+        
+        try:
+            response = self.supabase.table("workout_assignments")\
+                .insert(workout_data)\
+                .execute()
+            return response.data[0]
+        except Exception as e:
+            print(f"Error creating workout assignment: {e}")
+            raise
+    
+    def create_workout_assignments(
+        self,
+        athlete_id: str,
+        workouts: List[GeneratedWorkout]
+    ) -> List[Dict]:
+        """Create many workout assignments with one multi-row insert"""
+        
+        if not workouts:
+            return []
+        
+        try:
+            response = self.supabase.table("workout_assignments")\
+                .insert([self._workout_assignment_row(athlete_id, workout) for workout in workouts])\
+                .execute()
+            return response.data
+        except Exception as e:
+            print(f"Error creating workout assignments: {e}")
+            raise
+    
+    @staticmethod
+    def _workout_assignment_row(athlete_id: str, workout: GeneratedWorkout) -> Dict:
+        """workout_assignments row for a generated workout"""
+        return {
             "athlete_id": athlete_id,
             "assigned_date": datetime.now().isoformat(),
             "scheduled_date": workout.workout_date.isoformat(),
@@ -298,15 +333,6 @@ class DatabaseIntegration:
             "acwr_projected": workout.acwr_after_workout,
             "generation_rationale": workout.generation_rationale
         }
-        
-        try:
-            response = self.supabase.table("workout_assignments")\
-                .insert(workout_data)\
-                .execute()
-            return response.data[0]
-        except Exception as e:
-            print(f"Error creating workout assignment: {e}")
-            raise
     
     def get_workout_assignment(self, assignment_id: str) -> Optional[Dict]:
         """Get workout assignment by ID"""
@@ -385,7 +411,30 @@ class DatabaseIntegration:
     ) -> Dict:
         """Store workout result and performance assessment"""
         
-        result_data = {
+        result_data = self._workout_result_row(assignment_id, athlete_id, result, assessment)
+        
+        try:
+            response = self.supabase.table("workout_results")\
+                .insert(result_data)\
+                .execute()
+            
+            # Update workout assignment status
+            self.update_workout_status(assignment_id, "completed")
+            
+            return response.data[0]
+        except Exception as e:
+            print(f"Error storing workout result: {e}")
+            raise
+    
+    @staticmethod
+    def _workout_result_row(
+        assignment_id: str,
+        athlete_id: str,
+        result: WorkoutResult,
+        assessment: PerformanceAssessment
+    ) -> Dict:
+        """workout_results row for an assessed result"""
+        return {
             "assignment_id": assignment_id,
             "athlete_id": athlete_id,
             "workout_date": result.completed_date.isoformat(),
@@ -415,19 +464,6 @@ class DatabaseIntegration:
             "fatigue_level": assessment.fatigue_level,
             "injury_risk_indicators": json.dumps(assessment.injury_risk_indicators)
         }
-        
-        try:
-            response = self.supabase.table("workout_results")\
-                .insert(result_data)\
-                .execute()
-            
-            # Update workout assignment status
-            self.update_workout_status(assignment_id, "completed")
-            
-            return response.data[0]
-        except Exception as e:
-            print(f"Error storing workout result: {e}")
-            raise
     
     def get_workout_result(self, result_id: str) -> Optional[Dict]:
         """Get workout result by ID"""
@@ -462,6 +498,58 @@ class DatabaseIntegration:
             print(f"Error fetching athlete workout results: {e}")
             return []
     
+    def get_workload_state(self, athlete_id: str) -> Optional[WorkloadState]:
+        """
+        Trigger-maintained EWMA training load (athlete_workload_state,
+        ledger 'load' units), decayed to today. None when the athlete has
+        no logged training yet, so callers fall back to declared volumes.
+        """
+        try:
+            state = WorkloadEngine(self.supabase).get_state(athlete_id, 'load')
+        except Exception as e:
+            print(f"Error fetching workload state: {e}")
+            return None
+        return state if state.chronic > 0 else None
+    
+    @staticmethod
+    def _workload_from_inputs(row: Dict, today: date) -> Optional[WorkloadState]:
+        """
+        Stored load EWMA from a bulk-input row (workload_as_of, load_acute,
+        load_chronic) decayed to today; None without logged training, as
+        get_workload_state.
+        """
+        if not row.get("workload_as_of"):
+            return None
+        state = WorkloadEngine.advance(WorkloadState(
+            acute=float(row.get("load_acute") or 0),
+            chronic=float(row.get("load_chronic") or 0),
+            as_of=date.fromisoformat(row["workload_as_of"])
+        ), today)
+        return state if state.chronic > 0 else None
+    
+    def get_workout_completion_inputs(
+        self,
+        assignment_id: str,
+        athlete_id: str,
+        recent_days: int = 7
+    ) -> Dict:
+        """
+        Everything process_workout_completion reads, in one query
+        (get_workout_completion_inputs RPC): the assignment, the detailed
+        profile, the last recent_days of results (newest first), the
+        stored load EWMA and the assignment's existing result, if any.
+        """
+        try:
+            rows = self.supabase.rpc("get_workout_completion_inputs", {
+                "p_assignment_id": assignment_id,
+                "p_athlete_id": athlete_id,
+                "p_recent_days": recent_days
+            }).execute().data or []
+        except Exception as e:
+            print(f"Error fetching workout completion inputs: {e}")
+            raise
+        return rows[0] if rows else {}
+    
     # =========================================================================
     # ABILITY PROGRESSION OPERATIONS
     # =========================================================================
@@ -475,7 +563,28 @@ class DatabaseIntegration:
     ) -> Dict:
         """Update athlete ability progression"""
         
-        progression_data = {
+        progression_data = self._ability_progression_row(
+            athlete_id, ability_change, workout_result_id, current_ability
+        )
+        
+        try:
+            response = self.supabase.table("ability_progression")\
+                .insert(progression_data)\
+                .execute()
+            return response.data[0]
+        except Exception as e:
+            print(f"Error updating ability progression: {e}")
+            raise
+    
+    @staticmethod
+    def _ability_progression_row(
+        athlete_id: str,
+        ability_change: float,
+        workout_result_id: str,
+        current_ability: AthleteAbility
+    ) -> Dict:
+        """ability_progression row after a workout result"""
+        return {
             "athlete_id": athlete_id,
             "recorded_date": datetime.now().isoformat(),
             "workout_result_id": workout_result_id,
@@ -490,15 +599,6 @@ class DatabaseIntegration:
             "threshold_hr": current_ability.threshold_hr,
             "aerobic_hr": current_ability.aerobic_hr
         }
-        
-        try:
-            response = self.supabase.table("ability_progression")\
-                .insert(progression_data)\
-                .execute()
-            return response.data[0]
-        except Exception as e:
-            print(f"Error updating ability progression: {e}")
-            raise
     
     def get_ability_progression_history(
         self,
@@ -520,6 +620,55 @@ class DatabaseIntegration:
             print(f"Error fetching ability progression: {e}")
             return []
     
+    # =========================================================================
+    # AISRI CHANGE DETECTION
+    # =========================================================================
+
+    def get_aisri_recompute_candidates(
+        self,
+        user_ids: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Dict]]:
+        """
+        Athletes with activities started or edited since their last AISRI calculation.
+
+        One aggregate RPC for all athletes; no activity rows are transferred.
+
+        Returns:
+            Dict of user_id -> {last_calculated_at, last_aisri_score,
+            latest_activity_at, latest_activity_updated_at}, or None if the
+            lookup failed (callers should then treat every athlete as changed)
+        """
+        try:
+            response = self.supabase.rpc(
+                "get_aisri_recompute_candidates",
+                {"p_user_ids": user_ids}
+            ).execute()
+            return {row["user_id"]: row for row in (response.data or [])}
+        except Exception as e:
+            print(f"Error fetching AISRI recompute candidates: {e}")
+            return None
+
+    def get_telegram_chat_ids(self, athlete_ids: List[str]) -> Dict[str, str]:
+        """Map athlete IDs to their Telegram chat IDs (athletes without one are omitted)"""
+        chat_ids = {}
+
+        try:
+            # Chunked: a whole shard's IDs would overflow the request URL
+            for i in range(0, len(athlete_ids), 100):
+                response = self.supabase.table("athletes")\
+                    .select("id, telegram_id")\
+                    .in_("id", athlete_ids[i:i + 100])\
+                    .execute()
+                chat_ids.update({
+                    row["id"]: row["telegram_id"]
+                    for row in (response.data or [])
+                    if row.get("telegram_id")
+                })
+        except Exception as e:
+            print(f"Error fetching Telegram chat IDs: {e}")
+
+        return chat_ids
+
     # =========================================================================
     # INTEGRATED WORKFLOWS
     # =========================================================================
@@ -582,28 +731,31 @@ class DatabaseIntegration:
                 fitness_assessment, signup_data
             )
             
-            for day in range(1, 15):
-                workout = self.workout_generator.generate_next_workout(
-                    athlete_ability=athlete_ability,
-                    performance_history=PerformanceHistory(
-                        last_7_days=[],
-                        last_4_weeks_volume=[signup_data.get("current_weekly_volume_km", 30.0)],
-                        last_3_workouts=[],
-                        consecutive_good_performances=0,
-                        fatigue_indicators=[],
-                        injury_risk_score=0.0
-                    ),
-                    training_phase=(
-                        TrainingPhase.FOUNDATION if fitness_assessment.foundation_phase_needed
-                        else TrainingPhase.BASE_BUILD
-                    ),
-                    week_number=1 if day <= 7 else 2,
-                    day_of_week=((day - 1) % 7) + 1
-                )
-                
-                workout.workout_date = datetime.now() + timedelta(days=day)
-                assignment = self.create_workout_assignment(athlete_id, workout)
-                results["initial_workouts"].append(assignment["id"])
+            # One generator pass and one insert for the whole block; plan
+            # day 1 (tomorrow) takes the Monday slot of the weekly structure
+            workouts = self.workout_generator.generate_block(
+                athlete_ability=athlete_ability,
+                performance_history=PerformanceHistory(
+                    last_7_days=[],
+                    last_4_weeks_volume=[signup_data.get("current_weekly_volume_km", 30.0)],
+                    last_3_workouts=[],
+                    consecutive_good_performances=0,
+                    fatigue_indicators=[],
+                    injury_risk_score=0.0,
+                    workload=self.get_workload_state(athlete_id)
+                ),
+                training_phase=(
+                    TrainingPhase.FOUNDATION if fitness_assessment.foundation_phase_needed
+                    else TrainingPhase.BASE_BUILD
+                ),
+                start_date=datetime.now() + timedelta(days=1),
+                days=14,
+                week_number=1,
+                first_day_of_week=1
+            )
+            
+            assignments = self.create_workout_assignments(athlete_id, workouts)
+            results["initial_workouts"] = [assignment["id"] for assignment in assignments]
             
             return results
             
@@ -621,39 +773,47 @@ class DatabaseIntegration:
         Process workout completion workflow.
         
         Steps:
-        1. Get workout assignment (GIVEN)
+        1. Prefetch assignment (GIVEN), profile, recent results and workload (one read)
         2. Parse workout result (RESULT)
         3. Analyze performance (GIVEN vs RESULT)
-        4. Store workout result and assessment
-        5. Update ability progression
-        6. Generate next workout
+        4. Build the result, ability progression and next workout in memory
+        5. Store all of them in one transaction (complete_workout RPC)
+        
+        A repeated delivery of an already completed assignment writes
+        nothing and returns the stored result (duplicate=True), whether
+        the prefetch sees it or it is stored by a concurrent delivery
+        before complete_workout runs.
         
         Returns:
             Complete workout processing result
         """
         results = {
             "assignment_id": assignment_id,
+            "result_id": None,
             "performance_label": None,
             "ability_change": 0.0,
             "next_workout_id": None,
-            "feedback": []
+            "feedback": [],
+            "duplicate": False
         }
         
         try:
-            # Step 1: Get workout assignment
-            assignment = self.get_workout_assignment(assignment_id)
+            # Step 1: Prefetch everything the analysis reads
+            inputs = self.get_workout_completion_inputs(assignment_id, athlete_id)
+            assignment = inputs.get("assignment")
             if not assignment:
                 raise ValueError(f"Workout assignment {assignment_id} not found")
             
+            completed = inputs.get("completed_result")
+            if completed:
+                return self._duplicate_completion(results, completed)
+            
             # Step 2: Parse workout result
             workout_result = self._dict_to_workout_result(workout_data)
             
-            # Step 3: Create workout target from assignment
-            workout_target = self._assignment_to_workout_target(assignment)
-            
-            # Step 4: Analyze performance
+            # Step 3: Analyze performance
             assessment = self.performance_tracker.assess_workout_performance(
-                given=workout_target,
+                given=self._assignment_to_workout_target(assignment),
                 result=workout_result
             )
             
@@ -661,43 +821,69 @@ class DatabaseIntegration:
             results["ability_change"] = assessment.ability_change
             results["feedback"] = assessment.key_feedback
             
-            # Step 5: Store result and assessment
-            stored_result = self.store_workout_result(
-                assignment_id, athlete_id, workout_result, assessment
-            )
+            # Step 4: Rows to store, linked by client-generated ids
+            result_row = {
+                "id": str(uuid.uuid4()),
+                **self._workout_result_row(assignment_id, athlete_id, workout_result, assessment)
+            }
             
-            # Step 6: Update ability progression
-            athlete_profile = self.get_athlete_profile(athlete_id)
+            athlete_profile = inputs.get("profile") or {}
             current_ability = self._profile_to_athlete_ability(athlete_profile)
-            
-            self.update_ability_progression(
-                athlete_id,
-                assessment.ability_change,
-                stored_result["id"],
-                current_ability
+            progression_row = self._ability_progression_row(
+                athlete_id, assessment.ability_change, result_row["id"], current_ability
             )
             
-            # Step 7: Generate next workout
-            recent_results = self.get_athlete_workout_results(athlete_id, days=7)
-            performance_history = self._create_performance_history(recent_results)
+            # The new result is the most recent one
+            performance_history = self._create_performance_history(
+                [result_row] + (inputs.get("recent_results") or []),
+                self._workload_from_inputs(inputs, datetime.now().date())
+            )
             
             next_workout = self.workout_generator.generate_next_workout(
                 athlete_ability=current_ability,
                 performance_history=performance_history,
                 training_phase=TrainingPhase.SPEED_BUILD,  # Would come from training plan
-                week_number=self._calculate_week_number(athlete_id),
+                week_number=self._week_number_from_profile(inputs.get("profile")),
                 day_of_week=((datetime.now().weekday() + 2) % 7) + 1
             )
+            next_row = {
+                "id": str(uuid.uuid4()),
+                **self._workout_assignment_row(athlete_id, next_workout)
+            }
+            
+            # Step 5: One transaction
+            stored = self.supabase.rpc("complete_workout", {
+                "p_assignment_id": assignment_id,
+                "p_result": result_row,
+                "p_progression": progression_row,
+                "p_next_assignment": next_row
+            }).execute().data[0]
             
-            next_assignment = self.create_workout_assignment(athlete_id, next_workout)
-            results["next_workout_id"] = next_assignment["id"]
+            if stored["duplicate"]:
+                # Lost a race with a concurrent delivery: report what it stored
+                return self._duplicate_completion(results, stored["stored_result"])
             
+            results["result_id"] = stored["result_id"]
+            results["next_workout_id"] = stored["next_assignment_id"]
             return results
             
         except Exception as e:
             print(f"Error processing workout completion: {e}")
             raise
     
+    @staticmethod
+    def _duplicate_completion(results: Dict, stored_result: Dict) -> Dict:
+        """Completion result for an assignment whose result is already stored"""
+        feedback = stored_result.get("key_feedback") or []
+        results.update({
+            "result_id": stored_result["id"],
+            "performance_label": stored_result.get("performance_label"),
+            "ability_change": stored_result.get("ability_change") or 0.0,
+            "feedback": json.loads(feedback) if isinstance(feedback, str) else feedback,
+            "duplicate": True
+        })
+        return results
+    
     # =========================================================================
     # HELPER METHODS
     # =========================================================================
@@ -746,7 +932,8 @@ class DatabaseIntegration:
             notes=assignment.get("workout_notes", "")
         )
     
-    def _profile_to_athlete_ability(self, profile: Dict) -> AthleteAbility:
+    @staticmethod
+    def _profile_to_athlete_ability(profile: Dict) -> AthleteAbility:
         """Convert profile dict to AthleteAbility"""
         # Would extract ability metrics from profile
         return AthleteAbility(
@@ -761,8 +948,12 @@ class DatabaseIntegration:
             fitness_score=65.0
         )
     
-    def _create_performance_history(self, recent_results: List[Dict]) -> PerformanceHistory:
-        """Create PerformanceHistory from recent workout results"""
+    @staticmethod
+    def _create_performance_history(
+        recent_results: List[Dict],
+        workload: Optional[WorkloadState] = None
+    ) -> PerformanceHistory:
+        """Create PerformanceHistory from recent workout results and the stored workload"""
         last_7_labels = [r["performance_label"] for r in recent_results[:7]]
         
         # Calculate weekly volumes
@@ -775,7 +966,8 @@ class DatabaseIntegration:
             last_3_workouts=recent_results[:3],
             consecutive_good_performances=len([l for l in last_7_labels if l in ["GREAT", "BEST"]]),
             fatigue_indicators=[],
-            injury_risk_score=0.0
+            injury_risk_score=0.0,
+            workload=workload
         )
     
     def _generate_initial_fitness_assessment(
@@ -816,12 +1008,16 @@ class DatabaseIntegration:
     
     def _calculate_week_number(self, athlete_id: str) -> int:
         """Calculate current week number in training plan"""
-        profile = self.get_athlete_profile(athlete_id)
+        return self._week_number_from_profile(self.get_athlete_profile(athlete_id))
+    
+    @staticmethod
+    def _week_number_from_profile(profile: Optional[Dict], now: Optional[datetime] = None) -> int:
+        """Week number in the training plan, counted from the profile's signup date"""
         if not profile:
             return 1
         
         signup_date = datetime.fromisoformat(profile["signup_date"])
-        days_since_signup = (datetime.now() - signup_date).days
+        days_since_signup = ((now or datetime.now()) - signup_date).days
         return (days_since_signup // 7) + 1
 
 
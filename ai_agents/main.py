@@ -1,11 +1,13 @@
+import json
 import os
 from datetime import datetime
-from typing import Any, Optional
+from typing import Any, List, Optional
 
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from system_guardian import run_integrity_checks
 
@@ -129,11 +131,27 @@ async def startup_event():
             print(f'Orchestrator init failed: {e}')
             import sys
             sys.exit(1)  # Orchestrator failure is fatal
+        
+        # Index every athlete's structural state once instead of on first request
+        try:
+            indexed = orchestrator.safety_gate.structural_index.load_all()
+            print(f'Structural index loaded: {indexed} athletes')
+        except Exception as e:
+            print(f'Structural index preload failed (loading on demand): {e}')
     else:
         print('WARNING: Orchestrator module not available (_ORCHESTRATOR_OK=False)')
     print('AISRI ENGINE READY')
     print('='*70)
 
+@app.on_event('shutdown')
+async def shutdown_event():
+    # Write out safety decisions still in the audit buffer
+    if orchestrator is not None:
+        try:
+            await orchestrator.close()
+        except Exception as e:
+            print(f'Safety audit flush on shutdown failed: {e}')
+
 
 
 class CommanderRequest(BaseModel):
@@ -153,6 +171,19 @@ class TrainingPlanRequest(BaseModel):
     athlete_id: str
 
 
+class PlanRiskRequest(BaseModel):
+    athlete_id: str
+    planned_minutes: List[float] = Field(..., min_length=1, max_length=84)
+    n_simulations: int = Field(2000, ge=100, le=20000)
+    adherence: float = Field(0.9, ge=0.0, le=1.0)
+
+
+class SquadPlanRequest(BaseModel):
+    coach_id: Optional[str] = None
+    athlete_ids: Optional[List[str]] = None
+    supersede: bool = True
+
+
 class PerformancePredictionRequest(BaseModel):
     athlete_id: str
 
@@ -372,6 +403,31 @@ def generate_training_plan(request: TrainingPlanRequest):
     return result
 
 
+@app.post("/agent/regenerate-squad-plans")
+def regenerate_squad_plans(request: SquadPlanRequest):
+    """
+    Regenerate weekly training plans for a coach's squad and/or an athlete
+    list in one batch: one read for all inputs, one transaction for all
+    plans. With supersede (default), each athlete's current active plan is
+    cancelled and its remaining scheduled workouts are removed.
+    """
+    if request.coach_id is None and not request.athlete_ids:
+        raise HTTPException(status_code=400, detail="coach_id or athlete_ids required")
+
+    from ai_engine_agent.adaptive_training_plan_agent import AISRiAdaptiveTrainingPlanAgent
+
+    agent = AISRiAdaptiveTrainingPlanAgent()
+
+    try:
+        return agent.generate_plans(
+            athlete_ids=request.athlete_ids,
+            coach_id=request.coach_id,
+            supersede=request.supersede
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.post("/agent/predict-performance")
 def predict_performance(request: PerformancePredictionRequest):
     """
@@ -401,7 +457,15 @@ def autonomous_decision(request: AutonomousDecisionRequest):
     - Recent training load (last 7 days)
     
     Returns: Decision (REST, RECOVERY, INTENSIFY, TRAIN, LIGHT_TRAIN) with reason
+
+    Served from the precomputed daily readiness record when available.
     """
+    if orchestrator is not None:
+        try:
+            return orchestrator.readiness.get(request.athlete_id).to_decision_response()
+        except Exception as e:
+            print(f'Readiness lookup failed, deciding live: {e}')
+
     from ai_engine_agent.autonomous_decision_agent import AISRiAutonomousDecisionAgent
 
     agent = AISRiAutonomousDecisionAgent()
@@ -624,6 +688,69 @@ async def safety_status(athlete_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get('/safety/envelope/{athlete_id}')
+async def safety_envelope(
+    athlete_id: str,
+    workout_types: Optional[str] = Query(None, description='Comma-separated workout types (default: all in rule table)'),
+    intensities: Optional[str] = Query(None, description='Comma-separated intensities (default: all in rule table)')
+):
+    '''
+    Full admissible workout envelope for an athlete in one call.
+    Returns every intensity x workout type with pass/fail, reasons and
+    the maximum safe duration (solved from the volume-progression limit).
+    '''
+    try:
+        return await orchestrator.get_safety_envelope(
+            athlete_id,
+            workout_types=[t.strip() for t in workout_types.split(',') if t.strip()] if workout_types else None,
+            intensities=[i.strip() for i in intensities.split(',') if i.strip()] if intensities else None
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/safety/structural-states')
+async def structural_states(
+    athlete_ids: Optional[str] = Query(None, description='Comma-separated athlete IDs'),
+    group_id: Optional[str] = Query(None, description='Coach ID: include all active athletes of the coach')
+):
+    '''
+    RED/YELLOW/GREEN structural state, score and speed permission for a
+    squad. Streams one JSON object per line (NDJSON) so large groups start
+    rendering before the last page is read.
+    '''
+    ids = [a.strip() for a in athlete_ids.split(',') if a.strip()] if athlete_ids else None
+    if not ids and not group_id:
+        raise HTTPException(status_code=400, detail='Provide athlete_ids or group_id')
+
+    def generate():
+        for page in orchestrator.iter_structural_states(athlete_ids=ids, group_id=group_id):
+            for row in page:
+                yield json.dumps(row) + '\n'
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+@app.get('/readiness/{athlete_id}')
+def daily_readiness(athlete_id: str):
+    '''
+    Today's readiness: safety status, structural state, speed permission and
+    training decision. Precomputed nightly; recomputed only after new data.
+    '''
+    try:
+        return orchestrator.get_daily_readiness(athlete_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get('/safety/audit/counters')
+async def safety_audit_counters():
+    '''
+    Safety decisions since startup: checks, blocks, blocks per gate and the
+    state of the batched audit writer (buffered / written / dropped).
+    '''
+    try:
+        return orchestrator.get_safety_audit_counters()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post('/safety/check-workout')
 async def check_workout_safety(
     athlete_id: str = Query(...),
@@ -668,6 +795,23 @@ async def generate_safe_workout(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post('/workout/plan-risk')
+def plan_risk(request: PlanRiskRequest):
+    '''
+    Monte Carlo load-risk projection for a proposed plan (planned minutes
+    per day from tomorrow, 0 on rest days). Returns ACWR percentile bands
+    per day and the probability of crossing the high-risk threshold.
+    '''
+    try:
+        return orchestrator.project_plan_risk(
+            request.athlete_id,
+            request.planned_minutes,
+            n_simulations=request.n_simulations,
+            adherence=request.adherence
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # =====================================================
 # SYSTEM ENDPOINTS
 # =====================================================
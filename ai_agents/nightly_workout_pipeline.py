@@ -0,0 +1,436 @@
+"""
+Nightly Workout Pipeline
+Generates the next day's workout for every active athlete in bulk.
+
+Workouts used to be generated one athlete at a time on the request path
+(process_workout_completion, /workout/generate-safe). This pipeline runs
+the whole population once a night, page by page:
+
+1. Load      - one get_nightly_workout_inputs call per page (profile
+               ability fields, last week's performance labels, stored load
+               EWMA, existing assignment) and one get_safety_gate_inputs
+               call; structural states come from the shared index
+2. Filter    - every candidate session type is checked for every athlete
+               against the safety gates and the structural rules as one
+               (athletes x types) array operation
+3. Generate  - AdaptiveWorkoutGenerator in a process pool, in chunks. A
+               planned session that is not permitted is replaced by the
+               first permitted of easy, recovery, mobility; athletes
+               cleared for none of them get a rest day
+4. Store     - one multi-row workout_assignments insert per page
+
+Generation of one page overlaps with loading and filtering the next.
+Athletes that already have an assignment on the target day are skipped,
+so the run can be repeated safely.
+
+Features:
+- Keyset-paginated streaming (constant memory for any population)
+- Vectorized gate and structural filtering
+- Per-stage timings and athletes/second in a NightlyRunReport
+
+Usage:
+    # Nightly (cron, after the ledger, AISRi and structural updates)
+    python nightly_workout_pipeline.py
+    0 5 * * * cd /path/to/ai_agents && python nightly_workout_pipeline.py
+
+    pipeline = NightlyWorkoutPipeline(db)
+    report = pipeline.run()                 # tomorrow, every active athlete
+    report.to_dict()
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from adaptive_workout_generator import AdaptiveWorkoutGenerator, AthleteAbility, GeneratedWorkout, PerformanceHistory, TrainingPhase
+from aisri_safety_gate import AISRISafetyGate
+from database_integration import DatabaseIntegration
+from training_load_ledger import TrainingLoadLedger
+
+logger = logging.getLogger(__name__)
+
+
+PAGE_SIZE = 1000
+CHUNK_SIZE = 250  # Athletes per process-pool task
+ACTIVE_DAYS = 28  # Athletes with training load in this window get a workout
+
+# Session types the generator can produce; each is its own gate intensity
+CANDIDATE_TYPES = ('interval', 'threshold', 'tempo', 'long', 'easy', 'recovery', 'strength', 'mobility')
+# Replacements for a blocked session, in order of preference
+STEP_DOWN_TYPES = ('easy', 'recovery', 'mobility')
+
+# Training phase until plans carry one (as process_workout_completion)
+DEFAULT_PHASE = TrainingPhase.SPEED_BUILD
+
+
+@dataclass
+class GenerationTask:
+    """One athlete's generator inputs (pickled to the worker processes)"""
+    athlete_id: str
+    ability: AthleteAbility
+    history: PerformanceHistory
+    week_number: int
+    permitted: Tuple[str, ...]
+
+
+@dataclass
+class NightlyRunReport:
+    """Throughput and outcome of one pipeline run"""
+    day: str
+    workers: int = 0
+    pages: int = 0
+    failed_pages: int = 0
+    athletes: int = 0               # Athletes read
+    assigned: int = 0               # Assignments written
+    already_assigned: int = 0       # Skipped: target day already has one
+    stepped_down: int = 0           # Planned session blocked, replacement assigned
+    rest_days: int = 0              # No permitted session
+    by_type: Dict[str, int] = field(default_factory=dict)
+    # Wall time per stage; with a pool, 'generate' is time spent waiting on it
+    stage_seconds: Dict[str, float] = field(
+        default_factory=lambda: {'load': 0.0, 'filter': 0.0, 'generate': 0.0, 'store': 0.0}
+    )
+    elapsed_seconds: float = 0.0
+
+    @property
+    def athletes_per_second(self) -> float:
+        return self.athletes / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'day': self.day,
+            'workers': self.workers,
+            'pages': self.pages,
+            'failed_pages': self.failed_pages,
+            'athletes': self.athletes,
+            'assigned': self.assigned,
+            'already_assigned': self.already_assigned,
+            'stepped_down': self.stepped_down,
+            'rest_days': self.rest_days,
+            'by_type': dict(self.by_type),
+            'stage_seconds': {k: round(v, 3) for k, v in self.stage_seconds.items()},
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'athletes_per_second': round(self.athletes_per_second, 1)
+        }
+
+
+class NightlyWorkoutPipeline:
+    """Population-wide next-day workout generation"""
+
+    def __init__(
+        self,
+        database: DatabaseIntegration,
+        safety_gate: Optional[AISRISafetyGate] = None,
+        workers: Optional[int] = None,
+        training_phase: TrainingPhase = DEFAULT_PHASE
+    ):
+        """
+        Args:
+            database: DatabaseIntegration (its supabase client is used)
+            safety_gate: Gate whose rules and structural index filter sessions
+            workers: Generator processes (default: CPU count; 0 or 1 runs
+                in this process)
+            training_phase: Phase passed to the generator
+        """
+        self.db = database
+        self.supabase = database.supabase
+        self.safety_gate = safety_gate or AISRISafetyGate(database)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.training_phase = training_phase
+
+    # =========================================================================
+    # RUN
+    # =========================================================================
+
+    def run(
+        self,
+        day: Optional[date] = None,
+        athlete_ids: Optional[List[str]] = None,
+        page_size: int = PAGE_SIZE
+    ) -> NightlyRunReport:
+        """
+        Generate and store one workout per athlete for a day.
+
+        Args:
+            day: Target day (default: tomorrow, UTC)
+            athlete_ids: Restrict to these athletes (default: every active athlete)
+            page_size: Athletes per page
+
+        Returns:
+            NightlyRunReport
+        """
+        day = day or _today() + timedelta(days=1)
+        report = NightlyRunReport(day=day.isoformat(), workers=self.workers)
+        started = time.perf_counter()
+
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            pages = self._iter_inputs(day, athlete_ids, page_size)
+            pending = None
+            while True:
+                with _stage(report, 'load'):
+                    page = next(pages, None)
+                if page is None:
+                    break
+                report.pages += 1
+                report.athletes += len(page)
+
+                try:
+                    tasks = self.prepare(page, day, report)
+                    futures = self._submit(pool, tasks, day, report)
+                except Exception as e:
+                    report.failed_pages += 1
+                    logger.error(f"Nightly workouts: page after {page[0]['athlete_id']} failed: {e}")
+                    continue
+
+                if pending:
+                    self._finish(pending, report)
+                pending = futures
+            if pending:
+                self._finish(pending, report)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        report.elapsed_seconds = time.perf_counter() - started
+        logger.info(f"Nightly workouts generated: {report.to_dict()}")
+        return report
+
+    # =========================================================================
+    # STAGES
+    # =========================================================================
+
+    def prepare(self, rows: List[Dict], day: date, report: NightlyRunReport) -> List[GenerationTask]:
+        """Generation tasks for a page of get_nightly_workout_inputs rows"""
+        report.already_assigned += sum(1 for row in rows if row.get('has_assignment'))
+        rows = [row for row in rows if not row.get('has_assignment')]
+        ids = [str(row['athlete_id']) for row in rows]
+        if not rows:
+            return []
+
+        with _stage(report, 'load'):
+            gate_inputs = self.safety_gate.fetch_gate_inputs(ids)
+            states = self.safety_gate.structural_index.states_for(ids)
+
+        with _stage(report, 'filter'):
+            permitted = self.permitted_types([gate_inputs[a] for a in ids], [states[a] for a in ids])
+
+        today = day - timedelta(days=1)
+        now = datetime.combine(day, datetime.min.time())
+        tasks = []
+        for i, row in enumerate(rows):
+            allowed = tuple(t for t, ok in zip(CANDIDATE_TYPES, permitted[i]) if ok)
+            if not any(t in allowed for t in STEP_DOWN_TYPES):
+                report.rest_days += 1
+                continue
+            profile = row.get('profile') or {}
+            tasks.append(GenerationTask(
+                athlete_id=ids[i],
+                ability=DatabaseIntegration._profile_to_athlete_ability(profile),
+                history=DatabaseIntegration._create_performance_history(
+                    row.get('recent_results') or [], DatabaseIntegration._workload_from_inputs(row, today)
+                ),
+                week_number=DatabaseIntegration._week_number_from_profile(profile, now),
+                permitted=allowed
+            ))
+        return tasks
+
+    def permitted_types(self, gate_inputs: Sequence, structural_states: Sequence[str]) -> np.ndarray:
+        """
+        (athletes x CANDIDATE_TYPES) boolean matrix: session type passes
+        every safety gate and the structural rules. The volume gate needs a
+        duration and is left to the generator's ACWR-capped progression.
+        """
+        rules = self.safety_gate.rules.current()
+        n, k = len(gate_inputs), len(CANDIDATE_TYPES)
+
+        aisri = np.full(n, np.nan)
+        recovery = np.full(n, np.nan)
+        injury_risk = np.full(n, 50.0)  # Neutral when no prediction
+        consecutive_hard = np.zeros(n)
+        has_profile = np.zeros(n, dtype=bool)
+        for i, record in enumerate(gate_inputs):
+            # Read as AISRISafetyGate.evaluate_gates_batch does
+            if record.latest_aisri:
+                aisri[i] = record.latest_aisri.get('aisri_score', 0) or 0
+                pillar_recovery = record.latest_aisri.get('pillar_recovery')
+                recovery[i] = 70 if pillar_recovery is None else pillar_recovery
+            if record.latest_injury_prediction:
+                injury_risk[i] = record.latest_injury_prediction.get('risk_score', 50)
+            consecutive_hard[i] = TrainingLoadLedger.consecutive_hard_days(record.recent_days)
+            has_profile[i] = record.has_profile
+
+        checks = rules.evaluate_gate_codes(
+            rules.intensity_codes(CANDIDATE_TYPES)[None, :],
+            aisri[:, None], injury_risk[:, None], recovery[:, None], consecutive_hard[:, None],
+            np.nan
+        )
+        structural = rules.evaluate_structural(
+            np.repeat(np.asarray(structural_states, dtype=object), k),
+            CANDIDATE_TYPES * n,
+            CANDIDATE_TYPES * n
+        )
+        return (
+            checks.aisri & checks.injury_risk & checks.recovery & checks.consecutive_days
+            & structural['type_allowed'].reshape(n, k)
+            & structural['intensity_allowed'].reshape(n, k)
+            & has_profile[:, None]
+        )
+
+    def _submit(self, pool, tasks: List[GenerationTask], day: date, report: NightlyRunReport) -> List[Future]:
+        """Chunked generation: pool futures, or already-resolved futures without a pool"""
+        futures = []
+        for i in range(0, len(tasks), CHUNK_SIZE):
+            chunk = tasks[i:i + CHUNK_SIZE]
+            if pool:
+                futures.append(pool.submit(generate_chunk, chunk, day, self.training_phase))
+                continue
+            future = Future()
+            with _stage(report, 'generate'):
+                future.set_result(generate_chunk(chunk, day, self.training_phase))
+            futures.append(future)
+        return futures
+
+    def _finish(self, futures: List[Future], report: NightlyRunReport):
+        """Collect a page's workouts and store them with one insert"""
+        try:
+            with _stage(report, 'generate'):
+                generated = [item for future in futures for item in future.result()]
+
+            rows = []
+            for athlete_id, workout, stepped_down in generated:
+                if workout is None:
+                    report.rest_days += 1
+                    continue
+                report.stepped_down += int(stepped_down)
+                rows.append(DatabaseIntegration._workout_assignment_row(athlete_id, workout))
+
+            with _stage(report, 'store'):
+                if rows:
+                    self.supabase.table('workout_assignments').insert(rows).execute()
+        except Exception as e:
+            report.failed_pages += 1
+            logger.error(f"Nightly workouts: storing a page failed: {e}")
+            return
+
+        report.assigned += len(rows)
+        for row in rows:
+            report.by_type[row['workout_type']] = report.by_type.get(row['workout_type'], 0) + 1
+
+    def _iter_inputs(
+        self,
+        day: date,
+        athlete_ids: Optional[List[str]] = None,
+        page_size: int = PAGE_SIZE
+    ) -> Iterator[List[Dict]]:
+        """Pages of get_nightly_workout_inputs rows (every active athlete if no ids)"""
+        after = None
+        while True:
+            page = self.supabase.rpc('get_nightly_workout_inputs', {
+                'p_athlete_ids': [str(a) for a in athlete_ids] if athlete_ids is not None else None,
+                'p_day': day.isoformat(),
+                'p_active_days': ACTIVE_DAYS,
+                'p_after': after,
+                'p_limit': page_size
+            }).execute().data or []
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = page[-1]['athlete_id']
+
+
+# =============================================================================
+# WORKER (runs in the pool processes)
+# =============================================================================
+
+def generate_chunk(
+    tasks: List[GenerationTask],
+    day: date,
+    training_phase: TrainingPhase
+) -> List[Tuple[str, Optional[GeneratedWorkout], bool]]:
+    """
+    One workout per task for the day: (athlete_id, workout or None for a
+    rest day, whether the planned session was replaced)
+    """
+    generator = AdaptiveWorkoutGenerator()
+    slot = day.isoweekday()
+    results = []
+    for task in tasks:
+        workout = _generate(generator, task, day, training_phase)
+        if workout.workout_type in task.permitted:
+            results.append((task.athlete_id, workout, False))
+            continue
+
+        replacement = next((t for t in STEP_DOWN_TYPES if t in task.permitted), None)
+        if replacement is None:
+            results.append((task.athlete_id, None, True))
+            continue
+        workout = _generate(generator, task, day, training_phase, {slot: replacement})
+        results.append((task.athlete_id, workout, True))
+    return results
+
+
+def _generate(
+    generator: AdaptiveWorkoutGenerator,
+    task: GenerationTask,
+    day: date,
+    training_phase: TrainingPhase,
+    weekly_plan_structure: Optional[Dict] = None
+) -> GeneratedWorkout:
+    return generator.generate_block(
+        athlete_ability=task.ability,
+        performance_history=task.history,
+        training_phase=training_phase,
+        start_date=day,
+        days=1,
+        week_number=task.week_number,
+        weekly_plan_structure=weekly_plan_structure
+    )[0]
+
+
+# =============================================================================
+# HELPERS
+# =============================================================================
+
+class _stage:
+    """Adds the time spent in a with-block to report.stage_seconds[name]"""
+
+    def __init__(self, report: NightlyRunReport, name: str):
+        self.report = report
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.report.stage_seconds[self.name] += time.perf_counter() - self.started
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+# ═══════════════════════════════════════════════════════════════════════
+# Script Entry Point
+# ═══════════════════════════════════════════════════════════════════════
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    report = NightlyWorkoutPipeline(DatabaseIntegration()).run()
+    sys.exit(1 if report.failed_pages > 0 else 0)
@@ -0,0 +1,292 @@
+"""
+Notification Dispatcher
+Rate-limited outbound queue for Telegram notifications
+
+Features:
+- Non-blocking enqueue: producers never wait on Telegram I/O
+- Global + per-chat token buckets (Telegram: ~30 msg/s bot-wide, ~1 msg/s per chat)
+- Coalesces pending messages to the same chat into one message
+  (whole messages only; the oldest are dropped, and counted in
+  stats['dropped'], if they don't all fit)
+- Retries 429 responses after Telegram's retry_after, 5xx with backoff
+- One shared HTTP client for connection reuse
+
+Usage:
+    dispatcher = NotificationDispatcher()
+    dispatcher.start()
+
+    dispatcher.enqueue(chat_id, "Your AISRI score changed")   # returns immediately
+    ...
+    await dispatcher.close()   # delivers everything queued, then stops workers
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from telegram_handler_v2 import TelegramHandler
+
+logger = logging.getLogger(__name__)
+
+
+TELEGRAM_GLOBAL_RATE = 25        # msg/s, kept under Telegram's ~30/s bot limit
+TELEGRAM_PER_CHAT_RATE = 1       # msg/s to a single chat
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+COALESCE_SEPARATOR = "\n\n───\n\n"
+
+
+class TokenBucket:
+    """
+    Async token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`;
+    acquire() waits until a token is available.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait for and take one token"""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so nothing is sent for `seconds` (used after a 429)"""
+        self._refill()
+        self._tokens = min(self._tokens, 0) - seconds * self.rate
+
+
+class NotificationDispatcher:
+    """
+    Queue + worker pool that delivers Telegram messages within rate limits.
+    """
+
+    def __init__(
+        self,
+        send: Optional[Callable[..., Awaitable]] = None,
+        global_rate: float = TELEGRAM_GLOBAL_RATE,
+        per_chat_rate: float = TELEGRAM_PER_CHAT_RATE,
+        max_retries: int = 5
+    ):
+        """
+        Args:
+            send: async (chat_id, text, client) -> httpx.Response | None
+                  (defaults to TelegramHandler.send)
+            global_rate: Messages per second across all chats
+            per_chat_rate: Messages per second to a single chat
+            max_retries: Attempts per message before giving up
+        """
+        self._send = send or TelegramHandler.send
+        self._global_bucket = TokenBucket(global_rate)
+        self._per_chat_rate = per_chat_rate
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self.max_retries = max_retries
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[str, List[str]] = {}
+        self._workers: List[asyncio.Task] = []
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.stats = {
+            'enqueued': 0,
+            'coalesced': 0,
+            'sent': 0,
+            'retried': 0,
+            'failed': 0,
+            'dropped': 0
+        }
+        self.undelivered: List[tuple] = []   # (chat_id, text) left by a close() timeout
+
+    # =========================================================================
+    # LIFECYCLE
+    # =========================================================================
+
+    def start(self, concurrency: int = 4):
+        """Start worker tasks on the running event loop (idempotent)"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self._client = httpx.AsyncClient(timeout=10)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"notification-worker-{i}")
+            for i in range(concurrency)
+        ]
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait until every queued message has been delivered or dropped"""
+        if self._queue is None:
+            return
+        await asyncio.wait_for(self._queue.join(), timeout)
+
+    async def close(self, timeout: Optional[float] = None):
+        """
+        Deliver everything queued, then stop workers and the HTTP client.
+
+        Waits as long as the rate limits require by default. With a timeout,
+        messages still queued when it expires are kept in `undelivered`
+        and counted as dropped.
+        """
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            self.undelivered = [
+                (chat_key, text)
+                for chat_key, texts in self._pending.items()
+                for text in texts
+            ]
+            self._pending.clear()
+            self.stats['dropped'] += len(self.undelivered)
+            logger.warning(f"Notification queue not drained after {timeout}s; dropped "
+                           f"{len(self.undelivered)} messages to {len({c for c, _ in self.undelivered})} chats")
+        finally:
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+            if self._client is not None:
+                await self._client.aclose()
+                self._client = None
+
+    # =========================================================================
+    # PRODUCER SIDE
+    # =========================================================================
+
+    def enqueue(self, chat_id, text: str):
+        """
+        Queue a message without waiting.
+
+        If a message to the same chat is still waiting to be sent, the new
+        text is merged into it instead of producing another send.
+        """
+        if self._queue is None:
+            self.start()
+
+        chat_key = str(chat_id)
+        self.stats['enqueued'] += 1
+
+        if chat_key in self._pending:
+            self._pending[chat_key].append(text)
+            self.stats['coalesced'] += 1
+            return
+
+        self._pending[chat_key] = [text]
+        self._queue.put_nowait(chat_key)
+
+    # =========================================================================
+    # DELIVERY
+    # =========================================================================
+
+    async def _worker(self):
+        while True:
+            chat_key = await self._queue.get()
+            try:
+                texts = self._pending.pop(chat_key, [])
+                if texts:
+                    text, dropped = self._coalesce(texts)
+                    if dropped:
+                        self.stats['dropped'] += dropped
+                        logger.warning(f"Dropped {dropped} older notification(s) to {chat_key} "
+                                       f"that did not fit in one message")
+                    await self._deliver(chat_key, text)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"Notification to {chat_key} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _coalesce(texts: List[str]) -> Tuple[str, int]:
+        """
+        Merge queued texts into one message within Telegram's length limit.
+
+        Keeps the newest whole messages (they supersede older ones); only a
+        single message that is itself too long is cut.
+
+        Returns:
+            (message, number of older texts left out)
+        """
+        kept = []
+        length = 0
+        for text in reversed(texts):
+            added = len(text) + (len(COALESCE_SEPARATOR) if kept else 0)
+            if kept and length + added > TELEGRAM_MAX_MESSAGE_LENGTH:
+                break
+            kept.append(text)
+            length += added
+        message = COALESCE_SEPARATOR.join(reversed(kept))[:TELEGRAM_MAX_MESSAGE_LENGTH]
+        return message, len(texts) - len(kept)
+
+    def _chat_bucket(self, chat_key: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_key)
+        if bucket is None:
+            bucket = TokenBucket(self._per_chat_rate, capacity=1)
+            self._chat_buckets[chat_key] = bucket
+        return bucket
+
+    async def _deliver(self, chat_key: str, text: str):
+        chat_bucket = self._chat_bucket(chat_key)
+
+        for attempt in range(self.max_retries):
+            await chat_bucket.acquire()
+            await self._global_bucket.acquire()
+
+            response = await self._send(chat_key, text, client=self._client)
+
+            if response is None:
+                # Handler already logged (missing token or transport error)
+                self.stats['failed'] += 1
+                return
+
+            if response.status_code == 429:
+                retry_after = self._retry_after(response)
+                logger.warning(f"Telegram rate limit hit; retrying {chat_key} in {retry_after}s")
+                self._global_bucket.pause(retry_after)
+                self.stats['retried'] += 1
+                await asyncio.sleep(retry_after)
+                continue
+
+            if response.status_code >= 500:
+                self.stats['retried'] += 1
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            if response.status_code >= 400:
+                logger.warning(f"Telegram rejected message to {chat_key}: "
+                               f"{response.status_code} {response.text[:200]}")
+                self.stats['failed'] += 1
+                return
+
+            self.stats['sent'] += 1
+            return
+
+        logger.error(f"Giving up on message to {chat_key} after {self.max_retries} attempts")
+        self.stats['failed'] += 1
+
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Seconds to wait from a 429 body (parameters.retry_after) or header"""
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except Exception:
+            try:
+                return float(response.headers.get('Retry-After', 1))
+            except (TypeError, ValueError):
+                return 1.0
@@ -21,6 +21,7 @@ Usage:
     workout = await orchestrator.generate_safe_workout(athlete_id, 'interval', 60)
 """
 
+from dataclasses import asdict
 from typing import Dict, Optional, List
 from datetime import datetime
 
@@ -28,6 +29,7 @@ from database_integration import DatabaseIntegration
 from strava_oauth_service import StravaOAuthService
 from aisri_safety_gate import AISRISafetyGate
 from aisri_auto_calculator import AISRIAutoCalculator
+from workout_templates import WorkoutTemplate
 
 
 class AISRiOrchestrator:
@@ -42,6 +44,7 @@ class AISRiOrchestrator:
         # Initialize services
         self.strava_oauth = StravaOAuthService(self.db)
         self.safety_gate = AISRISafetyGate(self.db)
+        self._readiness = None  # DailyReadiness, created on first use
         self.aisri_calculator = AISRIAutoCalculator  # Static class, no instantiation needed
         
         print("✅ AISRi Orchestrator initialized")
@@ -184,6 +187,57 @@ class AISRiOrchestrator:
         """Get overall safety status for athlete"""
         return await self.safety_gate.get_safety_summary(athlete_id)
     
+    async def get_safety_envelope(
+        self,
+        athlete_id: str,
+        workout_types: Optional[List[str]] = None,
+        intensities: Optional[List[str]] = None
+    ) -> Dict:
+        """Every intensity x workout type option with pass/fail and max safe duration"""
+        return await self.safety_gate.get_safety_envelope(athlete_id, workout_types, intensities)
+    
+    def iter_structural_states(
+        self,
+        athlete_ids: Optional[List[str]] = None,
+        group_id: Optional[str] = None
+    ):
+        """Pages of structural score/state/speed permission for a squad"""
+        return self.safety_gate.iter_structural_states(athlete_ids, group_id)
+    
+    @property
+    def readiness(self):
+        """Precomputed daily readiness (athlete_readiness)"""
+        if self._readiness is None:
+            from daily_readiness import DailyReadiness
+            self._readiness = DailyReadiness(self.db, self.safety_gate)
+        return self._readiness
+    
+    def get_daily_readiness(self, athlete_id: str) -> Dict:
+        """Today's readiness record (recomputed only when invalidated)"""
+        return asdict(self.readiness.get(athlete_id))
+    
+    def get_safety_audit_counters(self) -> Dict:
+        """Safety decisions, blocks per gate and audit writer health"""
+        return self.safety_gate.audit_log.counters()
+    
+    def project_plan_risk(
+        self,
+        athlete_id: str,
+        planned_minutes: List[float],
+        n_simulations: int = 2000,
+        adherence: float = 0.9
+    ) -> Dict:
+        """ACWR percentile bands and high-risk probability of a proposed plan"""
+        from load_risk_simulator import LoadRiskSimulator
+        
+        state = self.safety_gate.workload.get_state(athlete_id, metric='minutes')
+        simulator = LoadRiskSimulator(n_simulations=n_simulations, adherence=adherence)
+        return {'athlete_id': athlete_id, **simulator.simulate(state, planned_minutes).to_dict()}
+    
+    async def close(self):
+        """Flush buffered safety audit entries"""
+        await self.safety_gate.audit_log.close()
+    
     # =====================================================
     # WORKOUT GENERATION WORKFLOWS
     # =====================================================
@@ -333,7 +387,7 @@ class AISRiOrchestrator:
     
     async def _apply_ai_adjustments(
         self,
-        template: Dict,
+        template: WorkoutTemplate,
         athlete_id: str,
         duration_minutes: int,
         safety_data: Dict,
@@ -343,7 +397,7 @@ class AISRiOrchestrator:
         Apply AI adjustments to template within constraints.
         
         Args:
-            template: Base template from structural state
+            template: Base template from structural state (WorkoutTemplate)
             athlete_id: Athlete ID
             duration_minutes: Requested duration
             safety_data: Safety gate results
@@ -352,36 +406,14 @@ class AISRiOrchestrator:
         Returns:
             Adjusted workout dictionary
         """
-        # Get AI constraints from template
-        ai_constraints = template.get('ai_constraints', {})
-        
-        # Adjust duration if needed (respect min/max from template)
-        actual_duration = min(
-            duration_minutes,
-            template.get('duration_minutes', duration_minutes)
-        )
-        
-        # Build final workout structure
+        # Template fields (name, type, intensity, zones, warmup/main/cooldown
+        # and resolved constraints) are shared read-only parts of the template
         workout = {
-            'name': template['name'],
-            'type': template['type'],
-            'duration_minutes': actual_duration,
-            'intensity': template['intensity'],
-            'structural_state': structural_state,
-            'zones_allowed': template.get('zones_allowed', [1, 2]),
+            **template.workout_fields,
             
-            # Structure from template
-            'warmup': template['structure']['warmup'],
-            'main': template['structure']['main'],
-            'cooldown': template['structure']['cooldown'],
-            
-            # AI constraints applied
-            'constraints': {
-                'max_heart_rate_percent': ai_constraints.get('max_heart_rate_percent', 75),
-                'max_perceived_exertion': ai_constraints.get('max_perceived_exertion', 6),
-                'speed_permission': structural_state == 'green',
-                'focus': ai_constraints.get('focus', 'aerobic_base')
-            },
+            # Adjust duration if needed (respect max from template)
+            'duration_minutes': min(duration_minutes, template.duration_minutes),
+            'structural_state': structural_state,
             
             # Safety metadata
             'safety_notes': self._generate_safety_notes(safety_data),
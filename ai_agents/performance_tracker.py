@@ -9,14 +9,23 @@ Tracks athlete performance against prescribed workouts:
 - LABEL: Performance classification (BEST/GREAT/GOOD/FAIR/POOR)
 
 Updates ability_progression table and provides feedback.
+
+Records are frozen, slotted dataclasses (no per-instance __dict__), so
+batch jobs can hold hundreds of thousands of them and assessments can
+share their given/expected/result objects instead of copying them. For
+large batches WorkoutTargetArrays / WorkoutResultArrays hold the same
+data as aligned NumPy columns, and PerformanceTracker.assess_batch scores
+them column-wise (text feedback is built lazily per row).
 """
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from enum import Enum
 import statistics
 
+import numpy as np
+
 
 class WorkoutType(Enum):
     """Types of workouts"""
@@ -41,7 +50,7 @@ class PerformanceLabel(Enum):
     INCOMPLETE = "INCOMPLETE"  # Workout not completed
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class WorkoutTarget:
     """Target/prescribed workout parameters"""
     workout_type: WorkoutType
@@ -57,7 +66,7 @@ class WorkoutTarget:
     notes: str = ""
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class WorkoutResult:
     """Actual workout results from Strava/Garmin"""
     workout_id: str
@@ -74,7 +83,7 @@ class WorkoutResult:
     stopped_at_km: Optional[float] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ExpectedPerformance:
     """Expected performance ranges"""
     distance_tolerance_km: float = 0.5  # ±0.5 km acceptable
@@ -86,7 +95,7 @@ class ExpectedPerformance:
     interval_consistency_tolerance: float = 0.10  # 10% variance acceptable
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PerformanceComparison:
     """Comparison of target vs actual"""
     distance_variance_km: float
@@ -106,9 +115,9 @@ class PerformanceComparison:
     workout_completed: bool = True
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PerformanceAssessment:
-    """Complete performance assessment"""
+    """Complete performance assessment (given/expected/result are shared, not copied)"""
     workout_date: datetime
     workout_type: WorkoutType
     performance_label: PerformanceLabel
@@ -138,6 +147,212 @@ class PerformanceAssessment:
     injury_risk_indicators: List[str]
 
 
+# Shared by every assessment made without explicit ranges
+DEFAULT_EXPECTED = ExpectedPerformance()
+
+
+def _optional_column(values: Sequence[Optional[float]]) -> np.ndarray:
+    """float64 column with NaN for None"""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def _optional_int(value: float) -> Optional[int]:
+    return None if np.isnan(value) else int(value)
+
+
+def _truthy(column: np.ndarray) -> np.ndarray:
+    """Where an optional column holds a truthy value (not None, not 0)"""
+    return ~np.isnan(column) & (column != 0)
+
+
+@dataclass
+class WorkoutTargetArrays:
+    """
+    Struct-of-arrays form of many WorkoutTargets: one aligned column per
+    field (NaN where the record has None). Interval and rest fields are
+    kept as optional columns; notes are not carried.
+    """
+    workout_type: np.ndarray            # object: WorkoutType
+    distance_km: np.ndarray
+    target_pace_seconds: np.ndarray
+    pace_range_min: np.ndarray
+    pace_range_max: np.ndarray
+    target_hr: np.ndarray
+    hr_range_min: np.ndarray
+    hr_range_max: np.ndarray
+    intervals: np.ndarray
+
+    @classmethod
+    def from_records(cls, targets: Sequence[WorkoutTarget]) -> 'WorkoutTargetArrays':
+        return cls(
+            workout_type=np.array([t.workout_type for t in targets], dtype=object),
+            distance_km=np.array([t.distance_km for t in targets], dtype=np.float64),
+            target_pace_seconds=_optional_column([t.target_pace_seconds for t in targets]),
+            pace_range_min=np.array([t.pace_range_seconds[0] for t in targets], dtype=np.float64),
+            pace_range_max=np.array([t.pace_range_seconds[1] for t in targets], dtype=np.float64),
+            target_hr=_optional_column([t.target_hr for t in targets]),
+            hr_range_min=np.array([t.hr_range[0] for t in targets], dtype=np.float64),
+            hr_range_max=np.array([t.hr_range[1] for t in targets], dtype=np.float64),
+            intervals=_optional_column([t.intervals for t in targets])
+        )
+
+    def __len__(self) -> int:
+        return len(self.distance_km)
+
+    def record(self, i: int) -> WorkoutTarget:
+        """Row i as a WorkoutTarget (interval/rest details and notes are not carried)"""
+        return WorkoutTarget(
+            workout_type=self.workout_type[i],
+            distance_km=float(self.distance_km[i]),
+            target_pace_seconds=_optional_int(self.target_pace_seconds[i]),
+            pace_range_seconds=(int(self.pace_range_min[i]), int(self.pace_range_max[i])),
+            target_hr=_optional_int(self.target_hr[i]),
+            hr_range=(int(self.hr_range_min[i]), int(self.hr_range_max[i])),
+            intervals=_optional_int(self.intervals[i])
+        )
+
+
+@dataclass
+class WorkoutResultArrays:
+    """
+    Struct-of-arrays form of many WorkoutResults. Splits are ragged and
+    stay per-record (object column, None when absent); HR zones are not
+    carried.
+    """
+    workout_id: np.ndarray              # object: str
+    completed_date: np.ndarray          # object: datetime (keeps tzinfo)
+    distance_km: np.ndarray
+    total_time_seconds: np.ndarray
+    avg_pace_seconds: np.ndarray
+    avg_hr: np.ndarray
+    max_hr: np.ndarray
+    elevation_gain_m: np.ndarray
+    splits: np.ndarray                  # object: list or None
+    completed_full: np.ndarray          # bool
+    stopped_at_km: np.ndarray
+
+    @classmethod
+    def from_records(cls, results: Sequence[WorkoutResult]) -> 'WorkoutResultArrays':
+        splits = np.empty(len(results), dtype=object)
+        splits[:] = [r.splits for r in results]
+        return cls(
+            workout_id=np.array([r.workout_id for r in results], dtype=object),
+            completed_date=np.array([r.completed_date for r in results], dtype=object),
+            distance_km=np.array([r.distance_km for r in results], dtype=np.float64),
+            total_time_seconds=np.array([r.total_time_seconds for r in results], dtype=np.float64),
+            avg_pace_seconds=np.array([r.avg_pace_seconds for r in results], dtype=np.float64),
+            avg_hr=_optional_column([r.avg_hr for r in results]),
+            max_hr=_optional_column([r.max_hr for r in results]),
+            elevation_gain_m=_optional_column([r.elevation_gain_m for r in results]),
+            splits=splits,
+            completed_full=np.array([r.completed_full for r in results], dtype=bool),
+            stopped_at_km=_optional_column([r.stopped_at_km for r in results])
+        )
+
+    def __len__(self) -> int:
+        return len(self.distance_km)
+
+    def record(self, i: int) -> WorkoutResult:
+        """Row i as a WorkoutResult (HR zones are not carried)"""
+        stopped_at_km = self.stopped_at_km[i]
+        return WorkoutResult(
+            workout_id=self.workout_id[i],
+            completed_date=self.completed_date[i],
+            distance_km=float(self.distance_km[i]),
+            total_time_seconds=int(self.total_time_seconds[i]),
+            avg_pace_seconds=int(self.avg_pace_seconds[i]),
+            avg_hr=_optional_int(self.avg_hr[i]),
+            max_hr=_optional_int(self.max_hr[i]),
+            elevation_gain_m=_optional_int(self.elevation_gain_m[i]),
+            splits=self.splits[i],
+            completed_full=bool(self.completed_full[i]),
+            stopped_at_km=None if np.isnan(stopped_at_km) else float(stopped_at_km)
+        )
+
+
+# Label order of PerformanceAssessmentBatch.label_code
+LABELS = tuple(PerformanceLabel)
+QUALITY_TYPES = (WorkoutType.INTERVAL, WorkoutType.TEMPO, WorkoutType.THRESHOLD)
+EASY_TYPES = (WorkoutType.EASY_RUN, WorkoutType.RECOVERY)
+
+
+@dataclass
+class PerformanceAssessmentBatch:
+    """
+    Column-wise assessment of many (target, result) pairs, as returned by
+    PerformanceTracker.assess_batch. Every numeric field of the
+    comparison and every score is a column (hr_variance_* are NaN where
+    the scalar comparison has None).
+
+    Strengths, weaknesses, feedback, coach notes, fatigue and injury risk
+    need the splits and are only built by assessment(i) / assessments(rows),
+    which return the same PerformanceAssessment as the scalar path (rows
+    of arrays inputs are turned back into records on demand).
+    """
+    targets: Union[Sequence[WorkoutTarget], WorkoutTargetArrays]
+    results: Union[Sequence[WorkoutResult], WorkoutResultArrays]
+    expected: ExpectedPerformance
+    tracker: 'PerformanceTracker'
+
+    # Comparison
+    distance_variance_km: np.ndarray
+    distance_variance_pct: np.ndarray
+    pace_variance_seconds: np.ndarray
+    pace_variance_pct: np.ndarray
+    hr_variance_bpm: np.ndarray
+    hr_variance_pct: np.ndarray
+    distance_met: np.ndarray
+    pace_met: np.ndarray
+    hr_met: np.ndarray
+    workout_completed: np.ndarray
+
+    # Scores and label
+    distance_score: np.ndarray
+    pace_score: np.ndarray
+    hr_score: np.ndarray
+    overall_score: np.ndarray
+    label_code: np.ndarray              # int: index into LABELS
+    ability_change: np.ndarray
+    readiness_for_progression: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.overall_score)
+
+    @property
+    def labels(self) -> List[PerformanceLabel]:
+        return [LABELS[code] for code in self.label_code]
+
+    def label_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.label_code, minlength=len(LABELS))
+        return {label.value: int(count) for label, count in zip(LABELS, counts)}
+
+    def assessment(self, i: int) -> PerformanceAssessment:
+        """Full assessment of row i, text feedback included"""
+        given = self.targets.record(i) if isinstance(self.targets, WorkoutTargetArrays) else self.targets[i]
+        result = self.results.record(i) if isinstance(self.results, WorkoutResultArrays) else self.results[i]
+        return self.tracker._build_assessment(
+            given, result, self.expected,
+            self.tracker._compare_performance(given, result, self.expected),
+            float(self.distance_score[i]), float(self.pace_score[i]),
+            float(self.hr_score[i]), float(self.overall_score[i]),
+            LABELS[self.label_code[i]]
+        )
+
+    def assessments(self, rows=None) -> Iterator[PerformanceAssessment]:
+        """
+        Full assessments of the selected rows (a boolean mask or indices;
+        all rows if None), e.g. batch.assessments(batch.label_code >= 3)
+        for FAIR and below.
+        """
+        if rows is None:
+            indices = range(len(self))
+        else:
+            rows = np.asarray(rows)
+            indices = np.flatnonzero(rows) if rows.dtype == bool else rows
+        for i in indices:
+            yield self.assessment(int(i))
+
+
 class PerformanceTracker:
     """
     Track athlete performance against prescribed workouts.
@@ -168,7 +383,7 @@ class PerformanceTracker:
             Complete performance assessment with label and feedback
         """
         if expected is None:
-            expected = ExpectedPerformance()
+            expected = DEFAULT_EXPECTED
         
         # Compare given vs result
         comparison = self._compare_performance(given, result, expected)
@@ -186,6 +401,25 @@ class PerformanceTracker:
             overall_score, comparison, given.workout_type
         )
         
+        return self._build_assessment(
+            given, result, expected, comparison,
+            distance_score, pace_score, hr_score, overall_score, label
+        )
+    
+    def _build_assessment(
+        self,
+        given: WorkoutTarget,
+        result: WorkoutResult,
+        expected: ExpectedPerformance,
+        comparison: PerformanceComparison,
+        distance_score: float,
+        pace_score: float,
+        hr_score: float,
+        overall_score: float,
+        label: PerformanceLabel
+    ) -> PerformanceAssessment:
+        """Feedback, progression and risk for a scored workout"""
+        
         # Analyze strengths and weaknesses
         strengths = self._identify_strengths(comparison, given.workout_type, result)
         weaknesses = self._identify_weaknesses(comparison, given.workout_type, result)
@@ -228,6 +462,154 @@ class PerformanceTracker:
             injury_risk_indicators=injury_risks
         )
     
+    def assess_batch(
+        self,
+        targets: Union[Sequence[WorkoutTarget], WorkoutTargetArrays],
+        results: Union[Sequence[WorkoutResult], WorkoutResultArrays],
+        expected: Optional[ExpectedPerformance] = None
+    ) -> PerformanceAssessmentBatch:
+        """
+        Assess many workouts at once.
+        
+        Variances, met flags, scores, overall score, label, ability change
+        and progression readiness are computed column-wise and equal the
+        scalar path's values row for row. Text feedback is left to
+        PerformanceAssessmentBatch.assessment(i), for the rows that need it.
+        
+        Args:
+            targets: Prescribed workouts (records or WorkoutTargetArrays)
+            results: Actual results, aligned with targets
+            expected: Expected performance ranges for every row (defaults if None)
+            
+        Returns:
+            PerformanceAssessmentBatch
+        """
+        if expected is None:
+            expected = DEFAULT_EXPECTED
+        
+        t = targets if isinstance(targets, WorkoutTargetArrays) else WorkoutTargetArrays.from_records(targets)
+        r = results if isinstance(results, WorkoutResultArrays) else WorkoutResultArrays.from_records(results)
+        if len(t) != len(r):
+            raise ValueError(f"{len(t)} targets but {len(r)} results")
+        
+        type_index = {workout_type: code for code, workout_type in enumerate(WorkoutType)}
+        type_code = np.array([type_index[w] for w in t.workout_type], dtype=np.int64)
+        quality = np.isin(type_code, [type_index[w] for w in QUALITY_TYPES])
+        easy = np.isin(type_code, [type_index[w] for w in EASY_TYPES])
+        completed = r.completed_full
+        
+        # Distance variance
+        distance_var_km = r.distance_km - t.distance_km
+        distance_var_pct = (distance_var_km / t.distance_km) * 100
+        distance_met = np.abs(distance_var_km) <= expected.distance_tolerance_km
+        
+        # Pace variance (0 and met where there is no target pace)
+        has_pace = _truthy(t.target_pace_seconds)
+        target_pace = np.where(has_pace, t.target_pace_seconds, 1.0)
+        pace_var_sec = np.where(has_pace, r.avg_pace_seconds - target_pace, 0.0)
+        pace_var_pct = np.where(has_pace, (pace_var_sec / target_pace) * 100, 0.0)
+        has_pace_range = (t.pace_range_min != 0) | (t.pace_range_max != 0)
+        pace_met = ~has_pace | np.where(
+            has_pace_range,
+            (t.pace_range_min <= r.avg_pace_seconds) & (r.avg_pace_seconds <= t.pace_range_max),
+            np.abs(pace_var_sec) <= expected.pace_tolerance_seconds
+        )
+        
+        # HR variance (NaN and met where target or average HR is missing)
+        has_hr = _truthy(t.target_hr) & _truthy(r.avg_hr)
+        hr_var_bpm = np.where(has_hr, r.avg_hr - t.target_hr, np.nan)
+        hr_var_pct = np.where(has_hr, (hr_var_bpm / np.where(has_hr, t.target_hr, 1.0)) * 100, np.nan)
+        has_hr_range = (t.hr_range_min != 0) | (t.hr_range_max != 0)
+        hr_met = ~has_hr | np.where(
+            has_hr_range,
+            (t.hr_range_min <= r.avg_hr) & (r.avg_hr <= t.hr_range_max),
+            np.abs(hr_var_bpm) <= expected.hr_tolerance_bpm
+        )
+        
+        # Scores (same bands as _score_distance/_score_pace/_score_hr)
+        distance_abs = np.abs(distance_var_pct)
+        distance_score = np.where(
+            completed,
+            np.select(
+                [distance_abs <= 1.0, distance_abs <= 2.0, distance_abs <= 5.0, distance_abs <= 10.0],
+                [100.0, 95.0, 85.0, 70.0], 50.0
+            ),
+            30.0
+        )
+        
+        pace_abs = np.abs(pace_var_sec)
+        pace_score = np.select(
+            [easy, quality],
+            [
+                np.select([pace_abs <= 10, pace_abs <= 20, pace_abs <= 30], [100.0, 90.0, 75.0], 60.0),
+                np.select([pace_abs <= 5, pace_abs <= 10, pace_abs <= 15, pace_abs <= 20],
+                          [100.0, 90.0, 75.0, 60.0], 40.0)
+            ],
+            np.select([pace_abs <= 10, pace_abs <= 15, pace_abs <= 20], [100.0, 90.0, 80.0], 65.0)
+        )
+        
+        hr_abs = np.abs(hr_var_bpm)
+        hr_score = np.where(
+            has_hr,
+            np.select([hr_abs <= 3, hr_abs <= 5, hr_abs <= 8, hr_abs <= 10], [100.0, 95.0, 85.0, 75.0], 60.0),
+            75.0
+        )
+        
+        # Overall score: weighted sum in the scalar order; band scores are
+        # multiples of 5, so the sum is a multiple of 0.25 and np.round
+        # agrees with round()
+        weighted = 0.25 * distance_score + 0.50 * pace_score + 0.25 * hr_score
+        overall_score = np.where(
+            completed,
+            np.round(weighted, 1),
+            np.minimum(50.0, (distance_score + pace_score + hr_score) / 3)
+        )
+        
+        # Label
+        best, great, good, fair, poor, incomplete = range(len(LABELS))
+        good_floor = np.where(quality, 75.0, 70.0)
+        fair_floor = np.where(quality, 60.0, 55.0)
+        label_code = np.where(
+            completed,
+            np.select(
+                [overall_score >= 95, overall_score >= 85, overall_score >= good_floor, overall_score >= fair_floor],
+                [best, great, good, fair], poor
+            ),
+            incomplete
+        )
+        
+        # Ability change and progression readiness
+        multiplier = np.where(quality, 1.5, 1.0)
+        ability_change = np.array([2.0, 1.0, 0.5, 0.0, -0.5, -1.0])[label_code] * multiplier
+        readiness = (
+            (label_code <= great) & completed
+            & ~(quality & (~pace_met | (hr_var_bpm > 10)))
+        )
+        
+        return PerformanceAssessmentBatch(
+            targets=targets,
+            results=results,
+            expected=expected,
+            tracker=self,
+            distance_variance_km=distance_var_km,
+            distance_variance_pct=distance_var_pct,
+            pace_variance_seconds=pace_var_sec,
+            pace_variance_pct=pace_var_pct,
+            hr_variance_bpm=hr_var_bpm,
+            hr_variance_pct=hr_var_pct,
+            distance_met=distance_met,
+            pace_met=pace_met,
+            hr_met=hr_met,
+            workout_completed=completed.copy(),
+            distance_score=distance_score,
+            pace_score=pace_score,
+            hr_score=hr_score,
+            overall_score=overall_score,
+            label_code=label_code.astype(np.int64),
+            ability_change=ability_change,
+            readiness_for_progression=readiness
+        )
+    
     def _compare_performance(
         self,
         given: WorkoutTarget,
@@ -0,0 +1,328 @@
+"""
+Recompute Graph
+Dependency-aware incremental recomputation of derived athlete data.
+
+Every derived artifact (workload, AISRI pillars, injury prediction,
+structural state, readiness, next workout) is a node that declares what
+it reads. Updating inputs recomputes only the nodes downstream of what
+changed, in topological order, and each node keeps its memoized output.
+A recomputed node whose output equals its previous one does not
+propagate: an activity that leaves readiness unchanged does not
+regenerate the next workout.
+
+Athlete graph (athlete_graph), each node with what it reads:
+- workload           ledger, today                       (load EWMA)
+- aisri              profile, activities, today          (AISRI pillars and score)
+- injury_prediction  aisri, workload, aisri_history
+- structural         athlete_id, assessment
+- readiness          aisri, injury_prediction, assessment_score, structural, ledger, today
+- next_workout       readiness, profile, workload, recent_results, today
+
+So a new activity (new activities and ledger) recomputes everything
+except structural, and a new assessment recomputes structural, readiness
+and next_workout only. Readiness records are built by
+daily_readiness.build_readiness_record, from the same inputs the nightly
+readiness stage reads.
+
+Inputs:
+- athlete_id        SafeStride athlete id
+- activities        Single-athlete ActivityFrame of the past 8 weeks, every
+                    source, deduplicated (load_activity_frame(...).slice(id))
+- ledger            athlete_daily_load days up to today, oldest first
+                    (TrainingLoadLedger.get_days(id, days=LEDGER_DAYS, end=today))
+- profile           athlete_detailed_profile row (signup_date, ability fields)
+- assessment        Latest aisri_scores row (structural pillars)
+- assessment_score  Latest AISRI_assessments score (None without one)
+- aisri_history     Earlier AISRI scores, newest first (injury trend)
+- recent_results    Last week's workout_results rows, newest first
+- today             Day the derived data is for
+
+Usage:
+    derived = AthleteDerivedData()
+    derived.sync(athlete_id, activities=frame, ledger=days, profile=profile, assessment=row,
+                 assessment_score=None, aisri_history=[], recent_results=[], today=date.today())
+    report = derived.sync(athlete_id, activities=new_frame, ledger=new_days)
+    report.recomputed          # ['workload', 'aisri', ...] only what changed
+    derived.get(athlete_id, 'next_workout')
+"""
+
+import operator
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from activity_providers import ActivityFrame, parse_datetime
+from database_integration import DatabaseIntegration
+from nightly_workout_pipeline import (
+    CANDIDATE_TYPES, DEFAULT_PHASE, STEP_DOWN_TYPES, GenerationTask, generate_chunk
+)
+from daily_readiness import ReadinessRecord, build_readiness_record
+from safety_rules import SafetyRuleEngine
+from structural_index import StructuralIndexEntry
+from training_load_ledger import DailyLoad
+from workload_engine import WorkloadEngine, WorkloadState
+
+
+LEDGER_DAYS = 56          # Ledger days read per athlete (8 weeks of activities)
+AISRI_HISTORY_LENGTH = 14  # Scores in the injury trend (as AISRiInjuryPredictionAgent)
+QUALITY_TYPES = ('interval', 'threshold', 'tempo')
+
+
+# =============================================================================
+# GRAPH
+# =============================================================================
+
+@dataclass(frozen=True)
+class Node:
+    """A derived artifact: compute(*values of inputs), compared with `equal`"""
+    name: str
+    inputs: Tuple[str, ...]
+    compute: Callable[..., Any]
+    equal: Callable[[Any, Any], bool] = operator.eq
+
+
+@dataclass
+class SyncReport:
+    """What one update did"""
+    changed_inputs: List[str] = field(default_factory=list)
+    recomputed: List[str] = field(default_factory=list)   # Topological order
+    changed: List[str] = field(default_factory=list)      # Recomputed with a new output
+
+
+class RecomputeGraph:
+    """
+    Static dependency graph over named inputs and nodes. Node values live
+    in a per-entity state dict, so one graph serves every athlete.
+    """
+
+    def __init__(self, inputs: Sequence[str], nodes: Sequence[Node]):
+        self.inputs = tuple(inputs)
+        self.nodes = {node.name: node for node in nodes}
+        if len(self.nodes) != len(nodes) or set(self.inputs) & set(self.nodes):
+            raise ValueError("Input and node names must be unique")
+        for node in nodes:
+            unknown = [d for d in node.inputs if d not in self.nodes and d not in self.inputs]
+            if unknown:
+                raise ValueError(f"Node {node.name} depends on unknown {unknown}")
+        self.order = self._topological_order(nodes)
+
+    def _topological_order(self, nodes: Sequence[Node]) -> Tuple[str, ...]:
+        """Kahn's algorithm; ties keep declaration order"""
+        pending = {node.name: sum(d in self.nodes for d in node.inputs) for node in nodes}
+        dependents: Dict[str, List[str]] = {name: [] for name in self.nodes}
+        for node in nodes:
+            for dependency in node.inputs:
+                if dependency in self.nodes:
+                    dependents[dependency].append(node.name)
+
+        order = []
+        ready = [node.name for node in nodes if pending[node.name] == 0]
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for dependent in dependents[name]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(nodes):
+            raise ValueError(f"Dependency cycle among {sorted(set(self.nodes) - set(order))}")
+        return tuple(order)
+
+    def downstream(self, names: Iterable[str]) -> List[str]:
+        """Nodes that (transitively) read any of `names`, in topological order"""
+        affected = set(names)
+        result = []
+        for name in self.order:
+            if any(d in affected for d in self.nodes[name].inputs):
+                affected.add(name)
+                result.append(name)
+        return result
+
+    def update(self, state: Dict[str, Any], **changes) -> SyncReport:
+        """
+        Set inputs and recompute what depends on them.
+
+        Inputs equal to their current value are ignored. A node is
+        recomputed when one of its inputs changed in this update, or when
+        it has no value yet and all its inputs have one. Nodes with a
+        missing input stay unset.
+        """
+        report = SyncReport()
+        changed = set()
+        for name, value in changes.items():
+            if name not in self.inputs:
+                raise KeyError(f"Unknown input {name}")
+            if name not in state or not _equal(state[name], value):
+                state[name] = value
+                changed.add(name)
+                report.changed_inputs.append(name)
+
+        for name in self.order:
+            node = self.nodes[name]
+            if name in state and not any(d in changed for d in node.inputs):
+                continue
+            if not all(d in state for d in node.inputs):
+                continue
+
+            value = node.compute(*(state[d] for d in node.inputs))
+            report.recomputed.append(name)
+            if name not in state or not node.equal(state[name], value):
+                state[name] = value
+                changed.add(name)
+                report.changed.append(name)
+        return report
+
+
+def _equal(a: Any, b: Any) -> bool:
+    return a is b or a == b
+
+
+def equal_ignoring(*names: str) -> Callable[[Any, Any], bool]:
+    """Dataclass equality that ignores bookkeeping fields (timestamps)"""
+    def equal(a, b):
+        if a is None or b is None:
+            return a is b
+        return replace(a, **{name: getattr(b, name) for name in names}) == b
+    return equal
+
+
+# =============================================================================
+# ATHLETE NODES
+# =============================================================================
+
+def workload_state(ledger: Tuple[DailyLoad, ...], today: date) -> WorkloadState:
+    """Load EWMA at the end of the ledger window"""
+    return WorkloadEngine.state_from_series([day.load for day in ledger], as_of=today)
+
+
+def structural_entry(athlete_id: str, assessment: Optional[Dict]) -> StructuralIndexEntry:
+    return StructuralIndexEntry.from_assessment(athlete_id, assessment)
+
+
+def training_load(ledger: Tuple[DailyLoad, ...]) -> float:
+    """Average load of training days in the last week (as the decision agent)"""
+    loads = [day.load for day in ledger[-7:] if day.load]
+    return sum(loads) / len(loads) if loads else 0
+
+
+def permitted_types(readiness: ReadinessRecord) -> Tuple[str, ...]:
+    """Session types the readiness record allows tomorrow"""
+    if readiness.decision == 'REST':
+        return ()
+    if readiness.decision == 'RECOVERY' or readiness.status == 'WARNING':
+        return STEP_DOWN_TYPES
+    if readiness.decision == 'LIGHT_TRAIN' or readiness.status == 'CAUTION' or not readiness.speed_permission:
+        return tuple(t for t in CANDIDATE_TYPES if t not in QUALITY_TYPES)
+    return CANDIDATE_TYPES
+
+
+ATHLETE_INPUTS = (
+    'athlete_id', 'activities', 'ledger', 'profile', 'assessment', 'assessment_score',
+    'aisri_history', 'recent_results', 'today'
+)
+
+
+def athlete_graph(rules=None, decision_agent=None) -> RecomputeGraph:
+    """
+    The derived-data graph of one athlete.
+
+    Args:
+        rules: CompiledSafetyRules for speed permission (SAFETY_RULES_PATH / defaults if None)
+        decision_agent: AISRiAutonomousDecisionAgent (created if None)
+    """
+    # Imported lazily: these modules open their own clients on import
+    from aisri_auto_calculator import AISRIAutoCalculator
+    from ai_engine_agent.injury_prediction_agent import AISRiInjuryPredictionAgent
+    if decision_agent is None:
+        from ai_engine_agent.autonomous_decision_agent import AISRiAutonomousDecisionAgent
+        decision_agent = AISRiAutonomousDecisionAgent()
+    rules = rules or SafetyRuleEngine.from_env().current()
+
+    def aisri(profile, activities: ActivityFrame, today):
+        """AISRI of the deduplicated multi-source activities, as of the end of `today`"""
+        user_id = activities.user_ids[0]
+        started = parse_datetime((profile or {}).get('created_at'))
+        result = AISRIAutoCalculator.calculate_batch(
+            activities,
+            {user_id: started} if started else None,
+            now=datetime.combine(today + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+        )[user_id]
+        return replace(result, calculated_at=datetime.combine(today, datetime.min.time()))
+
+    def injury_prediction(aisri, workload, aisri_history):
+        scores = [{'aisri_score': aisri.aisri_score}] + \
+            [{'aisri_score': s} for s in aisri_history[:AISRI_HISTORY_LENGTH - 1]]
+        risk_score = AISRiInjuryPredictionAgent.score_risk(
+            aisri.aisri_score, workload.acwr, AISRiInjuryPredictionAgent.calculate_aisri_trend(scores)
+        )
+        return {'risk_score': risk_score, 'risk_level': AISRiInjuryPredictionAgent.get_risk_level(risk_score)}
+
+    def readiness(athlete_id, aisri, injury_prediction, assessment_score, structural, ledger, today):
+        """The record DailyReadiness stores, with the AISRI row and prediction computed above"""
+        speed = rules.evaluate_structural([structural.state.value], ['easy'], ['low'])['speed_permission']
+        return build_readiness_record(
+            athlete_id=athlete_id,
+            today=today,
+            latest_aisri={'aisri_score': aisri.aisri_score, 'pillar_recovery': aisri.pillar_recovery},
+            latest_injury_prediction=injury_prediction,
+            assessment_aisri_score=assessment_score,
+            training_load=training_load(ledger),
+            structural=structural,
+            speed_permission=speed[0],
+            decision_agent=decision_agent,
+            computed_at=datetime.now(timezone.utc).isoformat()
+        )
+
+    def next_workout(athlete_id, readiness, profile, workload, recent_results, today):
+        """Tomorrow's workout (None for a rest day), stepped down as readiness requires"""
+        day = today + timedelta(days=1)
+        task = GenerationTask(
+            athlete_id=athlete_id,
+            ability=DatabaseIntegration._profile_to_athlete_ability(profile or {}),
+            history=DatabaseIntegration._create_performance_history(
+                recent_results, workload if workload.chronic > 0 else None
+            ),
+            week_number=DatabaseIntegration._week_number_from_profile(
+                profile, datetime.combine(day, datetime.min.time())
+            ),
+            permitted=permitted_types(readiness)
+        )
+        return generate_chunk([task], day, DEFAULT_PHASE)[0][1]
+
+    return RecomputeGraph(ATHLETE_INPUTS, [
+        Node('workload', ('ledger', 'today'), workload_state),
+        Node('aisri', ('profile', 'activities', 'today'), aisri),
+        Node('injury_prediction', ('aisri', 'workload', 'aisri_history'), injury_prediction),
+        Node('structural', ('athlete_id', 'assessment'), structural_entry, equal_ignoring('computed_at')),
+        Node('readiness', ('athlete_id', 'aisri', 'injury_prediction', 'assessment_score', 'structural',
+                           'ledger', 'today'),
+             readiness, equal_ignoring('computed_at')),
+        Node('next_workout', ('athlete_id', 'readiness', 'profile', 'workload', 'recent_results', 'today'),
+             next_workout)
+    ])
+
+
+# =============================================================================
+# PER-ATHLETE STATE
+# =============================================================================
+
+class AthleteDerivedData:
+    """Memoized derived data of many athletes over one athlete graph"""
+
+    def __init__(self, graph: Optional[RecomputeGraph] = None):
+        self.graph = graph or athlete_graph()
+        self.states: Dict[str, Dict[str, Any]] = {}
+
+    def sync(self, athlete_id: str, **changes) -> SyncReport:
+        """Apply changed inputs for one athlete; recompute only what they affect"""
+        state = self.states.get(athlete_id)
+        if state is None:
+            state = self.states[athlete_id] = {}
+            changes.setdefault('athlete_id', athlete_id)
+        return self.graph.update(state, **changes)
+
+    def get(self, athlete_id: str, name: str) -> Any:
+        return self.states[athlete_id].get(name)
+
+    def forget(self, athlete_id: str):
+        self.states.pop(athlete_id, None)
@@ -0,0 +1,268 @@
+"""
+Safety Audit Log
+Records every safety gate and structural clearance decision without
+putting database writes on the request path.
+
+Features:
+- record() is O(1) and never blocks: decisions go into a bounded
+  in-memory ring buffer
+- A background task flushes the buffer to safety_audit_log in bulk
+  inserts at a fixed interval (and when a batch fills up)
+- Under pressure (database slow or down) the oldest entries are dropped,
+  never the caller's request
+- Counters of checks, blocks and blocks per gate for hit-rate analysis
+
+The writer runs on the event loop that recorded the first decision. If
+that loop stops (e.g. one asyncio.run per job), the next decision
+recorded on a live loop starts a new writer there; callers without a
+loop use flush_sync().
+
+Usage:
+    audit = SafetyAuditLog(db.supabase)
+    audit.record_workout_check(athlete_id, result, workout_type, intensity, duration)
+    audit.counters()          # {'checks': ..., 'blocked_by_gate': {...}, ...}
+    await audit.close()       # final flush
+    audit.flush_sync()        # final flush without an event loop
+"""
+
+import asyncio
+import logging
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+AUDIT_TABLE = 'safety_audit_log'
+DEFAULT_CAPACITY = 10_000
+DEFAULT_FLUSH_INTERVAL = 5.0   # seconds
+DEFAULT_BATCH_SIZE = 500
+
+
+class SafetyAuditLog:
+    """Ring buffer of safety decisions with a batched background writer"""
+
+    def __init__(
+        self,
+        supabase,
+        capacity: int = DEFAULT_CAPACITY,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ):
+        """
+        Args:
+            supabase: Client used for the bulk inserts
+            capacity: Entries held in memory before the oldest are dropped
+            flush_interval: Seconds between background flushes
+            batch_size: Rows per insert
+        """
+        self.supabase = supabase
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self._buffer: deque = deque()
+        self._writer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None   # Loop the writer runs on
+        self._wake: Optional[asyncio.Event] = None
+
+        self.stats = Counter()                  # checks, blocked, dropped, written, write_errors
+        self.checks_by_kind = Counter()
+        self.blocked_by_gate = Counter()
+
+    # =========================================================================
+    # RECORDING (hot path)
+    # =========================================================================
+
+    def record_workout_check(
+        self,
+        athlete_id: str,
+        result: Dict,
+        workout_type: Optional[str] = None,
+        intensity: Optional[str] = None,
+        duration_minutes: Optional[int] = None
+    ):
+        """Record a check_workout_safety outcome"""
+        self._record({
+            'kind': 'workout_safety',
+            'athlete_id': str(athlete_id),
+            'passed': bool(result.get('safe')),
+            'gates_failed': list(result.get('gates_failed') or []),
+            'gates_passed': list(result.get('gates_passed') or []),
+            'reason': result.get('reason'),
+            'workout_type': workout_type,
+            'intensity': intensity,
+            'duration_minutes': duration_minutes,
+            'structural_state': None,
+            'rules_version': result.get('rules_version'),
+            'details': {
+                'aisri_score': result.get('aisri_score'),
+                'injury_risk': result.get('injury_risk')
+            }
+        })
+
+    def record_structural_clearance(
+        self,
+        athlete_id: str,
+        result: Dict,
+        workout_type: Optional[str] = None,
+        intensity: Optional[str] = None
+    ):
+        """Record a check_structural_clearance outcome"""
+        passed = bool(result.get('passed'))
+        self._record({
+            'kind': 'structural_clearance',
+            'athlete_id': str(athlete_id),
+            'passed': passed,
+            'gates_failed': [] if passed else ['structural_state'],
+            'gates_passed': ['structural_state'] if passed else [],
+            'reason': result.get('reason'),
+            'workout_type': workout_type,
+            'intensity': intensity,
+            'duration_minutes': None,
+            'structural_state': result.get('state'),
+            'rules_version': result.get('rules_version'),
+            'details': {
+                'structural_score': result.get('structural_score'),
+                'speed_permission': result.get('speed_permission')
+            }
+        })
+
+    def _record(self, entry: Dict):
+        entry['decided_at'] = datetime.now(timezone.utc).isoformat()
+
+        self.stats['checks'] += 1
+        self.checks_by_kind[entry['kind']] += 1
+        if not entry['passed']:
+            self.stats['blocked'] += 1
+            self.blocked_by_gate.update(entry['gates_failed'])
+
+        if len(self._buffer) >= self.capacity:
+            self._buffer.popleft()
+            self.stats['dropped'] += 1
+        self._buffer.append(entry)
+
+        self._ensure_writer()
+        if len(self._buffer) >= self.batch_size:
+            self._wake_writer()
+
+    # =========================================================================
+    # BACKGROUND WRITER
+    # =========================================================================
+
+    def _ensure_writer(self):
+        """Keep a writer on a live event loop, moving it to the caller's if needed"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No loop (sync caller): entries wait for flush() / flush_sync()
+        if self._writer is not None and not self._writer.done():
+            if self._loop is loop or self._loop.is_running():
+                return
+            # The writer's loop has stopped, so its task never runs again
+        self._loop = loop
+        self._wake = asyncio.Event()
+        self._writer = loop.create_task(self._run(), name='safety-audit-writer')
+
+    def _wake_writer(self):
+        """Ask the writer for an early flush (from any thread)"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything buffered so far in batch_size inserts"""
+        written = 0
+        while self._buffer:
+            batch = self._take_batch()
+            try:
+                await asyncio.to_thread(self._insert, batch)
+            except Exception as e:
+                self._write_failed(batch, e)
+                break
+            written += len(batch)
+            self.stats['written'] += len(batch)
+        return written
+
+    def flush_sync(self) -> int:
+        """flush() for callers without a running event loop (blocks)"""
+        written = 0
+        while self._buffer:
+            batch = self._take_batch()
+            try:
+                self._insert(batch)
+            except Exception as e:
+                self._write_failed(batch, e)
+                break
+            written += len(batch)
+            self.stats['written'] += len(batch)
+        return written
+
+    def _take_batch(self) -> List[Dict]:
+        return [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+
+    def _insert(self, batch: List[Dict]):
+        self.supabase.table(AUDIT_TABLE).insert(batch).execute()
+
+    def _write_failed(self, batch: List[Dict], error: Exception):
+        self.stats['write_errors'] += 1
+        logger.warning(f"Safety audit flush failed ({len(batch)} rows): {error}")
+        self._requeue(batch)
+
+    def _requeue(self, batch: List[Dict]):
+        """Put a failed batch back in front, keeping only what fits (newest first)"""
+        free = self.capacity - len(self._buffer)
+        keep = batch[-free:] if free > 0 else []
+        self.stats['dropped'] += len(batch) - len(keep)
+        self._buffer.extendleft(reversed(keep))
+
+    async def close(self):
+        """Stop the writer after a final flush"""
+        if self._writer is not None:
+            if self._loop is asyncio.get_running_loop():
+                self._writer.cancel()
+                try:
+                    await self._writer
+                except asyncio.CancelledError:
+                    pass
+            elif not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._writer.cancel)
+            self._writer = None
+            self._loop = None
+        await self.flush()
+
+    # =========================================================================
+    # COUNTERS
+    # =========================================================================
+
+    def counters(self) -> Dict:
+        """Checks, blocks and blocks per gate since startup"""
+        checks = self.stats['checks']
+        return {
+            'checks': checks,
+            'blocked': self.stats['blocked'],
+            'block_rate': round(self.stats['blocked'] / checks, 4) if checks else 0.0,
+            'checks_by_kind': dict(self.checks_by_kind),
+            'blocked_by_gate': dict(self.blocked_by_gate),
+            'buffered': len(self._buffer),
+            'written': self.stats['written'],
+            'dropped': self.stats['dropped'],
+            'write_errors': self.stats['write_errors']
+        }
@@ -0,0 +1,379 @@
+"""
+Safety Replay
+Offline time-travel evaluation of the AISRi safety gates: how
+AISRISafetyGate.check_workout_safety would have decided on every past day
+for every athlete, for threshold tuning.
+
+History (AISRi scores, injury predictions, the daily training-load ledger
+and profiles) is loaded into (athlete x day) arrays once. Every input the
+gates read is then rebuilt "as of" each day with array operations:
+
+- latest AISRi / injury rows: as-of forward fill of the row index
+- consecutive hard days: a fixed look-back over the ledger window
+- EWMA minutes workload: WorkloadEngine.backfill over the full history
+
+and the compiled rule table (safety_rules.py) is applied to whole
+matrices. Nothing is evaluated per day or per athlete in Python.
+
+Days are evaluated as of their start (UTC, like the ledger): rows
+created on a day become visible the next day, and the ledger up to the
+previous day counts. That is exactly what a live check sees in the
+morning before that day's session.
+
+Usage:
+    replay = SafetyReplay()                                   # or rules=SafetyRuleEngine(rules=candidate)
+    inputs = replay.load(db.supabase, athlete_ids, date(2025, 10, 1), date(2026, 9, 30))
+    decisions = replay.evaluate(inputs, 'interval', duration_minutes=45)
+    decisions.safe                 # bool (n_athletes, n_days)
+    decisions.blocked_by_gate()    # {'aisri_score': 1234, ...}
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from activity_providers import parse_datetime
+from safety_rules import SafetyRuleEngine
+from workload_engine import CHRONIC_DAYS, WorkloadEngine
+
+logger = logging.getLogger(__name__)
+
+
+HARD_DAY_WINDOW = 7                  # Ledger days the live gate reads (today included)
+WORKLOAD_WARMUP_DAYS = 4 * CHRONIC_DAYS  # History before the window feeding the EWMAs
+ATHLETE_CHUNK = 500                  # Athletes per .in_() filter when loading
+PAGE_SIZE = 1000
+
+GATES = ['aisri_score', 'injury_risk', 'recovery', 'consecutive_days', 'volume_progression']
+
+
+# =============================================================================
+# INPUTS
+# =============================================================================
+
+@dataclass
+class ReplayInputs:
+    """Gate inputs for every (athlete, day) as of the start of that day"""
+    athlete_ids: List[str]
+    start: date
+    has_profile: np.ndarray                  # (n_athletes,)
+    aisri: np.ndarray                        # (n_athletes, n_days), NaN = no assessment yet
+    recovery: np.ndarray                     # NaN = no assessment yet (gate not applied)
+    injury_risk: np.ndarray                  # 50 = no prediction yet
+    consecutive_hard: np.ndarray
+    minutes_acute: np.ndarray                # EWMA minutes, decayed to the start of the day
+    minutes_chronic: np.ndarray
+
+    @property
+    def n_days(self) -> int:
+        return self.aisri.shape[1]
+
+    @property
+    def dates(self) -> np.ndarray:
+        return np.datetime64(self.start, 'D') + np.arange(self.n_days)
+
+
+@dataclass
+class ReplayDecisions:
+    """Gate outcomes of one candidate workout replayed over every (athlete, day)"""
+    intensity: str
+    duration_minutes: Optional[int]
+    rules_version: str
+    athlete_ids: List[str]
+    dates: np.ndarray
+    safe: np.ndarray                          # (n_athletes, n_days)
+    has_profile: np.ndarray                   # (n_athletes,)
+    gates: Dict[str, np.ndarray] = field(default_factory=dict)   # Gate -> passed (n_athletes, n_days)
+    projected_acwr: Optional[np.ndarray] = None
+
+    def blocked_by_gate(self) -> Dict[str, int]:
+        """Blocked (athlete, day) cells per gate; athletes without a profile count once per day"""
+        counts = {'missing_profile': int((~self.has_profile).sum()) * len(self.dates)}
+        profiled = self.has_profile[:, None]
+        for name, passed in self.gates.items():
+            counts[name] = int((~passed & profiled).sum())
+        return counts
+
+    def block_rate(self) -> float:
+        return float(1 - self.safe.mean()) if self.safe.size else 0.0
+
+    def daily_block_rate(self) -> np.ndarray:
+        """Share of athletes blocked on each day"""
+        return 1 - self.safe.mean(axis=0)
+
+    def summary(self) -> Dict:
+        return {
+            'intensity': self.intensity,
+            'duration_minutes': self.duration_minutes,
+            'rules_version': self.rules_version,
+            'athletes': len(self.athlete_ids),
+            'days': len(self.dates),
+            'block_rate': round(self.block_rate(), 4),
+            'blocked_by_gate': self.blocked_by_gate()
+        }
+
+
+# =============================================================================
+# REPLAY
+# =============================================================================
+
+class SafetyReplay:
+    """Vectorized replay of the safety gates over historical data"""
+
+    def __init__(self, rules: Optional[SafetyRuleEngine] = None):
+        self.rules = rules or SafetyRuleEngine.from_env()
+
+    # -------------------------------------------------------------------------
+    # Evaluation
+    # -------------------------------------------------------------------------
+
+    def evaluate(
+        self,
+        inputs: ReplayInputs,
+        intensity: str,
+        duration_minutes: Optional[int] = None
+    ) -> ReplayDecisions:
+        """Replay one candidate workout for every athlete and day"""
+        rules = self.rules.current()
+
+        projected_acwr = np.full(inputs.aisri.shape, np.nan)
+        if duration_minutes:
+            # WorkloadEngine.project on each day's state (cold-start floor applied),
+            # where chronic load exists
+            floored = np.maximum(inputs.minutes_chronic, rules.min_chronic_minutes)
+            acute = inputs.minutes_acute + WorkloadEngine.ALPHA_ACUTE * duration_minutes
+            chronic = floored + WorkloadEngine.ALPHA_CHRONIC * duration_minutes
+            has_chronic = floored > 0
+            np.divide(acute, chronic, out=projected_acwr, where=has_chronic)
+
+        code = rules.intensity_codes([intensity])[0]
+        checks = rules.evaluate_gate_codes(
+            code, inputs.aisri, inputs.injury_risk, inputs.recovery,
+            inputs.consecutive_hard, projected_acwr
+        )
+
+        gates = {
+            'aisri_score': checks.aisri,
+            'injury_risk': checks.injury_risk,
+            'recovery': checks.recovery,
+            'consecutive_days': checks.consecutive_days
+        }
+        if duration_minutes:
+            gates['volume_progression'] = checks.volume
+
+        safe = np.logical_and.reduce(list(gates.values())) & inputs.has_profile[:, None]
+
+        return ReplayDecisions(
+            intensity=intensity,
+            duration_minutes=duration_minutes,
+            rules_version=rules.version,
+            athlete_ids=inputs.athlete_ids,
+            dates=inputs.dates,
+            safe=safe,
+            has_profile=inputs.has_profile,
+            gates=gates,
+            projected_acwr=projected_acwr if duration_minutes else None
+        )
+
+    def evaluate_many(
+        self,
+        inputs: ReplayInputs,
+        intensities: Iterable[str],
+        duration_minutes: Optional[int] = None
+    ) -> Dict[str, ReplayDecisions]:
+        """Replay several intensities over the same inputs"""
+        return {intensity: self.evaluate(inputs, intensity, duration_minutes) for intensity in intensities}
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    def load(
+        self,
+        supabase,
+        athlete_ids: Sequence[str],
+        start: date,
+        end: date
+    ) -> ReplayInputs:
+        """
+        Load history for a replay window (inclusive) and build the arrays.
+
+        Rows are fetched per chunk of athletes and paged; the ledger is read
+        from WORKLOAD_WARMUP_DAYS before `start` so the EWMAs are settled.
+        """
+        ids = [str(a) for a in athlete_ids]
+        end_ts = (end + timedelta(days=1)).isoformat()
+        ledger_start = (start - timedelta(days=WORKLOAD_WARMUP_DAYS)).isoformat()
+
+        aisri_rows, injury_rows, daily_rows, profile_ids = [], [], [], set()
+        for begin in range(0, len(ids), ATHLETE_CHUNK):
+            chunk = ids[begin:begin + ATHLETE_CHUNK]
+            aisri_rows += _fetch_all(
+                lambda: supabase.table('aisri_scores').select('*')
+                .in_('athlete_id', chunk).lt('created_at', end_ts).order('created_at')
+            )
+            injury_rows += _fetch_all(
+                lambda: supabase.table('injury_risk_predictions').select('athlete_id, risk_score, created_at')
+                .in_('athlete_id', chunk).lt('created_at', end_ts).order('created_at')
+            )
+            daily_rows += _fetch_all(
+                lambda: supabase.table('athlete_daily_load').select('athlete_id, day, minutes, sessions, hard_sessions')
+                .in_('athlete_id', chunk).gte('day', ledger_start).lte('day', end.isoformat()).order('day')
+            )
+            profile_ids.update(
+                str(row['athlete_id']) for row in _fetch_all(
+                    lambda: supabase.table('athlete_detailed_profile').select('athlete_id')
+                    .in_('athlete_id', chunk).order('athlete_id')
+                )
+            )
+
+        logger.info(
+            f"Replay history loaded: {len(aisri_rows)} AISRi, {len(injury_rows)} injury, "
+            f"{len(daily_rows)} ledger rows for {len(ids)} athletes"
+        )
+        return self.build_inputs(ids, start, end, aisri_rows, injury_rows, daily_rows, profile_ids)
+
+    @staticmethod
+    def build_inputs(
+        athlete_ids: Sequence[str],
+        start: date,
+        end: date,
+        aisri_rows: List[Dict],
+        injury_rows: List[Dict],
+        daily_rows: List[Dict],
+        profile_ids: Iterable[str]
+    ) -> ReplayInputs:
+        """Arrays for a replay window from raw table rows (no I/O)"""
+        ids = [str(a) for a in athlete_ids]
+        index = {athlete_id: i for i, athlete_id in enumerate(ids)}
+        n, n_days = len(ids), (end - start).days + 1
+        start64 = np.datetime64(start, 'D')
+
+        profiles = set(str(a) for a in profile_ids)
+        has_profile = np.array([a in profiles for a in ids], dtype=bool)
+
+        # Latest AISRi / injury row as of each day (same defaults as the gate)
+        aisri_src = _as_of_index(aisri_rows, index, start64, n_days)
+        aisri = _take(aisri_src, [(r.get('aisri_score', 0) or 0) for r in aisri_rows], np.nan)
+        recovery = _take(aisri_src, [_recovery(r) for r in aisri_rows], np.nan)
+
+        injury_src = _as_of_index(injury_rows, index, start64, n_days)
+        injury_risk = _take(injury_src, [_float(r.get('risk_score', 50)) for r in injury_rows], 50.0)
+
+        # Dense ledger over warm-up + window; day d is read up to d - 1
+        warmup = WORKLOAD_WARMUP_DAYS
+        minutes = np.zeros((n, warmup + n_days))
+        sessions = np.zeros((n, warmup + n_days), dtype=np.int32)
+        hard_sessions = np.zeros((n, warmup + n_days), dtype=np.int32)
+        if daily_rows:
+            rows = [r for r in daily_rows if str(r['athlete_id']) in index]
+            athlete = np.fromiter((index[str(r['athlete_id'])] for r in rows), dtype=np.intp, count=len(rows))
+            day = (np.array([str(r['day'])[:10] for r in rows], dtype='datetime64[D]') - start64).astype(np.intp) + warmup
+            keep = (day >= 0) & (day < warmup + n_days)
+            athlete, day = athlete[keep], day[keep]
+            keep_rows = np.flatnonzero(keep)
+            minutes[athlete, day] = [rows[i].get('minutes') or 0 for i in keep_rows]
+            sessions[athlete, day] = [rows[i].get('sessions') or 0 for i in keep_rows]
+            hard_sessions[athlete, day] = [rows[i].get('hard_sessions') or 0 for i in keep_rows]
+
+        # EWMA minutes at the end of each previous day, decayed one day
+        acute, chronic = WorkloadEngine.backfill(minutes)
+        previous = slice(warmup - 1, warmup - 1 + n_days)
+        minutes_acute = acute[:, previous] * (1 - WorkloadEngine.ALPHA_ACUTE)
+        minutes_chronic = chronic[:, previous] * (1 - WorkloadEngine.ALPHA_CHRONIC)
+
+        # TrainingLoadLedger.consecutive_hard_days over the live window,
+        # counting back from the previous day: rest days are skipped, an
+        # easy training day ends the streak
+        streak = np.zeros((n, n_days), dtype=np.int32)
+        broken = np.zeros((n, n_days), dtype=bool)
+        for back in range(1, HARD_DAY_WINDOW):
+            window = slice(warmup - back, warmup - back + n_days)
+            trained = sessions[:, window] > 0
+            hard = hard_sessions[:, window] > 0
+            broken |= trained & ~hard
+            streak += trained & hard & ~broken
+
+        return ReplayInputs(
+            athlete_ids=ids,
+            start=start,
+            has_profile=has_profile,
+            aisri=aisri,
+            recovery=recovery,
+            injury_risk=injury_risk,
+            consecutive_hard=streak,
+            minutes_acute=minutes_acute,
+            minutes_chronic=minutes_chronic
+        )
+
+
+# =============================================================================
+# ARRAY HELPERS
+# =============================================================================
+
+def _as_of_index(rows: List[Dict], index: Dict[str, int], start64: np.datetime64, n_days: int) -> np.ndarray:
+    """
+    (n_athletes, n_days) index of the latest row visible at the start of
+    each day (-1 before the first). A row created on UTC day e is visible
+    from e + 1; rows from before the window are visible from day 0.
+    """
+    src = np.full((len(index), n_days), -1, dtype=np.intp)
+    rows = [(i, r) for i, r in enumerate(rows) if str(r['athlete_id']) in index]
+    if not rows:
+        return src
+
+    position = np.array([i for i, _ in rows], dtype=np.intp)
+    athlete = np.array([index[str(r['athlete_id'])] for _, r in rows], dtype=np.intp)
+    # Epoch seconds: created_at may carry any UTC offset
+    created = np.array([parse_datetime(r['created_at']).timestamp() for _, r in rows])
+    created_day = np.floor(created / 86400).astype(np.int64).astype('datetime64[D]')
+    visible = (created_day - start64).astype(np.intp) + 1
+    visible = np.maximum(visible, 0)
+
+    keep = visible < n_days
+    position, athlete, created, visible = position[keep], athlete[keep], created[keep], visible[keep]
+
+    # Last row per (athlete, day) by created_at
+    order = np.lexsort((created, visible, athlete))
+    position, athlete, visible = position[order], athlete[order], visible[order]
+    key = athlete * n_days + visible
+    last = np.ones(len(key), dtype=bool)
+    last[:-1] = key[1:] != key[:-1]
+    src[athlete[last], visible[last]] = position[last]
+
+    # Forward fill along days
+    column = np.where(src >= 0, np.arange(n_days), -1)
+    np.maximum.accumulate(column, axis=1, out=column)
+    filled = np.take_along_axis(src, np.maximum(column, 0), axis=1)
+    return np.where(column >= 0, filled, -1)
+
+
+def _take(src: np.ndarray, values: List, default: float) -> np.ndarray:
+    """Gather per-row values through an as-of index, `default` where there is no row"""
+    values = np.append(np.asarray(values, dtype=np.float64), default)
+    return values[np.where(src >= 0, src, len(values) - 1)]
+
+
+def _float(value) -> float:
+    return np.nan if value is None else float(value)
+
+
+def _recovery(row: Dict) -> float:
+    """Recovery pillar as the live gate reads it (70 when not scored)"""
+    value = row.get('pillar_recovery')
+    return 70.0 if value is None else float(value)
+
+
+def _fetch_all(build_query) -> List[Dict]:
+    """Every row of a query, PAGE_SIZE at a time"""
+    rows = []
+    offset = 0
+    while True:
+        page = build_query().range(offset, offset + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        offset += PAGE_SIZE
@@ -0,0 +1,344 @@
+"""
+Safety Rules
+Declarative rule table for the AISRi safety gates and structural clearance,
+compiled into NumPy lookup tables.
+
+The rule table is plain data keyed by intensity, workout type and
+structural state. At load time it is compiled into small arrays (one row
+per intensity / structural state, one column per workout type), so a
+whole batch of candidate workouts is checked with array indexing and
+comparisons instead of per-workout branching.
+
+Rules are read from DEFAULT_SAFETY_RULES, or from the JSON file named by
+SAFETY_RULES_PATH when set. The file is re-read whenever its mtime
+changes (or on reload()), and every result carries the rule version:
+the table's own 'version' plus a short content hash.
+
+Usage:
+    rules = SafetyRuleEngine.from_env()
+    compiled = rules.current()
+    checks = compiled.evaluate_gates(intensities, aisri, injury_risk, recovery,
+                                     consecutive_hard, projected_acwr)
+    compiled.version   # e.g. '2026.10.1+3f9c1a2b'
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+DEFAULT_SAFETY_RULES = {
+    'version': '2026.10.1',
+
+    # Per-intensity gate thresholds. A missing key means the gate does not
+    # apply to that intensity; intensities not listed get '_default'.
+    'intensities': {
+        '_default': {},
+        'easy': {},
+        'moderate': {},
+        'long': {'min_recovery': 60},
+        'hard': {'min_aisri': 65, 'max_injury_risk': 75, 'min_recovery': 60, 'max_consecutive_hard_days': 3},
+        'tempo': {'min_aisri': 65, 'max_injury_risk': 75, 'min_recovery': 60, 'max_consecutive_hard_days': 3},
+        'threshold': {'min_aisri': 65},
+        'interval': {'min_aisri': 70, 'max_injury_risk': 75, 'min_recovery': 60, 'max_consecutive_hard_days': 3},
+        'speed': {'min_aisri': 70, 'max_injury_risk': 75, 'min_recovery': 60, 'max_consecutive_hard_days': 3},
+        'vo2max': {'min_aisri': 70}
+    },
+
+    # Applies to every intensity. Chronic load (minutes/day) below
+    # min_chronic_minutes counts as that much, so athletes with little
+    # history can still train (about 1h45 a week).
+    'volume': {'max_acwr': 1.3, 'min_chronic_minutes': 15},
+
+    # Structural rules block intensity classes ('low' .. 'very_high');
+    # gate intensities are mapped onto them. Class names pass through.
+    'intensity_classes': {
+        'easy': 'low',
+        'recovery': 'low',
+        'moderate': 'moderate',
+        'long': 'moderate',
+        'hard': 'high',
+        'tempo': 'high',
+        'threshold': 'high',
+        'interval': 'very_high',
+        'speed': 'very_high',
+        'vo2max': 'very_high',
+        'race': 'very_high'
+    },
+
+    # Structural clearance by state (see StructuralState)
+    'structural': {
+        'red': {
+            'allowed_types': ['mobility', 'activation', 'easy', 'recovery'],
+            'blocked_intensities': ['high', 'very_high'],
+            'speed_permission': False,
+            'type_reason': 'Only mobility, activation, and easy runs (zone 1-2) allowed.',
+            'intensity_reason': 'High intensity not allowed.'
+        },
+        'yellow': {
+            'blocked_types': ['threshold', 'vo2max', 'interval', 'race'],
+            'speed_permission': False,
+            'type_reason': 'Threshold and VO2max workouts not allowed.'
+        },
+        'green': {
+            'speed_permission': True
+        }
+    }
+}
+
+STRUCTURAL_STATES = ['red', 'yellow', 'green']
+OTHER = '_other'  # Column for workout types / intensities the table does not name
+
+_UNLIMITED = np.inf
+
+
+@dataclass
+class GateChecks:
+    """Per-gate pass/fail arrays for a batch of candidate workouts"""
+    aisri: np.ndarray
+    injury_risk: np.ndarray
+    recovery: np.ndarray
+    consecutive_days: np.ndarray
+    volume: np.ndarray
+    min_aisri: np.ndarray
+    max_injury_risk: np.ndarray
+    min_recovery: np.ndarray
+    max_consecutive_hard_days: np.ndarray
+
+
+class CompiledSafetyRules:
+    """Lookup-table form of a rule table"""
+
+    def __init__(self, rules: Dict):
+        self.rules = rules
+        digest = hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()[:8]
+        self.version = f"{rules.get('version', 'unversioned')}+{digest}"
+
+        # Intensity rows; row 0 is the default for unknown intensities
+        intensity_rules = dict(rules['intensities'])
+        default = intensity_rules.pop('_default', {})
+        self.intensity_names = [OTHER] + sorted(intensity_rules)
+        self._intensity_index = {name: i for i, name in enumerate(self.intensity_names)}
+        rows = [default] + [intensity_rules[name] for name in self.intensity_names[1:]]
+
+        self.min_aisri = np.array([r.get('min_aisri', -_UNLIMITED) for r in rows], dtype=np.float64)
+        self.max_injury_risk = np.array([r.get('max_injury_risk', _UNLIMITED) for r in rows], dtype=np.float64)
+        self.min_recovery = np.array([r.get('min_recovery', -_UNLIMITED) for r in rows], dtype=np.float64)
+        self.max_consecutive_hard_days = np.array(
+            [r.get('max_consecutive_hard_days', _UNLIMITED) for r in rows], dtype=np.float64
+        )
+        self.max_volume_acwr = float(rules.get('volume', {}).get('max_acwr', _UNLIMITED))
+        self.min_chronic_minutes = float(rules.get('volume', {}).get('min_chronic_minutes', 0))
+
+        # Structural tables: [state, workout type] and [state, structural intensity]
+        structural = rules.get('structural', {})
+        workout_types = set()
+        structural_intensities = set()
+        for state_rules in structural.values():
+            workout_types.update(state_rules.get('allowed_types', []))
+            workout_types.update(state_rules.get('blocked_types', []))
+            structural_intensities.update(state_rules.get('blocked_intensities', []))
+
+        self.workout_type_names = [OTHER] + sorted(workout_types)
+        self._workout_type_index = {name: i for i, name in enumerate(self.workout_type_names)}
+        self.structural_intensity_names = [OTHER] + sorted(structural_intensities)
+        self._structural_intensity_index = {name: i for i, name in enumerate(self.structural_intensity_names)}
+        # Rule files written before the mapping existed keep the default one
+        self.intensity_classes = dict(
+            rules.get('intensity_classes', DEFAULT_SAFETY_RULES['intensity_classes'])
+        )
+
+        self.type_allowed = np.ones((len(STRUCTURAL_STATES), len(self.workout_type_names)), dtype=bool)
+        self.intensity_allowed = np.ones((len(STRUCTURAL_STATES), len(self.structural_intensity_names)), dtype=bool)
+        self.speed_permission = np.zeros(len(STRUCTURAL_STATES), dtype=bool)
+
+        for s, state in enumerate(STRUCTURAL_STATES):
+            state_rules = structural.get(state, {})
+            if 'allowed_types' in state_rules:
+                self.type_allowed[s, :] = False
+                for name in state_rules['allowed_types']:
+                    self.type_allowed[s, self._workout_type_index[name]] = True
+            for name in state_rules.get('blocked_types', []):
+                self.type_allowed[s, self._workout_type_index[name]] = False
+            for name in state_rules.get('blocked_intensities', []):
+                self.intensity_allowed[s, self._structural_intensity_index[name]] = False
+            self.speed_permission[s] = bool(state_rules.get('speed_permission', False))
+
+    # =========================================================================
+    # ENCODING
+    # =========================================================================
+
+    def intensity_codes(self, intensities: Sequence[str]) -> np.ndarray:
+        index = self._intensity_index
+        return np.fromiter((index.get(i, 0) for i in intensities), dtype=np.intp, count=len(intensities))
+
+    def workout_type_codes(self, workout_types: Sequence[str]) -> np.ndarray:
+        index = self._workout_type_index
+        return np.fromiter((index.get(t.lower(), 0) for t in workout_types), dtype=np.intp, count=len(workout_types))
+
+    def structural_intensity_codes(self, intensities: Sequence[str]) -> np.ndarray:
+        """Codes for gate intensities ('interval') or intensity classes ('very_high')"""
+        index = self._structural_intensity_index
+        classes = self.intensity_classes
+        return np.fromiter(
+            (index.get(classes.get(i, i), 0) for i in intensities), dtype=np.intp, count=len(intensities)
+        )
+
+    @staticmethod
+    def state_codes(states: Sequence[str]) -> np.ndarray:
+        return np.fromiter((STRUCTURAL_STATES.index(s) for s in states), dtype=np.intp, count=len(states))
+
+    # =========================================================================
+    # BATCH EVALUATION
+    # =========================================================================
+
+    def evaluate_gates(
+        self,
+        intensities: Sequence[str],
+        aisri: np.ndarray,
+        injury_risk: np.ndarray,
+        recovery: np.ndarray,
+        consecutive_hard: np.ndarray,
+        projected_acwr: np.ndarray
+    ) -> GateChecks:
+        """
+        Check a batch of candidate workouts against the gate rules.
+
+        Args:
+            intensities: Intensity per candidate
+            aisri: Latest AISRi score (NaN when there is no assessment)
+            injury_risk: Latest injury risk (neutral 50 when unknown)
+            recovery: Recovery pillar (NaN when unknown: gate not applied)
+            consecutive_hard: Current streak of hard training days
+            projected_acwr: EWMA ACWR with the workout added (NaN: not checked)
+
+        Returns:
+            GateChecks with one boolean per candidate and gate, plus the
+            thresholds that applied (for failure messages)
+        """
+        return self.evaluate_gate_codes(
+            self.intensity_codes(intensities), aisri, injury_risk, recovery, consecutive_hard, projected_acwr
+        )
+
+    def evaluate_gate_codes(
+        self,
+        codes: np.ndarray,
+        aisri: np.ndarray,
+        injury_risk: np.ndarray,
+        recovery: np.ndarray,
+        consecutive_hard: np.ndarray,
+        projected_acwr: np.ndarray
+    ) -> GateChecks:
+        """
+        evaluate_gates with intensities already encoded (intensity_codes).
+        Codes broadcast against the inputs, so a single code checks a whole
+        matrix of inputs (e.g. athletes x days) for one intensity.
+        """
+        min_aisri = self.min_aisri[codes]
+        max_injury_risk = self.max_injury_risk[codes]
+        min_recovery = self.min_recovery[codes]
+        max_consecutive = self.max_consecutive_hard_days[codes]
+
+        aisri = np.asarray(aisri, dtype=np.float64)
+        recovery = np.asarray(recovery, dtype=np.float64)
+        projected_acwr = np.asarray(projected_acwr, dtype=np.float64)
+
+        return GateChecks(
+            aisri=~np.isnan(aisri) & (aisri >= min_aisri),
+            injury_risk=np.asarray(injury_risk, dtype=np.float64) <= max_injury_risk,
+            recovery=np.isnan(recovery) | (recovery >= min_recovery),
+            consecutive_days=np.asarray(consecutive_hard, dtype=np.float64) < max_consecutive,
+            volume=np.isnan(projected_acwr) | (projected_acwr <= self.max_volume_acwr),
+            min_aisri=min_aisri,
+            max_injury_risk=max_injury_risk,
+            min_recovery=min_recovery,
+            max_consecutive_hard_days=max_consecutive
+        )
+
+    def evaluate_structural(
+        self,
+        states: Sequence[str],
+        workout_types: Sequence[str],
+        intensities: Sequence[str]
+    ) -> Dict[str, np.ndarray]:
+        """
+        Structural clearance for a batch of candidates.
+
+        Returns:
+            {'type_allowed', 'intensity_allowed', 'speed_permission'} arrays
+        """
+        s = self.state_codes(states)
+        return {
+            'type_allowed': self.type_allowed[s, self.workout_type_codes(workout_types)],
+            'intensity_allowed': self.intensity_allowed[s, self.structural_intensity_codes(intensities)],
+            'speed_permission': self.speed_permission[s]
+        }
+
+    def structural_reason(self, state: str, kind: str) -> str:
+        """Human-readable reason for a structural block ('type' or 'intensity')"""
+        return self.rules.get('structural', {}).get(state, {}).get(f'{kind}_reason', '')
+
+
+class SafetyRuleEngine:
+    """Holds the compiled rule table and hot-reloads it when the source changes"""
+
+    def __init__(self, path: Optional[str] = None, rules: Optional[Dict] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._compiled = CompiledSafetyRules(copy.deepcopy(rules or DEFAULT_SAFETY_RULES))
+        if path:
+            self.reload()
+
+    @classmethod
+    def from_env(cls) -> 'SafetyRuleEngine':
+        return cls(path=os.getenv('SAFETY_RULES_PATH') or None)
+
+    def current(self) -> CompiledSafetyRules:
+        """Compiled rules, re-read first if the rule file changed"""
+        if self.path:
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime is not None and mtime != self._mtime:
+                self.reload()
+        return self._compiled
+
+    def reload(self) -> CompiledSafetyRules:
+        """
+        Re-read and recompile the rule file.
+
+        A file that is missing or does not compile leaves the previous
+        rules in place; a broken file is not retried until it changes again.
+        """
+        with self._lock:
+            mtime = None
+            try:
+                mtime = os.stat(self.path).st_mtime
+                with open(self.path) as f:
+                    compiled = CompiledSafetyRules(json.load(f))
+            except Exception as e:
+                print(f"Warning: Could not load safety rules from {self.path}: {e}")
+                if mtime is not None:
+                    self._mtime = mtime
+                return self._compiled
+
+            if compiled.version != self._compiled.version:
+                print(f"🛡️ Safety rules loaded: {compiled.version}")
+            self._compiled = compiled
+            self._mtime = mtime
+            return compiled
+
+    def replace(self, rules: Dict) -> CompiledSafetyRules:
+        """Swap in a rule table directly (e.g. from an admin endpoint)"""
+        compiled = CompiledSafetyRules(copy.deepcopy(rules))
+        with self._lock:
+            self._compiled = compiled
+        return compiled
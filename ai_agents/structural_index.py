@@ -0,0 +1,358 @@
+"""
+Structural Index
+In-memory per-athlete structural readiness index (score, RED/YELLOW/GREEN
+state, source assessment) built from aisri_scores.
+
+The structural score (mean of strength, mobility and, when present, ROM
+from the latest assessment) only changes when a new assessment lands, so
+it is computed once per assessment and held in a map. A periodic bulk
+refresh pulls only assessments created since the last refresh; lookups
+for thousands of athletes never touch the database.
+
+Usage:
+    index = StructuralIndex.shared(db.supabase)   # one index per client and process
+    index.load_all()                       # at startup
+    index.get(athlete_id).state            # StructuralState.GREEN
+    index.states_for(athlete_ids)          # {athlete_id: 'red' | 'yellow' | 'green'}
+    invalidate_structural_index(athlete_id)   # after saving a new assessment
+
+    # Whole squads: one DISTINCT ON query per page, vectorized classification
+    for page in index.iter_latest_assessments(group_id=coach_id):
+        scores = structural_scores_from_rows(page)
+"""
+
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+
+DEFAULT_STRUCTURAL_SCORE = 50
+REFRESH_INTERVAL_SECONDS = 300
+PAGE_SIZE = 1000
+
+# State order for vectorized codes (index into STATE_NAMES)
+STATE_NAMES = np.array(['red', 'yellow', 'green'])
+
+# Shared indexes by supabase client (see StructuralIndex.shared)
+_shared_indexes: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+_shared_lock = threading.Lock()
+
+
+class StructuralState(Enum):
+    """
+    Structural readiness state based on structural score.
+
+    States:
+    - RED: < 55 - Only mobility + activation + zone 1-2 allowed
+    - YELLOW: 55-70 - No threshold or VO2 allowed
+    - GREEN: > 70 - Full training access
+    """
+    RED = 'red'
+    YELLOW = 'yellow'
+    GREEN = 'green'
+
+    @staticmethod
+    def from_score(structural_score: int) -> 'StructuralState':
+        """Determine state from structural score"""
+        if structural_score < 55:
+            return StructuralState.RED
+        elif structural_score <= 70:
+            return StructuralState.YELLOW
+        else:
+            return StructuralState.GREEN
+
+    @staticmethod
+    def codes_from_scores(structural_scores: np.ndarray) -> np.ndarray:
+        """Vectorized from_score: 0=RED, 1=YELLOW, 2=GREEN (see STATE_NAMES)"""
+        scores = np.asarray(structural_scores)
+        return np.where(scores < 55, 0, np.where(scores <= 70, 1, 2))
+
+
+def structural_score_from_assessment(latest: Optional[Dict]) -> int:
+    """Structural score from an aisri_scores row (neutral 50 when missing)"""
+    if not latest:
+        return DEFAULT_STRUCTURAL_SCORE
+
+    # Average of strength + mobility (the core structural components)
+    strength = latest.get('strength_score', 50)
+    mobility = latest.get('mobility_score', 50)
+
+    # Could also factor in ROM if available
+    rom = latest.get('rom_score', None)
+
+    if rom is not None:
+        return int((strength + mobility + rom) / 3)
+    return int((strength + mobility) / 2)
+
+
+def structural_scores_from_rows(rows: List[Dict]) -> np.ndarray:
+    """
+    Vectorized structural_score_from_assessment over assessment rows
+    (e.g. get_latest_structural_assessments). Missing pillars count as 50;
+    athletes without an assessment get the neutral default.
+    """
+    def column(name: str, default: float) -> np.ndarray:
+        return np.array(
+            [default if row.get(name) is None else float(row[name]) for row in rows],
+            dtype=np.float64
+        )
+
+    strength = column('strength_score', 50.0)
+    mobility = column('mobility_score', 50.0)
+    rom = column('rom_score', np.nan)
+
+    with_rom = ~np.isnan(rom)
+    scores = np.where(
+        with_rom,
+        (strength + mobility + np.where(with_rom, rom, 0)) / 3,
+        (strength + mobility) / 2
+    )
+    scores = np.trunc(scores).astype(np.int64)
+
+    has_assessment = np.array([row.get('assessment_id') is not None for row in rows], dtype=bool)
+    return np.where(has_assessment, scores, DEFAULT_STRUCTURAL_SCORE)
+
+
+def entries_from_latest_rows(rows: List[Dict]) -> List['StructuralIndexEntry']:
+    """Index entries for a page of get_latest_structural_assessments rows"""
+    scores = structural_scores_from_rows(rows)
+    states = StructuralState.codes_from_scores(scores)
+    computed_at = datetime.now().isoformat()
+    return [
+        StructuralIndexEntry(
+            athlete_id=str(row['athlete_id']),
+            score=int(score),
+            state=StructuralState(STATE_NAMES[state]),
+            assessment_id=row.get('assessment_id'),
+            assessment_date=row.get('assessment_date'),
+            assessment_created_at=row.get('created_at'),
+            computed_at=computed_at
+        )
+        for row, score, state in zip(rows, scores, states)
+    ]
+
+
+@dataclass
+class StructuralIndexEntry:
+    """Structural readiness of one athlete"""
+    athlete_id: str
+    score: int
+    state: StructuralState
+    assessment_id: Optional[str] = None
+    assessment_date: Optional[str] = None
+    assessment_created_at: Optional[str] = None
+    computed_at: Optional[str] = None
+
+    @classmethod
+    def from_assessment(cls, athlete_id: str, row: Optional[Dict]) -> 'StructuralIndexEntry':
+        score = structural_score_from_assessment(row)
+        return cls(
+            athlete_id=athlete_id,
+            score=score,
+            state=StructuralState.from_score(score),
+            assessment_id=row.get('id') if row else None,
+            assessment_date=row.get('assessment_date') if row else None,
+            assessment_created_at=row.get('created_at') if row else None,
+            computed_at=datetime.now().isoformat()
+        )
+
+    def is_superseded_by(self, row: Dict) -> bool:
+        """True if `row` is a newer assessment than the one indexed"""
+        return (row.get('assessment_date') or '', row.get('created_at') or '') >= \
+            (self.assessment_date or '', self.assessment_created_at or '')
+
+
+class StructuralIndex:
+    """athlete_id -> StructuralIndexEntry, refreshed from new assessments only"""
+
+    TABLE = 'aisri_scores'
+
+    def __init__(self, supabase, refresh_interval: float = REFRESH_INTERVAL_SECONDS):
+        self.supabase = supabase
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, StructuralIndexEntry] = {}
+        self._watermark: Optional[str] = None   # Latest created_at seen by a bulk refresh
+        self._last_refresh: Optional[float] = None  # monotonic(); None = never
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, supabase) -> 'StructuralIndex':
+        """The index shared by every gate and agent using this client"""
+        with _shared_lock:
+            index = _shared_indexes.get(supabase)
+            if index is None:
+                index = _shared_indexes[supabase] = cls(supabase)
+            return index
+
+    # =========================================================================
+    # LOOKUPS
+    # =========================================================================
+
+    def get(self, athlete_id: str) -> StructuralIndexEntry:
+        """Entry for one athlete; a miss loads that athlete's latest assessment"""
+        athlete_id = str(athlete_id)
+        self.maybe_refresh()
+        entry = self._entries.get(athlete_id)
+        if entry is None:
+            entry = self._load_one(athlete_id)
+        return entry
+
+    def get_many(self, athlete_ids: Iterable[str]) -> Dict[str, StructuralIndexEntry]:
+        """Entries for many athletes; misses are loaded in one query"""
+        ids = [str(a) for a in athlete_ids]
+        self.maybe_refresh()
+        missing = [a for a in ids if a not in self._entries]
+        if missing:
+            self._load_many(missing)
+        return {a: self._entries[a] for a in ids}
+
+    def states_for(self, athlete_ids: Iterable[str]) -> Dict[str, str]:
+        """RED/YELLOW/GREEN ('red'/'yellow'/'green') per athlete"""
+        return {a: entry.state.value for a, entry in self.get_many(athlete_ids).items()}
+
+    def store(self, entries: Iterable[StructuralIndexEntry]):
+        """Put freshly computed entries (e.g. from a bulk classification) in the map"""
+        for entry in entries:
+            self._entries[entry.athlete_id] = entry
+
+    def iter_latest_assessments(
+        self,
+        athlete_ids: Optional[List[str]] = None,
+        group_id: Optional[str] = None,
+        page_size: int = PAGE_SIZE
+    ) -> Iterator[List[Dict]]:
+        """
+        Latest assessment per athlete, one DISTINCT ON query per page.
+
+        Args:
+            athlete_ids: Explicit athletes
+            group_id: Coach id; adds the coach's active athletes
+            page_size: Athletes per page
+
+        Yields:
+            Pages of get_latest_structural_assessments rows, by athlete_id
+        """
+        ids = sorted(set(str(a) for a in athlete_ids)) if athlete_ids else None
+        after = None
+        while True:
+            params = {'p_after': after, 'p_limit': page_size}
+            if ids is not None:
+                # Explicit lists are paged client-side so each call stays small
+                chunk = [a for a in ids if after is None or a > after][:page_size]
+                if not chunk and not group_id:
+                    return
+                params['p_athlete_ids'] = chunk
+            if group_id:
+                params['p_coach_id'] = str(group_id)
+
+            page = self.supabase.rpc('get_latest_structural_assessments', params).execute().data or []
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = page[-1]['athlete_id']
+
+    def invalidate(self, athlete_id: str):
+        """Drop one athlete so the next lookup re-reads the latest assessment"""
+        self._entries.pop(str(athlete_id), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # =========================================================================
+    # REFRESH
+    # =========================================================================
+
+    def maybe_refresh(self):
+        """Bulk refresh if the refresh interval has elapsed"""
+        if self._last_refresh is None or time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Apply every assessment created since the last refresh.
+
+        The first call only sets the watermark (the newest created_at in
+        the table); athletes are loaded on demand (or all at once with
+        load_all).
+
+        Returns:
+            Number of athletes whose entry changed
+        """
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            if self._watermark is None:
+                # From the database, not the local clock: rows stamped
+                # before a skewed client time would never be picked up
+                self._watermark = self._latest_created_at() or ''
+                return 0
+
+            changed = 0
+            for row in self._fetch_since(self._watermark):
+                self._watermark = max(self._watermark, row.get('created_at') or '')
+                athlete_id = str(row['athlete_id'])
+                entry = self._entries.get(athlete_id)
+                # Athletes not indexed yet are loaded on demand
+                if entry is not None and entry.is_superseded_by(row):
+                    self._entries[athlete_id] = StructuralIndexEntry.from_assessment(athlete_id, row)
+                    changed += 1
+            return changed
+
+    def load_all(self) -> int:
+        """Index every athlete with an assessment (e.g. at startup)"""
+        with self._lock:
+            self._watermark = None
+            for row in self._fetch_since(None):
+                self._watermark = max(self._watermark or '', row.get('created_at') or '')
+                athlete_id = str(row['athlete_id'])
+                entry = self._entries.get(athlete_id)
+                if entry is None or entry.is_superseded_by(row):
+                    self._entries[athlete_id] = StructuralIndexEntry.from_assessment(athlete_id, row)
+            self._last_refresh = time.monotonic()
+            return len(self._entries)
+
+    def _latest_created_at(self) -> Optional[str]:
+        result = self.supabase.table(self.TABLE).select('created_at')\
+            .order('created_at', desc=True).limit(1).execute()
+        return result.data[0].get('created_at') if result.data else None
+
+    def _fetch_since(self, watermark: Optional[str]) -> List[Dict]:
+        """Assessments created after `watermark`, oldest first, paged"""
+        rows = []
+        offset = 0
+        while True:
+            query = self.supabase.table(self.TABLE).select('*')
+            if watermark:
+                query = query.gt('created_at', watermark)
+            page = query.order('created_at').range(offset, offset + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def _load_one(self, athlete_id: str) -> StructuralIndexEntry:
+        result = self.supabase.table(self.TABLE).select('*').eq(
+            'athlete_id', athlete_id
+        ).order('assessment_date', desc=True).limit(1).execute()
+        entry = StructuralIndexEntry.from_assessment(athlete_id, result.data[0] if result.data else None)
+        self._entries[athlete_id] = entry
+        return entry
+
+    def _load_many(self, athlete_ids: List[str]):
+        for page in self.iter_latest_assessments(athlete_ids):
+            self.store(entries_from_latest_rows(page))
+
+
+def invalidate_structural_index(athlete_id: str):
+    """Drop one athlete from every shared index (call after saving an assessment)"""
+    with _shared_lock:
+        indexes = list(_shared_indexes.values())
+    for index in indexes:
+        index.invalidate(athlete_id)
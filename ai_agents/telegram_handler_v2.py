@@ -12,28 +12,36 @@ class TelegramHandler:
     """Handle Telegram Bot API operations"""
 
     @staticmethod
-    async def send(chat_id, text):
+    async def send(chat_id, text, client: httpx.AsyncClient = None):
         """
         Send message to Telegram chat
         
         Args:
             chat_id: Telegram chat ID
             text: Message text to send
+            client: Optional shared AsyncClient (reuses connections for bulk sends)
+            
+        Returns:
+            httpx.Response or None if the request could not be made
         """
         if not TELEGRAM_TOKEN:
             print("⚠️ TELEGRAM_BOT_TOKEN not set")
-            return
+            return None
             
         url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
+        payload = {
+            "chat_id": chat_id,
+            "text": text
+        }
         
         try:
+            if client is not None:
+                return await client.post(url, json=payload)
             async with httpx.AsyncClient(timeout=10) as client:
-                await client.post(url, json={
-                    "chat_id": chat_id,
-                    "text": text
-                })
+                return await client.post(url, json=payload)
         except Exception as e:
             print(f"Error sending Telegram message: {e}")
+            return None
 
     @staticmethod
     def extract(update):
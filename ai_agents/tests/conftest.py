@@ -0,0 +1,22 @@
+"""
+Shared pytest setup for the ai_agents unit tests.
+
+Modules in ai_agents create Supabase clients at import time, so dummy
+credentials are set before anything is imported. No test talks to a
+real database: DB access goes through benchmarks.offline_db or small fakes.
+
+Run from ai_agents/:
+    python -m pytest tests -q
+"""
+
+import os
+import sys
+
+AI_AGENTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault('SUPABASE_URL', 'https://mock-supabase-url.com')
+os.environ.setdefault('SUPABASE_KEY', 'mock-supabase-key')
+os.environ.setdefault('SUPABASE_SERVICE_KEY', 'mock-supabase-service-key')
+
+if AI_AGENTS_DIR not in sys.path:
+    sys.path.insert(0, AI_AGENTS_DIR)
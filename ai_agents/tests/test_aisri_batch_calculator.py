@@ -0,0 +1,147 @@
+"""
+Multi-source AISRI batch scoring: provider columns, tenure and intensity bonuses.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+
+import aisri_auto_calculator
+from activity_providers import (
+    SOURCE_GARMIN,
+    SOURCE_STRAVA,
+    ActivityFrame,
+    StravaActivityProvider
+)
+from aisri_auto_calculator import AISRIAutoCalculator, calculate_aisri_auto
+from benchmarks.offline_db import OfflineSupabase
+
+NOW = datetime(2026, 10, 19, 12, tzinfo=timezone.utc)
+
+
+def _frame(user_ids, activities):
+    """activities: (user_id, days_ago, suffer_score, source)"""
+    columns = {column: [] for column in ActivityFrame.COLUMNS}
+    row_user_ids = []
+    for user_id, days_ago, suffer_score, source in activities:
+        columns['start_ts'].append((NOW - timedelta(days=days_ago, hours=2)).timestamp())
+        columns['distance_m'].append(8000.0 + days_ago * 37)
+        columns['moving_time_s'].append(2400.0 + days_ago * 11)
+        columns['average_speed'].append(3.0 + (days_ago % 5) * 0.1)
+        columns['average_heartrate'].append(150.0)
+        columns['suffer_score'].append(suffer_score)
+        columns['source'].append(source)
+        row_user_ids.append(user_id)
+    return ActivityFrame.build(user_ids, columns, row_user_ids)
+
+
+def test_strava_provider_selects_suffer_score():
+    columns = [c.strip() for c in StravaActivityProvider.select_columns.split(',')]
+    assert 'suffer_score' in columns
+
+    parsed = StravaActivityProvider().parse_row({'start_date': '2026-10-18T06:00:00Z', 'suffer_score': 140})
+    assert parsed['suffer_score'] == 140
+
+
+def test_recent_hard_session_adds_intensity_bonus():
+    easy = [('easy', d, 40.0, SOURCE_STRAVA) for d in range(1, 20, 2)]
+    hard = [('hard', d, 140.0 if d == 1 else 40.0, SOURCE_STRAVA) for d in range(1, 20, 2)]
+    results = AISRIAutoCalculator.calculate_batch(_frame(['easy', 'hard'], easy + hard), now=NOW)
+
+    assert results['hard'].pillar_intensity == results['easy'].pillar_intensity + 10
+
+
+def test_tenure_start_adds_adaptability_and_confidence():
+    activities = [(user, d, 40.0, SOURCE_STRAVA) for user in ('new', 'veteran') for d in range(1, 20, 2)]
+    frame = _frame(['new', 'veteran'], activities)
+    results = AISRIAutoCalculator.calculate_batch(
+        frame, tenure_start={'veteran': NOW - timedelta(days=3 * 365)}, now=NOW
+    )
+
+    assert results['veteran'].pillar_adaptability == results['new'].pillar_adaptability + 9
+    assert results['veteran'].confidence == results['new'].confidence + 10
+
+
+def test_same_run_from_two_sources_is_counted_once():
+    frame = _frame(['a'], [('a', 3, 40.0, SOURCE_GARMIN), ('a', 3, 40.0, SOURCE_STRAVA)])
+    assert len(frame) == 1
+    assert frame.source[0] == SOURCE_STRAVA
+
+
+def _pillars(result):
+    return (result.aisri_score, result.risk_level, result.confidence,
+            result.pillar_adaptability, result.pillar_injury_risk, result.pillar_fatigue,
+            result.pillar_recovery, result.pillar_intensity, result.pillar_consistency,
+            result.activities_analyzed)
+
+
+@pytest.mark.parametrize('n_activities', [2, 9, 34])
+def test_per_athlete_and_batch_scoring_agree_on_the_same_activities(n_activities):
+    now = datetime.now()
+    activities = [
+        {
+            'start_date_local': (now - timedelta(days=d * 1.6, hours=2)).isoformat(),
+            'distance': 6000.0 + (d % 4) * 2500,
+            'moving_time': 1800.0 + d * 40,
+            'average_speed': 2.6 + (d % 5) * 0.3,
+            'average_heartrate': 150.0 if d % 3 else None,
+            'suffer_score': 130.0 if d == 4 else 45.0
+        }
+        for d in range(n_activities)
+    ]
+    columns = {
+        'start_ts': [datetime.fromisoformat(a['start_date_local']).timestamp() for a in activities],
+        'distance_m': [a['distance'] for a in activities],
+        'moving_time_s': [a['moving_time'] for a in activities],
+        'average_speed': [a['average_speed'] for a in activities],
+        'average_heartrate': [a['average_heartrate'] or float('nan') for a in activities],
+        'suffer_score': [a['suffer_score'] for a in activities],
+        'source': [SOURCE_STRAVA] * n_activities
+    }
+    frame = ActivityFrame.build(['a'], columns, ['a'] * n_activities)
+    joined = now - timedelta(days=800)
+
+    single = AISRIAutoCalculator.score_activities({'created_at': joined.isoformat()}, activities)
+    batch = AISRIAutoCalculator.calculate_batch(frame, {'a': joined.astimezone(timezone.utc)})['a']
+
+    assert _pillars(single) == _pillars(batch)
+
+
+def test_endpoint_scores_athletes_without_strava(monkeypatch):
+    user_id = '0b5c3a4e-1f2d-4c6b-9a8e-7d6f5e4c3b2a'
+    now = datetime.now(timezone.utc)
+    supabase = OfflineSupabase()
+    supabase.insert('workout_results', [
+        {'athlete_id': user_id, 'workout_date': (now - timedelta(days=d)).isoformat(),
+         'distance_km': 8.0, 'duration_seconds': 2700, 'avg_hr': 148, 'data_source': 'garmin'}
+        for d in range(1, 20, 2)
+    ] + [{'athlete_id': user_id, 'workout_date': (now - timedelta(days=4)).isoformat(),
+          'distance_km': 5.0, 'duration_seconds': 1700, 'data_source': 'manual'}])
+    queries = []
+    supabase.register_rpc('execute_raw_sql', lambda params: queries.append(params['query']) or [
+        {'tenure_start': (now - timedelta(days=400)).isoformat()}
+    ])
+
+    class FakeDatabase:
+        def __init__(self):
+            self.supabase = supabase
+            self.upserts = []
+
+        async def upsert_aisri_score(self, user_id, **scores):
+            self.upserts.append((user_id, scores))
+
+    fake = FakeDatabase()
+    monkeypatch.setattr(aisri_auto_calculator, 'db', fake)
+
+    response = asyncio.run(calculate_aisri_auto(user_id, BackgroundTasks()))
+
+    assert response['success'] and response['metadata']['activities_analyzed'] == 11
+    assert response['metadata']['data_source'] == 'Garmin + Manual'
+    assert fake.upserts[0][0] == user_id
+    assert user_id in queries[0]
+
+    with pytest.raises(HTTPException) as invalid:
+        asyncio.run(calculate_aisri_auto("x' OR '1'='1", BackgroundTasks()))
+    assert invalid.value.status_code == 400
@@ -0,0 +1,38 @@
+"""
+Benchmark regression gate: relative tolerance on median timings, above
+the run-to-run noise.
+"""
+
+from benchmarks.run_benchmarks import compare_to_baseline
+
+
+def _results(seconds, spread=None):
+    timing = {'seconds': seconds}
+    if spread is not None:
+        timing['spread_seconds'] = spread
+    return {'workout_generator': {'1000': timing}}
+
+
+def test_small_absolute_slowdown_is_a_regression():
+    # 1.8 ms -> 4.8 ms (+169%) used to pass under the 5 ms absolute floor
+    regressions = compare_to_baseline(_results(0.0048), {'results': _results(0.0018)}, tolerance=0.25)
+    assert len(regressions) == 1
+    assert 'workout_generator @ 1000' in regressions[0]
+
+
+def test_change_within_tolerance_passes():
+    assert compare_to_baseline(_results(0.0021), {'results': _results(0.0018)}, tolerance=0.25) == []
+
+
+def test_slowdown_within_run_to_run_noise_passes():
+    # A rerun of unchanged code: +35% on the median, but the runs themselves
+    # spread by ~2.5 ms, so a 3 ms shift is noise
+    baseline = {'results': _results(0.0088, spread=0.0021)}
+    assert compare_to_baseline(_results(0.0118, spread=0.0025), baseline, tolerance=0.25) == []
+
+
+def test_slowdown_beyond_run_to_run_noise_is_a_regression():
+    baseline = {'results': _results(0.0088, spread=0.0021)}
+    regressions = compare_to_baseline(_results(0.0188, spread=0.0025), baseline, tolerance=0.25)
+    assert len(regressions) == 1
+    assert 'workout_generator @ 1000' in regressions[0]
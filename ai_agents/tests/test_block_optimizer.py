@@ -0,0 +1,116 @@
+"""
+BlockOptimizer: plans pass the gates on the exact EWMA, batch = single.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from block_optimizer import BlockOptimizer, OptimizerInputs, SessionOption, session_options
+from safety_rules import SafetyRuleEngine
+from workload_engine import ACWR_SAFE_MAX, WorkloadEngine, WorkloadState
+
+START = date(2026, 10, 20)
+
+
+def _inputs(athlete_id='a1', acute=40.0, chronic=40.0, **kwargs):
+    kwargs.setdefault('aisri', 80.0)
+    kwargs.setdefault('recovery', 75.0)
+    return OptimizerInputs(athlete_id, WorkloadState(acute, chronic, START - timedelta(days=1)), **kwargs)
+
+
+def _key_streaks(plan, start_streak=0):
+    streak, streaks = start_streak, []
+    for session in plan.sessions:
+        if session.duration_minutes == 0:
+            streaks.append(streak)
+            continue
+        streak = streak + 1 if session.workout_type not in ('easy', 'recovery') else 0
+        streaks.append(streak)
+    return streaks
+
+
+@pytest.mark.parametrize('acute,chronic', [(40, 40), (20, 40), (55, 40), (90, 60)])
+def test_plan_passes_volume_and_streak_gates_on_exact_loads(acute, chronic):
+    plan = BlockOptimizer().optimize(_inputs(acute=acute, chronic=chronic), days=28, start=START)
+
+    assert len(plan.sessions) == 28
+    assert [s.day for s in plan.sessions] == [START + timedelta(days=d) for d in range(28)]
+    state = WorkloadState(acute, chronic, START - timedelta(days=1))
+    for session in plan.sessions:
+        state = WorkloadEngine.update(state, session.duration_minutes, session.day)
+        if session.duration_minutes:
+            assert state.acwr <= ACWR_SAFE_MAX + 1e-9, session
+        assert session.acwr_after == round(state.acwr, 2)
+    assert max(_key_streaks(plan)) <= 3
+    assert plan.stimulus > 0
+
+
+@pytest.mark.parametrize('chronic', [0.0, 2.0])
+def test_athlete_without_history_ramps_up_inside_the_acwr_window(chronic):
+    plan = BlockOptimizer().optimize(_inputs(acute=chronic * 3.6, chronic=chronic), days=14, start=START)
+
+    floor = SafetyRuleEngine().current().min_chronic_minutes
+    state = WorkloadState(chronic * 3.6, chronic, START - timedelta(days=1))
+    for session in plan.sessions:
+        day_state = WorkloadEngine.advance(state, session.day).with_chronic_floor(floor)
+        projected = WorkloadEngine.project(day_state, session.duration_minutes)
+        assert session.acwr_after == round(projected, 2)
+        assert projected <= ACWR_SAFE_MAX + 1e-9, session
+        state = WorkloadEngine.update(state, session.duration_minutes, session.day)
+    assert sum(1 for s in plan.sessions if s.duration_minutes) >= 5
+    assert max(s.duration_minutes for s in plan.sessions) < 90
+
+
+def test_static_gates_and_structural_state_limit_the_menu():
+    optimizer = BlockOptimizer()
+
+    low_aisri = optimizer.optimize(_inputs(aisri=66.0), days=14, start=START)
+    assert {'interval'}.isdisjoint(s.workout_type for s in low_aisri.sessions)
+
+    red = optimizer.optimize(_inputs(structural_state='red'), days=14, start=START)
+    assert {s.workout_type for s in red.sessions} <= {'rest', 'easy', 'recovery'}
+
+    yellow = optimizer.optimize(_inputs(structural_state='yellow'), days=14, start=START)
+    assert {'interval', 'threshold'}.isdisjoint(s.workout_type for s in yellow.sessions)
+
+
+def test_streak_carries_over_rest_days_from_history():
+    menu = [SessionOption('rest', 'rest', 0.0, 0.0), SessionOption('tempo', 'tempo', 40.0, 1.8)]
+    plan = BlockOptimizer().optimize(
+        _inputs(consecutive_hard=3, sessions=menu), days=7, start=START
+    )
+    # Three hard days already: without an easy day to reset, no more tempo
+    assert all(s.workout_type == 'rest' for s in plan.sessions)
+
+
+def test_batch_matches_single_athlete_runs():
+    optimizer = BlockOptimizer()
+    inputs = [
+        _inputs('a1'),
+        _inputs('a2', acute=70, chronic=50, structural_state='yellow'),
+        _inputs('a3', acute=10, chronic=30, aisri=60.0),
+        _inputs('a4', sessions=session_options())
+    ]
+
+    batch = optimizer.optimize_batch(inputs, days=21, start=START)
+
+    assert [p.athlete_id for p in batch] == ['a1', 'a2', 'a3', 'a4']
+    for record, plan in zip(inputs, batch):
+        single = optimizer.optimize(record, days=21, start=START)
+        assert plan.sessions == single.sessions
+        assert plan.stimulus == single.stimulus
+
+
+def test_weekly_structures_feed_the_generator():
+    plan = BlockOptimizer().optimize(_inputs(), days=14, start=START)
+    weeks = plan.weekly_structures()
+
+    assert len(weeks) == 2
+    assert sorted(weeks[0]) == list(range(1, 8))
+    assert weeks[0][START.isoweekday()] == plan.sessions[0].workout_type
+
+
+def test_horizon_is_bounded():
+    with pytest.raises(ValueError):
+        BlockOptimizer(SafetyRuleEngine()).optimize(_inputs(), days=29, start=START)
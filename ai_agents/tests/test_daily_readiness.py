@@ -0,0 +1,129 @@
+"""
+DailyReadiness: cached reads and the version-checked store.
+
+ReadinessTables mirrors the athlete_readiness invalidation trigger and
+the get_readiness_inputs / store_athlete_readiness RPCs of migration
+20261019000008.
+"""
+
+from datetime import date
+
+from aisri_safety_gate import AISRISafetyGate
+from benchmarks.offline_db import OfflineDatabase
+from daily_readiness import READINESS_TABLE, DailyReadiness
+from structural_index import StructuralIndex, StructuralIndexEntry, StructuralState
+
+TODAY = date(2026, 10, 19)
+
+
+class ReadinessTables:
+    def __init__(self, supabase):
+        self.rows = supabase._tables[READINESS_TABLE].rows
+        self.input_calls = 0
+        supabase.register_rpc('get_readiness_inputs', self.inputs)
+        supabase.register_rpc('store_athlete_readiness', self.store)
+
+    def _row(self, athlete_id):
+        return next((row for row in self.rows if row['athlete_id'] == athlete_id), None)
+
+    def invalidate(self, athlete_id):
+        """trg_invalidate_athlete_readiness"""
+        row = self._row(athlete_id)
+        if row is None:
+            self.rows.append({'athlete_id': athlete_id, 'readiness_date': TODAY.isoformat(),
+                              'status': 'PENDING', 'stale': True, 'version': 1})
+        else:
+            row.update(stale=True, version=row['version'] + 1)
+
+    def inputs(self, params):
+        self.input_calls += 1
+        return [{
+            'athlete_id': athlete_id,
+            'latest_aisri': {'aisri_score': 80, 'pillar_recovery': 75},
+            'latest_injury_prediction': {'risk_score': 20, 'risk_level': 'LOW'},
+            'assessment_aisri_score': 80,
+            'training_load': 60.0,
+            'readiness_version': (self._row(athlete_id) or {}).get('version', 0)
+        } for athlete_id in sorted(params['p_athlete_ids'])]
+
+    def store(self, params):
+        stored = []
+        for new in params['p_rows']:
+            row = self._row(new['athlete_id'])
+            if row is None:
+                self.rows.append({**new, 'stale': False})
+            elif row['version'] == new['version']:
+                row.update({**new, 'stale': False})
+            else:
+                continue
+            stored.append({'athlete_id': new['athlete_id']})
+        return stored
+
+
+class DecisionAgent:
+    """decide_action that can fire 'triggers' while readiness is computed"""
+
+    def __init__(self, during_compute=None):
+        self.during_compute = during_compute
+        self.calls = 0
+
+    def decide_action(self, aisri_score, injury_risk, training_load):
+        self.calls += 1
+        if self.during_compute:
+            self.during_compute()
+        return {'decision': 'TRAIN', 'reason': 'Safe to train at moderate intensity'}
+
+
+def _readiness(athlete_ids, during_compute=None):
+    database = OfflineDatabase()
+    tables = ReadinessTables(database.supabase)
+    index = StructuralIndex(database.supabase)
+    index.store(StructuralIndexEntry(a, 75, StructuralState.GREEN) for a in athlete_ids)
+    agent = DecisionAgent(during_compute and (lambda: during_compute(tables)))
+    readiness = DailyReadiness(
+        database, AISRISafetyGate(database, structural_index=index), decision_agent=agent
+    )
+    return readiness, tables, agent
+
+
+def test_fresh_record_is_served_without_recompute():
+    readiness, tables, agent = _readiness(['a1'])
+
+    first = readiness.get('a1', TODAY)
+    second = readiness.get('a1', TODAY)
+
+    assert first.decision == second.decision == 'TRAIN'
+    assert first.speed_permission
+    assert agent.calls == 1
+    assert tables.input_calls == 1
+
+
+def test_invalidation_during_compute_keeps_row_stale():
+    invalidated = []
+
+    def trigger(tables):
+        if not invalidated:
+            invalidated.append(True)
+            tables.invalidate('a1')   # new AISRi score lands mid-compute
+
+    readiness, tables, agent = _readiness(['a1'], during_compute=trigger)
+
+    readiness.get('a1', TODAY)
+    assert tables._row('a1')['stale']
+
+    readiness.get('a1', TODAY)
+    assert agent.calls == 2
+    row = tables._row('a1')
+    assert not row['stale'] and row['status'] != 'PENDING'
+
+
+def test_stale_trigger_after_store_forces_recompute():
+    readiness, tables, agent = _readiness(['a1', 'a2'])
+    readiness.get_many(['a1', 'a2'], TODAY)
+
+    tables.invalidate('a2')
+    records = readiness.get_many(['a1', 'a2'], TODAY)
+
+    assert set(records) == {'a1', 'a2'}
+    assert agent.calls == 3
+    assert records['a2'].version == 1
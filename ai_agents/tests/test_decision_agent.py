@@ -0,0 +1,27 @@
+"""
+Autonomous decision thresholds on ledger training load.
+"""
+
+from ai_engine_agent.autonomous_decision_agent import AISRiAutonomousDecisionAgent
+
+LOW_RISK = {"risk_score": 10, "risk_level": "LOW"}
+
+
+def _decide(training_load, aisri_score=75):
+    return AISRiAutonomousDecisionAgent().decide_action(aisri_score, LOW_RISK, training_load)["decision"]
+
+
+def test_normal_training_weeks_are_not_sent_to_recovery():
+    assert _decide(60) == "TRAIN"       # an hour easy per training day
+    assert _decide(90) == "TRAIN"       # 45 min of hard running (load x2)
+    assert _decide(120) == "TRAIN"
+
+
+def test_sustained_heavy_load_prescribes_recovery():
+    assert _decide(150) == "RECOVERY"   # 75+ hard minutes every training day
+
+
+def test_safety_overrides_come_first():
+    agent = AISRiAutonomousDecisionAgent()
+    assert agent.decide_action(90, {"risk_level": "HIGH"}, 0)["decision"] == "REST"
+    assert agent.decide_action(30, LOW_RISK, 0)["decision"] == "REST"
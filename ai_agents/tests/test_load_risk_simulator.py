@@ -0,0 +1,65 @@
+"""
+LoadRiskSimulator: exact without variability, sensible risk with it.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+from load_risk_simulator import LoadRiskSimulator
+from workload_engine import WorkloadEngine, WorkloadState
+
+STATE = WorkloadState(acute=40.0, chronic=40.0, as_of=date(2026, 10, 19))
+PLAN = [60, 0, 45, 90, 0, 40, 60] * 4
+
+
+def _exact_acwr(state, minutes):
+    acwr = []
+    for d, m in enumerate(minutes):
+        state = WorkloadEngine.update(state, m, STATE.as_of + timedelta(days=d + 1))
+        acwr.append(state.acwr)
+    return np.array(acwr)
+
+
+def test_backfill_from_state_matches_incremental_updates():
+    loads = np.array([PLAN, [m * 1.5 for m in PLAN]])
+    acute, chronic = WorkloadEngine.backfill_from_state(STATE, loads)
+
+    state = STATE
+    for d, m in enumerate(PLAN):
+        state = WorkloadEngine.update(state, m, STATE.as_of + timedelta(days=d + 1))
+        assert np.isclose(acute[0, d], state.acute)
+        assert np.isclose(chronic[0, d], state.chronic)
+
+
+def test_without_variability_every_band_is_the_exact_trajectory():
+    simulator = LoadRiskSimulator(n_simulations=50, adherence=1.0, duration_cv=0.0, pace_cv=0.0)
+    projection = simulator.simulate(STATE, PLAN)
+
+    expected = _exact_acwr(STATE, PLAN)
+    assert projection.days[0] == date(2026, 10, 20)
+    for band in projection.bands.values():
+        assert np.allclose(band, expected)
+    assert projection.p_high_risk == 0.0
+
+
+def test_risk_grows_with_overload():
+    simulator = LoadRiskSimulator(n_simulations=4000, seed=11)
+
+    steady = simulator.simulate(STATE, PLAN)
+    overload = simulator.simulate(STATE, [150] * 14)
+    rest = simulator.simulate(STATE, [0] * 14)
+
+    assert steady.p_high_risk < 0.05
+    assert overload.p_high_risk > 0.9
+    assert rest.p_high_risk == 0.0 and rest.p_below_sweet_spot_by_day[-1] == 1.0
+    bands = np.array([steady.bands[p] for p in (5, 25, 50, 75, 95)])
+    assert np.all(np.diff(bands, axis=0) >= 0)
+    assert np.all(steady.p_high_risk_by_day <= steady.p_high_risk)
+
+
+def test_seeded_runs_are_reproducible():
+    first = LoadRiskSimulator(seed=3).simulate(STATE, PLAN).to_dict()
+    second = LoadRiskSimulator(seed=3).simulate(STATE, PLAN).to_dict()
+    assert first == second
+    assert len(first['bands']['50']) == len(PLAN)
@@ -0,0 +1,123 @@
+"""
+NightlyWorkoutPipeline: filtered sessions, one assignment per athlete, idempotent.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from adaptive_workout_generator import AdaptiveWorkoutGenerator
+from aisri_safety_gate import AISRISafetyGate, GateInputs
+from benchmarks.offline_db import OfflineDatabase
+from benchmarks.synthetic import iter_athletes
+from database_integration import DatabaseIntegration
+from nightly_workout_pipeline import CANDIDATE_TYPES, DEFAULT_PHASE, NightlyWorkoutPipeline
+from structural_index import StructuralIndex, StructuralIndexEntry, StructuralState
+
+TUESDAY = date(2026, 10, 20)  # SPEED_BUILD slot 2: intervals
+
+
+def _pipeline(aisri_scores, states=None, workers=0):
+    """One profiled athlete per score (no training history), week 1 of the plan"""
+    database = OfflineDatabase()
+    now = datetime(2026, 10, 19).isoformat()
+    ids = list(aisri_scores)
+    database.supabase.insert('athlete_profiles', [{'id': a} for a in ids])
+    database.supabase.insert('athlete_detailed_profile', [
+        {'athlete_id': a, 'signup_date': now, 'current_weekly_volume_km': 40.0} for a in ids
+    ])
+    database.supabase.insert('aisri_scores', [
+        {'athlete_id': a, 'created_at': now, 'aisri_score': score, 'pillar_recovery': 80}
+        for a, score in aisri_scores.items()
+    ])
+    index = StructuralIndex(database.supabase)
+    index.store(
+        StructuralIndexEntry(a, 75, StructuralState((states or {}).get(a, 'green'))) for a in ids
+    )
+    gate = AISRISafetyGate(database, structural_index=index)
+    return NightlyWorkoutPipeline(database, gate, workers=workers), database
+
+
+def _assignments(database):
+    return {row['athlete_id']: row for row in database.supabase._tables['workout_assignments'].rows}
+
+
+def test_permitted_types_apply_gates_and_structural_rules():
+    pipeline, _ = _pipeline({})
+    inputs = [
+        GateInputs('fit', has_profile=True, latest_aisri={'aisri_score': 85, 'pillar_recovery': 80}),
+        GateInputs('low', has_profile=True, latest_aisri={'aisri_score': 60, 'pillar_recovery': 80}),
+        GateInputs('red', has_profile=True, latest_aisri={'aisri_score': 85, 'pillar_recovery': 80}),
+        GateInputs('nobody')
+    ]
+
+    permitted = pipeline.permitted_types(inputs, ['green', 'green', 'red', 'green'])
+
+    allowed = [{t for t, ok in zip(CANDIDATE_TYPES, row) if ok} for row in permitted]
+    assert allowed[0] == set(CANDIDATE_TYPES)
+    assert allowed[1] == {'long', 'easy', 'recovery', 'strength', 'mobility'}
+    assert allowed[2] == {'easy', 'recovery', 'mobility'}
+    assert not np.any(permitted[3])
+
+    # Same answer as the per-workout gate
+    for record, row in zip(inputs[:2], permitted):
+        for workout_type, ok in zip(CANDIDATE_TYPES, row):
+            result = pipeline.safety_gate.evaluate_gates(record, workout_type, workout_type)
+            assert result['safe'] == ok, (record.athlete_id, workout_type)
+
+
+def test_blocked_sessions_step_down_and_the_rest_are_generated_as_planned():
+    pipeline, database = _pipeline(
+        {'fit': 85, 'low': 60, 'red': 85}, states={'red': 'red'}
+    )
+
+    report = pipeline.run(day=TUESDAY)
+
+    rows = _assignments(database)
+    assert report.assigned == 3 and report.stepped_down == 2 and report.failed_pages == 0
+    assert {a: r['workout_type'] for a, r in rows.items()} == {'fit': 'interval', 'low': 'easy', 'red': 'easy'}
+    assert all(r['scheduled_date'].startswith('2026-10-20') for r in rows.values())
+
+    # The permitted plan is exactly what the generator produces on its own
+    profile = database.supabase._tables['athlete_detailed_profile'].rows[0]
+    expected = AdaptiveWorkoutGenerator().generate_block(
+        DatabaseIntegration._profile_to_athlete_ability(profile),
+        DatabaseIntegration._create_performance_history([], None),
+        DEFAULT_PHASE, TUESDAY, days=1, week_number=1
+    )[0]
+    assert rows['fit']['distance_km'] == expected.distance_km
+    assert rows['fit']['generation_rationale'] == expected.generation_rationale
+
+
+def test_rerun_skips_assigned_athletes_and_pages_cover_everyone():
+    athletes = next(iter_athletes(7, chunk_size=7))
+    database = OfflineDatabase()
+    database.load_athletes(athletes)
+    index = StructuralIndex(database.supabase)
+    index.store(StructuralIndexEntry(a.user_id, 75, StructuralState.GREEN) for a in athletes)
+    pipeline = NightlyWorkoutPipeline(database, AISRISafetyGate(database, structural_index=index), workers=0)
+
+    first = pipeline.run(day=TUESDAY, page_size=3)
+    second = pipeline.run(day=TUESDAY, page_size=3)
+    third = pipeline.run(day=TUESDAY + timedelta(days=1), athlete_ids=[athletes[0].user_id])
+
+    assert first.pages == 3 and first.athletes == 7
+    assert first.assigned + first.rest_days == 7
+    assert sum(first.by_type.values()) == first.assigned
+    assert second.assigned == 0 and second.already_assigned == first.assigned
+    assert third.athletes == 1 and third.assigned == 1
+    assert len(database.supabase._tables['workout_assignments'].rows) == first.assigned + 1
+
+
+def test_process_pool_matches_in_process_generation():
+    scores = {f'a{i}': 60 + 5 * i for i in range(6)}
+    inline, inline_db = _pipeline(scores, states={'a0': 'yellow'})
+    pooled, pooled_db = _pipeline(scores, states={'a0': 'yellow'}, workers=2)
+
+    inline.run(day=TUESDAY)
+    report = pooled.run(day=TUESDAY)
+
+    strip = lambda row: {k: v for k, v in row.items() if k != 'assigned_date'}
+    assert report.workers == 2 and report.assigned == 6
+    assert {a: strip(r) for a, r in _assignments(pooled_db).items()} == \
+        {a: strip(r) for a, r in _assignments(inline_db).items()}
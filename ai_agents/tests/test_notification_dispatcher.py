@@ -0,0 +1,127 @@
+"""
+NotificationDispatcher: coalescing, draining on close, 429 retries.
+"""
+
+import asyncio
+
+from notification_dispatcher import (
+    COALESCE_SEPARATOR,
+    TELEGRAM_MAX_MESSAGE_LENGTH,
+    NotificationDispatcher
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, retry_after=None):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = ''
+        self._retry_after = retry_after
+
+    def json(self):
+        return {'parameters': {'retry_after': self._retry_after}}
+
+
+class FakeTelegram:
+    def __init__(self, responses=None, delay=0.0):
+        self.sent = []
+        self._responses = list(responses or [])
+        self._delay = delay
+
+    async def send(self, chat_id, text, client=None):
+        await asyncio.sleep(self._delay)
+        if self._responses:
+            response = self._responses.pop(0)
+            if response.status_code != 200:
+                return response
+        self.sent.append((chat_id, text))
+        return FakeResponse()
+
+
+def test_coalesce_keeps_whole_newest_messages():
+    small = ['first', 'second', 'third']
+    assert NotificationDispatcher._coalesce(small) == (COALESCE_SEPARATOR.join(small), 0)
+
+    old, newer, newest = 'a' * 3500, 'b' * 500, 'c' * 500
+    message = NotificationDispatcher._coalesce([old, newer, newest])
+    assert message == (newer + COALESCE_SEPARATOR + newest, 1)
+
+    oversized = 'x' * (TELEGRAM_MAX_MESSAGE_LENGTH + 100)
+    assert NotificationDispatcher._coalesce([old, oversized]) == (oversized[:TELEGRAM_MAX_MESSAGE_LENGTH], 1)
+
+
+def test_messages_left_out_of_a_coalesced_message_are_counted_as_dropped():
+    telegram = FakeTelegram()
+
+    async def run():
+        dispatcher = NotificationDispatcher(send=telegram.send, global_rate=1000, per_chat_rate=1000)
+        for text in ('a' * 3000, 'b' * 3000, 'c' * 3000):
+            dispatcher.enqueue(7, text)
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert telegram.sent == [('7', 'c' * 3000)]
+    assert dispatcher.stats['dropped'] == 2
+
+
+def test_pending_messages_to_one_chat_are_merged():
+    telegram = FakeTelegram()
+
+    async def run():
+        dispatcher = NotificationDispatcher(send=telegram.send, global_rate=1000, per_chat_rate=1000)
+        dispatcher.enqueue(42, 'score up')
+        dispatcher.enqueue(42, 'score down')
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert telegram.sent == [('42', 'score up' + COALESCE_SEPARATOR + 'score down')]
+    assert dispatcher.stats['coalesced'] == 1
+
+
+def test_close_drains_everything_without_timeout():
+    telegram = FakeTelegram(delay=0.001)
+
+    async def run():
+        dispatcher = NotificationDispatcher(send=telegram.send, global_rate=200, per_chat_rate=1000)
+        for chat in range(300):
+            dispatcher.enqueue(chat, f'update {chat}')
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert len(telegram.sent) == 300
+    assert dispatcher.stats['sent'] == 300
+    assert dispatcher.stats['dropped'] == 0
+
+
+def test_close_with_timeout_reports_undelivered():
+    telegram = FakeTelegram(delay=0.2)
+
+    async def run():
+        dispatcher = NotificationDispatcher(send=telegram.send, global_rate=1000, per_chat_rate=1000)
+        dispatcher.start(concurrency=2)
+        for chat in range(10):
+            dispatcher.enqueue(chat, f'update {chat}')
+        await dispatcher.close(timeout=0.05)
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    # Two messages were in flight when the timeout hit; the rest are kept
+    assert dispatcher.stats['dropped'] == 8
+    assert sorted(chat for chat, _ in dispatcher.undelivered) == sorted(str(c) for c in range(2, 10))
+
+
+def test_rate_limited_message_is_retried():
+    telegram = FakeTelegram(responses=[FakeResponse(429, retry_after=0)])
+
+    async def run():
+        dispatcher = NotificationDispatcher(send=telegram.send, global_rate=1000, per_chat_rate=1000)
+        dispatcher.enqueue(7, 'hello')
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert telegram.sent == [('7', 'hello')]
+    assert dispatcher.stats['retried'] == 1
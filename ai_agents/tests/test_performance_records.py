@@ -0,0 +1,140 @@
+"""
+Workout and performance records: slotted, frozen where possible, shared not copied,
+and assessed column-wise in batches.
+"""
+
+import math
+import pickle
+from dataclasses import FrozenInstanceError
+
+import numpy as np
+import pytest
+
+from adaptive_workout_generator import AdaptiveWorkoutGenerator, TrainingPhase
+from benchmarks.memory_benchmarks import run as run_memory_benchmark
+from benchmarks.synthetic import SyntheticConfig, iter_athletes, to_workout_pairs
+from performance_tracker import (
+    DEFAULT_EXPECTED, LABELS, PerformanceLabel, PerformanceTracker,
+    WorkoutResultArrays, WorkoutTargetArrays
+)
+
+
+@pytest.fixture(scope='module')
+def records():
+    athletes = next(iter_athletes(20, chunk_size=20))
+    targets, results = to_workout_pairs(athletes)
+    tracker = PerformanceTracker()
+    assessments = [tracker.assess_workout_performance(t, r) for t, r in zip(targets, results)]
+    workout = AdaptiveWorkoutGenerator().generate_next_workout(
+        athletes[0].ability, athletes[0].history, TrainingPhase.BASE_BUILD, 1, 2
+    )
+    return athletes, targets, results, assessments, workout
+
+
+def test_records_have_no_instance_dict_and_frozen_ones_reject_writes(records):
+    athletes, targets, results, assessments, workout = records
+    frozen = [athletes[0].ability, athletes[0].history, targets[0], results[0],
+              assessments[0], assessments[0].comparison, DEFAULT_EXPECTED]
+
+    for record in frozen + [workout]:
+        assert not hasattr(record, '__dict__'), type(record).__name__
+    for record in frozen:
+        with pytest.raises(FrozenInstanceError):
+            record.__setattr__(next(iter(record.__slots__)), None)
+
+    # The generator fills workouts in after construction
+    workout.expected_load = 12.5
+    assert workout.expected_load == 12.5
+
+
+def test_assessments_share_their_inputs(records):
+    _, targets, results, assessments, _ = records
+    assert all(a.expected is DEFAULT_EXPECTED for a in assessments)
+    assert assessments[3].given is targets[3] and assessments[3].result is results[3]
+
+
+def test_records_survive_pickling(records):
+    athletes, _, _, assessments, workout = records
+    for record in (athletes[0].ability, athletes[0].history, assessments[0], workout):
+        assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_struct_of_arrays_columns_align_with_records(records):
+    _, targets, results, _, _ = records
+    target_arrays = WorkoutTargetArrays.from_records(targets)
+    result_arrays = WorkoutResultArrays.from_records(results)
+
+    assert len(target_arrays) == len(result_arrays) == len(targets)
+    for i in range(len(targets)):
+        target, result = targets[i], results[i]
+        assert target_arrays.workout_type[i] is target.workout_type
+        assert target_arrays.distance_km[i] == target.distance_km
+        assert target_arrays.pace_range_max[i] == target.pace_range_seconds[1]
+        if target.target_hr is None:
+            assert math.isnan(target_arrays.target_hr[i])
+        else:
+            assert target_arrays.target_hr[i] == target.target_hr
+        assert result_arrays.avg_pace_seconds[i] == result.avg_pace_seconds
+        assert result_arrays.splits[i] is result.splits
+        assert result_arrays.completed_full[i] == result.completed_full
+
+
+def test_memory_benchmark_shows_the_reduction():
+    report = run_memory_benchmark(100, SyntheticConfig())
+
+    assert report['PerformanceAssessment']['slots_bytes_per_record'] < \
+        report['PerformanceAssessment']['dict_bytes_per_record']
+    assert report['WorkoutResult']['arrays_bytes_per_record'] < \
+        report['WorkoutResult']['slots_bytes_per_record']
+
+
+def test_batch_assessment_matches_the_scalar_path():
+    athletes = next(iter_athletes(40, chunk_size=40))
+    targets, results = to_workout_pairs(athletes)
+    tracker = PerformanceTracker()
+
+    batch = tracker.assess_batch(targets, results)
+
+    assert len(batch) == len(targets)
+    for i, (target, result) in enumerate(zip(targets, results)):
+        scalar = tracker.assess_workout_performance(target, result)
+        c = scalar.comparison
+        assert (batch.distance_variance_km[i], batch.distance_variance_pct[i],
+                batch.pace_variance_seconds[i], batch.pace_variance_pct[i]) == \
+            (c.distance_variance_km, c.distance_variance_pct, c.pace_variance_seconds, c.pace_variance_pct)
+        if c.hr_variance_bpm is None:
+            assert math.isnan(batch.hr_variance_bpm[i]) and math.isnan(batch.hr_variance_pct[i])
+        else:
+            assert (batch.hr_variance_bpm[i], batch.hr_variance_pct[i]) == (c.hr_variance_bpm, c.hr_variance_pct)
+        assert (batch.distance_met[i], batch.pace_met[i], batch.hr_met[i]) == (c.distance_met, c.pace_met, c.hr_met)
+        assert (batch.distance_score[i], batch.pace_score[i], batch.hr_score[i], batch.overall_score[i]) == \
+            (scalar.distance_score, scalar.pace_score, scalar.hr_score, scalar.overall_score)
+        assert batch.labels[i] is scalar.performance_label
+        assert batch.ability_change[i] == scalar.ability_change
+        assert batch.readiness_for_progression[i] == scalar.readiness_for_progression
+        # Text feedback is built on demand and is the scalar assessment
+        assert batch.assessment(i) == scalar
+
+    assert sum(batch.label_counts().values()) == len(batch)
+
+
+def test_batch_assessment_accepts_arrays_and_builds_feedback_only_for_selected_rows():
+    athletes = next(iter_athletes(10, chunk_size=10))
+    targets, results = to_workout_pairs(athletes)
+    tracker = PerformanceTracker()
+    from_records = tracker.assess_batch(targets, results)
+
+    batch = tracker.assess_batch(WorkoutTargetArrays.from_records(targets),
+                                 WorkoutResultArrays.from_records(results))
+
+    assert np.array_equal(batch.overall_score, from_records.overall_score)
+    assert np.array_equal(batch.label_code, from_records.label_code)
+    flagged = batch.label_code >= LABELS.index(PerformanceLabel.FAIR)
+    assessments = list(batch.assessments(flagged))
+    assert len(assessments) == int(flagged.sum())
+    assert all(a.performance_label in (PerformanceLabel.FAIR, PerformanceLabel.POOR, PerformanceLabel.INCOMPLETE)
+               for a in assessments)
+    assert all(a.key_feedback and a.coach_notes for a in assessments)
+
+    with pytest.raises(ValueError):
+        tracker.assess_batch(targets, results[:-1])
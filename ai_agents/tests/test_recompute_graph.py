@@ -0,0 +1,159 @@
+"""
+RecomputeGraph: only affected nodes recompute, in topological order, memoized.
+"""
+
+from collections import Counter
+from dataclasses import replace
+from datetime import date
+
+import pytest
+
+from ai_engine_agent.autonomous_decision_agent import AISRiAutonomousDecisionAgent
+from aisri_safety_gate import AISRISafetyGate
+from benchmarks.offline_db import OfflineDatabase
+from benchmarks.synthetic import iter_athletes, to_activity_frame
+from daily_readiness import DailyReadiness
+from recompute_graph import LEDGER_DAYS, AthleteDerivedData, Node, RecomputeGraph, athlete_graph, training_load
+from structural_index import StructuralIndex
+from training_load_ledger import TrainingLoadLedger
+
+TODAY = date.today()
+
+
+def _counting_graph():
+    calls = Counter()
+
+    def node(name, inputs, compute):
+        def counted(*values):
+            calls[name] += 1
+            return compute(*values)
+        return Node(name, inputs, counted)
+
+    # Declared out of order on purpose
+    graph = RecomputeGraph(('a', 'b'), [
+        node('total', ('doubled', 'parity'), lambda d, p: (d, p)),
+        node('doubled', ('a',), lambda a: 2 * a),
+        node('parity', ('b',), lambda b: b % 2)
+    ])
+    return graph, calls
+
+
+def test_nodes_run_in_topological_order_and_only_when_affected():
+    graph, calls = _counting_graph()
+    state = {}
+
+    assert graph.order.index('total') > max(graph.order.index('doubled'), graph.order.index('parity'))
+    assert graph.update(state, a=1).recomputed == ['doubled']   # total still waits for b
+    first = graph.update(state, b=3)
+    assert first.recomputed == ['parity', 'total'] and state['total'] == (2, 1)
+
+    report = graph.update(state, a=5)
+    assert report.recomputed == ['doubled', 'total'] and state['total'] == (10, 1)
+    assert calls['parity'] == 1
+
+    # Unchanged inputs do nothing; an unchanged output stops propagation
+    assert graph.update(state, a=5).recomputed == []
+    cutoff = graph.update(state, b=5)
+    assert cutoff.recomputed == ['parity'] and cutoff.changed == []
+    assert calls['total'] == 2
+    assert graph.downstream(['b']) == ['parity', 'total']
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        RecomputeGraph(('a',), [Node('x', ('y',), abs), Node('y', ('x',), abs)])
+    with pytest.raises(ValueError):
+        RecomputeGraph(('a',), [Node('x', ('missing',), abs)])
+    with pytest.raises(KeyError):
+        RecomputeGraph(('a',), [Node('x', ('a',), abs)]).update({}, b=1)
+
+
+def _activity_inputs(athlete, activities):
+    """activities/ledger inputs as read from the providers and athlete_daily_load"""
+    athlete = replace(athlete, activities=activities)
+    database = OfflineDatabase()
+    database.load_athletes([athlete])
+    return {
+        'activities': to_activity_frame([athlete]).slice(athlete.user_id),
+        'ledger': TrainingLoadLedger(database.supabase).get_days(athlete.user_id, days=LEDGER_DAYS, end=TODAY)
+    }
+
+
+@pytest.fixture(scope='module')
+def athlete():
+    athlete = next(iter_athletes(1, chunk_size=1))[0]
+    profile = {**OfflineDatabase._detailed_profile_row(athlete), 'created_at': athlete.profile['created_at']}
+    inputs = dict(profile=profile, assessment=athlete.aisri_row, assessment_score=None,
+                  aisri_history=[78, 80], recent_results=[], today=TODAY)
+    return athlete, inputs
+
+
+def test_new_activity_recomputes_everything_but_structural(athlete):
+    athlete, inputs = athlete
+    derived = AthleteDerivedData()
+    derived.sync(athlete.user_id, **_activity_inputs(athlete, athlete.activities[1:]), **inputs)
+    latest = _activity_inputs(athlete, athlete.activities)
+
+    report = derived.sync(athlete.user_id, **latest)
+
+    assert report.changed_inputs == ['activities', 'ledger']
+    assert report.recomputed == ['workload', 'aisri', 'injury_prediction', 'readiness', 'next_workout']
+    assert derived.sync(athlete.user_id, **_activity_inputs(athlete, athlete.activities)).recomputed == []
+
+    # Same values as computing the final inputs from scratch
+    fresh = AthleteDerivedData()
+    fresh.sync(athlete.user_id, **latest, **inputs)
+    for name in ('workload', 'aisri', 'injury_prediction', 'next_workout'):
+        assert derived.get(athlete.user_id, name) == fresh.get(athlete.user_id, name), name
+    assert derived.graph.nodes['readiness'].equal(
+        derived.get(athlete.user_id, 'readiness'), fresh.get(athlete.user_id, 'readiness')
+    )
+
+
+@pytest.mark.parametrize('assessment_score', [None, 35])
+def test_readiness_matches_the_nightly_readiness_stage(athlete, assessment_score):
+    athlete, inputs = athlete
+    derived = AthleteDerivedData(athlete_graph(decision_agent=AISRiAutonomousDecisionAgent()))
+    derived.sync(athlete.user_id, **_activity_inputs(athlete, athlete.activities),
+                 **{**inputs, 'assessment_score': assessment_score})
+    aisri = derived.get(athlete.user_id, 'aisri')
+    structural = derived.get(athlete.user_id, 'structural')
+
+    # The get_readiness_inputs row for the same data
+    database = OfflineDatabase()
+    index = StructuralIndex(database.supabase)
+    index.store([structural])
+    daily = DailyReadiness(database, AISRISafetyGate(database, structural_index=index),
+                           decision_agent=AISRiAutonomousDecisionAgent())
+    nightly = daily.compute([{
+        'athlete_id': athlete.user_id,
+        'latest_aisri': {'aisri_score': aisri.aisri_score, 'pillar_recovery': aisri.pillar_recovery},
+        'latest_injury_prediction': derived.get(athlete.user_id, 'injury_prediction'),
+        'assessment_aisri_score': assessment_score,
+        'training_load': training_load(derived.get(athlete.user_id, 'ledger'))
+    }], TODAY)[0]
+
+    assert derived.graph.nodes['readiness'].equal(derived.get(athlete.user_id, 'readiness'), nightly)
+    if assessment_score is not None:
+        # The assessment score drives the decision, not the auto-calculated AISRI
+        assert nightly.decision == 'REST' and aisri.aisri_score >= 40
+
+
+def test_new_assessment_recomputes_structural_and_its_dependents(athlete):
+    athlete, inputs = athlete
+    derived = AthleteDerivedData(athlete_graph())
+    derived.sync(athlete.user_id, **_activity_inputs(athlete, athlete.activities), **inputs)
+    weak = {'strength_score': 20, 'mobility_score': 20, 'rom_score': 20}
+    strong = {'strength_score': 90, 'mobility_score': 90, 'rom_score': 90}
+    derived.sync(athlete.user_id, assessment={**athlete.aisri_row, **weak})
+
+    report = derived.sync(athlete.user_id, assessment={**athlete.aisri_row, **strong})
+
+    assert report.recomputed[:2] == ['structural', 'readiness']
+    assert set(report.recomputed) <= {'structural', 'readiness', 'next_workout'}
+    assert derived.get(athlete.user_id, 'structural').state.value == 'green'
+    assert derived.get(athlete.user_id, 'readiness').structural_state == 'green'
+
+    # A field structural does not read: it recomputes, nothing downstream runs
+    same = derived.sync(athlete.user_id, assessment={**athlete.aisri_row, **strong, 'aisri_score': 10})
+    assert same.recomputed == ['structural'] and same.changed == []
@@ -0,0 +1,76 @@
+"""
+SafetyAuditLog: batched writer across event loops, sync flush, pressure.
+"""
+
+import asyncio
+
+from benchmarks.offline_db import OfflineSupabase
+from safety_audit_log import AUDIT_TABLE, SafetyAuditLog
+
+BLOCKED = {'safe': False, 'gates_failed': ['recovery'], 'gates_passed': ['aisri_score'], 'reason': 'tired'}
+PASSED = {'safe': True, 'gates_failed': [], 'gates_passed': ['aisri_score', 'recovery']}
+
+
+def _written(supabase):
+    return supabase._tables[AUDIT_TABLE].rows
+
+
+async def _record_and_wait(audit, athlete_id, wait=0.1):
+    audit.record_workout_check(athlete_id, PASSED, 'run', 'easy')
+    await asyncio.sleep(wait)
+
+
+def test_writer_restarts_on_a_new_event_loop():
+    supabase = OfflineSupabase()
+    audit = SafetyAuditLog(supabase, flush_interval=0.02)
+
+    # First loop stops without being closed; its writer task stays pending
+    first = asyncio.new_event_loop()
+    first.run_until_complete(_record_and_wait(audit, 'a1', wait=0))
+    assert not audit._writer.done()
+
+    asyncio.run(_record_and_wait(audit, 'a2'))
+    asyncio.run(_record_and_wait(audit, 'a3'))
+
+    assert [row['athlete_id'] for row in _written(supabase)] == ['a1', 'a2', 'a3']
+    first.close()
+
+
+def test_full_batch_wakes_the_writer_early():
+    supabase = OfflineSupabase()
+    audit = SafetyAuditLog(supabase, flush_interval=60, batch_size=10)
+
+    async def run():
+        for i in range(10):
+            audit.record_workout_check(f'a{i}', BLOCKED, 'run', 'hard')
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert len(_written(supabase)) == 10
+    assert audit.counters()['blocked_by_gate'] == {'recovery': 10}
+
+
+def test_sync_callers_flush_without_a_loop():
+    supabase = OfflineSupabase()
+    audit = SafetyAuditLog(supabase)
+    audit.record_structural_clearance('a1', {'passed': False, 'state': 'red', 'reason': 'RED'}, 'interval', 'high')
+
+    assert audit._writer is None
+    assert audit.flush_sync() == 1
+    assert _written(supabase)[0]['structural_state'] == 'red'
+
+
+def test_failed_writes_are_requeued_within_capacity():
+    class FailingSupabase(OfflineSupabase):
+        def table(self, name):
+            raise ConnectionError('database down')
+
+    audit = SafetyAuditLog(FailingSupabase(), capacity=5)
+    for i in range(8):
+        audit.record_workout_check(f'a{i}', PASSED)
+
+    assert audit.flush_sync() == 0
+    counters = audit.counters()
+    assert counters['buffered'] == 5
+    assert counters['dropped'] == 3
+    assert counters['write_errors'] == 1
@@ -0,0 +1,114 @@
+"""
+AISRISafetyGate on get_safety_gate_inputs rows (in-memory database).
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from aisri_safety_gate import AISRISafetyGate, GateInputs
+from benchmarks.offline_db import OfflineDatabase
+from workload_engine import WorkloadEngine, WorkloadState
+
+
+def _database(aisri_rows):
+    """aisri_rows: {athlete_id: aisri_scores row fields}"""
+    database = OfflineDatabase()
+    now = datetime.now(timezone.utc).isoformat()
+    database.supabase.insert('athlete_profiles', [{'id': a} for a in aisri_rows])
+    database.supabase.insert('aisri_scores', [
+        {'athlete_id': a, 'created_at': now, **row} for a, row in aisri_rows.items()
+    ])
+    return database
+
+
+def _count_rpc_calls(database):
+    calls = []
+    rpc = database.supabase.rpc
+
+    def counting(name, params):
+        calls.append(name)
+        return rpc(name, params)
+
+    database.supabase.rpc = counting
+    return calls
+
+
+def test_unscored_recovery_pillar_is_neutral():
+    gate = AISRISafetyGate(_database({
+        'unscored': {'aisri_score': 80, 'pillar_recovery': None},
+        'tired': {'aisri_score': 80, 'pillar_recovery': 40}
+    }))
+
+    unscored, tired = asyncio.run(gate.check_workouts_safety([
+        {'athlete_id': 'unscored', 'workout_type': 'run', 'intensity': 'hard'},
+        {'athlete_id': 'tired', 'workout_type': 'run', 'intensity': 'hard'}
+    ]))
+
+    assert unscored['safe'] and 'recovery' in unscored['gates_passed']
+    assert 'recovery' in tired['gates_failed']
+    assert 'Recovery score (40) too low for hard workout' in tired['reason']
+
+
+def test_many_athletes_take_one_rpc():
+    athletes = {f'a{i}': {'aisri_score': 50 + i, 'pillar_recovery': 70} for i in range(20)}
+    database = _database(athletes)
+    calls = _count_rpc_calls(database)
+    gate = AISRISafetyGate(database)
+
+    results = asyncio.run(gate.check_workouts_safety([
+        {'athlete_id': a, 'workout_type': 'run', 'intensity': 'hard'} for a in athletes
+    ] + [{'athlete_id': 'missing', 'workout_type': 'run', 'intensity': 'easy'}]))
+
+    assert calls == ['get_safety_gate_inputs']
+    assert [r['aisri_score'] for r in results[:20]] == [50 + i for i in range(20)]
+    assert results[-1]['gates_failed'] == ['missing_profile']
+
+
+def test_red_envelope_blocks_high_intensities():
+    database = _database({
+        'red': {'aisri_score': 90, 'pillar_recovery': 80, 'strength_score': 40, 'mobility_score': 45},
+        'green': {'aisri_score': 90, 'pillar_recovery': 80, 'strength_score': 80, 'mobility_score': 85}
+    })
+    gate = AISRISafetyGate(database)
+
+    red = asyncio.run(gate.get_safety_envelope('red'))
+    assert red['structural_state'] == 'red'
+    options = {(o['intensity'], o['workout_type']): o for o in red['options']}
+    for intensity in ('hard', 'tempo', 'threshold', 'interval', 'speed', 'vo2max'):
+        for workout_type in ('easy', 'recovery', 'mobility'):
+            option = options[(intensity, workout_type)]
+            assert not option['safe'], (intensity, workout_type)
+            assert option['gates_failed'] == ['structural_state']
+            assert 'High intensity not allowed' in option['reasons'][0]
+    assert options[('easy', 'easy')]['safe']
+    assert not options[('easy', 'interval')]['safe']
+
+    green = asyncio.run(gate.get_safety_envelope('green'))
+    assert all(o['safe'] for o in green['options'])
+
+
+def test_new_athlete_is_not_locked_out_by_the_volume_gate():
+    database = _database({'new': {'aisri_score': 70, 'pillar_recovery': 70}})
+    today = datetime.now(timezone.utc).date()
+    # One 30-minute run today: chronic ~2 min/day, acute 7.5
+    database.supabase.insert('athlete_workload_state', [OfflineDatabase._workload_state_row(
+        'new', [{'day': today.isoformat(), 'minutes': 30, 'load': 30}]
+    )])
+    gate = AISRISafetyGate(database)
+
+    results = asyncio.run(gate.check_workouts_safety([
+        {'athlete_id': 'new', 'workout_type': 'easy', 'intensity': 'easy', 'duration_minutes': minutes}
+        for minutes in (30, 40, 180)
+    ]))
+
+    assert results[0]['safe'] and results[1]['safe']
+    assert results[2]['gates_failed'] == ['volume_progression']
+    assert asyncio.run(gate.get_safety_envelope('new'))['max_safe_duration_minutes'] >= 40
+
+    # Starting from nothing, 40 minutes every other day never hits the gate
+    state = WorkloadState(as_of=today)
+    for day in (today + timedelta(days=d) for d in range(0, 40, 2)):
+        inputs = GateInputs('new', has_profile=True, latest_aisri={'aisri_score': 70},
+                            workload=WorkloadEngine.advance(state, day))
+        assert gate.evaluate_gates(inputs, 'easy', 'easy', 40)['safe'], day
+        state = WorkloadEngine.update(state, 40, day)
@@ -0,0 +1,131 @@
+"""
+SafetyReplay: parity with the live batch gate, and UTC day bucketing.
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from aisri_safety_gate import AISRISafetyGate, GateInputs
+from benchmarks.offline_db import OfflineDatabase
+from safety_replay import WORKLOAD_WARMUP_DAYS, SafetyReplay
+from training_load_ledger import DailyLoad
+from workload_engine import WorkloadEngine
+
+START = date(2026, 9, 1)
+END = date(2026, 9, 30)
+OFFSETS = [timezone.utc, timezone(timedelta(hours=5, minutes=30)), timezone(timedelta(hours=-7))]
+
+
+def _history(n_athletes=6, seed=3):
+    rng = random.Random(seed)
+    ids = [f'a{i}' for i in range(n_athletes)]
+    aisri_rows, injury_rows, daily_rows = [], [], []
+    first_day = START - timedelta(days=WORKLOAD_WARMUP_DAYS)
+
+    for athlete_id in ids:
+        for _ in range(8):
+            created = datetime.combine(START, datetime.min.time(), timezone.utc) + timedelta(
+                days=rng.uniform(-20, 30), minutes=rng.randrange(1440)
+            )
+            aisri_rows.append({
+                'athlete_id': athlete_id,
+                'aisri_score': rng.randrange(50, 95),
+                'pillar_recovery': rng.choice([None, 45, 65, 80]),
+                'created_at': created.astimezone(rng.choice(OFFSETS)).isoformat()
+            })
+            injury_rows.append({
+                'athlete_id': athlete_id,
+                'risk_score': rng.randrange(20, 95),
+                'created_at': (created + timedelta(hours=rng.randrange(-30, 30))).isoformat()
+            })
+        for offset in range((END - first_day).days + 1):
+            if rng.random() < 0.6:
+                sessions = rng.choice([1, 1, 2])
+                daily_rows.append({
+                    'athlete_id': athlete_id,
+                    'day': (first_day + timedelta(days=offset)).isoformat(),
+                    'minutes': rng.randrange(20, 120),
+                    'sessions': sessions,
+                    'hard_sessions': rng.choice([0, 0, sessions])
+                })
+
+    aisri_rows.sort(key=lambda r: datetime.fromisoformat(r['created_at']))
+    injury_rows.sort(key=lambda r: datetime.fromisoformat(r['created_at']))
+    return ids, aisri_rows, injury_rows, daily_rows
+
+
+def _latest_before(rows, athlete_id, day):
+    """Latest row created before the start of `day` (UTC)"""
+    cutoff = datetime.combine(day, datetime.min.time(), timezone.utc)
+    visible = [r for r in rows if r['athlete_id'] == athlete_id
+               and datetime.fromisoformat(r['created_at']) < cutoff]
+    return max(visible, key=lambda r: datetime.fromisoformat(r['created_at'])) if visible else None
+
+
+def _live_inputs(athlete_id, day, has_profile, aisri_rows, injury_rows, daily_rows):
+    """GateInputs as get_safety_gate_inputs returns them on the morning of `day`"""
+    ledger = {r['day']: r for r in daily_rows if r['athlete_id'] == athlete_id}
+    recent = []
+    for back in range(6, -1, -1):
+        row = ledger.get((day - timedelta(days=back)).isoformat(), {}) if back else {}
+        recent.append(DailyLoad(day=day - timedelta(days=back), sessions=row.get('sessions', 0),
+                                hard_sessions=row.get('hard_sessions', 0)))
+
+    first_day = START - timedelta(days=WORKLOAD_WARMUP_DAYS)
+    series = [ledger.get((first_day + timedelta(days=k)).isoformat(), {}).get('minutes', 0)
+              for k in range((day - first_day).days)]
+    workload = WorkloadEngine.advance(
+        WorkloadEngine.state_from_series(series, as_of=day - timedelta(days=1)), day
+    )
+
+    return GateInputs(
+        athlete_id=athlete_id,
+        has_profile=has_profile,
+        latest_aisri=_latest_before(aisri_rows, athlete_id, day),
+        latest_injury_prediction=_latest_before(injury_rows, athlete_id, day),
+        recent_days=recent,
+        workload=workload
+    )
+
+
+@pytest.mark.parametrize('intensity,duration', [('hard', 45), ('interval', None), ('easy', 90), ('long', 120)])
+def test_replay_matches_live_gate(intensity, duration):
+    ids, aisri_rows, injury_rows, daily_rows = _history()
+    profiles = ids[:-1]  # Last athlete has no profile
+    inputs = SafetyReplay.build_inputs(ids, START, END, aisri_rows, injury_rows, daily_rows, profiles)
+    decisions = SafetyReplay().evaluate(inputs, intensity, duration)
+    gate = AISRISafetyGate(OfflineDatabase())
+
+    for d in range(0, (END - START).days + 1, 3):
+        day = START + timedelta(days=d)
+        live = gate.evaluate_gates_batch(
+            [_live_inputs(a, day, a in profiles, aisri_rows, injury_rows, daily_rows) for a in ids],
+            [{'workout_type': 'run', 'intensity': intensity, 'duration_minutes': duration}] * len(ids)
+        )
+        for i, result in enumerate(live):
+            assert decisions.safe[i, d] == result['safe'], (ids[i], day)
+            if ids[i] in profiles:
+                replayed = {g for g, passed in decisions.gates.items() if not passed[i, d]}
+                assert replayed == set(result['gates_failed']), (ids[i], day)
+
+
+def test_rows_are_bucketed_by_utc_day():
+    # 01:00 in India on Sep 10 is 19:30 UTC on Sep 9: visible from Sep 10
+    rows = [
+        {'athlete_id': 'a', 'aisri_score': 60, 'pillar_recovery': 70, 'created_at': '2026-09-01T08:00:00+00:00'},
+        {'athlete_id': 'a', 'aisri_score': 80, 'pillar_recovery': None, 'created_at': '2026-09-10T01:00:00+05:30'},
+        # 20:00 on Sep 11 in Los Angeles is Sep 12 UTC: visible from Sep 13
+        {'athlete_id': 'a', 'aisri_score': 90, 'pillar_recovery': 75, 'created_at': '2026-09-11T20:00:00-07:00'}
+    ]
+    inputs = SafetyReplay.build_inputs(['a'], START, END, rows, [], [], ['a'])
+
+    aisri = inputs.aisri[0]
+    assert np.isnan(aisri[0])
+    assert aisri[8] == 60           # Sep 9
+    assert aisri[9] == 80           # Sep 10
+    assert aisri[11] == 80          # Sep 12
+    assert aisri[12] == 90          # Sep 13
+    assert inputs.recovery[0, 9] == 70   # Unscored pillar reads as 70, as in the gate
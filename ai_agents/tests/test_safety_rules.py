@@ -0,0 +1,125 @@
+"""
+Compiled safety rule table: parity with the original hard-coded gates.
+
+The reference functions below restate the per-gate checks of the
+pre-rule-table AISRISafetyGate. Volume progression is not compared: it
+moved from week-over-week minutes to the EWMA ACWR by design.
+"""
+
+import builtins
+import json
+from itertools import product
+
+import numpy as np
+
+from safety_rules import DEFAULT_SAFETY_RULES, SafetyRuleEngine
+
+INTENSITIES = ['easy', 'moderate', 'long', 'hard', 'tempo', 'threshold',
+               'interval', 'speed', 'vo2max', 'race', 'unknown']
+AISRI = [np.nan, 0, 64, 65, 69, 70, 90]
+INJURY_RISK = [50, 75, 76, 100]
+RECOVERY = [np.nan, 59, 60, 80]
+CONSECUTIVE_HARD = [0, 2, 3, 5]
+
+
+def _baseline_aisri(intensity, aisri):
+    if np.isnan(aisri):
+        return False  # 'No AISRi assessment found'
+    if intensity in ['hard', 'tempo', 'threshold']:
+        return aisri >= 65
+    if intensity in ['interval', 'speed', 'vo2max']:
+        return aisri >= 70
+    return True
+
+
+def _baseline_injury_risk(intensity, risk):
+    return not (risk > 75 and intensity in ['hard', 'interval', 'speed', 'tempo'])
+
+
+def _baseline_recovery(intensity, recovery):
+    if np.isnan(recovery):
+        return True  # No data = allow
+    return not (intensity in ['hard', 'interval', 'speed', 'tempo', 'long'] and recovery < 60)
+
+
+def _baseline_consecutive(intensity, streak):
+    return intensity not in ['hard', 'interval', 'speed', 'tempo'] or streak < 3
+
+
+def _baseline_structural(state, workout_type, intensity):
+    if state == 'red':
+        return workout_type in ['mobility', 'activation', 'easy', 'recovery'] and \
+            intensity not in ['high', 'very_high']
+    if state == 'yellow':
+        return workout_type not in ['threshold', 'vo2max', 'interval', 'race']
+    return True
+
+
+def test_gate_rules_match_baseline_gates():
+    grid = list(product(INTENSITIES, AISRI, INJURY_RISK, RECOVERY, CONSECUTIVE_HARD))
+    columns = list(zip(*grid))
+    checks = SafetyRuleEngine().current().evaluate_gates(
+        list(columns[0]), np.array(columns[1]), np.array(columns[2]),
+        np.array(columns[3]), np.array(columns[4]), np.full(len(grid), np.nan)
+    )
+
+    for k, (intensity, aisri, risk, recovery, streak) in enumerate(grid):
+        assert checks.aisri[k] == _baseline_aisri(intensity, aisri), (intensity, aisri)
+        assert checks.injury_risk[k] == _baseline_injury_risk(intensity, risk), (intensity, risk)
+        assert checks.recovery[k] == _baseline_recovery(intensity, recovery), (intensity, recovery)
+        assert checks.consecutive_days[k] == _baseline_consecutive(intensity, streak), (intensity, streak)
+    assert checks.volume.all()
+
+
+def test_structural_rules_match_baseline_clearance():
+    types = ['mobility', 'activation', 'easy', 'recovery', 'threshold', 'vo2max',
+             'interval', 'race', 'long', 'Easy']
+    levels = ['low', 'moderate', 'high', 'very_high']
+    grid = list(product(['red', 'yellow', 'green'], types, levels))
+    states, workout_types, intensities = (list(c) for c in zip(*grid))
+
+    result = SafetyRuleEngine().current().evaluate_structural(states, workout_types, intensities)
+
+    allowed = result['type_allowed'] & result['intensity_allowed']
+    for k, (state, workout_type, intensity) in enumerate(grid):
+        assert allowed[k] == _baseline_structural(state, workout_type.lower(), intensity), grid[k]
+    assert list(result['speed_permission'][:3]) == [False, False, False]
+    assert result['speed_permission'][-1]
+
+
+def test_rule_file_is_reloaded_when_it_changes(tmp_path):
+    path = tmp_path / 'rules.json'
+    rules = json.loads(json.dumps(DEFAULT_SAFETY_RULES))
+    path.write_text(json.dumps(rules))
+    engine = SafetyRuleEngine(path=str(path))
+    before = engine.current().version
+
+    rules['intensities']['hard']['min_aisri'] = 80
+    path.write_text(json.dumps(rules))
+    engine._mtime = None  # mtime resolution can hide a same-second rewrite
+
+    compiled = engine.current()
+    assert compiled.version != before
+    assert not compiled.evaluate_gates(['hard'], np.array([75.0]), np.array([50.0]), np.array([70.0]),
+                                       np.zeros(1), np.full(1, np.nan)).aisri[0]
+
+    path.write_text('{not json')
+    engine._mtime = None
+    assert engine.current().version == compiled.version
+
+
+def test_broken_rule_file_is_read_once_until_it_changes(tmp_path, monkeypatch, capsys):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(DEFAULT_SAFETY_RULES))
+    engine = SafetyRuleEngine(path=str(path))
+    path.write_text('{not json')
+    engine._mtime = None
+
+    opened = []
+    real_open = builtins.open
+    monkeypatch.setattr(builtins, 'open', lambda *args, **kwargs: opened.append(args[0]) or real_open(*args, **kwargs))
+    for _ in range(5):
+        engine.current()
+
+    assert opened == [str(path)]
+    assert capsys.readouterr().out.count('Could not load safety rules') == 1
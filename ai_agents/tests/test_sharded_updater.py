@@ -0,0 +1,211 @@
+"""
+Sharded AISRI updater: several workers sharing one run through SQLite leases.
+"""
+
+import asyncio
+import multiprocessing
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from aisri_auto_calculator import AISRIAutoResult
+from aisri_shard_coordinator import LeaseHeartbeat, ShardLeaseCoordinator
+
+
+class FakeDatabase:
+    """Records upserts; every athlete counts as changed"""
+
+    def __init__(self):
+        self.upserts = []
+        self._lock = threading.Lock()
+
+    def get_aisri_recompute_candidates(self, user_ids=None):
+        return {user_id: {'last_aisri_score': None} for user_id in user_ids}
+
+    def get_telegram_chat_ids(self, athlete_ids):
+        return {}
+
+    async def upsert_aisri_score(self, user_id, **scores):
+        with self._lock:
+            self.upserts.append(user_id)
+
+
+class FakeNotifier:
+    def enqueue(self, chat_id, text):
+        pass
+
+    async def close(self):
+        pass
+
+
+def _result() -> AISRIAutoResult:
+    return AISRIAutoResult(
+        aisri_score=70, risk_level='Low', confidence=80,
+        pillar_adaptability=70, pillar_injury_risk=70, pillar_fatigue=70,
+        pillar_recovery=70, pillar_intensity=70, pillar_consistency=70,
+        calculation_method='multi_source_auto', activities_analyzed=10,
+        data_source='Strava', notes='', calculated_at=datetime.now()
+    )
+
+
+@pytest.fixture
+def updater_module(tmp_path, monkeypatch):
+    # The updater logs to logs/aisri_scheduler.log relative to the cwd
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'logs').mkdir()
+    monkeypatch.delenv('ADMIN_TELEGRAM_ID', raising=False)
+    import aisri_scheduled_updater
+    return aisri_scheduled_updater
+
+
+def _make_updater(module, monkeypatch, athletes, batch_seconds, tenure_seen=None):
+    def calculate(user_ids, tenure_start=None):
+        time.sleep(batch_seconds)  # blocking, like the real provider fetch
+        if tenure_seen is not None:
+            tenure_seen.update(tenure_start or {})
+        return {user_id: _result() for user_id in user_ids}
+
+    monkeypatch.setattr(module.AISRIAutoCalculator, 'calculate_from_providers', staticmethod(calculate))
+
+    db = FakeDatabase()
+    updater = module.AISRIScheduledUpdater(db=db, notifier=FakeNotifier())
+
+    async def connected_athletes():
+        return athletes
+
+    updater._get_connected_athletes = connected_athletes
+    return updater, db
+
+
+def test_lease_survives_blocking_shard(updater_module, monkeypatch, tmp_path):
+    # 8 s lease is only valid for 3 s without a heartbeat; the batch blocks for 4 s
+    coordinator = ShardLeaseCoordinator.for_sqlite(str(tmp_path / 'leases.db'), lease_seconds=8)
+    athletes = [{'user_id': f'athlete-{i}', 'tenure_start': '2023-03-01T08:00:00+00:00'} for i in range(5)]
+    tenure_seen = {}
+    updater, db = _make_updater(updater_module, monkeypatch, athletes, batch_seconds=4, tenure_seen=tenure_seen)
+
+    results = asyncio.run(updater.run_sharded_worker(coordinator, 'w0', run_id='run-1', num_shards=1))
+
+    assert results['shards_processed'] == 1
+    assert results['success'] == 5
+    assert sorted(db.upserts) == sorted(a['user_id'] for a in athletes)
+    assert coordinator.run_complete('run-1')
+    assert tenure_seen['athlete-0'] == datetime(2023, 3, 1, 8, tzinfo=timezone.utc)
+
+
+def test_several_workers_process_every_athlete_once(updater_module, monkeypatch, tmp_path):
+    path = str(tmp_path / 'leases.db')
+    athletes = [{'user_id': f'athlete-{i}'} for i in range(200)]
+    updater, db = _make_updater(updater_module, monkeypatch, athletes, batch_seconds=0.05)
+
+    worker_results = {}
+
+    def worker(worker_id):
+        coordinator = ShardLeaseCoordinator.for_sqlite(path, lease_seconds=30)
+        worker_results[worker_id] = asyncio.run(
+            updater.run_sharded_worker(coordinator, worker_id, run_id='run-2', num_shards=8)
+        )
+
+    threads = [threading.Thread(target=worker, args=(f'w{i}',)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(db.upserts) == sorted(a['user_id'] for a in athletes)
+    assert sum(r['shards_processed'] for r in worker_results.values()) == 8
+    summary = ShardLeaseCoordinator.for_sqlite(path).run_summary('run-2')
+    assert summary['shards_done'] == 8
+    assert summary['success'] == 200
+
+
+def _worker_process(module, path, worker_id, athletes, upserts_dir, hang):
+    """Forked worker; writes each upsert to its own file. `hang` blocks mid-shard forever."""
+    def calculate(user_ids, tenure_start=None):
+        time.sleep(3600 if hang else 0.01)
+        return {user_id: _result() for user_id in user_ids}
+
+    class FileDatabase(FakeDatabase):
+        async def upsert_aisri_score(self, user_id, **scores):
+            with open(upserts_dir / worker_id, 'a') as f:
+                f.write(user_id + '\n')
+
+    module.AISRIAutoCalculator.calculate_from_providers = staticmethod(calculate)
+    updater = module.AISRIScheduledUpdater(db=FileDatabase(), notifier=FakeNotifier())
+
+    async def connected_athletes():
+        return athletes
+
+    updater._get_connected_athletes = connected_athletes
+    coordinator = ShardLeaseCoordinator.for_sqlite(path, lease_seconds=8)
+    asyncio.run(updater.run_sharded_worker(coordinator, worker_id, run_id='run-4', num_shards=4))
+
+
+def _wait_until(condition, timeout=30):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'timed out'
+        time.sleep(0.05)
+
+
+def test_killed_worker_shard_is_finished_once_by_a_waiting_process(updater_module, tmp_path):
+    path = str(tmp_path / 'leases.db')
+    athletes = [{'user_id': f'athlete-{i}'} for i in range(40)]
+    upserts_dir = tmp_path / 'upserts'
+    upserts_dir.mkdir()
+    coordinator = ShardLeaseCoordinator.for_sqlite(path, lease_seconds=8)
+    context = multiprocessing.get_context('fork')
+
+    def start(worker_id, hang=False):
+        process = context.Process(target=_worker_process, args=(
+            updater_module, path, worker_id, athletes, upserts_dir, hang
+        ))
+        process.start()
+        return process
+
+    victim = start('victim', hang=True)
+    _wait_until(lambda: coordinator._query(
+        "SELECT 1 FROM aisri_shard_leases WHERE run_id = 'run-4' AND owner = 'victim'"
+    ))
+    workers = [start('w0'), start('w1')]
+    _wait_until(lambda: coordinator.run_summary('run-4')['shards_done'] == 3)
+
+    # Killed mid-shard; the live workers must not exit before stealing its shard
+    victim.kill()
+    victim.join()
+    assert all(w.is_alive() for w in workers)
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    upserted = [line for f in upserts_dir.iterdir() for line in f.read_text().split()]
+    assert sorted(upserted) == sorted(a['user_id'] for a in athletes)
+    assert not (upserts_dir / 'victim').exists()
+    assert coordinator.run_complete('run-4')
+    attempts = coordinator._query(
+        "SELECT MAX(attempts) FROM aisri_shard_leases WHERE run_id = 'run-4'"
+    )[0][0]
+    assert attempts == 2
+
+
+def test_heartbeat_renews_and_detects_stolen_lease(tmp_path):
+    coordinator = ShardLeaseCoordinator.for_sqlite(str(tmp_path / 'leases.db'), lease_seconds=8)
+    coordinator.init_run('run-3', 1)
+    lease = coordinator.claim_next_shard('run-3', 'w0')
+    claimed_until = lease.expires_at
+
+    with LeaseHeartbeat(coordinator, lease, interval=0.05) as heartbeat:
+        time.sleep(0.3)
+    assert heartbeat.beats >= 2
+    assert lease.expires_at > claimed_until
+
+    coordinator.release(lease)
+    thief = coordinator.claim_next_shard('run-3', 'w1')
+    assert thief is not None
+
+    with LeaseHeartbeat(coordinator, lease, interval=0.05):
+        time.sleep(0.2)
+    assert lease.expires_at == 0
+    assert not lease.is_valid()
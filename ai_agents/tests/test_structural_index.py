@@ -0,0 +1,64 @@
+"""
+StructuralIndex: shared instances, invalidation and the refresh watermark.
+"""
+
+from aisri_safety_gate import AISRISafetyGate
+from benchmarks.offline_db import OfflineDatabase, OfflineSupabase
+from structural_index import StructuralIndex, StructuralState, invalidate_structural_index
+
+
+def _assessment(athlete_id, created_at, strength, mobility):
+    return {
+        'id': f'{athlete_id}-{created_at}', 'athlete_id': athlete_id,
+        'assessment_date': created_at[:10], 'created_at': created_at,
+        'strength_score': strength, 'mobility_score': mobility
+    }
+
+
+def test_gates_on_one_client_share_an_index():
+    database = OfflineDatabase()
+    first, second = AISRISafetyGate(database), AISRISafetyGate(database)
+    other = AISRISafetyGate(OfflineDatabase())
+
+    assert first.structural_index is second.structural_index
+    assert other.structural_index is not first.structural_index
+
+
+def test_saved_assessment_invalidates_shared_index():
+    supabase = OfflineSupabase()
+    supabase.insert('aisri_scores', [_assessment('a1', '2026-10-01T08:00:00+00:00', 40, 40)])
+    index = StructuralIndex.shared(supabase)
+    assert index.get('a1').state == StructuralState.RED
+
+    supabase.insert('aisri_scores', [_assessment('a1', '2026-10-18T08:00:00+00:00', 80, 80)])
+    assert index.get('a1').state == StructuralState.RED  # Cached until refresh
+    invalidate_structural_index('a1')
+    assert index.get('a1').state == StructuralState.GREEN
+
+
+def test_watermark_follows_database_time_not_local_clock():
+    # Database clock years behind the app server
+    supabase = OfflineSupabase()
+    supabase.insert('aisri_scores', [_assessment('a1', '2020-01-01T08:00:00+00:00', 40, 40)])
+    index = StructuralIndex(supabase, refresh_interval=3600)
+    assert index.get('a1').state == StructuralState.RED
+    assert index._watermark == '2020-01-01T08:00:00+00:00'
+
+    supabase.insert('aisri_scores', [_assessment('a1', '2020-01-02T08:00:00+00:00', 80, 80)])
+    assert index.refresh() == 1
+    assert index.get('a1').state == StructuralState.GREEN
+    assert index._watermark == '2020-01-02T08:00:00+00:00'
+
+
+def test_load_all_indexes_latest_assessment_per_athlete():
+    supabase = OfflineSupabase()
+    supabase.insert('aisri_scores', [
+        _assessment('a1', '2026-10-01T08:00:00+00:00', 40, 40),
+        _assessment('a1', '2026-10-10T08:00:00+00:00', 60, 60),
+        _assessment('a2', '2026-10-05T08:00:00+00:00', 90, 80)
+    ])
+    index = StructuralIndex(supabase)
+
+    assert index.load_all() == 2
+    assert index.states_for(['a1', 'a2']) == {'a1': 'yellow', 'a2': 'green'}
+    assert index._watermark == '2026-10-10T08:00:00+00:00'
@@ -0,0 +1,118 @@
+"""
+AISRiAdaptiveTrainingPlanAgent: in-memory plan rows, one atomic persist.
+
+PlanTables mirrors the get_training_plan_inputs / persist_training_plans
+RPCs of migration 20261019000009 over OfflineSupabase tables.
+"""
+
+from datetime import datetime, timedelta
+
+from ai_engine_agent import adaptive_training_plan_agent
+from ai_engine_agent.adaptive_training_plan_agent import AISRiAdaptiveTrainingPlanAgent
+from benchmarks.offline_db import OfflineSupabase
+
+
+class PlanTables:
+    def __init__(self, scores, risks=None, squads=None):
+        self.supabase = OfflineSupabase()
+        self.scores = scores
+        self.risks = risks or {}
+        self.squads = squads or {}
+        self.calls = []
+        self.supabase.register_rpc('get_training_plan_inputs', self.inputs)
+        self.supabase.register_rpc('persist_training_plans', self.persist)
+
+    def rows(self, table):
+        return self.supabase._tables[table].rows
+
+    def inputs(self, params):
+        self.calls.append('get_training_plan_inputs')
+        members = set(params['p_athlete_ids'] or []) | set(self.squads.get(params['p_coach_id'], []))
+        members = sorted(m for m in members if params['p_after'] is None or m > params['p_after'])
+        return [{
+            'athlete_id': athlete_id,
+            'aisri_score': self.scores.get(athlete_id),
+            'risk_score': self.risks.get(athlete_id, (None, None))[0],
+            'risk_level': self.risks.get(athlete_id, (None, None))[1]
+        } for athlete_id in members[:params['p_limit']]]
+
+    def persist(self, params):
+        self.calls.append('persist_training_plans')
+        athletes = {plan['athlete_id'] for plan in params['p_plans']}
+        if params['p_supersede']:
+            today = datetime.utcnow().date().isoformat()
+            active = {p['id'] for p in self.rows('ai_workout_plans')
+                      if p['status'] == 'active' and p['athlete_id'] in athletes}
+            self.rows('workout_assignments')[:] = [
+                a for a in self.rows('workout_assignments')
+                if not (a['plan_id'] in active and a['status'] == 'scheduled' and a['scheduled_date'] >= today)
+            ]
+            for plan in self.rows('ai_workout_plans'):
+                if plan['id'] in active:
+                    plan['status'] = 'cancelled'
+        self.supabase.insert('ai_workout_plans', params['p_plans'])
+        self.supabase.insert('ai_workouts', params['p_workouts'])
+        self.supabase.insert('workout_assignments', params['p_assignments'])
+        return [{'plan_id': plan['id']} for plan in params['p_plans']]
+
+
+def test_plan_is_written_in_one_call_with_linked_rows():
+    tables = PlanTables({'a1': 90}, risks={'a1': (20, 'LOW')})
+    result = AISRiAdaptiveTrainingPlanAgent(tables.supabase).generate_plan('a1')
+
+    assert tables.calls == ['get_training_plan_inputs', 'persist_training_plans']
+    assert result['status'] == 'success'
+    assert result['injury_risk'] == {'risk_score': 20, 'risk_level': 'LOW'}
+    assert [day['zone'] for day in result['weekly_plan']] == ['AR', 'EN', 'REST', 'TH', 'REST', 'P', 'REST']
+
+    plans, workouts, assignments = (tables.rows(t) for t in ('ai_workout_plans', 'ai_workouts', 'workout_assignments'))
+    assert [p['id'] for p in plans] == [result['plan_id']]
+    assert len(workouts) == len(assignments) == 4
+    assert {a['workout_id'] for a in assignments} == {w['id'] for w in workouts}
+    assert all(a['plan_id'] == result['plan_id'] and a['status'] == 'scheduled' for a in assignments)
+    training_days = [day['date'] for day in result['weekly_plan'] if day['zone'] != 'REST']
+    assert [a['scheduled_date'] for a in assignments] == training_days
+
+
+def test_missing_score_writes_nothing():
+    tables = PlanTables({'a1': None})
+    result = AISRiAdaptiveTrainingPlanAgent(tables.supabase).generate_plan('a1')
+
+    assert result == {'status': 'error', 'message': 'No AISRi score'}
+    assert tables.calls == ['get_training_plan_inputs']
+
+
+def test_squad_regeneration_supersedes_active_plans_in_one_transaction():
+    tables = PlanTables({'a1': 50, 'a2': 75, 'a3': None}, risks={'a2': (80, 'HIGH')},
+                        squads={'coach': ['a1', 'a2', 'a3']})
+    agent = AISRiAdaptiveTrainingPlanAgent(tables.supabase)
+    first = agent.generate_plan('a1')
+    yesterday = (datetime.utcnow().date() - timedelta(days=1)).isoformat()
+    tables.rows('workout_assignments')[0]['scheduled_date'] = yesterday
+    tables.calls.clear()
+
+    result = agent.generate_plans(coach_id='coach')
+
+    assert tables.calls == ['get_training_plan_inputs', 'persist_training_plans']
+    assert result['generated'] == 2
+    assert result['skipped'] == [{'athlete_id': 'a3', 'message': 'No AISRi score'}]
+    by_athlete = {plan['athlete_id']: plan for plan in result['plans']}
+    assert [day['zone'] for day in by_athlete['a2']['weekly_plan']] == ['AR', 'REST', 'AR', 'REST', 'F', 'REST', 'REST']
+
+    statuses = {p['id']: p['status'] for p in tables.rows('ai_workout_plans')}
+    assert statuses[first['plan_id']] == 'cancelled'
+    assert statuses[by_athlete['a1']['plan_id']] == 'active'
+    # Only the past assignment of the superseded plan survives
+    old = [a for a in tables.rows('workout_assignments') if a['plan_id'] == first['plan_id']]
+    assert [a['scheduled_date'] for a in old] == [yesterday]
+
+
+def test_inputs_are_paged(monkeypatch):
+    monkeypatch.setattr(adaptive_training_plan_agent, 'INPUT_PAGE_SIZE', 2)
+    tables = PlanTables({f'a{i}': 60 for i in range(5)})
+
+    result = AISRiAdaptiveTrainingPlanAgent(tables.supabase).generate_plans([f'a{i}' for i in range(5)])
+
+    assert tables.calls.count('get_training_plan_inputs') == 3
+    assert tables.calls.count('persist_training_plans') == 1
+    assert result['generated'] == 5
@@ -0,0 +1,139 @@
+"""
+WorkloadEngine EWMA math, and the generator reading the stored state.
+"""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from adaptive_workout_generator import (
+    AdaptiveWorkoutGenerator,
+    AthleteAbility,
+    PerformanceHistory,
+    TrainingPhase
+)
+from benchmarks.offline_db import OfflineSupabase
+from database_integration import DatabaseIntegration
+from workload_engine import WorkloadEngine, WorkloadState
+
+A_ACUTE = WorkloadEngine.ALPHA_ACUTE
+A_CHRONIC = WorkloadEngine.ALPHA_CHRONIC
+
+
+def _naive(loads, alpha, start=0.0):
+    out, value = [], start
+    for load in loads:
+        value = alpha * load + (1 - alpha) * value
+        out.append(value)
+    return np.array(out)
+
+
+def _ability() -> AthleteAbility:
+    return AthleteAbility(
+        current_pace_easy=405, current_pace_tempo=360, current_pace_interval=340,
+        max_hr=185, threshold_hr=167, aerobic_hr=148,
+        weekly_volume_km=40.0, longest_run_km=16.0, fitness_score=65.0
+    )
+
+
+def _history(workload=None) -> PerformanceHistory:
+    return PerformanceHistory(
+        last_7_days=['GOOD'] * 3, last_4_weeks_volume=[36.0, 38.0, 40.0, 40.0],
+        last_3_workouts=[], consecutive_good_performances=0,
+        fatigue_indicators=[], injury_risk_score=0.0, workload=workload
+    )
+
+
+def test_backfill_matches_recurrence_across_blocks():
+    rng = np.random.default_rng(7)
+    loads = rng.integers(0, 120, size=(3, 600)).astype(float)
+    loads[:, rng.random(600) < 0.3] = 0  # rest days
+    seed = np.array([0.0, 30.0, 55.0])
+
+    acute, chronic = WorkloadEngine.backfill(loads, seed)
+
+    for i in range(3):
+        np.testing.assert_allclose(acute[i], _naive(loads[i], A_ACUTE, seed[i]), rtol=1e-9)
+        np.testing.assert_allclose(chronic[i], _naive(loads[i], A_CHRONIC, seed[i]), rtol=1e-9)
+
+
+def test_incremental_updates_equal_backfill():
+    loads = [40, 0, 65, 30, 0, 0, 90, 45, 0, 60]
+    start = date(2026, 10, 1)
+    state = WorkloadState(as_of=start)
+    for offset, load in enumerate(loads):
+        state = WorkloadEngine.update(state, load, start + timedelta(days=offset))
+
+    expected = WorkloadEngine.state_from_series(loads)
+    assert state.acute == pytest.approx(expected.acute)
+    assert state.chronic == pytest.approx(expected.chronic)
+
+
+def test_late_session_is_folded_in_exactly():
+    start = date(2026, 10, 1)
+    in_order = WorkloadState(as_of=start)
+    for offset, load in enumerate([50, 0, 70, 0, 40]):
+        in_order = WorkloadEngine.update(in_order, load, start + timedelta(days=offset))
+
+    late = WorkloadState(as_of=start)
+    for offset, load in [(0, 50), (2, 70), (4, 40)]:
+        late = WorkloadEngine.update(late, load, start + timedelta(days=offset))
+    # An edit removing 20 from day 2 after the fact, then adding it back
+    late = WorkloadEngine.update(late, -20, start + timedelta(days=2))
+    late = WorkloadEngine.update(late, 20, start + timedelta(days=2))
+
+    assert late.acute == pytest.approx(in_order.acute)
+    assert late.chronic == pytest.approx(in_order.chronic)
+    assert late.as_of == start + timedelta(days=4)
+
+
+def test_advance_decays_and_max_load_hits_the_bound():
+    state = WorkloadState(acute=40.0, chronic=50.0, as_of=date(2026, 10, 1))
+    later = WorkloadEngine.advance(state, date(2026, 10, 4))
+    assert later.acute == pytest.approx(40.0 * (1 - A_ACUTE) ** 3)
+    assert later.chronic == pytest.approx(50.0 * (1 - A_CHRONIC) ** 3)
+
+    bound = WorkloadEngine.max_load(state, 1.3)
+    assert WorkloadEngine.project(state, bound) == pytest.approx(1.3)
+    assert WorkloadEngine.max_load(WorkloadState(acute=80, chronic=50), 1.3) == 0.0
+    assert WorkloadEngine.max_load(WorkloadState(), 1.3) is None
+
+
+def test_generator_projects_ledger_load_onto_stored_state():
+    generator = AdaptiveWorkoutGenerator()
+    start = datetime(2026, 10, 20)
+    stored = WorkloadState(acute=70.0, chronic=55.0, as_of=start.date() - timedelta(days=1))
+
+    workouts = generator.generate_block(
+        _ability(), _history(stored), TrainingPhase.BASE_BUILD, start, days=7
+    )
+
+    state = stored
+    for workout in workouts:
+        ledger = generator._calculate_ledger_load(workout, _ability())
+        day = workout.workout_date.date()
+        assert workout.acwr_after_workout == round(WorkloadEngine.project(state, ledger, day), 2)
+        state = WorkloadEngine.update(state, ledger, day)
+
+    # Without stored state the block falls back to km volumes
+    fallback = generator.generate_block(
+        _ability(), _history(), TrainingPhase.BASE_BUILD, start, days=7
+    )
+    assert [w.acwr_after_workout for w in fallback] != [w.acwr_after_workout for w in workouts]
+
+
+def test_database_integration_reads_stored_state():
+    db = DatabaseIntegration.__new__(DatabaseIntegration)
+    db.supabase = OfflineSupabase()
+    today = datetime.now().date()
+    db.supabase.insert('athlete_workload_state', [{
+        'athlete_id': 'a1', 'as_of': today.isoformat(),
+        'load_acute': 64.0, 'load_chronic': 52.0, 'minutes_acute': 50.0, 'minutes_chronic': 45.0
+    }])
+
+    state = db.get_workload_state('a1')
+    assert (state.acute, state.chronic) == (64.0, 52.0)
+    assert db._create_performance_history([], state).workload is state
+    # No training logged yet: fall back to declared volumes
+    assert db.get_workload_state('new-athlete') is None
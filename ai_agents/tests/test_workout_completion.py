@@ -0,0 +1,146 @@
+"""
+process_workout_completion: one prefetch read, one atomic write, idempotent.
+
+OfflineDatabase mirrors the get_workout_completion_inputs / complete_workout
+RPCs of migration 20261019000011.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from adaptive_workout_generator import AdaptiveWorkoutGenerator
+from benchmarks.offline_db import OfflineDatabase
+from database_integration import DatabaseIntegration
+from performance_tracker import PerformanceTracker
+
+ASSIGNMENT_ID = '7b0c1d9e-0000-4000-8000-000000000001'
+
+
+def _integration(monkeypatch):
+    """DatabaseIntegration over OfflineDatabase tables; records every request"""
+    database = OfflineDatabase()
+    now = datetime.now()
+    database.supabase.insert('athlete_detailed_profile', [{
+        'athlete_id': 'a1', 'signup_date': (now - timedelta(days=20)).isoformat(),
+        'current_avg_pace_easy': 390, 'current_weekly_volume_km': 35.0
+    }])
+    database.supabase.insert('workout_assignments', [{
+        'id': ASSIGNMENT_ID, 'athlete_id': 'a1', 'scheduled_date': now.isoformat(),
+        'workout_type': 'tempo', 'workout_status': 'assigned', 'distance_km': 8.0,
+        'target_pace_seconds': 330, 'pace_range_min': 320, 'pace_range_max': 340,
+        'target_hr': 165, 'hr_range_min': 160, 'hr_range_max': 170
+    }])
+    database.supabase.insert('workout_results', [{
+        'id': 'earlier', 'assignment_id': 'older-assignment', 'athlete_id': 'a1',
+        'workout_date': (now - timedelta(days=2)).isoformat(), 'performance_label': 'GREAT'
+    }])
+
+    db = DatabaseIntegration.__new__(DatabaseIntegration)
+    db.supabase = database.supabase
+    db.performance_tracker = PerformanceTracker()
+    db.workout_generator = AdaptiveWorkoutGenerator()
+
+    requests = []
+    rpc = database.supabase.rpc
+    monkeypatch.setattr(database.supabase, 'rpc', lambda name, params: requests.append(name) or rpc(name, params))
+    monkeypatch.setattr(database.supabase, 'table', lambda name: requests.append(name) or pytest.fail(name))
+    return db, database.supabase._tables, requests
+
+
+def _workout_data(**overrides):
+    return {
+        'external_id': 'strava-1', 'completed_date': datetime.now().isoformat(),
+        'distance_km': 8.1, 'duration_seconds': 2670, 'avg_pace_seconds': 330,
+        'avg_hr': 164, 'max_hr': 178, 'splits': [332, 331, 329, 330, 328, 331, 330, 329],
+        **overrides
+    }
+
+
+def test_completion_reads_once_and_writes_once(monkeypatch):
+    db, tables, requests = _integration(monkeypatch)
+
+    results = db.process_workout_completion(ASSIGNMENT_ID, 'a1', _workout_data())
+
+    assert requests == ['get_workout_completion_inputs', 'complete_workout']
+    assert results['duplicate'] is False
+
+    stored = tables['workout_results'].lookup('id', results['result_id'])[0]
+    assert stored['assignment_id'] == ASSIGNMENT_ID
+    assert stored['performance_label'] == results['performance_label']
+    assert tables['ability_progression'].rows[0]['workout_result_id'] == results['result_id']
+    assert tables['workout_assignments'].lookup('id', ASSIGNMENT_ID)[0]['workout_status'] == 'completed'
+    next_assignment = tables['workout_assignments'].lookup('id', results['next_workout_id'])[0]
+    assert next_assignment['athlete_id'] == 'a1' and next_assignment['workout_status'] == 'assigned'
+
+    # Same assessment as scoring the prefetched assignment directly
+    assessment = db.performance_tracker.assess_workout_performance(
+        db._assignment_to_workout_target(tables['workout_assignments'].lookup('id', ASSIGNMENT_ID)[0]),
+        db._dict_to_workout_result(_workout_data())
+    )
+    assert results['performance_label'] == assessment.performance_label.value
+    assert results['feedback'] == assessment.key_feedback
+
+
+def test_repeated_delivery_writes_nothing(monkeypatch):
+    db, tables, requests = _integration(monkeypatch)
+    first = db.process_workout_completion(ASSIGNMENT_ID, 'a1', _workout_data())
+    requests.clear()
+
+    again = db.process_workout_completion(ASSIGNMENT_ID, 'a1', _workout_data())
+
+    assert requests == ['get_workout_completion_inputs']
+    assert again['duplicate'] is True and again['result_id'] == first['result_id']
+    assert again['performance_label'] == first['performance_label']
+    assert again['feedback'] == first['feedback']
+    assert len(tables['workout_results'].rows) == 2
+    assert len(tables['ability_progression'].rows) == 1
+    assert len(tables['workout_assignments'].rows) == 2
+
+
+def test_delivery_that_loses_the_race_reports_the_stored_result(monkeypatch):
+    db, tables, requests = _integration(monkeypatch)
+    prefetch = db.get_workout_completion_inputs
+    winner = {}
+
+    def racing_prefetch(assignment_id, athlete_id):
+        inputs = prefetch(assignment_id, athlete_id)
+        if not winner:
+            # A concurrent delivery of a slower run commits between this prefetch and complete_workout
+            winner['pending'] = True
+            winner.update(db.process_workout_completion(
+                ASSIGNMENT_ID, 'a1', _workout_data(avg_pace_seconds=395, duration_seconds=3200, avg_hr=178)
+            ))
+        return inputs
+    monkeypatch.setattr(db, 'get_workout_completion_inputs', racing_prefetch)
+
+    loser = db.process_workout_completion(ASSIGNMENT_ID, 'a1', _workout_data())
+
+    assert requests.count('complete_workout') == 2
+    assert winner['duplicate'] is False and loser['duplicate'] is True
+    assert loser['performance_label'] != db.performance_tracker.assess_workout_performance(
+        db._assignment_to_workout_target(tables['workout_assignments'].lookup('id', ASSIGNMENT_ID)[0]),
+        db._dict_to_workout_result(_workout_data())
+    ).performance_label.value
+    for key in ('result_id', 'performance_label', 'ability_change', 'feedback'):
+        assert loser[key] == winner[key], key
+    assert loser['next_workout_id'] is None
+    assert len(tables['ability_progression'].rows) == 1
+
+
+def test_failure_before_the_write_leaves_no_partial_state(monkeypatch):
+    db, tables, requests = _integration(monkeypatch)
+
+    with pytest.raises(ValueError):
+        db.process_workout_completion('missing', 'a1', _workout_data())
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("generator failed")
+    monkeypatch.setattr(db.workout_generator, 'generate_next_workout', fail)
+    with pytest.raises(RuntimeError):
+        db.process_workout_completion(ASSIGNMENT_ID, 'a1', _workout_data())
+
+    assert 'complete_workout' not in requests
+    assert [row['id'] for row in tables['workout_results'].rows] == ['earlier']
+    assert not tables['ability_progression'].rows
+    assert tables['workout_assignments'].lookup('id', ASSIGNMENT_ID)[0]['workout_status'] == 'assigned'
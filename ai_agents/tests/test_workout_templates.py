@@ -0,0 +1,90 @@
+"""
+Template registry: same choices as the per-call lookup, read-only, shared.
+"""
+
+import copy
+import json
+import pickle
+
+import pytest
+
+from aisri_safety_gate import AISRISafetyGate
+from benchmarks.offline_db import OfflineDatabase
+from workout_templates import (
+    STRUCTURAL_WORKOUT_TEMPLATES, TEMPLATE_REGISTRY, TEMPLATE_TYPE_ALIASES, get_template_for_state
+)
+
+WORKOUT_TYPES = list(TEMPLATE_TYPE_ALIASES) + ['long', 'strength', 'Recovery', 'INTERVAL']
+
+
+def _previous_lookup(structural_state, workout_type):
+    """get_template_for_state before the registry (template key, or None)"""
+    state_templates = STRUCTURAL_WORKOUT_TEMPLATES.get(structural_state.lower(), {})
+    key = TEMPLATE_TYPE_ALIASES.get(workout_type.lower())
+    if key and key in state_templates:
+        return state_templates[key]['name']
+    if structural_state == 'red':
+        fallback = state_templates.get('easy', state_templates.get('mobility'))
+    elif structural_state == 'yellow':
+        fallback = state_templates.get('easy')
+    else:
+        fallback = state_templates.get('threshold')
+    return fallback['name'] if fallback else None
+
+
+@pytest.mark.parametrize('state', ['red', 'yellow', 'green'])
+def test_registry_resolves_like_the_per_call_lookup(state):
+    for workout_type in WORKOUT_TYPES:
+        template = get_template_for_state(state, workout_type)
+        assert template.name == _previous_lookup(state, workout_type), (state, workout_type)
+        assert template.state == state
+
+
+def test_lookups_share_one_read_only_object():
+    first = TEMPLATE_REGISTRY.get('green', 'vo2max')
+    assert first is TEMPLATE_REGISTRY.get('green', 'interval')
+    assert first.zones_allowed == (2, 3, 4, 5)
+
+    with pytest.raises(TypeError):
+        first.main['blocks'] = []
+    with pytest.raises(TypeError):
+        first.constraints.update(focus='anything')
+    with pytest.raises(AttributeError):
+        first.duration_minutes = 10
+    assert not hasattr(first, '__dict__')
+
+
+def test_workout_fields_are_resolved_and_serializable():
+    red = TEMPLATE_REGISTRY.get('red', 'easy')
+    assert red.constraints == {
+        'max_heart_rate_percent': 65, 'max_perceived_exertion': 4,
+        'speed_permission': False, 'focus': 'aerobic_base_only'
+    }
+    assert TEMPLATE_REGISTRY.get('green', 'race').constraints['speed_permission']
+
+    workout = {**red.workout_fields, 'duration_minutes': 20}
+    workout['duration_minutes'] = 15
+    decoded = json.loads(json.dumps(workout))
+    assert decoded['warmup'] == STRUCTURAL_WORKOUT_TEMPLATES['red']['easy']['structure']['warmup']
+    assert red.workout_fields['duration_minutes'] == 25
+
+
+def test_templates_survive_pickling_and_copying():
+    template = TEMPLATE_REGISTRY.get('green', 'tempo')
+
+    restored = pickle.loads(pickle.dumps(template))
+    assert restored == template
+    with pytest.raises(TypeError):
+        restored.main['blocks'] = []
+
+    fields = pickle.loads(pickle.dumps(template.workout_fields))
+    assert fields == template.workout_fields and type(fields) is type(template.workout_fields)
+    assert copy.deepcopy(template.workout_fields) == template.workout_fields
+    assert copy.deepcopy({'workout': template.workout_fields})['workout'] == template.workout_fields
+    assert copy.copy(template.constraints) == template.constraints
+
+
+def test_gate_falls_back_for_unknown_states():
+    gate = AISRISafetyGate(OfflineDatabase())
+    assert gate.load_template_for_state('yellow', 'interval').key == 'easy'
+    assert gate.load_template_for_state('unknown', 'easy') is TEMPLATE_REGISTRY.fallback('green')
@@ -0,0 +1,166 @@
+"""
+Training Load Ledger
+Reader for the materialized per-athlete daily training-load ledger
+(athlete_daily_load), maintained in the database by triggers on every
+activity source.
+
+Each day is a handful of integers (minutes, distance, load, sessions,
+hard sessions, max HR), so gates and agents read O(days) small rows
+instead of re-aggregating raw activities on every request.
+
+Usage:
+    ledger = TrainingLoadLedger(db.supabase)
+    days = ledger.get_days(athlete_id, days=14)      # oldest -> newest, zero-filled
+    TrainingLoadLedger.total(days[-7:], 'minutes')
+    TrainingLoadLedger.consecutive_hard_days(days)
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+
+HARD_SESSION_LOAD_MULTIPLIER = 2  # Mirrors the ledger's load definition
+
+
+@dataclass
+class DailyLoad:
+    """One athlete-day of the ledger"""
+    day: date
+    minutes: int = 0
+    distance_m: int = 0
+    load: int = 0
+    sessions: int = 0
+    hard_sessions: int = 0
+    max_hr: Optional[int] = None
+
+    @property
+    def is_rest_day(self) -> bool:
+        return self.sessions == 0
+
+
+class TrainingLoadLedger:
+    """Read access to athlete_daily_load"""
+
+    TABLE = 'athlete_daily_load'
+    COLUMNS = 'day, minutes, distance_m, load, sessions, hard_sessions, max_hr'
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def get_days(
+        self,
+        athlete_id: str,
+        days: int = 28,
+        end: Optional[date] = None
+    ) -> List[DailyLoad]:
+        """
+        Dense daily series ending today (UTC), oldest first.
+
+        Days without activity are zero-filled so callers can slice
+        windows by position (e.g. days[-7:] is the last week).
+        """
+        end = end or datetime.now(timezone.utc).date()
+        start = end - timedelta(days=days - 1)
+
+        response = self.supabase.table(self.TABLE)\
+            .select(self.COLUMNS)\
+            .eq("athlete_id", str(athlete_id))\
+            .gte("day", start.isoformat())\
+            .lte("day", end.isoformat())\
+            .execute()
+
+        by_day = {
+            date.fromisoformat(row['day']): row
+            for row in (response.data or [])
+        }
+        return [
+            self._to_daily_load(start + timedelta(days=i), by_day.get(start + timedelta(days=i)))
+            for i in range(days)
+        ]
+
+    def get_days_for_athletes(
+        self,
+        athlete_ids: List[str],
+        days: int = 28,
+        end: Optional[date] = None
+    ) -> Dict[str, List[DailyLoad]]:
+        """Dense daily series for many athletes in one query"""
+        end = end or datetime.now(timezone.utc).date()
+        start = end - timedelta(days=days - 1)
+
+        response = self.supabase.table(self.TABLE)\
+            .select('athlete_id, ' + self.COLUMNS)\
+            .in_("athlete_id", [str(a) for a in athlete_ids])\
+            .gte("day", start.isoformat())\
+            .lte("day", end.isoformat())\
+            .execute()
+
+        rows_by_athlete: Dict[str, Dict[date, Dict]] = {str(a): {} for a in athlete_ids}
+        for row in (response.data or []):
+            rows_by_athlete.setdefault(row['athlete_id'], {})[date.fromisoformat(row['day'])] = row
+
+        return {
+            athlete_id: [
+                self._to_daily_load(start + timedelta(days=i), by_day.get(start + timedelta(days=i)))
+                for i in range(days)
+            ]
+            for athlete_id, by_day in rows_by_athlete.items()
+        }
+
+    def refresh_day(self, athlete_id: str, day: date):
+        """Recompute one athlete-day from the raw activity tables (repair/backfill)"""
+        self.supabase.rpc('refresh_athlete_daily_load', {
+            'p_athlete_id': str(athlete_id),
+            'p_day': day.isoformat()
+        }).execute()
+
+    @staticmethod
+    def _to_daily_load(day: date, row: Optional[Dict]) -> DailyLoad:
+        if not row:
+            return DailyLoad(day=day)
+        return DailyLoad(
+            day=day,
+            minutes=row.get('minutes') or 0,
+            distance_m=row.get('distance_m') or 0,
+            load=row.get('load') or 0,
+            sessions=row.get('sessions') or 0,
+            hard_sessions=row.get('hard_sessions') or 0,
+            max_hr=row.get('max_hr')
+        )
+
+    # =========================================================================
+    # AGGREGATES (pure functions over a dense series)
+    # =========================================================================
+
+    @staticmethod
+    def total(days: List[DailyLoad], field: str = 'load') -> int:
+        """Sum of one field over a window"""
+        return sum(getattr(d, field) for d in days)
+
+    @staticmethod
+    def consecutive_hard_days(days: List[DailyLoad]) -> int:
+        """
+        Hard training days in a row, counting back from the most recent
+        training day. Rest days neither count nor break the streak.
+        """
+        streak = 0
+        for day in reversed(days):
+            if day.is_rest_day:
+                continue
+            if day.hard_sessions == 0:
+                break
+            streak += 1
+        return streak
+
+    @staticmethod
+    def acute_chronic_ratio(days: List[DailyLoad], acute_days: int = 7) -> float:
+        """Mean daily load of the last `acute_days` over the whole window"""
+        if not days:
+            return 1.0
+        chronic = sum(d.load for d in days) / len(days)
+        if chronic == 0:
+            return 1.0
+        acute_window = days[-acute_days:]
+        acute = sum(d.load for d in acute_window) / len(acute_window)
+        return acute / chronic
@@ -0,0 +1,317 @@
+"""
+Workload Engine
+Exponentially weighted acute/chronic workload (EWMA ACWR) shared by the
+safety gate, the injury prediction agent and the adaptive workout generator.
+
+Acute and chronic loads are EWMAs of daily load with decay constants
+alpha = 2 / (N + 1) for N = 7 (acute) and N = 28 (chronic) days:
+
+    ewma[t] = alpha * load[t] + (1 - alpha) * ewma[t - 1]
+
+The recurrence is linear, so a session of load L on day d changes the
+state as of day s >= d by exactly alpha * L * (1 - alpha) ** (s - d).
+That makes every new (or late, or edited) session an O(1) update, which
+is how athlete_workload_state is maintained in the database.
+
+Features:
+- O(1) per-session update (also for sessions older than the state)
+- Vectorized backfill of full acute/chronic/ACWR history for one athlete
+  or a whole population (n_athletes x n_days) in one NumPy pass, from
+  zero or continuing a current state
+- Reads of the trigger-maintained athlete_workload_state table, decayed
+  to today
+
+Usage:
+    engine = WorkloadEngine(db.supabase)
+    state = engine.get_state(athlete_id, metric='minutes')
+    state.acwr, engine.project(state, planned_minutes)
+
+    acute, chronic = WorkloadEngine.backfill(daily_loads)   # 2-D array
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+
+# Shared ACWR bands ("sweet spot" 0.8-1.3, danger above 1.5)
+ACWR_SAFE_MIN = 0.8
+ACWR_SAFE_MAX = 1.3
+ACWR_DANGER = 1.5
+
+METRICS = ('load', 'minutes')
+
+# Backfill works in blocks so (1 - alpha) ** -k stays well inside float64
+BACKFILL_BLOCK_DAYS = 256
+
+
+def ewma_alpha(days: int) -> float:
+    """EWMA decay constant for an N-day window"""
+    return 2.0 / (days + 1)
+
+
+@dataclass
+class WorkloadState:
+    """Acute and chronic EWMA of daily load as of one day"""
+    acute: float = 0.0
+    chronic: float = 0.0
+    as_of: Optional[date] = None
+
+    @property
+    def acwr(self) -> float:
+        """Acute:chronic workload ratio (1.0 without chronic load)"""
+        if self.chronic <= 0:
+            return 1.0
+        return self.acute / self.chronic
+
+    def with_chronic_floor(self, minimum: float) -> 'WorkloadState':
+        """
+        Same state with chronic load raised to at least `minimum`.
+
+        Cold start: a new athlete's chronic EWMA is a fraction of one
+        session, so the ratio would forbid any session for weeks.
+        """
+        if self.chronic >= minimum:
+            return self
+        return WorkloadState(self.acute, minimum, self.as_of)
+
+    @property
+    def acute_weekly(self) -> float:
+        """Acute load expressed as a weekly total"""
+        return self.acute * 7
+
+    @property
+    def chronic_weekly(self) -> float:
+        """Chronic load expressed as a weekly total"""
+        return self.chronic * 7
+
+
+class WorkloadEngine:
+    """EWMA acute/chronic workload: O(1) updates, vectorized backfill"""
+
+    TABLE = 'athlete_workload_state'
+
+    ALPHA_ACUTE = ewma_alpha(ACUTE_DAYS)
+    ALPHA_CHRONIC = ewma_alpha(CHRONIC_DAYS)
+
+    def __init__(self, supabase=None):
+        self.supabase = supabase
+
+    # =========================================================================
+    # INCREMENTAL (O(1) per session)
+    # =========================================================================
+
+    @classmethod
+    def advance(cls, state: WorkloadState, day: date) -> WorkloadState:
+        """State decayed to `day` assuming no load since state.as_of"""
+        if state.as_of is None or day <= state.as_of:
+            return WorkloadState(state.acute, state.chronic, state.as_of or day)
+        gap = (day - state.as_of).days
+        return WorkloadState(
+            acute=state.acute * (1 - cls.ALPHA_ACUTE) ** gap,
+            chronic=state.chronic * (1 - cls.ALPHA_CHRONIC) ** gap,
+            as_of=day
+        )
+
+    @classmethod
+    def update(cls, state: WorkloadState, load: float, day: date) -> WorkloadState:
+        """
+        Apply one session (or a load delta) on `day`.
+
+        Sessions dated before state.as_of are folded in with the decay
+        they would have had, so out-of-order ingestion stays exact.
+        Negative loads undo a session (edits and deletes).
+        """
+        state = cls.advance(state, day)
+        lag = (state.as_of - day).days
+        return WorkloadState(
+            acute=state.acute + cls.ALPHA_ACUTE * load * (1 - cls.ALPHA_ACUTE) ** lag,
+            chronic=state.chronic + cls.ALPHA_CHRONIC * load * (1 - cls.ALPHA_CHRONIC) ** lag,
+            as_of=state.as_of
+        )
+
+    @classmethod
+    def project(cls, state: WorkloadState, load: float, day: Optional[date] = None) -> float:
+        """ACWR after adding a planned session of `load` on `day` (default: as_of)"""
+        return cls.update(state, load, day or state.as_of or _today()).acwr
+
+    @classmethod
+    def max_load(cls, state: WorkloadState, max_acwr: float) -> Optional[float]:
+        """
+        Largest single session on state.as_of that keeps ACWR <= max_acwr.
+
+        Solves (acute + a_A * L) / (chronic + a_C * L) <= max_acwr for L:
+            L <= (max_acwr * chronic - acute) / (a_A - max_acwr * a_C)
+
+        Returns:
+            The bound (0 when already above the limit), or None when no
+            session size can breach it (no chronic load, or a limit so
+            loose that the ratio can never reach it)
+        """
+        if state.chronic <= 0:
+            return None
+        headroom = max_acwr * state.chronic - state.acute
+        slope = cls.ALPHA_ACUTE - max_acwr * cls.ALPHA_CHRONIC
+        if slope <= 0:
+            return None if headroom >= 0 else 0.0
+        return max(headroom / slope, 0.0)
+
+    # =========================================================================
+    # VECTORIZED BACKFILL
+    # =========================================================================
+
+    @classmethod
+    def backfill(
+        cls,
+        loads: np.ndarray,
+        seed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Full acute and chronic history for a daily load series.
+
+        Args:
+            loads: Daily loads, oldest first; shape (n_days,) or
+                   (n_athletes, n_days) with zeros on rest days
+            seed: Optional per-athlete starting level for both EWMAs
+                  (e.g. mean daily load before the window); zero if omitted
+
+        Returns:
+            (acute, chronic) arrays with the same shape as `loads`
+        """
+        loads = np.asarray(loads, dtype=np.float64)
+        squeeze = loads.ndim == 1
+        loads = np.atleast_2d(loads)
+        start = np.zeros(loads.shape[0]) if seed is None else \
+            np.broadcast_to(np.asarray(seed, dtype=np.float64), (loads.shape[0],))
+
+        acute = cls._ewma(loads, cls.ALPHA_ACUTE, start)
+        chronic = cls._ewma(loads, cls.ALPHA_CHRONIC, start)
+        if squeeze:
+            return acute[0], chronic[0]
+        return acute, chronic
+
+    @classmethod
+    def backfill_from_state(cls, state: WorkloadState, loads: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Acute and chronic history of loads that continue an existing state.
+
+        Args:
+            state: Workload as of the day before loads[..., 0]
+            loads: Daily loads from the next day on; shape (n_days,) or
+                   (n_series, n_days), e.g. simulated trajectories
+
+        Returns:
+            (acute, chronic) arrays with the same shape as `loads`
+        """
+        loads = np.asarray(loads, dtype=np.float64)
+        squeeze = loads.ndim == 1
+        loads = np.atleast_2d(loads)
+        acute = cls._ewma(loads, cls.ALPHA_ACUTE, np.full(loads.shape[0], state.acute))
+        chronic = cls._ewma(loads, cls.ALPHA_CHRONIC, np.full(loads.shape[0], state.chronic))
+        if squeeze:
+            return acute[0], chronic[0]
+        return acute, chronic
+
+    @staticmethod
+    def _ewma(loads: np.ndarray, alpha: float, start: np.ndarray) -> np.ndarray:
+        """
+        Closed-form EWMA along axis 1:
+            ewma[t] = r**(t+1) * start + alpha * sum_k r**(t-k) * load[k],  r = 1 - alpha
+        evaluated per block with a cumulative sum, carrying the last value.
+        """
+        r = 1.0 - alpha
+        out = np.empty_like(loads)
+        carry = start.astype(np.float64)
+
+        for begin in range(0, loads.shape[1], BACKFILL_BLOCK_DAYS):
+            block = loads[:, begin:begin + BACKFILL_BLOCK_DAYS]
+            k = np.arange(block.shape[1])
+            growth = r ** -k
+            decay = r ** k
+            out[:, begin:begin + block.shape[1]] = decay * (
+                alpha * np.cumsum(block * growth, axis=1) + r * carry[:, None]
+            )
+            carry = out[:, begin + block.shape[1] - 1]
+
+        return out
+
+    @classmethod
+    def acwr_history(cls, loads: np.ndarray, seed: Optional[np.ndarray] = None) -> np.ndarray:
+        """Daily ACWR history (1.0 where there is no chronic load yet)"""
+        acute, chronic = cls.backfill(loads, seed)
+        ratio = np.ones_like(acute)
+        np.divide(acute, chronic, out=ratio, where=chronic > 0)
+        return ratio
+
+    @classmethod
+    def state_from_series(
+        cls,
+        daily_loads: Sequence[float],
+        as_of: Optional[date] = None,
+        seed: Optional[float] = None
+    ) -> WorkloadState:
+        """State at the end of a dense daily series (oldest first)"""
+        if len(daily_loads) == 0:
+            return WorkloadState(as_of=as_of)
+        acute, chronic = cls.backfill(np.asarray(daily_loads, dtype=np.float64), seed)
+        return WorkloadState(float(acute[-1]), float(chronic[-1]), as_of)
+
+    @classmethod
+    def state_from_weekly_volumes(cls, weekly_volumes: Sequence[float]) -> WorkloadState:
+        """
+        State from weekly totals (oldest first), spread evenly over each
+        week. Seeded at the first week's level so short histories do not
+        start from an empty chronic load.
+        """
+        if not weekly_volumes:
+            return WorkloadState()
+        daily = np.repeat(np.asarray(weekly_volumes, dtype=np.float64) / 7, 7)
+        return cls.state_from_series(daily, seed=weekly_volumes[0] / 7)
+
+    # =========================================================================
+    # STORED STATE (athlete_workload_state, maintained by triggers)
+    # =========================================================================
+
+    def get_state(
+        self,
+        athlete_id: str,
+        metric: str = 'load',
+        today: Optional[date] = None
+    ) -> WorkloadState:
+        """Stored state for one athlete, decayed to today (one row read)"""
+        return self.get_states([athlete_id], metric, today)[str(athlete_id)]
+
+    def get_states(
+        self,
+        athlete_ids: List[str],
+        metric: str = 'load',
+        today: Optional[date] = None
+    ) -> Dict[str, WorkloadState]:
+        """Stored states for many athletes in one query, decayed to today"""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown workload metric: {metric}")
+        today = today or _today()
+
+        response = self.supabase.table(self.TABLE)\
+            .select(f'athlete_id, as_of, {metric}_acute, {metric}_chronic')\
+            .in_("athlete_id", [str(a) for a in athlete_ids])\
+            .execute()
+
+        states = {str(a): WorkloadState(as_of=today) for a in athlete_ids}
+        for row in (response.data or []):
+            state = WorkloadState(
+                acute=float(row.get(f'{metric}_acute') or 0),
+                chronic=float(row.get(f'{metric}_chronic') or 0),
+                as_of=date.fromisoformat(row['as_of'])
+            )
+            states[row['athlete_id']] = self.advance(state, today)
+        return states
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
@@ -5,8 +5,22 @@ Templates optimized for each structural state:
 - RED: Mobility-focused, foundation building
 - YELLOW: Moderate intensity, controlled progression
 - GREEN: Full range, performance-oriented
+
+STRUCTURAL_WORKOUT_TEMPLATES is the editable source. At import it is
+compiled into TEMPLATE_REGISTRY: immutable, slotted WorkoutTemplate
+objects indexed by (state, workout type), with type aliases
+('vo2max' -> interval) and per-state fallbacks resolved ahead of time.
+A lookup is one tuple-key dict hit, and the same template objects are
+shared by every request (nothing in them can be mutated).
+
+Usage:
+    template = TEMPLATE_REGISTRY.get('yellow', 'recovery')   # Yellow easy run
+    workout = {**template.workout_fields, 'duration_minutes': 30}
 """
 
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
 STRUCTURAL_WORKOUT_TEMPLATES = {
     'red': {
         'mobility': {
@@ -231,7 +245,176 @@ STRUCTURAL_WORKOUT_TEMPLATES = {
 }
 
 
-def get_template_for_state(structural_state: str, workout_type: str) -> dict:
+# Requested workout type -> template key
+TEMPLATE_TYPE_ALIASES = {
+    'mobility': 'mobility',
+    'activation': 'mobility',
+    'easy': 'easy',
+    'recovery': 'easy',
+    'tempo': 'tempo',
+    'threshold': 'threshold',
+    'interval': 'interval',
+    'vo2max': 'interval',
+    'race': 'race'
+}
+
+# Template used when a state has none for the requested type, in order of
+# preference (most conservative option for the state)
+STATE_FALLBACK_KEYS = {
+    'red': ('easy', 'mobility'),
+    'yellow': ('easy',),
+    'green': ('threshold',)
+}
+
+# Constraint defaults for templates that do not set them
+DEFAULT_MAX_HEART_RATE_PERCENT = 75
+DEFAULT_MAX_PERCEIVED_EXERTION = 6
+DEFAULT_FOCUS = 'aerobic_base'
+DEFAULT_ZONES_ALLOWED = (1, 2)
+
+
+class FrozenDict(dict):
+    """dict that rejects mutation; still a dict for JSON and FastAPI encoding"""
+
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('Workout templates are read-only; build a new dict instead')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.items())))
+
+    # Default dict pickling/copying refills the new object with __setitem__
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self  # Values are frozen all the way down
+
+
+def _freeze(value: Any) -> Any:
+    """Deep read-only copy: dicts -> FrozenDict, lists -> tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class WorkoutTemplate:
+    """One compiled template; every container in it is read-only"""
+    state: str
+    key: str
+    name: str
+    type: str
+    duration_minutes: int
+    intensity: str
+    zones_allowed: Tuple[int, ...]
+    warmup: FrozenDict
+    main: FrozenDict
+    cooldown: FrozenDict
+    ai_constraints: FrozenDict
+    # Constraints with defaults resolved and the state's speed permission
+    constraints: FrozenDict
+    # Workout dict fields taken from the template, ready to splat
+    workout_fields: FrozenDict
+
+    @classmethod
+    def compile(cls, state: str, key: str, source: Dict) -> 'WorkoutTemplate':
+        ai_constraints = _freeze(source.get('ai_constraints', {}))
+        structure = source['structure']
+        constraints = FrozenDict(
+            max_heart_rate_percent=ai_constraints.get('max_heart_rate_percent', DEFAULT_MAX_HEART_RATE_PERCENT),
+            max_perceived_exertion=ai_constraints.get('max_perceived_exertion', DEFAULT_MAX_PERCEIVED_EXERTION),
+            speed_permission=state == 'green',
+            focus=ai_constraints.get('focus', DEFAULT_FOCUS)
+        )
+        fields = dict(
+            name=source['name'],
+            type=source['type'],
+            duration_minutes=source['duration_minutes'],
+            intensity=source['intensity'],
+            zones_allowed=_freeze(source.get('zones_allowed', DEFAULT_ZONES_ALLOWED)),
+            warmup=_freeze(structure['warmup']),
+            main=_freeze(structure['main']),
+            cooldown=_freeze(structure['cooldown'])
+        )
+        return cls(
+            state=state,
+            key=key,
+            ai_constraints=ai_constraints,
+            constraints=constraints,
+            workout_fields=FrozenDict(fields, constraints=constraints),
+            **fields
+        )
+
+    def to_dict(self) -> Dict:
+        """Template in the STRUCTURAL_WORKOUT_TEMPLATES shape (read-only parts)"""
+        return {
+            'name': self.name,
+            'type': self.type,
+            'duration_minutes': self.duration_minutes,
+            'intensity': self.intensity,
+            'zones_allowed': list(self.zones_allowed),
+            'structure': {'warmup': self.warmup, 'main': self.main, 'cooldown': self.cooldown},
+            'ai_constraints': self.ai_constraints
+        }
+
+
+class TemplateRegistry:
+    """
+    Templates indexed by (state, workout type), fallbacks included.
+
+    Every (state, alias) pair is resolved at compile time, so get() is a
+    single dict lookup; unknown workout types get the state's fallback.
+    """
+
+    __slots__ = ('_by_key', '_fallback')
+
+    def __init__(self, sources: Dict[str, Dict[str, Dict]]):
+        by_key = {}
+        fallback = {}
+        for state, templates in sources.items():
+            compiled = {key: WorkoutTemplate.compile(state, key, source) for key, source in templates.items()}
+            fallback[state] = next(
+                (compiled[key] for key in STATE_FALLBACK_KEYS.get(state, ()) if key in compiled), None
+            )
+            for workout_type, key in TEMPLATE_TYPE_ALIASES.items():
+                template = compiled.get(key, fallback[state])
+                if template is not None:
+                    by_key[(state, workout_type)] = template
+            for key, template in compiled.items():
+                by_key.setdefault((state, key), template)
+        self._by_key = by_key
+        self._fallback = fallback
+
+    def get(self, structural_state: str, workout_type: str) -> Optional[WorkoutTemplate]:
+        """Template for the state and type, the state's fallback, or None for unknown states"""
+        template = self._by_key.get((structural_state, workout_type))
+        if template is not None:
+            return template
+        state = structural_state.lower()
+        return self._by_key.get((state, workout_type.lower())) or self._fallback.get(state)
+
+    def fallback(self, structural_state: str) -> Optional[WorkoutTemplate]:
+        """Most conservative template of a state"""
+        return self._fallback.get(structural_state.lower())
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+
+TEMPLATE_REGISTRY = TemplateRegistry(STRUCTURAL_WORKOUT_TEMPLATES)
+
+
+def get_template_for_state(structural_state: str, workout_type: str) -> Optional[WorkoutTemplate]:
     """
     Get appropriate workout template based on structural state.
     
@@ -240,32 +423,7 @@ def get_template_for_state(structural_state: str, workout_type: str) -> dict:
         workout_type: Desired workout type
     
     Returns:
-        Template dict or fallback template
+        Compiled template (the state's fallback for unknown types), or
+        None for an unknown state
     """
-    state_templates = STRUCTURAL_WORKOUT_TEMPLATES.get(structural_state.lower(), {})
-    
-    # Map workout types to template keys
-    type_mapping = {
-        'mobility': 'mobility',
-        'activation': 'mobility',
-        'easy': 'easy',
-        'recovery': 'easy',
-        'tempo': 'tempo',
-        'threshold': 'threshold',
-        'interval': 'interval',
-        'vo2max': 'interval',
-        'race': 'race'
-    }
-    
-    template_key = type_mapping.get(workout_type.lower())
-    
-    if template_key and template_key in state_templates:
-        return state_templates[template_key]
-    
-    # Fallback: most conservative option for state
-    if structural_state == 'red':
-        return state_templates.get('easy', state_templates.get('mobility'))
-    elif structural_state == 'yellow':
-        return state_templates.get('easy')
-    else:
-        return state_templates.get('threshold')
+    return TEMPLATE_REGISTRY.get(structural_state, workout_type)
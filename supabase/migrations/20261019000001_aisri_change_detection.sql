@@ -0,0 +1,80 @@
+-- =====================================================
+-- Migration: 20261019000001_aisri_change_detection.sql
+-- Purpose: Bulk change detection for the weekly AISRI updater
+-- =====================================================
+-- The scheduled updater used to fetch every athlete's activity rows just to
+-- answer "anything new since the last AISRI calculation?". This function
+-- answers that for all athletes in one aggregate query and returns only the
+-- athletes that need recomputation.
+
+-- Indexes backing the per-athlete MAX() aggregates and the latest-score lookup
+CREATE INDEX IF NOT EXISTS idx_strava_activities_user_start
+ON public.strava_activities(user_id, start_date DESC);
+
+CREATE INDEX IF NOT EXISTS idx_strava_activities_user_updated
+ON public.strava_activities(user_id, updated_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_aisri_scores_athlete_created
+ON public.aisri_scores(athlete_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION public.get_aisri_recompute_candidates(
+  p_user_ids UUID[] DEFAULT NULL,
+  p_default_lookback INTERVAL DEFAULT INTERVAL '365 days'
+)
+RETURNS TABLE (
+  user_id UUID,
+  last_calculated_at TIMESTAMP WITH TIME ZONE,
+  last_aisri_score NUMERIC,
+  latest_activity_at TIMESTAMP WITH TIME ZONE,
+  latest_activity_updated_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH activity_marks AS (
+    -- One row per athlete: newest activity start and newest edit
+    SELECT
+      sa.user_id,
+      MAX(sa.start_date) AS latest_start,
+      MAX(sa.updated_at) AS latest_update
+    FROM public.strava_activities sa
+    WHERE p_user_ids IS NULL OR sa.user_id = ANY(p_user_ids)
+    GROUP BY sa.user_id
+  ),
+  last_scores AS (
+    -- Most recent AISRI calculation per athlete
+    SELECT DISTINCT ON (s.athlete_id)
+      s.athlete_id,
+      s.created_at,
+      s.total_score
+    FROM public.aisri_scores s
+    WHERE p_user_ids IS NULL OR s.athlete_id = ANY(p_user_ids::TEXT[])
+    ORDER BY s.athlete_id, s.created_at DESC
+  )
+  SELECT
+    am.user_id,
+    ls.created_at,
+    ls.total_score,
+    am.latest_start,
+    am.latest_update
+  FROM activity_marks am
+  LEFT JOIN last_scores ls ON ls.athlete_id = am.user_id::TEXT
+  WHERE GREATEST(am.latest_start, am.latest_update)
+        > COALESCE(ls.created_at, NOW() - p_default_lookback);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_aisri_recompute_candidates(UUID[], INTERVAL) TO service_role;
+
+COMMENT ON FUNCTION public.get_aisri_recompute_candidates IS 'Athletes with activities started or edited after their last AISRI calculation. Used by the weekly AISRI updater to skip unchanged athletes without loading activity rows.';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ AISRI change detection function created successfully!';
+  RAISE NOTICE 'ℹ️ Function: get_aisri_recompute_candidates(user_ids, default_lookback)';
+END $$;
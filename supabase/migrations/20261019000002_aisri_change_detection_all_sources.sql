@@ -0,0 +1,91 @@
+-- =====================================================
+-- Migration: 20261019000002_aisri_change_detection_all_sources.sql
+-- Purpose: Extend AISRI change detection to every activity source
+-- =====================================================
+-- AISRI is now calculated from Strava, Garmin uploads, manual logs
+-- (workout_results) and in-app GPS runs (run_sessions). A new activity in
+-- any of them must mark the athlete for recomputation.
+
+CREATE INDEX IF NOT EXISTS idx_workout_results_athlete_date
+ON public.workout_results(athlete_id, workout_date DESC);
+
+CREATE OR REPLACE FUNCTION public.get_aisri_recompute_candidates(
+  p_user_ids UUID[] DEFAULT NULL,
+  p_default_lookback INTERVAL DEFAULT INTERVAL '365 days'
+)
+RETURNS TABLE (
+  user_id UUID,
+  last_calculated_at TIMESTAMP WITH TIME ZONE,
+  last_aisri_score NUMERIC,
+  latest_activity_at TIMESTAMP WITH TIME ZONE,
+  latest_activity_updated_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH source_marks AS (
+    SELECT sa.user_id, MAX(sa.start_date) AS latest_start, MAX(sa.updated_at) AS latest_update
+    FROM public.strava_activities sa
+    WHERE p_user_ids IS NULL OR sa.user_id = ANY(p_user_ids)
+    GROUP BY sa.user_id
+
+    UNION ALL
+
+    -- Garmin uploads and manual logs
+    SELECT wr.athlete_id::UUID, MAX(wr.workout_date)::TIMESTAMPTZ, NULL::TIMESTAMPTZ
+    FROM public.workout_results wr
+    WHERE wr.data_source IN ('garmin', 'manual')
+      AND (p_user_ids IS NULL OR wr.athlete_id::UUID = ANY(p_user_ids))
+    GROUP BY wr.athlete_id
+
+    UNION ALL
+
+    SELECT rs.user_id, MAX(rs.start_time), MAX(rs.updated_at)
+    FROM public.run_sessions rs
+    WHERE rs.status IN ('completed', 'uploaded')
+      AND (p_user_ids IS NULL OR rs.user_id = ANY(p_user_ids))
+    GROUP BY rs.user_id
+  ),
+  activity_marks AS (
+    SELECT
+      m.user_id,
+      MAX(m.latest_start) AS latest_start,
+      MAX(m.latest_update) AS latest_update
+    FROM source_marks m
+    GROUP BY m.user_id
+  ),
+  last_scores AS (
+    SELECT DISTINCT ON (s.athlete_id)
+      s.athlete_id,
+      s.created_at,
+      s.total_score
+    FROM public.aisri_scores s
+    WHERE p_user_ids IS NULL OR s.athlete_id = ANY(p_user_ids::TEXT[])
+    ORDER BY s.athlete_id, s.created_at DESC
+  )
+  SELECT
+    am.user_id,
+    ls.created_at,
+    ls.total_score,
+    am.latest_start,
+    am.latest_update
+  FROM activity_marks am
+  LEFT JOIN last_scores ls ON ls.athlete_id = am.user_id::TEXT
+  WHERE GREATEST(am.latest_start, am.latest_update)
+        > COALESCE(ls.created_at, NOW() - p_default_lookback);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_aisri_recompute_candidates(UUID[], INTERVAL) TO service_role;
+
+COMMENT ON FUNCTION public.get_aisri_recompute_candidates IS 'Athletes with activities (Strava, Garmin, manual, in-app runs) started or edited after their last AISRI calculation.';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ AISRI change detection now covers all activity sources';
+END $$;
@@ -0,0 +1,246 @@
+-- =====================================================
+-- Migration: 20261019000003_athlete_daily_load.sql
+-- Purpose: Materialized per-athlete daily training-load ledger
+-- =====================================================
+-- One row per athlete per day with small integer aggregates. Safety gates
+-- and agents read O(days) rows from here instead of re-aggregating raw
+-- activities on every request.
+--
+-- The ledger is maintained by triggers on every activity source, so each
+-- ingestion path (Strava sync, Garmin/manual workout_results, in-app
+-- run_sessions) updates it incrementally: only the affected athlete-day
+-- is recomputed.
+--
+-- load = moving minutes, doubled for hard sessions (avg HR > 160 or a
+--        tempo/interval/race workout)
+
+CREATE TABLE IF NOT EXISTS public.athlete_daily_load (
+  athlete_id TEXT NOT NULL,
+  day DATE NOT NULL,
+  minutes INTEGER NOT NULL DEFAULT 0,
+  distance_m INTEGER NOT NULL DEFAULT 0,
+  load INTEGER NOT NULL DEFAULT 0,
+  sessions SMALLINT NOT NULL DEFAULT 0,
+  hard_sessions SMALLINT NOT NULL DEFAULT 0,
+  max_hr SMALLINT,
+  updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (athlete_id, day)
+);
+
+ALTER TABLE public.athlete_daily_load ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own daily load" ON public.athlete_daily_load;
+CREATE POLICY "Users can view own daily load"
+ON public.athlete_daily_load
+FOR SELECT
+USING (auth.uid()::TEXT = athlete_id);
+
+-- =====================================================
+-- UNIFIED SESSION VIEW (all sources, one row per session)
+-- =====================================================
+-- Strava workout_type ('3', '4', '9' = interval, tempo, race) marks hard
+-- sessions as in the original consecutive-hard-days gate; suffer_score
+-- feeds the AISRI intensity pillar. Older installs lack both columns.
+ALTER TABLE public.strava_activities ADD COLUMN IF NOT EXISTS workout_type TEXT;
+ALTER TABLE public.strava_activities ADD COLUMN IF NOT EXISTS suffer_score INTEGER;
+
+-- Every session from every source, with its start time and a dedupe
+-- priority (lower wins, as in ai_agents/activity_providers.py).
+-- run_sessions already uploaded to Strava are excluded (the Strava copy counts).
+CREATE OR REPLACE VIEW public.athlete_activity_sessions AS
+SELECT
+  sa.user_id::TEXT AS athlete_id,
+  sa.start_date AS started_at,
+  0 AS source_priority,
+  COALESCE(sa.moving_time_seconds, 0) AS seconds,
+  COALESCE(sa.distance_meters, 0) AS distance_m,
+  sa.average_heartrate AS avg_hr,
+  sa.max_heartrate AS max_hr,
+  COALESCE(sa.average_heartrate, 0) > 160
+    OR sa.workout_type::TEXT IN ('3', '4', '9') AS is_hard
+FROM public.strava_activities sa
+WHERE sa.start_date IS NOT NULL
+
+UNION ALL
+
+SELECT
+  wr.athlete_id::TEXT,
+  wr.workout_date::TIMESTAMPTZ,
+  CASE WHEN wr.data_source = 'garmin' THEN 1 ELSE 3 END,
+  COALESCE(wr.duration_seconds, 0),
+  COALESCE(wr.distance_km, 0) * 1000,
+  wr.avg_hr,
+  wr.max_hr,
+  COALESCE(wr.avg_hr, 0) > 160
+FROM public.workout_results wr
+WHERE wr.data_source IN ('garmin', 'manual')
+  AND wr.workout_date IS NOT NULL
+
+UNION ALL
+
+SELECT
+  rs.user_id::TEXT,
+  rs.start_time,
+  2,
+  COALESCE(rs.duration_seconds, 0),
+  COALESCE(rs.distance_meters, 0),
+  rs.avg_heart_rate,
+  rs.max_heart_rate,
+  COALESCE(rs.avg_heart_rate, 0) > 160 OR rs.workout_type IN ('tempo', 'interval')
+FROM public.run_sessions rs
+WHERE rs.status IN ('completed', 'uploaded')
+  AND rs.strava_activity_id IS NULL;
+
+-- The same run reported by several sources (start within 5 minutes,
+-- distance within 5%) counts once: only the highest-priority copy is kept.
+CREATE OR REPLACE VIEW public.athlete_training_sessions AS
+SELECT
+  s.athlete_id,
+  (s.started_at AT TIME ZONE 'UTC')::DATE AS day,
+  s.seconds,
+  s.distance_m,
+  s.avg_hr,
+  s.max_hr,
+  s.is_hard
+FROM public.athlete_activity_sessions s
+WHERE NOT EXISTS (
+  SELECT 1
+  FROM public.athlete_activity_sessions d
+  WHERE d.athlete_id = s.athlete_id
+    AND d.source_priority < s.source_priority
+    AND d.started_at BETWEEN s.started_at - INTERVAL '5 minutes'
+                         AND s.started_at + INTERVAL '5 minutes'
+    AND ABS(d.distance_m - s.distance_m) <= 0.05 * GREATEST(d.distance_m, s.distance_m, 1)
+);
+
+-- =====================================================
+-- INCREMENTAL MAINTENANCE
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.refresh_athlete_daily_load(
+  p_athlete_id TEXT,
+  p_day DATE
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+  IF p_athlete_id IS NULL OR p_day IS NULL THEN
+    RETURN;
+  END IF;
+
+  DELETE FROM public.athlete_daily_load
+  WHERE athlete_id = p_athlete_id AND day = p_day;
+
+  INSERT INTO public.athlete_daily_load
+    (athlete_id, day, minutes, distance_m, load, sessions, hard_sessions, max_hr, updated_at)
+  SELECT
+    s.athlete_id,
+    s.day,
+    ROUND(SUM(s.seconds) / 60.0)::INTEGER,
+    ROUND(SUM(s.distance_m))::INTEGER,
+    ROUND(SUM(s.seconds / 60.0 * CASE WHEN s.is_hard THEN 2 ELSE 1 END))::INTEGER,
+    COUNT(*)::SMALLINT,
+    COUNT(*) FILTER (WHERE s.is_hard)::SMALLINT,
+    MAX(GREATEST(s.max_hr, s.avg_hr))::SMALLINT,
+    NOW()
+  FROM public.athlete_training_sessions s
+  WHERE s.athlete_id = p_athlete_id AND s.day = p_day
+  GROUP BY s.athlete_id, s.day;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.trg_refresh_athlete_daily_load()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_athlete_column TEXT := TG_ARGV[0];
+  v_start_column TEXT := TG_ARGV[1];
+  v_new JSONB;
+  v_old JSONB;
+BEGIN
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    v_new := to_jsonb(NEW);
+    PERFORM public.refresh_athlete_daily_load(
+      v_new->>v_athlete_column,
+      ((v_new->>v_start_column)::TIMESTAMPTZ AT TIME ZONE 'UTC')::DATE
+    );
+  END IF;
+
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    v_old := to_jsonb(OLD);
+    IF TG_OP = 'DELETE'
+       OR v_old->>v_athlete_column IS DISTINCT FROM v_new->>v_athlete_column
+       OR v_old->>v_start_column IS DISTINCT FROM v_new->>v_start_column THEN
+      PERFORM public.refresh_athlete_daily_load(
+        v_old->>v_athlete_column,
+        ((v_old->>v_start_column)::TIMESTAMPTZ AT TIME ZONE 'UTC')::DATE
+      );
+    END IF;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_strava_activities_daily_load ON public.strava_activities;
+CREATE TRIGGER trg_strava_activities_daily_load
+AFTER INSERT OR UPDATE OR DELETE ON public.strava_activities
+FOR EACH ROW EXECUTE FUNCTION public.trg_refresh_athlete_daily_load('user_id', 'start_date');
+
+DROP TRIGGER IF EXISTS trg_workout_results_daily_load ON public.workout_results;
+CREATE TRIGGER trg_workout_results_daily_load
+AFTER INSERT OR UPDATE OR DELETE ON public.workout_results
+FOR EACH ROW EXECUTE FUNCTION public.trg_refresh_athlete_daily_load('athlete_id', 'workout_date');
+
+DROP TRIGGER IF EXISTS trg_run_sessions_daily_load ON public.run_sessions;
+CREATE TRIGGER trg_run_sessions_daily_load
+AFTER INSERT OR UPDATE OR DELETE ON public.run_sessions
+FOR EACH ROW EXECUTE FUNCTION public.trg_refresh_athlete_daily_load('user_id', 'start_time');
+
+-- =====================================================
+-- BACKFILL
+-- =====================================================
+
+INSERT INTO public.athlete_daily_load
+  (athlete_id, day, minutes, distance_m, load, sessions, hard_sessions, max_hr, updated_at)
+SELECT
+  s.athlete_id,
+  s.day,
+  ROUND(SUM(s.seconds) / 60.0)::INTEGER,
+  ROUND(SUM(s.distance_m))::INTEGER,
+  ROUND(SUM(s.seconds / 60.0 * CASE WHEN s.is_hard THEN 2 ELSE 1 END))::INTEGER,
+  COUNT(*)::SMALLINT,
+  COUNT(*) FILTER (WHERE s.is_hard)::SMALLINT,
+  MAX(GREATEST(s.max_hr, s.avg_hr))::SMALLINT,
+  NOW()
+FROM public.athlete_training_sessions s
+GROUP BY s.athlete_id, s.day
+ON CONFLICT (athlete_id, day) DO UPDATE SET
+  minutes = EXCLUDED.minutes,
+  distance_m = EXCLUDED.distance_m,
+  load = EXCLUDED.load,
+  sessions = EXCLUDED.sessions,
+  hard_sessions = EXCLUDED.hard_sessions,
+  max_hr = EXCLUDED.max_hr,
+  updated_at = NOW();
+
+GRANT EXECUTE ON FUNCTION public.refresh_athlete_daily_load(TEXT, DATE) TO service_role;
+
+COMMENT ON TABLE public.athlete_daily_load IS 'Per-athlete daily training load ledger (minutes, distance, load, hard sessions, max HR), maintained by triggers on all activity sources';
+COMMENT ON FUNCTION public.refresh_athlete_daily_load IS 'Recompute one athlete-day of the training-load ledger from all activity sources';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  SELECT COUNT(*) INTO v_rows FROM public.athlete_daily_load;
+  RAISE NOTICE '✅ athlete_daily_load ledger created (% athlete-days backfilled)', v_rows;
+  RAISE NOTICE 'ℹ️ Triggers: strava_activities, workout_results, run_sessions';
+END $$;
@@ -0,0 +1,147 @@
+-- =====================================================
+-- Migration: 20261019000004_athlete_workload_state.sql
+-- Purpose: EWMA acute/chronic workload per athlete, updated in O(1)
+-- =====================================================
+-- Acute (7-day) and chronic (28-day) exponentially weighted moving
+-- averages of daily load and daily minutes, one row per athlete.
+--
+-- ewma[t] = alpha * load[t] + (1 - alpha) * ewma[t - 1],  alpha = 2 / (N + 1)
+--
+-- The recurrence is linear, so a change of D on day d moves the state as
+-- of day s >= d by alpha * D * (1 - alpha) ^ (s - d). A trigger on
+-- athlete_daily_load applies exactly that delta whenever a ledger day
+-- changes, so every session costs O(1) regardless of history length.
+-- Readers decay the stored state to today: state * (1 - alpha) ^ (today - as_of).
+--
+-- Mirrors ai_agents/workload_engine.py.
+
+CREATE TABLE IF NOT EXISTS public.athlete_workload_state (
+  athlete_id TEXT PRIMARY KEY,
+  as_of DATE NOT NULL,
+  load_acute DOUBLE PRECISION NOT NULL DEFAULT 0,
+  load_chronic DOUBLE PRECISION NOT NULL DEFAULT 0,
+  minutes_acute DOUBLE PRECISION NOT NULL DEFAULT 0,
+  minutes_chronic DOUBLE PRECISION NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE public.athlete_workload_state ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own workload state" ON public.athlete_workload_state;
+CREATE POLICY "Users can view own workload state"
+ON public.athlete_workload_state
+FOR SELECT
+USING (auth.uid()::TEXT = athlete_id);
+
+-- =====================================================
+-- O(1) DELTA UPDATE
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.apply_workload_delta(
+  p_athlete_id TEXT,
+  p_day DATE,
+  p_load DOUBLE PRECISION,
+  p_minutes DOUBLE PRECISION
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_alpha_acute CONSTANT DOUBLE PRECISION := 2.0 / (7 + 1);
+  v_alpha_chronic CONSTANT DOUBLE PRECISION := 2.0 / (28 + 1);
+BEGIN
+  IF p_athlete_id IS NULL OR p_day IS NULL THEN
+    RETURN;
+  END IF;
+
+  INSERT INTO public.athlete_workload_state (athlete_id, as_of)
+  VALUES (p_athlete_id, p_day)
+  ON CONFLICT (athlete_id) DO NOTHING;
+
+  -- Decay the stored state forward to p_day if the change is newer,
+  -- otherwise decay the delta forward to as_of.
+  UPDATE public.athlete_workload_state
+  SET
+    load_acute = load_acute * POWER(1 - v_alpha_acute, GREATEST(p_day - as_of, 0))
+      + v_alpha_acute * p_load * POWER(1 - v_alpha_acute, GREATEST(as_of - p_day, 0)),
+    load_chronic = load_chronic * POWER(1 - v_alpha_chronic, GREATEST(p_day - as_of, 0))
+      + v_alpha_chronic * p_load * POWER(1 - v_alpha_chronic, GREATEST(as_of - p_day, 0)),
+    minutes_acute = minutes_acute * POWER(1 - v_alpha_acute, GREATEST(p_day - as_of, 0))
+      + v_alpha_acute * p_minutes * POWER(1 - v_alpha_acute, GREATEST(as_of - p_day, 0)),
+    minutes_chronic = minutes_chronic * POWER(1 - v_alpha_chronic, GREATEST(p_day - as_of, 0))
+      + v_alpha_chronic * p_minutes * POWER(1 - v_alpha_chronic, GREATEST(as_of - p_day, 0)),
+    as_of = GREATEST(as_of, p_day),
+    updated_at = NOW()
+  WHERE athlete_id = p_athlete_id;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.trg_apply_workload_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM public.apply_workload_delta(OLD.athlete_id, OLD.day, -OLD.load, -OLD.minutes);
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM public.apply_workload_delta(NEW.athlete_id, NEW.day, NEW.load, NEW.minutes);
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_athlete_daily_load_workload ON public.athlete_daily_load;
+CREATE TRIGGER trg_athlete_daily_load_workload
+AFTER INSERT OR UPDATE OR DELETE ON public.athlete_daily_load
+FOR EACH ROW EXECUTE FUNCTION public.trg_apply_workload_delta();
+
+-- =====================================================
+-- BACKFILL (closed form: alpha * SUM(load * (1 - alpha) ^ (as_of - day)))
+-- =====================================================
+
+INSERT INTO public.athlete_workload_state
+  (athlete_id, as_of, load_acute, load_chronic, minutes_acute, minutes_chronic, updated_at)
+SELECT
+  d.athlete_id,
+  l.as_of,
+  (2.0 / 8) * SUM(d.load * POWER(1 - 2.0 / 8, l.as_of - d.day)),
+  (2.0 / 29) * SUM(d.load * POWER(1 - 2.0 / 29, l.as_of - d.day)),
+  (2.0 / 8) * SUM(d.minutes * POWER(1 - 2.0 / 8, l.as_of - d.day)),
+  (2.0 / 29) * SUM(d.minutes * POWER(1 - 2.0 / 29, l.as_of - d.day)),
+  NOW()
+FROM public.athlete_daily_load d
+JOIN (
+  SELECT athlete_id, MAX(day) AS as_of
+  FROM public.athlete_daily_load
+  GROUP BY athlete_id
+) l ON l.athlete_id = d.athlete_id
+GROUP BY d.athlete_id, l.as_of
+ON CONFLICT (athlete_id) DO UPDATE SET
+  as_of = EXCLUDED.as_of,
+  load_acute = EXCLUDED.load_acute,
+  load_chronic = EXCLUDED.load_chronic,
+  minutes_acute = EXCLUDED.minutes_acute,
+  minutes_chronic = EXCLUDED.minutes_chronic,
+  updated_at = NOW();
+
+GRANT EXECUTE ON FUNCTION public.apply_workload_delta(TEXT, DATE, DOUBLE PRECISION, DOUBLE PRECISION) TO service_role;
+
+COMMENT ON TABLE public.athlete_workload_state IS 'EWMA acute (7d) and chronic (28d) daily load and minutes per athlete, updated in O(1) from athlete_daily_load';
+COMMENT ON FUNCTION public.apply_workload_delta IS 'Fold a daily load/minutes delta into the athlete''s EWMA workload state';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+DECLARE
+  v_rows INTEGER;
+BEGIN
+  SELECT COUNT(*) INTO v_rows FROM public.athlete_workload_state;
+  RAISE NOTICE '✅ athlete_workload_state created (% athletes backfilled)', v_rows;
+  RAISE NOTICE 'ℹ️ Trigger: athlete_daily_load -> apply_workload_delta';
+END $$;
@@ -0,0 +1,101 @@
+-- =====================================================
+-- Migration: 20261019000005_safety_gate_inputs.sql
+-- Purpose: Every AISRi safety gate input in one RPC call
+-- =====================================================
+-- A cold AISRISafetyGate.check_workout_safety used to issue a PostgREST
+-- request per gate (profile, latest AISRi, latest injury prediction,
+-- hard-day history, workload). This function returns one compact record
+-- per athlete with all of them, for one or many athletes, so the gate
+-- path is a single round-trip regardless of athlete count.
+--
+-- Latest AISRi / injury rows are returned whole as JSONB so the gate keeps
+-- reading the same fields it always has.
+
+CREATE OR REPLACE FUNCTION public.get_safety_gate_inputs(
+  p_athlete_ids TEXT[],
+  p_days INTEGER DEFAULT 7
+)
+RETURNS TABLE (
+  athlete_id TEXT,
+  has_profile BOOLEAN,
+  latest_aisri JSONB,
+  latest_injury_prediction JSONB,
+  recent_sessions SMALLINT[],
+  recent_hard_sessions SMALLINT[],
+  workload_as_of DATE,
+  minutes_acute DOUBLE PRECISION,
+  minutes_chronic DOUBLE PRECISION
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH ids AS (
+    SELECT DISTINCT unnest(p_athlete_ids) AS id
+  ),
+  calendar AS (
+    SELECT g.day::DATE AS day
+    FROM generate_series(
+      (NOW() AT TIME ZONE 'UTC')::DATE - (p_days - 1),
+      (NOW() AT TIME ZONE 'UTC')::DATE,
+      INTERVAL '1 day'
+    ) AS g(day)
+  ),
+  -- Dense per-day ledger series, oldest first (zero on rest days)
+  recent AS (
+    SELECT
+      ids.id,
+      ARRAY_AGG(COALESCE(d.sessions, 0)::SMALLINT ORDER BY c.day) AS sessions,
+      ARRAY_AGG(COALESCE(d.hard_sessions, 0)::SMALLINT ORDER BY c.day) AS hard_sessions
+    FROM ids
+    CROSS JOIN calendar c
+    LEFT JOIN public.athlete_daily_load d
+      ON d.athlete_id = ids.id AND d.day = c.day
+    GROUP BY ids.id
+  ),
+  aisri AS (
+    SELECT DISTINCT ON (s.athlete_id) s.athlete_id, to_jsonb(s) AS row_data
+    FROM public.aisri_scores s
+    WHERE s.athlete_id = ANY(p_athlete_ids)
+    ORDER BY s.athlete_id, s.created_at DESC
+  ),
+  injury AS (
+    SELECT DISTINCT ON (r.athlete_id) r.athlete_id, to_jsonb(r) AS row_data
+    FROM public.injury_risk_predictions r
+    WHERE r.athlete_id = ANY(p_athlete_ids)
+    ORDER BY r.athlete_id, r.created_at DESC
+  )
+  SELECT
+    ids.id,
+    EXISTS (
+      SELECT 1 FROM public.athlete_detailed_profile p
+      WHERE p.athlete_id::TEXT = ids.id
+    ),
+    aisri.row_data,
+    injury.row_data,
+    recent.sessions,
+    recent.hard_sessions,
+    w.as_of,
+    w.minutes_acute,
+    w.minutes_chronic
+  FROM ids
+  LEFT JOIN recent ON recent.id = ids.id
+  LEFT JOIN aisri ON aisri.athlete_id = ids.id
+  LEFT JOIN injury ON injury.athlete_id = ids.id
+  LEFT JOIN public.athlete_workload_state w ON w.athlete_id = ids.id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_safety_gate_inputs(TEXT[], INTEGER) TO service_role;
+
+COMMENT ON FUNCTION public.get_safety_gate_inputs IS 'All AISRi safety gate inputs (profile, latest AISRi, latest injury prediction, recent hard days, EWMA minutes) for one or many athletes';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ get_safety_gate_inputs(athlete_ids, days) created';
+END $$;
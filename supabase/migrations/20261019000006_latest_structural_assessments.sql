@@ -0,0 +1,92 @@
+-- =====================================================
+-- Migration: 20261019000006_latest_structural_assessments.sql
+-- Purpose: Latest structural assessment per athlete, in bulk
+-- =====================================================
+-- Coach dashboards need RED/YELLOW/GREEN for a whole group. Instead of one
+-- aisri_scores query per athlete, this returns the latest assessment of
+-- every requested athlete (DISTINCT ON athlete_id) in one query.
+--
+-- Athletes come from an explicit id list and/or a coach's active
+-- athlete_coach_relationships. Results are ordered by athlete_id and
+-- keyset-paginated (p_after, p_limit) so large groups can be streamed.
+-- Athletes without an assessment are returned with NULL scores.
+--
+-- Pillar columns are read through to_jsonb so installs whose aisri_scores
+-- lacks strength/mobility/ROM columns still work (NULL = default 50).
+
+CREATE OR REPLACE FUNCTION public.get_latest_structural_assessments(
+  p_athlete_ids TEXT[] DEFAULT NULL,
+  p_coach_id UUID DEFAULT NULL,
+  p_after TEXT DEFAULT NULL,
+  p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+  athlete_id TEXT,
+  assessment_id UUID,
+  assessment_date DATE,
+  created_at TIMESTAMP WITH TIME ZONE,
+  strength_score NUMERIC,
+  mobility_score NUMERIC,
+  rom_score NUMERIC
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH members AS (
+    SELECT DISTINCT m.id
+    FROM (
+      SELECT unnest(p_athlete_ids) AS id
+      UNION ALL
+      SELECT acr.athlete_id::TEXT
+      FROM public.athlete_coach_relationships acr
+      WHERE p_coach_id IS NOT NULL
+        AND acr.coach_id = p_coach_id
+        AND acr.status = 'active'
+    ) m
+    WHERE m.id IS NOT NULL
+      AND (p_after IS NULL OR m.id > p_after)
+    ORDER BY m.id
+    LIMIT p_limit
+  ),
+  latest AS (
+    SELECT DISTINCT ON (s.athlete_id)
+      s.athlete_id,
+      s.id,
+      s.assessment_date,
+      s.created_at,
+      to_jsonb(s) AS row_data
+    FROM public.aisri_scores s
+    JOIN members ON members.id = s.athlete_id
+    ORDER BY s.athlete_id, s.assessment_date DESC NULLS LAST, s.created_at DESC
+  )
+  SELECT
+    members.id,
+    latest.id,
+    latest.assessment_date,
+    latest.created_at,
+    (latest.row_data->>'strength_score')::NUMERIC,
+    (latest.row_data->>'mobility_score')::NUMERIC,
+    (latest.row_data->>'rom_score')::NUMERIC
+  FROM members
+  LEFT JOIN latest ON latest.athlete_id = members.id
+  ORDER BY members.id;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_aisri_scores_athlete_assessment
+ON public.aisri_scores(athlete_id, assessment_date DESC, created_at DESC);
+
+GRANT EXECUTE ON FUNCTION public.get_latest_structural_assessments(TEXT[], UUID, TEXT, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION public.get_latest_structural_assessments IS 'Latest aisri_scores assessment (strength/mobility/ROM) per athlete for an id list or coach group, keyset-paginated by athlete_id';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ get_latest_structural_assessments(athlete_ids, coach_id, after, limit) created';
+END $$;
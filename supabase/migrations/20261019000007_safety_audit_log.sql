@@ -0,0 +1,55 @@
+-- =====================================================
+-- Migration: 20261019000007_safety_audit_log.sql
+-- Purpose: Audit trail of AISRi safety gate decisions
+-- =====================================================
+-- Every check_workout_safety and check_structural_clearance outcome,
+-- written in bulk by ai_agents/safety_audit_log.py (ring buffer +
+-- background writer), for gate hit-rate analysis and debugging blocked
+-- workouts after the fact.
+
+CREATE TABLE IF NOT EXISTS public.safety_audit_log (
+  id BIGSERIAL PRIMARY KEY,
+  kind TEXT NOT NULL CHECK (kind IN ('workout_safety', 'structural_clearance')),
+  athlete_id TEXT NOT NULL,
+  passed BOOLEAN NOT NULL,
+  gates_failed TEXT[] NOT NULL DEFAULT '{}',
+  gates_passed TEXT[] NOT NULL DEFAULT '{}',
+  reason TEXT,
+  workout_type TEXT,
+  intensity TEXT,
+  duration_minutes INTEGER,
+  structural_state TEXT,
+  rules_version TEXT,
+  details JSONB,
+  decided_at TIMESTAMP WITH TIME ZONE NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_safety_audit_athlete_decided
+ON public.safety_audit_log(athlete_id, decided_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_safety_audit_decided
+ON public.safety_audit_log(decided_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_safety_audit_blocked
+ON public.safety_audit_log USING GIN (gates_failed)
+WHERE NOT passed;
+
+-- Written by the service role only; athletes may read their own decisions
+ALTER TABLE public.safety_audit_log ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own safety decisions" ON public.safety_audit_log;
+CREATE POLICY "Users can view own safety decisions"
+ON public.safety_audit_log
+FOR SELECT
+USING (auth.uid()::TEXT = athlete_id);
+
+COMMENT ON TABLE public.safety_audit_log IS 'AISRi safety gate and structural clearance decisions (bulk-written audit trail)';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ safety_audit_log table created';
+END $$;
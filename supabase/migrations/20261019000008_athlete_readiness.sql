@@ -0,0 +1,259 @@
+-- =====================================================
+-- Migration: 20261019000008_athlete_readiness.sql
+-- Purpose: Precomputed daily readiness per athlete
+-- =====================================================
+-- "Should I train today?" is asked by most athletes every morning. The
+-- nightly precompute (ai_agents/daily_readiness.py) evaluates safety
+-- summary, structural state and the autonomous decision for every active
+-- athlete in bulk and stores one compact row here; daytime requests read
+-- the row directly.
+--
+-- A row is recomputed on read when it is from an earlier day or has been
+-- marked stale. Triggers mark it stale whenever one of its inputs changes:
+-- aisri_scores, injury_risk_predictions, AISRI_assessments and
+-- athlete_daily_load.
+--
+-- Every invalidation also bumps the row's version. Inputs are read
+-- together with that version, and store_athlete_readiness only overwrites
+-- a row whose version is unchanged, so an invalidation that lands between
+-- compute and store keeps the row stale instead of being overwritten.
+
+CREATE TABLE IF NOT EXISTS public.athlete_readiness (
+  athlete_id TEXT PRIMARY KEY,
+  readiness_date DATE NOT NULL,
+  status TEXT NOT NULL,
+  message TEXT,
+  aisri_score NUMERIC,
+  injury_risk NUMERIC,
+  injury_risk_level TEXT,
+  recovery_score NUMERIC,
+  structural_state TEXT,
+  structural_score INTEGER,
+  speed_permission BOOLEAN,
+  decision TEXT,
+  decision_reason TEXT,
+  training_load DOUBLE PRECISION,
+  stale BOOLEAN NOT NULL DEFAULT FALSE,
+  version BIGINT NOT NULL DEFAULT 0,
+  computed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE public.athlete_readiness ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+
+ALTER TABLE public.athlete_readiness ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own readiness" ON public.athlete_readiness;
+CREATE POLICY "Users can view own readiness"
+ON public.athlete_readiness
+FOR SELECT
+USING (auth.uid()::TEXT = athlete_id);
+
+COMMENT ON TABLE public.athlete_readiness IS 'Daily readiness (safety status, structural state, training decision) precomputed per athlete';
+
+-- =====================================================
+-- INVALIDATION
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.trg_invalidate_athlete_readiness()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_athlete_id TEXT;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    v_athlete_id := OLD.athlete_id::TEXT;
+  ELSE
+    v_athlete_id := NEW.athlete_id::TEXT;
+  END IF;
+
+  -- Athletes without a row yet get a stale placeholder, so a first
+  -- compute already in flight cannot store over this change either
+  INSERT INTO public.athlete_readiness AS r (athlete_id, readiness_date, status, stale, version)
+  VALUES (v_athlete_id, (NOW() AT TIME ZONE 'UTC')::DATE, 'PENDING', TRUE, 1)
+  ON CONFLICT (athlete_id) DO UPDATE SET
+    stale = TRUE,
+    version = r.version + 1;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_aisri_scores_readiness ON public.aisri_scores;
+CREATE TRIGGER trg_aisri_scores_readiness
+AFTER INSERT OR UPDATE OR DELETE ON public.aisri_scores
+FOR EACH ROW EXECUTE FUNCTION public.trg_invalidate_athlete_readiness();
+
+DROP TRIGGER IF EXISTS trg_injury_risk_predictions_readiness ON public.injury_risk_predictions;
+CREATE TRIGGER trg_injury_risk_predictions_readiness
+AFTER INSERT OR UPDATE OR DELETE ON public.injury_risk_predictions
+FOR EACH ROW EXECUTE FUNCTION public.trg_invalidate_athlete_readiness();
+
+DROP TRIGGER IF EXISTS trg_aisri_assessments_readiness ON public."AISRI_assessments";
+CREATE TRIGGER trg_aisri_assessments_readiness
+AFTER INSERT OR UPDATE OR DELETE ON public."AISRI_assessments"
+FOR EACH ROW EXECUTE FUNCTION public.trg_invalidate_athlete_readiness();
+
+DROP TRIGGER IF EXISTS trg_athlete_daily_load_readiness ON public.athlete_daily_load;
+CREATE TRIGGER trg_athlete_daily_load_readiness
+AFTER INSERT OR UPDATE OR DELETE ON public.athlete_daily_load
+FOR EACH ROW EXECUTE FUNCTION public.trg_invalidate_athlete_readiness();
+
+-- =====================================================
+-- BULK INPUTS
+-- =====================================================
+-- Everything readiness needs except the structural state (served by
+-- get_latest_structural_assessments) for an id list, or for every active
+-- athlete (training load in the last p_active_days) when p_athlete_ids is
+-- NULL. Keyset-paginated by athlete_id. readiness_version is the current
+-- athlete_readiness version (0 without a row), read in the same snapshot.
+
+DROP FUNCTION IF EXISTS public.get_readiness_inputs(TEXT[], INTEGER, TEXT, INTEGER);
+CREATE OR REPLACE FUNCTION public.get_readiness_inputs(
+  p_athlete_ids TEXT[] DEFAULT NULL,
+  p_active_days INTEGER DEFAULT 28,
+  p_after TEXT DEFAULT NULL,
+  p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+  athlete_id TEXT,
+  latest_aisri JSONB,
+  latest_injury_prediction JSONB,
+  assessment_aisri_score INTEGER,
+  training_load DOUBLE PRECISION,
+  readiness_version BIGINT
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_today DATE := (NOW() AT TIME ZONE 'UTC')::DATE;
+BEGIN
+  RETURN QUERY
+  WITH members AS (
+    SELECT m.id
+    FROM (
+      SELECT DISTINCT unnest(p_athlete_ids) AS id
+      WHERE p_athlete_ids IS NOT NULL
+      UNION
+      SELECT DISTINCT d.athlete_id
+      FROM public.athlete_daily_load d
+      WHERE p_athlete_ids IS NULL
+        AND d.day > v_today - p_active_days
+        AND d.load > 0
+    ) m
+    WHERE m.id IS NOT NULL
+      AND (p_after IS NULL OR m.id > p_after)
+    ORDER BY m.id
+    LIMIT p_limit
+  ),
+  aisri AS (
+    SELECT DISTINCT ON (s.athlete_id) s.athlete_id, to_jsonb(s) AS row_data
+    FROM public.aisri_scores s
+    JOIN members ON members.id = s.athlete_id
+    ORDER BY s.athlete_id, s.created_at DESC
+  ),
+  injury AS (
+    SELECT DISTINCT ON (r.athlete_id) r.athlete_id, to_jsonb(r) AS row_data
+    FROM public.injury_risk_predictions r
+    JOIN members ON members.id = r.athlete_id
+    ORDER BY r.athlete_id, r.created_at DESC
+  ),
+  assessment AS (
+    SELECT DISTINCT ON (a.athlete_id) a.athlete_id, a.aisri_score
+    FROM public."AISRI_assessments" a
+    JOIN members ON members.id = a.athlete_id
+    ORDER BY a.athlete_id, a.created_at DESC
+  ),
+  -- Average load of training days in the last week (as the decision agent)
+  load_7d AS (
+    SELECT d.athlete_id, AVG(d.load)::DOUBLE PRECISION AS avg_load
+    FROM public.athlete_daily_load d
+    JOIN members ON members.id = d.athlete_id
+    WHERE d.day > v_today - 7
+      AND d.day <= v_today
+      AND d.load > 0
+    GROUP BY d.athlete_id
+  )
+  SELECT
+    members.id,
+    aisri.row_data,
+    injury.row_data,
+    assessment.aisri_score,
+    COALESCE(load_7d.avg_load, 0),
+    COALESCE(readiness.version, 0)
+  FROM members
+  LEFT JOIN aisri ON aisri.athlete_id = members.id
+  LEFT JOIN injury ON injury.athlete_id = members.id
+  LEFT JOIN assessment ON assessment.athlete_id = members.id
+  LEFT JOIN load_7d ON load_7d.athlete_id = members.id
+  LEFT JOIN public.athlete_readiness readiness ON readiness.athlete_id = members.id
+  ORDER BY members.id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_readiness_inputs(TEXT[], INTEGER, TEXT, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION public.get_readiness_inputs IS 'Latest AISRi, injury prediction, assessment score, 7-day training load and readiness version for an id list or every active athlete, keyset-paginated by athlete_id';
+
+-- =====================================================
+-- CONDITIONAL STORE
+-- =====================================================
+-- Upserts computed rows as fresh (stale = FALSE) only where the row's
+-- version still equals the version the inputs were read at. ON CONFLICT
+-- re-checks the condition on the latest committed row, so a concurrent
+-- invalidation always wins. Returns the athlete_ids actually stored.
+
+CREATE OR REPLACE FUNCTION public.store_athlete_readiness(p_rows JSONB)
+RETURNS TABLE (athlete_id TEXT)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+  RETURN QUERY
+  INSERT INTO public.athlete_readiness AS r (
+    athlete_id, readiness_date, status, message, aisri_score, injury_risk,
+    injury_risk_level, recovery_score, structural_state, structural_score,
+    speed_permission, decision, decision_reason, training_load, stale,
+    version, computed_at
+  )
+  SELECT
+    x.athlete_id, x.readiness_date, x.status, x.message, x.aisri_score, x.injury_risk,
+    x.injury_risk_level, x.recovery_score, x.structural_state, x.structural_score,
+    x.speed_permission, x.decision, x.decision_reason, x.training_load, FALSE,
+    COALESCE(x.version, 0), COALESCE(x.computed_at, NOW())
+  FROM jsonb_populate_recordset(NULL::public.athlete_readiness, p_rows) x
+  ON CONFLICT ON CONSTRAINT athlete_readiness_pkey DO UPDATE SET
+    readiness_date = EXCLUDED.readiness_date,
+    status = EXCLUDED.status,
+    message = EXCLUDED.message,
+    aisri_score = EXCLUDED.aisri_score,
+    injury_risk = EXCLUDED.injury_risk,
+    injury_risk_level = EXCLUDED.injury_risk_level,
+    recovery_score = EXCLUDED.recovery_score,
+    structural_state = EXCLUDED.structural_state,
+    structural_score = EXCLUDED.structural_score,
+    speed_permission = EXCLUDED.speed_permission,
+    decision = EXCLUDED.decision,
+    decision_reason = EXCLUDED.decision_reason,
+    training_load = EXCLUDED.training_load,
+    stale = FALSE,
+    computed_at = EXCLUDED.computed_at
+  WHERE r.version = EXCLUDED.version
+  RETURNING r.athlete_id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.store_athlete_readiness(JSONB) TO service_role;
+
+COMMENT ON FUNCTION public.store_athlete_readiness IS 'Store computed readiness rows unless the row was invalidated (version bumped) since its inputs were read';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ athlete_readiness table, invalidation triggers, get_readiness_inputs and store_athlete_readiness created';
+END $$;
@@ -0,0 +1,153 @@
+-- =====================================================
+-- Migration: 20261019000009_persist_training_plans.sql
+-- Purpose: Batched inputs and atomic persistence for weekly training plans
+-- =====================================================
+-- AISRiAdaptiveTrainingPlanAgent (ai_agents/ai_engine_agent/
+-- adaptive_training_plan_agent.py) used to write one ai_workout_plans row
+-- and then an ai_workouts + workout_assignments pair per training day, up
+-- to 11 sequential inserts per plan with no transaction. It now builds all
+-- rows in memory with client-generated ids and hands them to
+-- persist_training_plans, which writes every plan of a request (one
+-- athlete or a whole squad) in a single transaction.
+--
+-- get_training_plan_inputs returns the plan inputs (latest AISRI
+-- assessment score and injury prediction) for an id list or a coach's
+-- active squad in one query.
+
+-- =====================================================
+-- BULK INPUTS
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION public.get_training_plan_inputs(
+  p_athlete_ids TEXT[] DEFAULT NULL,
+  p_coach_id UUID DEFAULT NULL,
+  p_after TEXT DEFAULT NULL,
+  p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+  athlete_id TEXT,
+  aisri_score INTEGER,
+  risk_score NUMERIC,
+  risk_level TEXT
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+BEGIN
+  RETURN QUERY
+  WITH members AS (
+    SELECT DISTINCT m.id
+    FROM (
+      SELECT unnest(p_athlete_ids) AS id
+      UNION ALL
+      SELECT acr.athlete_id::TEXT
+      FROM public.athlete_coach_relationships acr
+      WHERE p_coach_id IS NOT NULL
+        AND acr.coach_id = p_coach_id
+        AND acr.status = 'active'
+    ) m
+    WHERE m.id IS NOT NULL
+      AND (p_after IS NULL OR m.id > p_after)
+    ORDER BY m.id
+    LIMIT p_limit
+  ),
+  assessment AS (
+    SELECT DISTINCT ON (a.athlete_id) a.athlete_id, a.aisri_score
+    FROM public."AISRI_assessments" a
+    JOIN members ON members.id = a.athlete_id
+    ORDER BY a.athlete_id, a.created_at DESC
+  ),
+  injury AS (
+    SELECT DISTINCT ON (r.athlete_id) r.athlete_id, to_jsonb(r) AS row_data
+    FROM public.injury_risk_predictions r
+    JOIN members ON members.id = r.athlete_id
+    ORDER BY r.athlete_id, r.created_at DESC
+  )
+  SELECT
+    members.id,
+    assessment.aisri_score,
+    (injury.row_data->>'risk_score')::NUMERIC,
+    injury.row_data->>'risk_level'
+  FROM members
+  LEFT JOIN assessment ON assessment.athlete_id = members.id
+  LEFT JOIN injury ON injury.athlete_id = members.id
+  ORDER BY members.id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_training_plan_inputs(TEXT[], UUID, TEXT, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION public.get_training_plan_inputs IS 'Latest AISRI assessment score and injury prediction per athlete for an id list or coach squad, keyset-paginated by athlete_id';
+
+-- =====================================================
+-- ATOMIC PERSISTENCE
+-- =====================================================
+-- Inserts prebuilt ai_workout_plans, ai_workouts and workout_assignments
+-- rows (ids generated by the caller) in one transaction: either every
+-- plan is stored or none is.
+--
+-- With p_supersede, the athletes' previously active plans are cancelled
+-- first and their future assignments that are still 'scheduled' are
+-- removed, so a regenerated squad never shows two overlapping weeks.
+-- Returns the ids of the stored plans.
+
+CREATE OR REPLACE FUNCTION public.persist_training_plans(
+  p_plans JSONB,
+  p_workouts JSONB,
+  p_assignments JSONB,
+  p_supersede BOOLEAN DEFAULT FALSE
+)
+RETURNS TABLE (plan_id UUID)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_today DATE := (NOW() AT TIME ZONE 'UTC')::DATE;
+BEGIN
+  IF p_supersede THEN
+    DELETE FROM public.workout_assignments wa
+    USING public.ai_workout_plans p
+    WHERE wa.plan_id = p.id
+      AND p.status = 'active'
+      AND p.athlete_id IN (SELECT x.athlete_id FROM jsonb_populate_recordset(NULL::public.ai_workout_plans, p_plans) x)
+      AND wa.status = 'scheduled'
+      AND wa.scheduled_date >= v_today;
+
+    UPDATE public.ai_workout_plans p
+    SET status = 'cancelled',
+        updated_at = NOW()
+    WHERE p.status = 'active'
+      AND p.athlete_id IN (SELECT x.athlete_id FROM jsonb_populate_recordset(NULL::public.ai_workout_plans, p_plans) x);
+  END IF;
+
+  INSERT INTO public.ai_workout_plans (id, athlete_id, status, created_at, updated_at)
+  SELECT x.id, x.athlete_id, COALESCE(x.status, 'active'), COALESCE(x.created_at, NOW()), NOW()
+  FROM jsonb_populate_recordset(NULL::public.ai_workout_plans, p_plans) x;
+
+  INSERT INTO public.ai_workouts (id, athlete_id, name, duration_minutes, zone, description, created_at)
+  SELECT x.id, x.athlete_id, x.name, x.duration_minutes, x.zone, x.description, COALESCE(x.created_at, NOW())
+  FROM jsonb_populate_recordset(NULL::public.ai_workouts, p_workouts) x;
+
+  INSERT INTO public.workout_assignments (id, athlete_id, workout_id, plan_id, scheduled_date, status)
+  SELECT COALESCE(x.id, gen_random_uuid()), x.athlete_id, x.workout_id, x.plan_id, x.scheduled_date,
+         COALESCE(x.status, 'scheduled')
+  FROM jsonb_populate_recordset(NULL::public.workout_assignments, p_assignments) x;
+
+  RETURN QUERY
+  SELECT x.id
+  FROM jsonb_populate_recordset(NULL::public.ai_workout_plans, p_plans) x;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.persist_training_plans(JSONB, JSONB, JSONB, BOOLEAN) TO service_role;
+
+COMMENT ON FUNCTION public.persist_training_plans IS 'Store prebuilt training plans, workouts and assignments in one transaction, optionally superseding the athletes'' active plans';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ get_training_plan_inputs and persist_training_plans created';
+END $$;
@@ -0,0 +1,101 @@
+-- =====================================================
+-- Migration: 20261019000010_nightly_workout_inputs.sql
+-- Purpose: Bulk inputs for the nightly workout pipeline
+-- =====================================================
+-- NightlyWorkoutPipeline (ai_agents/nightly_workout_pipeline.py) generates
+-- the next day's workout for every active athlete. Per athlete the
+-- generator needs the detailed profile (ability fields, signup date), the
+-- performance labels of the last week's results and the stored 'load'
+-- EWMA; reading those per athlete is four requests each. This function
+-- returns them for a page of athletes in one query.
+--
+-- has_assignment makes the run idempotent: athletes that already have a
+-- workout_assignments row on p_day are returned but not regenerated.
+
+CREATE INDEX IF NOT EXISTS idx_workout_assignments_athlete_date
+ON public.workout_assignments(athlete_id, scheduled_date);
+
+DROP FUNCTION IF EXISTS public.get_nightly_workout_inputs(TEXT[], DATE, INTEGER, TEXT, INTEGER);
+CREATE OR REPLACE FUNCTION public.get_nightly_workout_inputs(
+  p_athlete_ids TEXT[] DEFAULT NULL,
+  p_day DATE DEFAULT NULL,
+  p_active_days INTEGER DEFAULT 28,
+  p_after TEXT DEFAULT NULL,
+  p_limit INTEGER DEFAULT 1000
+)
+RETURNS TABLE (
+  athlete_id TEXT,
+  profile JSONB,
+  recent_results JSONB,
+  workload_as_of DATE,
+  load_acute DOUBLE PRECISION,
+  load_chronic DOUBLE PRECISION,
+  has_assignment BOOLEAN
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_today DATE := (NOW() AT TIME ZONE 'UTC')::DATE;
+  v_day DATE := COALESCE(p_day, (NOW() AT TIME ZONE 'UTC')::DATE + 1);
+BEGIN
+  RETURN QUERY
+  WITH members AS (
+    -- Athletes with a detailed profile, restricted to the id list or to
+    -- those with training load in the last p_active_days
+    SELECT p.athlete_id::TEXT AS id, to_jsonb(p) AS profile
+    FROM public.athlete_detailed_profile p
+    WHERE (p_after IS NULL OR p.athlete_id::TEXT > p_after)
+      AND (
+        (p_athlete_ids IS NOT NULL AND p.athlete_id::TEXT = ANY(p_athlete_ids))
+        OR (p_athlete_ids IS NULL AND EXISTS (
+          SELECT 1 FROM public.athlete_daily_load d
+          WHERE d.athlete_id = p.athlete_id::TEXT
+            AND d.day > v_today - p_active_days
+            AND d.load > 0
+        ))
+      )
+    ORDER BY p.athlete_id::TEXT
+    LIMIT p_limit
+  ),
+  -- Last week's results, newest first (as get_athlete_workout_results)
+  results AS (
+    SELECT
+      members.id,
+      JSONB_AGG(to_jsonb(wr) ORDER BY wr.workout_date DESC) AS rows_data
+    FROM members
+    JOIN public.workout_results wr ON wr.athlete_id::TEXT = members.id
+    WHERE wr.workout_date >= NOW() - INTERVAL '7 days'
+    GROUP BY members.id
+  )
+  SELECT
+    members.id,
+    members.profile,
+    COALESCE(results.rows_data, '[]'::JSONB),
+    w.as_of,
+    w.load_acute,
+    w.load_chronic,
+    EXISTS (
+      SELECT 1 FROM public.workout_assignments wa
+      WHERE wa.athlete_id::TEXT = members.id
+        AND wa.scheduled_date::DATE = v_day
+    )
+  FROM members
+  LEFT JOIN results ON results.id = members.id
+  LEFT JOIN public.athlete_workload_state w ON w.athlete_id = members.id
+  ORDER BY members.id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_nightly_workout_inputs(TEXT[], DATE, INTEGER, TEXT, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION public.get_nightly_workout_inputs IS 'Detailed profile, last-week results, stored load EWMA and whether p_day is already assigned, for an id list or every active athlete, keyset-paginated by athlete_id';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ get_nightly_workout_inputs(athlete_ids, day, active_days, after, limit) created';
+END $$;
@@ -0,0 +1,192 @@
+-- =====================================================
+-- Migration: 20261019000011_workout_completion.sql
+-- Purpose: One-read, one-transaction workout completion
+-- =====================================================
+-- DatabaseIntegration.process_workout_completion (ai_agents/
+-- database_integration.py) used to make 7+ sequential requests per
+-- completed run: read the assignment, insert the result, mark the
+-- assignment completed, read the profile, insert ability_progression,
+-- read last week's results, read the profile again for the week number
+-- and insert the next assignment. A failure midway left a stored result
+-- with no progression or next workout.
+--
+-- get_workout_completion_inputs returns everything the analysis needs in
+-- one query. complete_workout then stores the result, the assignment
+-- status, the ability_progression row and the next assignment (all
+-- built in memory with client-generated ids) in one transaction.
+--
+-- Webhooks can deliver the same activity more than once and at the same
+-- time. complete_workout locks the assignment row, so concurrent
+-- completions of one assignment are serialized. Only the first one is
+-- stored; the others get the stored result row back (stored_result) with
+-- duplicate = TRUE, so a delivery that lost the race reports the same
+-- label and feedback as one caught by the prefetch.
+
+CREATE INDEX IF NOT EXISTS idx_workout_results_assignment
+ON public.workout_results(assignment_id);
+
+-- =====================================================
+-- PREFETCH
+-- =====================================================
+
+DROP FUNCTION IF EXISTS public.get_workout_completion_inputs(UUID, TEXT, INTEGER);
+CREATE OR REPLACE FUNCTION public.get_workout_completion_inputs(
+  p_assignment_id UUID,
+  p_athlete_id TEXT,
+  p_recent_days INTEGER DEFAULT 7
+)
+RETURNS TABLE (
+  assignment JSONB,
+  profile JSONB,
+  recent_results JSONB,
+  workload_as_of DATE,
+  load_acute DOUBLE PRECISION,
+  load_chronic DOUBLE PRECISION,
+  completed_result JSONB
+)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    (SELECT to_jsonb(wa) FROM public.workout_assignments wa WHERE wa.id = p_assignment_id),
+    (SELECT to_jsonb(p) FROM public.athlete_detailed_profile p WHERE p.athlete_id::TEXT = p_athlete_id),
+    -- Newest first (as get_athlete_workout_results)
+    COALESCE((
+      SELECT JSONB_AGG(to_jsonb(wr) ORDER BY wr.workout_date DESC)
+      FROM public.workout_results wr
+      WHERE wr.athlete_id::TEXT = p_athlete_id
+        AND wr.workout_date >= NOW() - make_interval(days => p_recent_days)
+    ), '[]'::JSONB),
+    w.as_of,
+    w.load_acute,
+    w.load_chronic,
+    -- Set when this assignment was already completed (a repeated delivery)
+    (
+      SELECT to_jsonb(wr)
+      FROM public.workout_results wr
+      WHERE wr.assignment_id = p_assignment_id
+      ORDER BY wr.workout_date
+      LIMIT 1
+    )
+  FROM (SELECT 1) one
+  LEFT JOIN public.athlete_workload_state w ON w.athlete_id = p_athlete_id;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_workout_completion_inputs(UUID, TEXT, INTEGER) TO service_role;
+
+COMMENT ON FUNCTION public.get_workout_completion_inputs IS 'Assignment, detailed profile, recent results, stored load EWMA and any existing result of the assignment, for one workout completion';
+
+-- =====================================================
+-- ATOMIC COMPLETION
+-- =====================================================
+
+DROP FUNCTION IF EXISTS public.complete_workout(UUID, JSONB, JSONB, JSONB);
+CREATE OR REPLACE FUNCTION public.complete_workout(
+  p_assignment_id UUID,
+  p_result JSONB,
+  p_progression JSONB,
+  p_next_assignment JSONB DEFAULT NULL
+)
+RETURNS TABLE (
+  result_id UUID,
+  next_assignment_id UUID,
+  duplicate BOOLEAN,
+  stored_result JSONB
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_existing public.workout_results;
+BEGIN
+  PERFORM 1 FROM public.workout_assignments wa WHERE wa.id = p_assignment_id FOR UPDATE;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Workout assignment % not found', p_assignment_id;
+  END IF;
+
+  SELECT wr.* INTO v_existing
+  FROM public.workout_results wr
+  WHERE wr.assignment_id = p_assignment_id
+  ORDER BY wr.workout_date
+  LIMIT 1;
+
+  IF FOUND THEN
+    RETURN QUERY SELECT v_existing.id, NULL::UUID, TRUE, to_jsonb(v_existing);
+    RETURN;
+  END IF;
+
+  INSERT INTO public.workout_results (
+    id, assignment_id, athlete_id, workout_date, external_id, data_source,
+    distance_km, duration_seconds, avg_pace_seconds, avg_hr, max_hr, elevation_gain_m,
+    splits_data, hr_zones, completed_full, stopped_at_km,
+    performance_label, distance_score, pace_score, hr_score, overall_score,
+    strengths, weaknesses, key_feedback, coach_notes,
+    ability_change, readiness_for_progression, fatigue_level, injury_risk_indicators
+  )
+  SELECT
+    x.id, x.assignment_id, x.athlete_id, x.workout_date, x.external_id, x.data_source,
+    x.distance_km, x.duration_seconds, x.avg_pace_seconds, x.avg_hr, x.max_hr, x.elevation_gain_m,
+    x.splits_data, x.hr_zones, x.completed_full, x.stopped_at_km,
+    x.performance_label, x.distance_score, x.pace_score, x.hr_score, x.overall_score,
+    x.strengths, x.weaknesses, x.key_feedback, x.coach_notes,
+    x.ability_change, x.readiness_for_progression, x.fatigue_level, x.injury_risk_indicators
+  FROM jsonb_populate_record(NULL::public.workout_results, p_result) x;
+
+  UPDATE public.workout_assignments
+  SET workout_status = 'completed',
+      completed_date = NOW(),
+      updated_at = NOW()
+  WHERE id = p_assignment_id;
+
+  INSERT INTO public.ability_progression (
+    athlete_id, recorded_date, workout_result_id, ability_score_change,
+    current_pace_easy, current_pace_tempo, current_pace_interval,
+    current_weekly_volume, current_longest_run, fitness_score,
+    max_hr, threshold_hr, aerobic_hr
+  )
+  SELECT
+    x.athlete_id, x.recorded_date, x.workout_result_id, x.ability_score_change,
+    x.current_pace_easy, x.current_pace_tempo, x.current_pace_interval,
+    x.current_weekly_volume, x.current_longest_run, x.fitness_score,
+    x.max_hr, x.threshold_hr, x.aerobic_hr
+  FROM jsonb_populate_record(NULL::public.ability_progression, p_progression) x;
+
+  IF p_next_assignment IS NOT NULL THEN
+    INSERT INTO public.workout_assignments (
+      id, athlete_id, assigned_date, scheduled_date, workout_type, workout_status,
+      distance_km, target_pace_seconds, pace_range_min, pace_range_max,
+      target_hr, hr_range_min, hr_range_max,
+      interval_count, interval_distance_m, interval_pace_seconds, rest_time_seconds,
+      workout_notes, coaching_cues, expected_load, progressive_increase_pct,
+      acwr_projected, generation_rationale
+    )
+    SELECT
+      x.id, x.athlete_id, x.assigned_date, x.scheduled_date, x.workout_type, x.workout_status,
+      x.distance_km, x.target_pace_seconds, x.pace_range_min, x.pace_range_max,
+      x.target_hr, x.hr_range_min, x.hr_range_max,
+      x.interval_count, x.interval_distance_m, x.interval_pace_seconds, x.rest_time_seconds,
+      x.workout_notes, x.coaching_cues, x.expected_load, x.progressive_increase_pct,
+      x.acwr_projected, x.generation_rationale
+    FROM jsonb_populate_record(NULL::public.workout_assignments, p_next_assignment) x;
+  END IF;
+
+  RETURN QUERY
+  SELECT (p_result->>'id')::UUID, (p_next_assignment->>'id')::UUID, FALSE, NULL::JSONB;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.complete_workout(UUID, JSONB, JSONB, JSONB) TO service_role;
+
+COMMENT ON FUNCTION public.complete_workout IS 'Store a workout result, mark its assignment completed, record ability progression and insert the next assignment in one transaction; repeated completions of an assignment return the stored result';
+
+-- =====================================================
+-- VERIFICATION
+-- =====================================================
+DO $$
+BEGIN
+  RAISE NOTICE '✅ get_workout_completion_inputs and complete_workout created';
+END $$;